@@ -18,6 +18,9 @@
 Defines an Alarm base class.
 """
 
+# standard library
+import logging
+
 # third party
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.fields import GenericRelation
@@ -30,6 +33,8 @@ from cyphon.baseclass import BaseClass
 from cyphon.models import GetByNameManager, FindEnabledMixin
 from cyphon.transaction import close_old_connections
 
+_LOGGER = logging.getLogger(__name__)
+
 
 class AlarmManager(GetByNameManager, FindEnabledMixin, BaseClass):
     """
@@ -53,6 +58,25 @@ class AlarmManager(GetByNameManager, FindEnabledMixin, BaseClass):
         """
         self.raise_method_not_implemented()
 
+    def get_relevant(self, distillery):
+        """Get the Alarms that should inspect a document.
+
+        Uses :meth:`~AlarmManager.find_relevant` by default. Derived
+        classes can override this to get the Alarms from a cache.
+
+        Parameters
+        ----------
+        distillery : |Distillery|
+            The |Distillery| associated with the document.
+
+        Returns
+        -------
+        iterable of Alarms
+            The Alarms that should inspect the document.
+
+        """
+        return self.find_relevant(distillery)
+
     @close_old_connections
     def process(self, doc_obj):
         """Inspect a document with Alarms.
@@ -67,10 +91,66 @@ class AlarmManager(GetByNameManager, FindEnabledMixin, BaseClass):
         None
 
         """
-        alarms = self.find_relevant(doc_obj.distillery)
+        alarms = self.get_relevant(doc_obj.distillery)
         for alarm in alarms:
             alarm.process(doc_obj)
 
+    def _inspect(self, doc_obj, alarms):
+        """
+        Takes a DocumentObj and a list of Alarms and inspects the
+        document with each Alarm. Returns a Boolean indicating whether
+        all the Alerts it generated were saved.
+        """
+        alerts = [alarm.process(doc_obj) for alarm in alarms]
+        return all(alert is None or alert.pk is not None for alert in alerts)
+
+    @close_old_connections
+    def process_many(self, doc_objs, heartbeat=None):
+        """Inspect a batch of documents with Alarms.
+
+        The |Distillery| and relevant Alarms are only looked up once for
+        each Collection in the batch.
+
+        Parameters
+        ----------
+        doc_objs : |list| of |DocumentObj|
+            The documents that Alarms should inspect.
+
+        heartbeat : callable, optional
+            A function called before each document is inspected, e.g.
+            to keep a connection to a message broker alive.
+
+        Returns
+        -------
+        |list| of |bool|
+            Whether each document was inspected without errors and
+            any Alerts it generated were saved.
+
+        """
+        distilleries = {}
+        alarms_by_collection = {}
+        results = []
+
+        for doc_obj in doc_objs:
+            if heartbeat is not None:
+                heartbeat()
+            try:
+                collection = doc_obj.collection
+                if collection in distilleries:
+                    doc_obj.distillery = distilleries[collection]
+                else:
+                    alarms_by_collection[collection] = list(
+                        self.get_relevant(doc_obj.distillery))
+                    distilleries[collection] = doc_obj.distillery
+                results.append(self._inspect(
+                    doc_obj, alarms_by_collection[collection]))
+            except Exception as error:
+                _LOGGER.exception('An error occurred while inspecting '
+                                  'document %s:\n  %s', doc_obj.doc_id, error)
+                results.append(False)
+
+        return results
+
 
 class Alarm(models.Model, BaseClass):
     """
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmarks redacting text with compiled CodeBooks against replacing
+each of their RealNames in turn.
+
+Run it from the command line with the name of a CodeBook's Company and
+a file of texts to redact, one per line, e.g.::
+
+    python codebooks/benchmark.py 'Acme' texts.txt
+
+The difference grows with the number of RealNames, so it's best run
+against a large CodeBook. Each text is redacted by replacing the
+CodeBook's RealNames one at a time, like CodeBooks did before they were
+compiled, then with a cold and a warm
+:const:`~codebooks.models.CODEBOOK_CACHE`.
+"""
+
+# standard library
+import os
+import sys
+import timeit
+
+# add path to the Cyphon project folder so Cyphon packages can be found
+CYPHON_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(CYPHON_PATH)
+
+# set the default Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cyphon.settings.prod')
+
+# third party
+import django
+django.setup()
+
+# local
+from codebooks.models import CODEBOOK_CACHE, CodeBook
+
+
+def run_benchmark(codebook, texts, repeat=3):
+    """Time redacting texts with a CodeBook.
+
+    Parameters
+    ----------
+    codebook : CodeBook
+        The CodeBook used to redact the texts.
+
+    texts : list of str
+        The texts to redact.
+
+    repeat : int
+        The number of times each timing is taken. The best one is kept.
+
+    Returns
+    -------
+    |dict|
+        Seconds taken to redact all texts, keyed by redaction method.
+
+    """
+    def each_realname():
+        for text in texts:
+            codebook._redact_each(text)
+
+    def compiled():
+        for text in texts:
+            codebook.redact(text)
+
+    def compiled_cold():
+        CODEBOOK_CACHE.clear()
+        compiled()
+
+    return {
+        'each RealName': min(timeit.repeat(each_realname, number=1,
+                                           repeat=repeat)),
+        'compiled (cold cache)': min(timeit.repeat(compiled_cold, number=1,
+                                                   repeat=repeat)),
+        'compiled (warm cache)': min(timeit.repeat(compiled, number=1,
+                                                   repeat=repeat)),
+    }
+
+
+if __name__ == '__main__':
+    _CODEBOOK = CodeBook.objects.get_by_natural_key(sys.argv[1])
+    with open(sys.argv[2]) as _FILE:
+        _TEXTS = [_LINE.rstrip('\n') for _LINE in _FILE if _LINE.strip()]
+
+    _CHANGED = sum(_CODEBOOK.redact(_TEXT) != _CODEBOOK._redact_each(_TEXT)
+                   for _TEXT in _TEXTS)
+    print('%d RealNames, %d texts, %d redacted differently'
+          % (len(_CODEBOOK.realnames), len(_TEXTS), _CHANGED))
+    for _NAME, _SECONDS in sorted(run_benchmark(_CODEBOOK, _TEXTS).items()):
+        print('  %s: %.2fs (%.1fus per text)'
+              % (_NAME, _SECONDS, _SECONDS * 1e6 / len(_TEXTS)))
@@ -19,26 +19,173 @@ Defines CodeName, RealName, and CodeBook models for redacting text fields.
 """
 
 # standard library
+import bisect
 from collections import OrderedDict
+import heapq
 import json
 import logging
 import re
+import string
 
 # third party
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.functional import cached_property
 from django.utils.translation import ugettext_lazy as _
 
 # local
 from companies.models import Company
+from utils.cacheutils.cacheutils import ModelCache
 from utils.validators.validators import regex_validator
 
 _CODEBOOK_SETTINGS = settings.CODEBOOKS
 
 _LOGGER = logging.getLogger(__name__)
 
+# regexes with numbered backreferences or conditionals can't be combined,
+# since their group numbers change in the combined regex
+_NUMBERED_GROUP_REF = re.compile(r'\\[1-9]|\(\?\(\d')
+
+_LITERAL_CHARS = frozenset(string.ascii_letters + string.digits + ' ')
+
+_QUANTIFIERS = '*+?{'
+
+
+def _has_top_level_branch(regex):
+    """
+    Takes a regex and returns a Boolean indicating whether it contains
+    a | that isn't inside a group or a character set.
+    """
+    depth = 0
+    index = 0
+    in_set = False
+    while index < len(regex):
+        char = regex[index]
+        if char == '\\':
+            index += 1
+        elif in_set:
+            in_set = char != ']'
+        elif char == '[':
+            in_set = True
+            # a ] at the start of a set is a literal
+            if regex[index + 1:index + 2] == '^':
+                index += 1
+            if regex[index + 1:index + 2] == ']':
+                index += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        index += 1
+    return False
+
+
+def _split_literal_prefix(regex):
+    """
+    Takes a regex and returns a tuple of the literal characters that
+    every match starts with, in lower case, and the rest of the regex.
+    """
+    if _has_top_level_branch(regex):
+        return ('', regex)
+
+    end = 0
+    while end < len(regex) and regex[end] in _LITERAL_CHARS:
+        end += 1
+
+    # a quantifier applies to the last literal character
+    if end and end < len(regex) and regex[end] in _QUANTIFIERS:
+        end -= 1
+
+    return (regex[:end].lower(), regex[end:])
+
+
+def _combine_regexes(alternatives):
+    """
+    Takes a list of tuples of literal prefixes and regexes, in the order
+    they should be tried, and returns a regex that matches any of them.
+
+    Alternatives are nested under the prefix characters they share, like
+    in a trie, so the regex engine only tries the alternatives that can
+    match the text. Alternatives starting with different characters can't
+    match at the same place, so only those that don't start with a
+    literal character need to keep their place in the order.
+    """
+    segments = []
+    for (prefix, regex) in alternatives:
+        if not prefix:
+            segments.append(regex)
+            continue
+        if not segments or not isinstance(segments[-1], OrderedDict):
+            segments.append(OrderedDict())
+        segments[-1].setdefault(prefix[0], []).append((prefix[1:], regex))
+
+    parts = []
+    for segment in segments:
+        if not isinstance(segment, OrderedDict):
+            parts.append(segment)
+            continue
+        for (char, nested) in segment.items():
+            if len(nested) == 1:
+                (prefix, regex) = nested[0]
+                parts.append(re.escape(char + prefix) + regex)
+            else:
+                parts.append('%s(?:%s)' % (re.escape(char),
+                                           _combine_regexes(nested)))
+
+    return '|'.join(parts)
+
+
+def _format_codename(code):
+    """
+    Takes a code and returns it with the CodeName prefix and suffix.
+    """
+    prefix = _CODEBOOK_SETTINGS['CODENAME_PREFIX']
+    suffix = _CODEBOOK_SETTINGS['CODENAME_SUFFIX']
+    return prefix + code + suffix
+
+
+def _select_spans(text, candidates, patterns):
+    """
+    Takes a text string, a list of (number, start, end) tuples for the
+    matches of the RealNames numbered in order of rank, and a list of
+    compiled regexes for the RealNames. Returns a sorted list of
+    (start, end, number) tuples for the matches that should be replaced.
+
+    Matches are taken in order of rank and then position, skipping those
+    that overlap a match already taken. Where a skipped match starts
+    before the match it overlaps, RealNames of the following ranks are
+    tried at the same position, since they may match a shorter string.
+    """
+    heapq.heapify(candidates)
+    starts = []
+    spans = []
+
+    while candidates:
+        (num, start, end) = heapq.heappop(candidates)
+        index = bisect.bisect_right(starts, start)
+        covered = index > 0 and spans[index - 1][1] > start
+
+        if not covered and (index == len(starts) or starts[index] >= end):
+            starts.insert(index, start)
+            spans.insert(index, (start, end, num))
+            continue
+
+        if covered:
+            continue
+
+        for next_num in range(num + 1, len(patterns)):
+            match = patterns[next_num].match(text, start)
+            if match and match.end() > start:
+                heapq.heappush(candidates, (next_num, start, match.end()))
+                break
+
+    return spans
+
 
 class CodeNameManager(models.Manager):
     """
@@ -89,9 +236,7 @@ class CodeName(models.Model):
         """
         Returns a formatted version of the codename.
         """
-        prefix = _CODEBOOK_SETTINGS['CODENAME_PREFIX']
-        suffix = _CODEBOOK_SETTINGS['CODENAME_SUFFIX']
-        return prefix + self.code + suffix
+        return _format_codename(self.code)
 
 
 class RealNameManager(models.Manager):
@@ -188,14 +333,6 @@ class CodeBookManager(models.Manager):
     Adds methods to the default model manager.
     """
 
-    def get_queryset(self):
-        """
-        Overrides the default get_queryset method to prefetch related
-        CodeNames.
-        """
-        default_queryset = super(CodeBookManager, self).get_queryset()
-        return default_queryset.prefetch_related('codenames__realnames')
-
     def get_by_natural_key(self, company_name):
         """
         Allow retrieval of a Codebook by its natural key instead of its
@@ -230,14 +367,12 @@ class CodeBook(models.Model):
     @cached_property
     def realnames(self):
         """
-        Returns a QuerySet of RealNames associated with the CodeBook,
+        Returns a list of RealNames associated with the CodeBook,
         sorted by rank.
         """
-        realnames = []
-        for codename in self.codenames.all():
-            realnames.extend(codename.realnames.all())
-        realnames.sort(key=lambda x: x.rank)
-        return realnames
+        realnames = RealName.objects.filter(codename__codebook=self)
+        return list(realnames.select_related('codename')
+                    .order_by('rank', 'codename__code', 'regex'))
 
     def _get_codename_dict(self):
         """
@@ -257,11 +392,125 @@ class CodeBook(models.Model):
         codes = self._get_codename_dict()
         return json.dumps(codes, indent=4)
 
-    def redact(self, text):
+    def _compile(self):
+        """
+        Returns a tuple of a regex that finds, at every position of a
+        text, the RealName with the lowest rank number that matches
+        there, a dictionary of the RealName numbers for each of the
+        regex's groups, and lists of the RealNames' own regexes and codes,
+        in order of rank. The regex is None if the CodeBook has no
+        RealNames. Returns None if the RealNames can't be combined into
+        one regex.
+        """
+        alternatives = []
+        group_nums = {}
+        regexes = []
+        codes = []
+
+        for (num, realname) in enumerate(self.realnames):
+            if _NUMBERED_GROUP_REF.search(realname.regex):
+                return None
+
+            # the empty group at the end of each alternative tells which
+            # RealName was matched, and where its match ends
+            group_name = '_realname%s' % num
+            group_nums[group_name] = num
+            (prefix, regex) = _split_literal_prefix(realname.regex)
+            alternatives.append(
+                (prefix, '(?:%s)(?P<%s>)' % (regex, group_name)))
+            regexes.append(realname.regex)
+            codes.append(realname.codename.code)
+
+        if not alternatives:
+            return (None, {}, [], [])
+
+        # the lookahead finds matches starting at every position, even
+        # where they overlap, so they can be selected by rank
+        try:
+            pattern = re.compile('(?=%s)' % _combine_regexes(alternatives),
+                                 re.IGNORECASE)
+            patterns = [re.compile(regex, re.IGNORECASE) for regex in regexes]
+
+        # Python < 3.5 raises an AssertionError for more than 100 groups
+        except (re.error, AssertionError) as error:
+            _LOGGER.warning('RealNames for CodeBook "%s" could not be '
+                            'combined: %s', self, error)
+            return None
+
+        nums = {pattern.groupindex[group_name]: num
+                for (group_name, num) in group_nums.items()}
+
+        return (pattern, nums, patterns, codes)
+
+    def _redact_each(self, text):
         """
-        Takes a text string and returns a redacted version of the text
-        using the CodeBook's CodeNames.
+        Takes a text string and returns a redacted version of the text,
+        replacing each of the CodeBook's RealNames in turn.
         """
         for realname in self.realnames:
             text = realname.redact(text)
         return text
+
+    def redact(self, text):
+        """
+        Takes a text string and returns a redacted version of the text
+        using the CodeBook's CodeNames.
+
+        Where matches of several RealNames overlap, the RealName with the
+        lowest rank number is replaced, as if the RealNames were replaced
+        one at a time in order of rank. Unlike that, all RealNames are
+        matched against the original text, so a RealName is never found
+        in the CodeName that replaced another one.
+        """
+        matcher = CODEBOOK_CACHE.get(self.pk, self._compile)
+
+        if matcher is None:
+            return self._redact_each(text)
+
+        (pattern, nums, patterns, codes) = matcher
+
+        if pattern is None:
+            return text
+
+        candidates = []
+        for match in pattern.finditer(text):
+            start = match.start()
+            end = match.end(match.lastindex)
+            if end > start:
+                candidates.append((nums[match.lastindex], start, end))
+
+        parts = []
+        position = 0
+        for (start, end, num) in _select_spans(text, candidates, patterns):
+            parts.append(text[position:start])
+            parts.append(_format_codename(codes[num]))
+            position = end
+        parts.append(text[position:])
+
+        return ''.join(parts)
+
+
+#: |ModelCache| of compiled CodeBooks, keyed by Company. Redacting text
+#: with a compiled CodeBook takes a single pass over the text, no matter
+#: how many RealNames the CodeBook has. The cache is cleared whenever a
+#: CodeBook, CodeName or RealName is changed.
+CODEBOOK_CACHE = ModelCache('codebooks')
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def clear_codebook_cache(sender, instance, **kwargs):
+    """
+    Clears the CODEBOOK_CACHE when a model used by compiled CodeBooks is
+    saved or deleted.
+    """
+    if isinstance(instance, (CodeBook, CodeName, RealName)):
+        CODEBOOK_CACHE.clear()
+
+
+@receiver(m2m_changed, sender=CodeBook.codenames.through)
+def clear_codebook_cache_on_codenames(sender, **kwargs):
+    """
+    Clears the CODEBOOK_CACHE when the CodeNames of a CodeBook change.
+    """
+    CODEBOOK_CACHE.clear()
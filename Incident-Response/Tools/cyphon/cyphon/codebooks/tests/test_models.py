@@ -29,7 +29,7 @@ from django.test import TestCase
 from testfixtures import LogCapture
 
 # local
-from codebooks.models import CodeName, RealName, CodeBook
+from codebooks.models import CODEBOOK_CACHE, CodeName, RealName, CodeBook
 from tests.fixture_manager import get_fixtures
 
 
@@ -162,6 +162,7 @@ class CodeBookTestCase(CodeBookBaseTestCase):
     """
 
     def setUp(self):
+        CODEBOOK_CACHE.clear()
         self.codebook = CodeBook.objects.get_by_natural_key('Acme')
 
     def test_str(self):
@@ -195,3 +196,151 @@ class CodeBookTestCase(CodeBookBaseTestCase):
             actual = self.codebook.redact(text)
             expected = '**FORGE** is president of **PEAK**.'
             self.assertEqual(actual, expected)
+
+    def test_realnames(self):
+        """
+        Tests that the realnames property gets the RealNames in one query.
+        """
+        with self.assertNumQueries(1):
+            regexes = [realname.regex for realname in self.codebook.realnames]
+            codes = [str(realname.codename)
+                     for realname in self.codebook.realnames]
+        self.assertEqual(regexes, ['Acme.?Supply.?Co', 'John.?Smith',
+                                   'Acme.?Supply', 'Smith', 'Acme'])
+        self.assertEqual(codes, ['PEAK', 'FORGE', 'PEAK', 'FORGE', 'PEAK'])
+
+    def test_redact_uses_cache(self):
+        """
+        Tests that the redact method uses the compiled CodeBook once it
+        has been cached.
+        """
+        self.codebook.redact('Acme')
+        codebook = CodeBook.objects.get_by_natural_key('Acme')
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            with self.assertNumQueries(0):
+                actual = codebook.redact('Smith and Acme Supply')
+        self.assertEqual(actual, '**FORGE** and **PEAK**')
+
+    def test_redact_realname_saved(self):
+        """
+        Tests that the redact method uses a RealName's new regex after
+        the RealName is saved.
+        """
+        self.codebook.redact('Acme')
+        realname = RealName.objects.get_by_natural_key('Smith')
+        realname.regex = 'Smithers'
+        realname.save()
+        codebook = CodeBook.objects.get_by_natural_key('Acme')
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = codebook.redact('Smith and Smithers')
+        self.assertEqual(actual, 'Smith and **FORGE**')
+
+    def test_redact_codename_added(self):
+        """
+        Tests that the redact method uses a CodeName after it is added
+        to the CodeBook.
+        """
+        self.codebook.redact('Acme')
+        codename = CodeName.objects.get_by_natural_key('GRIST')
+        self.codebook.codenames.add(codename)
+        codebook = CodeBook.objects.get_by_natural_key('Acme')
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = codebook.redact('Jane Miller')
+        self.assertEqual(actual, 'Jane **GRIST**')
+
+    def test_redact_with_groups(self):
+        """
+        Tests the redact method when RealNames contain groups.
+        """
+        RealName.objects.filter(regex='John.?Smith').update(
+            regex='(John|Jane).?(Q.?)?Smith')
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = self.codebook.redact('Jane Q Smith of Acme')
+        self.assertEqual(actual, '**FORGE** of **PEAK**')
+
+    def test_redact_branch(self):
+        """
+        Tests the redact method when a RealName contains alternatives.
+        """
+        RealName.objects.filter(regex='Smith').update(regex='Smith|Jones')
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = self.codebook.redact('Jones of Acme')
+        self.assertEqual(actual, '**FORGE** of **PEAK**')
+
+    def test_redact_backreference(self):
+        """
+        Tests that the redact method replaces RealNames one at a time
+        when a RealName contains a numbered backreference.
+        """
+        RealName.objects.filter(regex='Smith').update(regex=r'(Sm)ith\1')
+        self.assertIsNone(self.codebook._compile())
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = self.codebook.redact('Acme Supply and SmithSm')
+        self.assertEqual(actual, '**PEAK** and **FORGE**')
+
+    def _add_realnames(self, *realnames):
+        """
+        Takes tuples of regexes, codes and ranks and adds RealNames for
+        them to the CodeBook. Returns the CodeBook read again.
+        """
+        for (regex, code, rank) in realnames:
+            (codename, _) = CodeName.objects.get_or_create(code=code)
+            RealName.objects.create(regex=regex, codename=codename, rank=rank)
+            self.codebook.codenames.add(codename)
+        return CodeBook.objects.get_by_natural_key('Acme')
+
+    def test_redact_overlap_by_rank(self):
+        """
+        Tests that the redact method replaces the RealName with the
+        lowest rank number where matches of RealNames overlap, even if
+        another RealName's match starts first.
+        """
+        codebook = self._add_realnames(('Acme.?Corp', 'ROCK', -2),
+                                       ('Bob.?Acme', 'STONE', -1))
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            text = 'Bob Acme Corp and Bob Acme'
+            actual = codebook.redact(text)
+            self.assertEqual(actual, 'Bob **ROCK** and **STONE**')
+            self.assertEqual(actual, codebook._redact_each(text))
+
+    def test_redact_overlap_shorter_match(self):
+        """
+        Tests that the redact method replaces a RealName with a higher
+        rank number in front of a match it overlaps.
+        """
+        codebook = self._add_realnames(('Acme.?Corp', 'ROCK', -2),
+                                       ('Bob.?Acme', 'STONE', -1),
+                                       ('Bob', 'STONE', 30))
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            text = 'Bob Acme Corp'
+            actual = codebook.redact(text)
+            self.assertEqual(actual, '**STONE** **ROCK**')
+            self.assertEqual(actual, codebook._redact_each(text))
+
+    def test_redact_ignores_codenames(self):
+        """
+        Tests that the redact method doesn't find RealNames in the
+        CodeNames that replaced other RealNames.
+        """
+        codebook = self._add_realnames(('Acme.?Corp', 'ROCK', -2),
+                                       ('Rock', 'PEAK', 40))
+        with patch.dict('codebooks.models.settings.CODEBOOKS',
+                        self.mock_settings):
+            actual = codebook.redact('Acme Corp')
+        self.assertEqual(actual, '**ROCK**')
+
+    def test_redact_empty(self):
+        """
+        Tests the redact method when the CodeBook has no CodeNames.
+        """
+        self.codebook.codenames.clear()
+        codebook = CodeBook.objects.get_by_natural_key('Acme')
+        self.assertEqual(codebook.redact('Acme'), 'Acme')
@@ -43,6 +43,7 @@ from cyphon.documents import DocumentObj
 from cyphon.models import GetByNameMixin, SelectRelatedManager
 from bottler.containers.models import Container
 from distilleries import signals
+from engines.writer import get_writer
 from utils.dateutils.dateutils import parse_date
 from warehouses.models import Collection
 
@@ -253,6 +254,11 @@ class Distillery(models.Model):
         """
         return DocumentObj(data=doc, doc_id=doc_id, collection=str(self))
 
+    def _send_signal(self, doc, doc_id):
+        """Send a |document_saved| signal for a saved doc."""
+        doc_obj = self._create_doc_obj(doc, doc_id)
+        signals.document_saved.send(sender=type(self), doc_obj=doc_obj)
+
     def _save_and_send_signal(self, doc):
         """Save a doc and send a |document_saved| signal.
 
@@ -260,10 +266,19 @@ class Distillery(models.Model):
         |Collection|, and sends a signal that the document has been
         saved. This signal is received by |Alarms|, such as |Watchdogs|
         and |Monitors|.
+
+        Inside a :func:`~engines.writer.buffered_inserts` block, the doc
+        is added to the |Collection|'s |BulkWriter| instead, and the
+        signal is sent once the doc has been inserted. In that case,
+        returns |True| rather than the doc's id, which isn't known yet.
         """
+        writer = get_writer(self.collection)
+        if writer is not None:
+            writer.add(doc, self._send_signal)
+            return True
+
         doc_id = self.collection.insert(doc)
-        doc_obj = self._create_doc_obj(doc, doc_id)
-        signals.document_saved.send(sender=type(self), doc_obj=doc_obj)
+        self._send_signal(doc, doc_id)
         return doc_id
 
     def _get_date_saved_field(self):
@@ -616,8 +631,9 @@ class Distillery(models.Model):
 
         Returns
         -------
-        str
-            The id of the saved document.
+        str or bool
+            The id of the saved document, or |True| if the document was
+            added to a |BulkWriter| to be saved later.
 
         """
         doc = self._add_date(doc_obj.data)
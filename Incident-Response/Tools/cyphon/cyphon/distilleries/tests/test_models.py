@@ -35,6 +35,7 @@ from testfixtures import LogCapture
 from bottler.containers.models import Container
 from cyphon.documents import DocumentObj
 from distilleries.models import _DISTILLERY_SETTINGS, _PAGE_SIZE, Distillery
+from engines.writer import buffered_inserts
 from tests.fixture_manager import get_fixtures
 from warehouses.models import Collection
 
@@ -390,4 +391,28 @@ class SaveDataTestCase(TransactionTestCase, DistilleryTestCaseMixin):
         self.distillery.collection.insert.assert_called_once_with(bottled_with_meta)
         self.assertEqual(doc_id, mock_doc_id)
 
+    def test_save_data_buffered(self):
+        """
+        Tests the save_data method inside a buffered_inserts block.
+        """
+        self.distillery.collection.insert = Mock()
+        self.distillery.collection.bulk_insert = Mock(return_value=['1', '2'])
+
+        doc_objs = [DocumentObj(data=copy.deepcopy(self.bottled_data))
+                    for dummy_num in range(2)]
+
+        with patch('distilleries.models.signals.document_saved.send') \
+                as mock_send:
+            with buffered_inserts():
+                for doc_obj in doc_objs:
+                    self.assertTrue(self.distillery.save_data(doc_obj))
+                self.assertFalse(mock_send.called)
+
+        self.assertFalse(self.distillery.collection.insert.called)
+        self.assertEqual(self.distillery.collection.bulk_insert.call_count, 1)
+        self.assertEqual(len(mock_send.call_args_list), 2)
+        doc_ids = [call[1]['doc_obj'].doc_id
+                   for call in mock_send.call_args_list]
+        self.assertEqual(doc_ids, ['1', '2'])
+
 # TODO(LH): test labeled doc
@@ -28,6 +28,7 @@ Constant                                Description
 ======================================  ======================================
 :const:`~ENGINE_CLASS`                  Name of module's Engine subclass.
 :const:`~MULTIPLE_FIELD_NAME_MAPPINGS`  Whether a field can have >1 data type.
+:const:`~STATUS_CHECK_INTERVAL`         Seconds a cluster status is trusted.
 :const:`~TIME_SERIES_ENABLED`           Whether time-series are supported.
 ======================================  ======================================
 
@@ -44,6 +45,7 @@ Decorator                               Description
 import datetime
 from functools import wraps
 import logging
+import time
 
 # third party
 from django.utils import timezone
@@ -85,6 +87,16 @@ for easily archiving or deleting old data.
 """
 
 
+STATUS_CHECK_INTERVAL = 5
+"""|int|
+
+Number of seconds after a successful cluster health check during which
+:func:`~wait_for_status` doesn't check the same status again.
+"""
+
+_STATUS_CHECKED = {}
+
+
 def catch_connection_error(func):
     """Catch and log :exc:`~elasticsearch.exceptions.ConnectionError`.
 
@@ -117,7 +129,9 @@ def wait_for_status(status, timeout=TIMEOUT):
 
     Decorator for functions that require a particular cluster state.
     Waits for the cluster to attain the given status before executing
-    the function.
+    the function. The check is skipped if the cluster was found to have
+    the status within the last :const:`~STATUS_CHECK_INTERVAL` seconds,
+    so creating many Engines at once doesn't make a request for each.
 
     Parameters
     ----------
@@ -136,8 +150,14 @@ def wait_for_status(status, timeout=TIMEOUT):
     def _decorator(func):
         @wraps(func)  # preserve name and docstring of wrapped function
         def _call(*args, **kwargs):
-            ELASTICSEARCH.cluster.health(wait_for_status=status,
-                                         request_timeout=timeout)
+            now = time.monotonic()
+            last_checked = _STATUS_CHECKED.get(status)
+            if (last_checked is None or
+                    now - last_checked >= STATUS_CHECK_INTERVAL):
+                health = ELASTICSEARCH.cluster.health(
+                    wait_for_status=status, request_timeout=timeout)
+                if not health.get('timed_out'):
+                    _STATUS_CHECKED[status] = now
             return func(*args, **kwargs)
         return _call
     return _decorator
@@ -173,6 +193,8 @@ class ElasticsearchEngine(Engine):
 
     """
 
+    MULTI_SEARCH_ENABLED = True
+
     @catch_connection_error
     @wait_for_status('yellow')
     def __init__(self, collection):
@@ -186,9 +208,10 @@ class ElasticsearchEngine(Engine):
         self._index_name = self.warehouse_collection.get_warehouse_name()
         self._doc_type = self.warehouse_collection.name
         self._in_time_series = self.warehouse_collection.in_time_series()
+        self._existing_index = None
 
-        if not self._in_time_series and not self._index_exists():
-            self._create_index()
+        if not self._in_time_series:
+            self._get_index_for_insert()
 
     def __str__(self):
         """Get a string representation of the Engine instance.
@@ -271,6 +294,21 @@ class ElasticsearchEngine(Engine):
         """
         return ELASTICSEARCH.indices.exists(self._index_for_insert)
 
+    def _get_index_for_insert(self):
+        """Get the name of the index for inserting docs, creating it
+        if needed.
+
+        Checks whether the index exists only when its name changes
+        (i.e., once a day for a time series), instead of for every
+        insert.
+        """
+        index = self._index_for_insert
+        if index != self._existing_index:
+            if not self._index_exists():
+                self._create_index()
+            self._existing_index = index
+        return index
+
     def _create_mapping(self):
         """Create a mapping for the index.
 
@@ -458,6 +496,114 @@ class ElasticsearchEngine(Engine):
         )
         return es_results.get_results_and_count(results)
 
+    def _get_multi_search_request(self, query, size, offset, timeout=None):
+        """Return the header and body of a search for a multi-search.
+
+        Parameters
+        ----------
+        query : |EngineQuery|
+            An |EngineQuery| defining critieria for matching documents
+            in the index or time series.
+
+        size : int
+            The maximum number of results to return.
+
+        offset : int
+            The number of results to skip when returning the result set.
+
+        timeout : |int|, |float|, or |None|
+            The number of seconds the search may run before returning
+            the results found so far.
+
+        Returns
+        -------
+        |tuple| of |dict|
+            The header and the body of the search.
+
+        """
+        header = {
+            'index': self._index_for_search,
+            'type': self._doc_type,
+            'ignore_unavailable': True,
+        }
+        es_query = es_queries.ElasticsearchQuery(query.subqueries,
+                                                 query.joiner)
+        body = es_query.params
+        body.update({
+            '_source': self.field_names,
+            'size': size,
+            'from': offset,
+        })
+        if timeout is not None:
+            body['timeout'] = '%dms' % (timeout * 1000)
+        return (header, body)
+
+    @classmethod
+    @catch_connection_error
+    @wait_for_status('yellow')
+    def _multi_search(cls, searches, page, page_size, timeout):
+        """Run searches with a single request to the msearch API."""
+        offset = cls.get_offset(page, page_size)
+        body = []
+        for (engine, query) in searches:
+            body.extend(engine._get_multi_search_request(
+                query, page_size, offset, timeout))
+
+        response = ELASTICSEARCH.msearch(body=body)
+
+        results = []
+        for (engine, dummy_query), result in zip(searches,
+                                                 response['responses']):
+            if 'error' in result:
+                _LOGGER.error('Could not search %s: %s',
+                              engine, result['error'])
+                results.append(None)
+            else:
+                results.append(es_results.get_results_and_count(result))
+        return results
+
+    @classmethod
+    def find_many(cls, searches, page=1, page_size=PAGE_SIZE, timeout=None):
+        """Find documents matching queries in several indexes.
+
+        All ElasticsearchEngines share the same Elasticsearch cluster,
+        so the searches are sent together using the msearch API. Each
+        search has its own `timeout`, so a slow index doesn't hold up
+        the results of the others.
+
+        Parameters
+        ----------
+        searches : |list| of |tuple| of (|ElasticsearchEngine|, |EngineQuery|)
+            ElasticsearchEngines and the queries to run with them.
+
+        page : int
+            The page of results to return for each query.
+
+        page_size : int
+            The number of documents per page of results.
+
+        timeout : |int|, |float|, or |None|
+            The number of seconds each search may run before returning
+            the results found so far.
+
+        Returns
+        -------
+        |list| of |dict| or |None|
+            The results of each search, in the same order as `searches`,
+            in the form returned by :meth:`~ElasticsearchEngine.find`.
+            The result is |None| for a search that failed.
+
+        """
+        if not searches:
+            return []
+
+        results = cls._multi_search(searches, page, page_size, timeout)
+
+        if results is None:
+            return [None] * len(searches)
+
+        return results
+
     @catch_connection_error
     @wait_for_status('yellow')
     def filter_ids(self, doc_ids, fields, value):
@@ -499,13 +645,65 @@ class ElasticsearchEngine(Engine):
             The id of the inserted document.
 
         """
-        params = self._params_for_insert
-        params.update({'body': doc, 'refresh': True})
-        if not self._index_exists():
-            self._create_index()
+        params = {
+            'index': self._get_index_for_insert(),
+            'doc_type': self._doc_type,
+            'body': doc,
+            'refresh': True
+        }
         doc = ELASTICSEARCH.index(**params)
         return doc['_id']
 
+    def bulk_insert(self, docs):
+        """Insert several documents into the index at once.
+
+        Uses Elasticsearch's bulk API. Unlike :meth:`~insert`, this
+        doesn't refresh the index, so the documents become searchable
+        after the index's next scheduled refresh.
+
+        Parameters
+        ----------
+        docs : |list| of |dict|
+            Documents to insert into the Elasticsearch index.
+
+        Returns
+        -------
+        |list| of |str| or |None|
+            The ids of the inserted documents, in the same order as
+            `docs`. The id is |None| for a document that couldn't be
+            inserted. If Elasticsearch can't be reached or rejects the
+            whole request, all ids are |None|.
+
+        """
+        if not docs:
+            return []
+
+        try:
+            action = {'index': {'_index': self._get_index_for_insert(),
+                                '_type': self._doc_type}}
+            body = []
+            for doc in docs:
+                body.append(action)
+                body.append(doc)
+
+            response = ELASTICSEARCH.bulk(body=body)
+
+        except elasticsearch.exceptions.TransportError as error:
+            _LOGGER.error('Could not insert %d documents into %s: %s',
+                          len(docs), self, error)
+            return [None] * len(docs)
+
+        doc_ids = []
+        for item in response['items']:
+            result = item['index']
+            if 'error' in result:
+                _LOGGER.error('Could not insert a document into %s: %s',
+                              self, result['error'])
+                doc_ids.append(None)
+            else:
+                doc_ids.append(result['_id'])
+        return doc_ids
+
     def _remove_by_id_wildcard(self, doc_ids):
         """Remove one or more docs from multiple indexes.
 
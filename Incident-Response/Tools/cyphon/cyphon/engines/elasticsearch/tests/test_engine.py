@@ -32,6 +32,8 @@ from elasticsearch.exceptions import ConnectionError
 from testfixtures import LogCapture
 
 # local
+from cyphon.fieldsets import QueryFieldset
+from engines.queries import EngineQuery
 from engines.tests.test_engine import EngineBaseTestCase
 from engines.tests.mixins import CRUDTestCaseMixin, FilterTestCaseMixin
 from warehouses.models import Collection
@@ -43,6 +45,7 @@ try:
     from engines.elasticsearch.client import ELASTICSEARCH, VERSION
     from engines.elasticsearch.engine import (
         catch_connection_error,
+        wait_for_status,
         ElasticsearchEngine,
     )
     NOT_CONNECTED = False
@@ -151,6 +154,48 @@ class CatchConnectionError(ElasticsearchBaseTestCase):
             )
 
 
+class WaitForStatusTestCase(ElasticsearchBaseTestCase):
+    """
+    Tests the wait_for_status decorator.
+    """
+
+    @patch('engines.elasticsearch.engine._STATUS_CHECKED', {})
+    @patch('engines.elasticsearch.engine.ELASTICSEARCH.cluster.health',
+           return_value={'status': 'green', 'timed_out': False})
+    def test_status_checked_once(self, mock_health):
+        """
+        Tests that the cluster status isn't checked again within the
+        status check interval.
+        """
+        @wait_for_status('yellow')
+        def test_decorator():
+            """Test the wait_for_status decorator."""
+            return 'foo'
+
+        with patch('engines.elasticsearch.engine.time.monotonic',
+                   side_effect=[1000, 1004, 1005]):
+            for dummy_num in range(3):
+                self.assertEqual(test_decorator(), 'foo')
+        self.assertEqual(mock_health.call_count, 2)
+
+    @patch('engines.elasticsearch.engine._STATUS_CHECKED', {})
+    @patch('engines.elasticsearch.engine.ELASTICSEARCH.cluster.health',
+           return_value={'status': 'red', 'timed_out': True})
+    def test_status_timed_out(self, mock_health):
+        """
+        Tests that the cluster status is checked again if it wasn't
+        attained.
+        """
+        @wait_for_status('yellow')
+        def test_decorator():
+            """Test the wait_for_status decorator."""
+            return 'foo'
+
+        for dummy_num in range(2):
+            test_decorator()
+        self.assertEqual(mock_health.call_count, 2)
+
+
 class ElasticsearchHelperTestCase(ElasticsearchBaseTestCase):
     """
     Tests helper methods for the Elasticsearch class.
@@ -412,6 +457,136 @@ class ElasticsearchCRUDTestCase(ElasticsearchBaseTestCase, CRUDTestCaseMixin):
     pass
 
 
+class ElasticsearchBulkInsertTestCase(ElasticsearchBaseTestCase):
+    """
+    Tests the bulk_insert method of the ElasticsearchEngine class.
+    """
+
+    def test_bulk_insert(self):
+        """
+        Tests the bulk_insert method.
+        """
+        doc_ids = self.engine.bulk_insert([{'text': 'foo'}, {'text': 'bar'}])
+        self.assertEqual(len(doc_ids), 2)
+        self.assertTrue(all(doc_ids))
+
+        self.elasticsearch.indices.refresh(index=self.index)
+        results = self.engine.find_by_id(doc_ids)
+        self.assertEqual(len(results), 2)
+
+    def test_bulk_insert_error(self):
+        """
+        Tests the bulk_insert method when a document can't be inserted.
+        """
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.bulk',
+                   return_value={'items': [
+                       {'index': {'_id': '1', 'status': 201}},
+                       {'index': {'status': 400, 'error': 'foo'}},
+                   ]}):
+            doc_ids = self.engine.bulk_insert([{'text': 'foo'},
+                                               {'text': 'bar'}])
+        self.assertEqual(doc_ids, ['1', None])
+
+    def test_bulk_insert_connection_error(self):
+        """
+        Tests the bulk_insert method when Elasticsearch can't be
+        reached.
+        """
+        error = ConnectionError('N/A', 'Connection refused', None)
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.bulk',
+                   side_effect=error):
+            with LogCapture():
+                doc_ids = self.engine.bulk_insert([{'text': 'foo'},
+                                                   {'text': 'bar'}])
+        self.assertEqual(doc_ids, [None, None])
+
+    def test_index_checked_once(self):
+        """
+        Tests that inserts don't check whether the index exists once
+        it has been created.
+        """
+        with patch.object(self.engine, '_index_exists') as mock_exists:
+            self.engine.insert({'text': 'foo'})
+            self.engine.bulk_insert([{'text': 'bar'}])
+        self.assertFalse(mock_exists.called)
+
+
+class ElasticsearchFindManyTestCase(ElasticsearchBaseTestCase):
+    """
+    Tests the find_many method of the ElasticsearchEngine class.
+    """
+
+    @staticmethod
+    def _get_query(value):
+        """
+        Returns an EngineQuery for documents with the given text.
+        """
+        fieldset = QueryFieldset(
+            field_name='text',
+            field_type='CharField',
+            operator='eq',
+            value=value
+        )
+        return EngineQuery([fieldset])
+
+    def test_find_many(self):
+        """
+        Tests that the find_many method returns the same results as
+        separate searches, using a single request.
+        """
+        self.engine.bulk_insert([{'text': 'foo'}, {'text': 'foo'},
+                                 {'text': 'bar'}])
+        self.elasticsearch.indices.refresh(index=self.index)
+        queries = [self._get_query('foo'), self._get_query('bar')]
+        expected = [self.engine.find(query) for query in queries]
+
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.msearch',
+                   wraps=self.elasticsearch.msearch) as mock_msearch:
+            results = ElasticsearchEngine.find_many(
+                [(self.engine, query) for query in queries])
+
+        self.assertEqual(mock_msearch.call_count, 1)
+        self.assertEqual([result['count'] for result in results], [2, 1])
+        self.assertEqual(results, expected)
+
+    def test_find_many_timeout(self):
+        """
+        Tests that the find_many method sets a timeout for each search.
+        """
+        response = {'responses': [{'error': 'foo'}] * 2}
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.msearch',
+                   return_value=response) as mock_msearch:
+            ElasticsearchEngine.find_many(
+                [(self.engine, self._get_query('foo')),
+                 (self.engine, self._get_query('bar'))],
+                timeout=1.5)
+        body = mock_msearch.call_args[1]['body']
+        self.assertEqual([search['timeout'] for search in body[1::2]],
+                         ['1500ms', '1500ms'])
+
+    def test_find_many_error(self):
+        """
+        Tests that the find_many method returns None for a search that
+        fails.
+        """
+        response = {'responses': [{'error': 'foo'}]}
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.msearch',
+                   return_value=response):
+            results = ElasticsearchEngine.find_many(
+                [(self.engine, self._get_query('foo'))])
+        self.assertEqual(results, [None])
+
+    def test_find_many_no_searches(self):
+        """
+        Tests that the find_many method doesn't make a request when
+        there are no searches.
+        """
+        with patch('engines.elasticsearch.engine.ELASTICSEARCH.msearch') \
+                as mock_msearch:
+            self.assertEqual(ElasticsearchEngine.find_many([]), [])
+        self.assertFalse(mock_msearch.called)
+
+
 class ElasticsearchWildcardTestCase(ElasticsearchBaseTestCase):
     """
 
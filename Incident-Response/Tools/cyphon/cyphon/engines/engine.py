@@ -86,6 +86,13 @@ class Engine(BaseClass):
 
     """
 
+    MULTI_SEARCH_ENABLED = False
+    """|bool|
+
+    Whether :meth:`~Engine.find_many` searches several |Collections|
+    with a single request to the data store.
+    """
+
     def __init__(self, collection):
         """Initialize an Engine instance."""
         self.warehouse_collection = collection
@@ -179,6 +186,44 @@ class Engine(BaseClass):
         """
         return self.raise_method_not_implemented()
 
+    @classmethod
+    def find_many(cls, searches, page=1, page_size=PAGE_SIZE, timeout=None):
+        """Find documents matching queries in several data stores.
+
+        Parameters
+        ----------
+        searches : |list| of |tuple| of (|Engine|, |EngineQuery|)
+            Engines of this class and the queries to run with them.
+
+        page : int
+            The page of results to return for each query.
+
+        page_size : int
+            The number of documents per page of results.
+
+        timeout : |int|, |float|, or |None|
+            The number of seconds each search may run before the data
+            store returns the results found so far, if the data store
+            supports it.
+
+        Returns
+        -------
+        |list| of |dict| or |None|
+            The results of each search, in the same order as `searches`,
+            in the form returned by :meth:`~Engine.find`. The result is
+            |None| for a search that failed.
+
+        Notes
+        -----
+        This default implementation runs the searches one at a time.
+        Derived classes should override it, and set
+        :attr:`~Engine.MULTI_SEARCH_ENABLED`, if the data store can run
+        several searches in one request.
+
+        """
+        return [engine.find(query, page=page, page_size=page_size)
+                for (engine, query) in searches]
+
     def filter_ids(self, doc_ids, fields, value):
         """Find the ids of documents that match a value.
 
@@ -226,6 +271,30 @@ class Engine(BaseClass):
         """
         return self.raise_method_not_implemented()
 
+    def bulk_insert(self, docs):
+        """Insert several documents into the data store at once.
+
+        Parameters
+        ----------
+        docs : |list| of |dict|
+            Documents to insert in the data store.
+
+        Returns
+        -------
+        |list| of |str| or |None|
+            The ids of the inserted documents, in the same order as
+            `docs`. The id is |None| for a document that couldn't be
+            inserted.
+
+        Notes
+        -----
+        This default implementation inserts the documents one at a
+        time. Derived classes should override it to use the data
+        store's bulk API.
+
+        """
+        return [self.insert(doc) for doc in docs]
+
     def remove_by_id(self, doc_ids):
         """Remove the documents with the given ids.
 
@@ -418,6 +418,70 @@ class MongoDbEngine(Engine):
 
         return str(obj_id)
 
+    def _find_duplicate_id(self, errmsg):
+        """Get the id of the document that caused a duplicate key error.
+
+        Takes the error message of a duplicate key error and returns the
+        ObjectId of the original document, or |None| if it can't be
+        found.
+        """
+        key_val = parserutils.get_dup_key_val(errmsg)
+        dup = self._collection.find_one(key_val)
+        if dup:
+            return dup['_id']
+
+    def bulk_insert(self, docs):
+        """Insert several documents into the collection at once.
+
+        Parameters
+        ----------
+        docs : |list| of |dict|
+            Documents to insert into the MongoDB collection.
+
+        Returns
+        -------
+        |list| of |str| or |None|
+            The hexadecimal ids of the inserted documents, in the same
+            order as `docs`. The id is |None| for a document that
+            couldn't be inserted.
+
+        Notes
+        ------
+        Like :meth:`~insert`, returns the id of the original document
+        for a document whose key already exists. If the request fails
+        for another reason than a write error (e.g. MongoDB can't be
+        reached), all ids are |None|.
+
+        """
+        if not docs:
+            return []
+
+        try:
+            result = self._collection.insert_many(docs, ordered=False)
+            obj_ids = result.inserted_ids
+
+        except pymongo.errors.BulkWriteError as error:
+            # ids are assigned to the docs before they are sent
+            obj_ids = [doc.get('_id') for doc in docs]
+
+            for write_error in error.details['writeErrors']:
+                index = write_error['index']
+                if write_error['code'] == 11000:  # duplicate key
+                    obj_ids[index] = self._find_duplicate_id(
+                        write_error['errmsg'])
+                else:
+                    _LOGGER.error('Could not insert a document into %s: %s',
+                                  self, write_error['errmsg'])
+                    obj_ids[index] = None
+
+        except pymongo.errors.PyMongoError as error:
+            _LOGGER.error('Could not insert %d documents into %s: %s',
+                          len(docs), self, error)
+            return [None] * len(docs)
+
+        return [str(obj_id) if obj_id is not None else None
+                for obj_id in obj_ids]
+
     def remove_by_id(self, doc_ids):
         """Remove the documents with the given ids.
 
@@ -130,6 +130,72 @@ class MongoDbTestCase(MongoDbBaseTestCase):
         self.assertTrue(name.endswith('.test_docs'))
 
 
+class MongoDbBulkInsertTestCase(MongoDbBaseTestCase):
+    """
+    Tests the bulk_insert method of the MongoDbEngine class.
+    """
+
+    @staticmethod
+    def _create_doc(doc_id, text):
+        """
+        Returns a document with a reference to its raw data.
+        """
+        return {
+            '_raw_data': {
+                'backend': 'example_backend',
+                'database': 'example_database',
+                'collection': 'raw_data',
+                'doc_id': doc_id
+            },
+            'text': text
+        }
+
+    def test_bulk_insert(self):
+        """
+        Tests the bulk_insert method.
+        """
+        docs = [self._create_doc(1, 'foo'), self._create_doc(2, 'bar')]
+        doc_ids = self.engine.bulk_insert(docs)
+        results = self.engine.find_by_id(doc_ids)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            {doc['text'] for doc in results},
+            {'foo', 'bar'}
+        )
+
+    def test_bulk_insert_duplicate(self):
+        """
+        Tests the bulk_insert method for a document that already exists.
+        """
+        self.engine._create_unique_index()
+        original_id = self.engine.insert(self._create_doc(1, 'foo'))
+        doc_ids = self.engine.bulk_insert([
+            self._create_doc(2, 'bar'),
+            self._create_doc(1, 'foo')
+        ])
+        self.assertEqual(doc_ids[1], original_id)
+        self.assertNotEqual(doc_ids[0], original_id)
+        self.assertEqual(self.mongodb.count(), 2)
+
+    def test_bulk_insert_connection_error(self):
+        """
+        Tests the bulk_insert method when MongoDB can't be reached.
+        """
+        docs = [self._create_doc(1, 'foo'), self._create_doc(2, 'bar')]
+        with patch.object(self.engine, '_collection') as mock_collection:
+            mock_collection.insert_many.side_effect = \
+                pymongo.errors.AutoReconnect()
+            with patch('engines.mongodb.engine._LOGGER'):
+                doc_ids = self.engine.bulk_insert(docs)
+        self.assertEqual(doc_ids, [None, None])
+
+    def test_bulk_insert_empty(self):
+        """
+        Tests the bulk_insert method for an empty list of documents.
+        """
+        self.assertEqual(self.engine.bulk_insert([]), [])
+
+
 class MongoDbCRUDTestCase(MongoDbBaseTestCase, CRUDTestCaseMixin):
     """
     Class for testing simple CRUD operations for the MongoDbEngine class. Inherits its
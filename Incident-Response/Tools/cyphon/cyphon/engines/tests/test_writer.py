@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests the BulkWriter class and related functions.
+"""
+
+# standard library
+from unittest import TestCase
+try:
+    from unittest.mock import Mock, call, patch
+except ImportError:
+    from mock import Mock, call, patch
+
+# local
+from engines.writer import (
+    BulkWriter,
+    buffered_inserts,
+    get_writer,
+    tagged_inserts,
+)
+
+
+def _create_collection(pk=1):
+    """
+    Returns a mock Collection that returns ids for inserted documents.
+    """
+    collection = Mock(pk=pk)
+    collection.bulk_insert = Mock(
+        side_effect=lambda docs: [str(num) for num in range(len(docs))])
+    return collection
+
+
+class BulkWriterTestCase(TestCase):
+    """
+    Tests the BulkWriter class.
+    """
+
+    def test_flush_on_size(self):
+        """
+        Tests that documents are inserted when the buffer is full.
+        """
+        collection = _create_collection()
+        writer = BulkWriter(collection, max_size=2, max_wait=60)
+        writer.add({'foo': 1})
+        self.assertFalse(collection.bulk_insert.called)
+        writer.add({'foo': 2})
+        collection.bulk_insert.assert_called_once_with([{'foo': 1},
+                                                        {'foo': 2}])
+        self.assertEqual(len(writer), 0)
+
+    def test_flush_on_time(self):
+        """
+        Tests that documents are inserted when the buffer is too old.
+        """
+        collection = _create_collection()
+        writer = BulkWriter(collection, max_size=100, max_wait=5)
+        with patch('engines.writer.time.time', side_effect=[0, 1, 6]):
+            writer.add({'foo': 1})
+            writer.add({'foo': 2})
+        collection.bulk_insert.assert_called_once_with([{'foo': 1},
+                                                        {'foo': 2}])
+
+    def test_callbacks(self):
+        """
+        Tests that callbacks are called with the ids of inserted
+        documents.
+        """
+        collection = _create_collection()
+        callback = Mock(side_effect=[Exception('foo'), None])
+        writer = BulkWriter(collection, max_size=100, max_wait=60)
+        writer.add({'foo': 1}, callback)
+        writer.add({'foo': 2}, callback)
+        writer.add({'foo': 3})
+        with patch('engines.writer._LOGGER'):
+            self.assertEqual(writer.flush(), ['0', '1', '2'])
+        callback.assert_has_calls([call({'foo': 1}, '0'),
+                                   call({'foo': 2}, '1')])
+
+    def test_failed_inserts(self):
+        """
+        Tests that callbacks aren't called for documents that couldn't
+        be inserted, and that their tags are kept.
+        """
+        collection = _create_collection()
+        collection.bulk_insert = Mock(return_value=['0', None, None])
+        callback = Mock()
+        writer = BulkWriter(collection, max_size=100, max_wait=60)
+        with tagged_inserts(1):
+            writer.add({'foo': 1}, callback)
+        with tagged_inserts(2):
+            writer.add({'foo': 2}, callback)
+        writer.add({'foo': 3}, callback)
+        self.assertEqual(writer.flush(), ['0', None, None])
+        callback.assert_called_once_with({'foo': 1}, '0')
+        self.assertEqual(writer.failed_tags, {2})
+
+    def test_insert_error(self):
+        """
+        Tests that the tags of documents are kept if the Collection
+        raises an exception, and that the documents are no longer
+        buffered.
+        """
+        collection = _create_collection()
+        collection.bulk_insert = Mock(side_effect=Exception('foo'))
+        callback = Mock()
+        writer = BulkWriter(collection, max_size=2, max_wait=60)
+        with patch('engines.writer._LOGGER'):
+            with tagged_inserts(1):
+                writer.add({'foo': 1}, callback)
+            with tagged_inserts(2):
+                writer.add({'foo': 2}, callback)
+        self.assertFalse(callback.called)
+        self.assertEqual(writer.failed_tags, {1, 2})
+        self.assertEqual(len(writer), 0)
+
+    def test_flush_empty(self):
+        """
+        Tests the flush method when no documents have been added.
+        """
+        collection = _create_collection()
+        writer = BulkWriter(collection)
+        self.assertEqual(writer.flush(), [])
+        self.assertFalse(collection.bulk_insert.called)
+
+
+class BufferedInsertsTestCase(TestCase):
+    """
+    Tests the buffered_inserts and get_writer functions.
+    """
+
+    def test_get_writer_outside_block(self):
+        """
+        Tests that no writer is returned outside a buffered_inserts
+        block.
+        """
+        self.assertIsNone(get_writer(_create_collection()))
+
+    def test_buffered_inserts(self):
+        """
+        Tests that documents are inserted when the block exits.
+        """
+        collection_1 = _create_collection(1)
+        collection_2 = _create_collection(2)
+        with buffered_inserts():
+            writer = get_writer(collection_1)
+            self.assertIs(get_writer(collection_1), writer)
+            writer.add({'foo': 1})
+            get_writer(collection_2).add({'foo': 2})
+            with buffered_inserts():
+                get_writer(collection_1).add({'foo': 3})
+            self.assertFalse(collection_1.bulk_insert.called)
+
+        collection_1.bulk_insert.assert_called_once_with([{'foo': 1},
+                                                          {'foo': 3}])
+        collection_2.bulk_insert.assert_called_once_with([{'foo': 2}])
+        self.assertIsNone(get_writer(collection_1))
+
+    def test_buffered_inserts_options(self):
+        """
+        Tests that the buffered_inserts function passes its options to
+        writers.
+        """
+        collection = _create_collection()
+        with buffered_inserts(max_size=1):
+            get_writer(collection).add({'foo': 1})
+            self.assertTrue(collection.bulk_insert.called)
+
+    def test_buffered_inserts_failed(self):
+        """
+        Tests that the buffered_inserts function yields the tags of
+        documents that couldn't be inserted.
+        """
+        collection = _create_collection()
+        collection.bulk_insert = Mock(return_value=[None, '1'])
+        with buffered_inserts() as failed:
+            with buffered_inserts() as inner_failed:
+                with tagged_inserts('foo'):
+                    get_writer(collection).add({'foo': 1})
+                with tagged_inserts('bar'):
+                    get_writer(collection).add({'foo': 2})
+            self.assertEqual(failed, set())
+        self.assertEqual(failed, {'foo'})
+        self.assertIs(inner_failed, failed)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Provides a buffered writer for inserting documents in bulk.
+
+Inside a :func:`~buffered_inserts` block, documents saved by
+|Distilleries| are collected by a |BulkWriter| for each |Collection|
+and inserted with the |Engine|'s bulk API, instead of one at a time.
+
+=============================  ============================================
+Class                          Description
+=============================  ============================================
+:class:`~BulkWriter`           Buffers documents for a |Collection|.
+=============================  ============================================
+
+=============================  ============================================
+Function                       Description
+=============================  ============================================
+:func:`~buffered_inserts`      Buffer inserts made in a block of code.
+:func:`~get_writer`            Get the active |BulkWriter| for a Collection.
+:func:`~tagged_inserts`        Tag the documents buffered in a block of code.
+=============================  ============================================
+
+=============================  ============================================
+Constant                       Description
+=============================  ============================================
+:const:`~MAX_SIZE`             Number of documents that triggers a flush.
+:const:`~MAX_WAIT`             Seconds after which a buffer is flushed.
+=============================  ============================================
+
+"""
+
+# standard library
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_SIZE = 500
+"""|int|
+
+Number of buffered documents that triggers a bulk insert.
+"""
+
+MAX_WAIT = 5
+"""|int|
+
+Number of seconds after which buffered documents are inserted when the
+next document is added, even if there are less than :const:`~MAX_SIZE`.
+"""
+
+_LOCAL = threading.local()
+
+
+class BulkWriter(object):
+    """Buffers documents for a |Collection| and inserts them in bulk.
+
+    Documents are inserted when :const:`~MAX_SIZE` documents have been
+    added, when a document is added :const:`~MAX_WAIT` seconds after the
+    first one, or when :meth:`~BulkWriter.flush` is called. Callbacks
+    for the documents are called once they have been inserted.
+
+    Documents added inside a :func:`~tagged_inserts` block are tagged,
+    and the tags of documents that couldn't be inserted are kept in
+    :attr:`~BulkWriter.failed_tags`.
+
+    Parameters
+    ----------
+    collection : |Collection|
+        The |Collection| in which documents will be inserted.
+
+    max_size : int
+        The number of documents that triggers a bulk insert.
+
+    max_wait : |int| or |float|
+        The number of seconds after which documents are inserted.
+
+    """
+
+    def __init__(self, collection, max_size=MAX_SIZE, max_wait=MAX_WAIT):
+        self.collection = collection
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._docs = []
+        self._callbacks = []
+        self._tags = []
+        self._first_added = None
+        self.failed_tags = set()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc, callback=None):
+        """Add a document to the buffer.
+
+        Parameters
+        ----------
+        doc : dict
+            A document to insert.
+
+        callback : function or |None|
+            A function to call with the document and its id after the
+            document has been inserted. It isn't called if the document
+            couldn't be inserted.
+
+        Returns
+        -------
+        None
+
+        """
+        if not self._docs:
+            self._first_added = time.time()
+
+        self._docs.append(doc)
+        self._callbacks.append(callback)
+        self._tags.append(getattr(_LOCAL, 'tag', None))
+
+        if len(self._docs) >= self.max_size or \
+                time.time() - self._first_added >= self.max_wait:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered documents and call their callbacks.
+
+        If the |Collection| raises an exception, none of the documents
+        are considered inserted.
+
+        Returns
+        -------
+        |list| of |str| or |None|
+            The ids of the inserted documents. The id is |None| for a
+            document that couldn't be inserted.
+
+        """
+        docs = self._docs
+        callbacks = self._callbacks
+        tags = self._tags
+        self._docs = []
+        self._callbacks = []
+        self._tags = []
+
+        if not docs:
+            return []
+
+        try:
+            doc_ids = self.collection.bulk_insert(docs)
+        except Exception as error:  # pylint: disable=W0703
+            _LOGGER.exception('An error occurred while inserting %d '
+                              'documents: %s', len(docs), error)
+            doc_ids = [None] * len(docs)
+
+        for doc, doc_id, callback, tag in zip(docs, doc_ids, callbacks, tags):
+            if doc_id is None:
+                if tag is not None:
+                    self.failed_tags.add(tag)
+                continue
+
+            if callback is not None:
+                try:
+                    callback(doc, doc_id)
+                except Exception as error:  # pylint: disable=W0703
+                    _LOGGER.exception('An error occurred after inserting '
+                                      'document %s: %s', doc_id, error)
+
+        return doc_ids
+
+
+def get_writer(collection):
+    """Get the active |BulkWriter| for a |Collection|.
+
+    Parameters
+    ----------
+    collection : |Collection|
+        The |Collection| in which documents will be inserted.
+
+    Returns
+    -------
+    |BulkWriter| or |None|
+        The |BulkWriter| for the |Collection| if this is called inside
+        a :func:`~buffered_inserts` block. Otherwise, |None|.
+
+    """
+    writers = getattr(_LOCAL, 'writers', None)
+
+    if writers is None:
+        return None
+
+    if collection.pk not in writers:
+        writers[collection.pk] = BulkWriter(collection, **_LOCAL.options)
+
+    return writers[collection.pk]
+
+
+@contextmanager
+def tagged_inserts(tag):
+    """Tag the documents buffered in a block of code.
+
+    Documents added to a |BulkWriter| in the block are tagged, so the
+    ones that couldn't be inserted can be traced back to whatever
+    produced them (see :func:`~buffered_inserts`).
+
+    Parameters
+    ----------
+    tag : hashable
+        The tag for the documents, e.g. the index of the message being
+        processed.
+
+    """
+    previous_tag = getattr(_LOCAL, 'tag', None)
+    _LOCAL.tag = tag
+    try:
+        yield
+    finally:
+        _LOCAL.tag = previous_tag
+
+
+@contextmanager
+def buffered_inserts(max_size=MAX_SIZE, max_wait=MAX_WAIT):
+    """Buffer the inserts made by |Distilleries| in a block of code.
+
+    All buffered documents are inserted when the block exits. Blocks
+    can be nested, in which case documents are inserted when the
+    outermost block exits. Buffers are local to the current thread.
+
+    The block yields a |set| that holds the tags (see
+    :func:`~tagged_inserts`) of the documents that couldn't be
+    inserted, once the outermost block has exited.
+
+    Parameters
+    ----------
+    max_size : int
+        The number of documents that triggers a bulk insert.
+
+    max_wait : |int| or |float|
+        The number of seconds after which documents are inserted.
+
+    Example
+    -------
+    .. code-block:: python
+
+       with buffered_inserts() as failed:
+           for index, doc_obj in enumerate(doc_objs):
+               with tagged_inserts(index):
+                   DataChute.objects.process(doc_obj)
+
+    """
+    if getattr(_LOCAL, 'writers', None) is not None:
+        yield _LOCAL.failed_tags
+        return
+
+    failed_tags = set()
+    _LOCAL.writers = {}
+    _LOCAL.options = {'max_size': max_size, 'max_wait': max_wait}
+    _LOCAL.failed_tags = failed_tags
+    try:
+        yield failed_tags
+    finally:
+        writers = _LOCAL.writers
+        _LOCAL.writers = None
+        _LOCAL.failed_tags = None
+        for writer in writers.values():
+            writer.flush()
+            failed_tags.update(writer.failed_tags)
@@ -103,6 +103,12 @@ class Parser(models.Model):
         abstract = True
         ordering = ['name']
 
+    # regex compiled by _get_pattern(), kept with the pattern it came from
+    _pattern = None
+
+    # DateParser used by _get_date(), which learns the format of the dates
+    _date_parser = None
+
     def __str__(self):
         return self.name
 
@@ -114,12 +120,21 @@ class Parser(models.Model):
             raise ValidationError(_('A regex must be provided to use the '
                                     '%s method.' % method_name))
 
+    def _get_pattern(self):
+        """
+        Returns the Parser's regex as a compiled pattern. The pattern is
+        compiled once and reused until the regex is changed.
+        """
+        if self._pattern is None or self._pattern.pattern != self.regex:
+            self._pattern = re.compile(self.regex, re.DOTALL | re.IGNORECASE)
+        return self._pattern
+
     def _search(self, string):
         """
         Takes a string and returns a re.MatchObject for the Parser's regex.
         """
         # TODO(LH): catch exceptions for malformed regex
-        return re.search(self.regex, string, re.DOTALL | re.IGNORECASE)
+        return self._get_pattern().search(string)
 
     def _is_present(self, string):
         """
@@ -147,19 +162,43 @@ class Parser(models.Model):
                              self.regex)
         return None
 
+    def _get_date_parser(self):
+        """
+        Returns the DateParser used to convert strings into datetime
+        objects for the Parser.
+        """
+        if self._date_parser is None:
+            self._date_parser = dateutils.DateParser()
+        return self._date_parser
+
     def _get_date(self, string):
         """
         Converts a string into a datetime object.
         """
         if self.regex:
             string = self._get_substring(string)
-        return dateutils.date_from_str(string)
+        return self._get_date_parser().parse(string)
+
+    def get_date_stats(self):
+        """
+        Returns a dictionary of statistics on the dates parsed by the
+        Parser, or None if the Parser's method isn't 'DATE'.
+        """
+        if self.method == 'DATE':
+            return self._get_date_parser().stats
+
+    def set_date_stats(self, stats):
+        """
+        Takes a DateStats object and gives the Parser a new DateParser
+        that counts the dates it parses there.
+        """
+        self._date_parser = dateutils.DateParser(stats=stats)
 
     def _findall(self, string):
         """
         Takes a string and returns a list of strings matching the Parser's regex.
         """
-        return re.findall(self.regex, string, re.DOTALL | re.IGNORECASE)
+        return self._get_pattern().findall(string)
 
     def _get_count(self, string):
         """
@@ -261,6 +300,9 @@ class FieldParser(Parser):
         abstract = True
         ordering = ['name']
 
+    # keys split from source_fields by _get_keys(), with the source_fields
+    _keys = (None, ())
+
     def clean(self):
         """
         Adds custom validations to the model's clean() method.
@@ -279,20 +321,26 @@ class FieldParser(Parser):
             # for COUNT and P/A, results will be aggregated into one value
             validators.validate_str_substitution(self.formatter, 1)
 
+    def _get_keys(self):
+        """
+        Returns a tuple of the field names in the source_fields. They are
+        split once and reused until the source_fields are changed.
+        """
+        source_fields, keys = self._keys
+        if source_fields != self.source_fields:
+            fields = self.source_fields.split(',')
+            # in case there were spaces after commas
+            keys = tuple(field.strip() for field in fields)
+            self._keys = (self.source_fields, keys)
+        return keys
+
     def _get_values(self, doc):
         """
         Takes a dictionary and returns values for the keys specified by the
         source_fields.
         """
-        fields = self.source_fields.split(',')
-        values = []
-
-        for field in fields:
-            key = field.strip() # in case there were spaces after commas
-            value = parserutils.get_dict_value(key, doc)
-            values.append(value)
-
-        return values
+        return [parserutils.get_dict_value(key, doc)
+                for key in self._get_keys()]
 
     def _parse_all(self, values):
         """
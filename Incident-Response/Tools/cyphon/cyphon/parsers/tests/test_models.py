@@ -148,6 +148,19 @@ class ParseTestCase(TestCase):
         result = parser._parse('this is an example post')
         self.assertEqual(result, 'this is an example post')
 
+    def test_regex_changed(self):
+        """
+        Tests that the compiled regex is replaced when the Parser's regex
+        is changed.
+        """
+        parser = Parser(
+            method='COUNT',
+            regex='Bad Bots'
+        )
+        self.assertEqual(parser._parse(self.string), 2)
+        parser.regex = 'Bad Robots'
+        self.assertEqual(parser._parse(self.string), 0)
+
 
 class StringParserTestCase(TestCase):
     """
@@ -381,3 +394,13 @@ class FieldParserProcessTestCase(TestCase):
         expected = 'this is an example post'
         self.assertEqual(actual, expected)
 
+
+    def test_source_fields_changed(self):
+        """
+        Tests that a new value for the source_fields is used after the
+        Parser has processed a document.
+        """
+        parser = FieldParser(source_fields='text')
+        self.assertEqual(parser.process(self.doc), 'this is an example post')
+        parser.source_fields = 'user.screen_name'
+        self.assertEqual(parser.process(self.doc), 'zebrafinch')
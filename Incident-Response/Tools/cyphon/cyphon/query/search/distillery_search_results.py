@@ -16,18 +16,47 @@
 # along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
 
 # standard library
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from functools import reduce
+import logging
 
 # third party
 from django.urls import reverse
 
 # local
 from cyphon.fieldsets import QueryFieldset
+from cyphon.transaction import close_connection
 from distilleries.models import Distillery
 from distilleries.serializers import DistilleryListSerializer
 from engines.queries import EngineQuery
 from .search_results import SearchResults, DEFAULT_PAGE_SIZE
 
+_LOGGER = logging.getLogger(__name__)
+
+MAX_WORKERS = 8
+"""|int|
+
+Maximum number of threads used to search |Distilleries| concurrently
+for a single request.
+"""
+
+SEARCH_TIMEOUT = 10
+"""|int|
+
+Number of seconds to wait for |Distillery| searches. Results of searches
+that haven't finished by then are left out of a DistillerySearchResultsList.
+"""
+
+QUERY_TIMEOUT = 8
+"""|int|
+
+Number of seconds each search in a multi-search may run before the data
+store returns the results found so far. This is less than
+:const:`~SEARCH_TIMEOUT`, so a slow index doesn't make the whole
+multi-search time out.
+"""
+
 
 class DistillerySearchResults(SearchResults):
     """
@@ -37,7 +66,7 @@ class DistillerySearchResults(SearchResults):
     VIEW_NAME = 'search_distillery'
 
     def __init__(self, query, distillery, page=1, page_size=DEFAULT_PAGE_SIZE,
-                 before=None, after=None):
+                 before=None, after=None, search=True):
         """Create a DistillerySearchResults instance.
 
         Parameters
@@ -46,25 +75,78 @@ class DistillerySearchResults(SearchResults):
 
         distillery : Distillery
 
+        search : bool
+            Whether to search the distillery now. If False, the results
+            can be added later with :meth:`~set_results`.
+
         """
         super(DistillerySearchResults, self).__init__(
             self.VIEW_NAME, query, page, page_size,
         )
         self.results = []
         self.count = 0
+        self.timed_out = False
         self.distillery = distillery
         self.engine_query = self._get_engine_query(
             distillery, query, before=before, after=after)
+        self.searchable = self._is_searchable(
+            distillery, self.engine_query, before=before, after=after)
 
-        if not self.engine_query:
-            return
+        if search and self.searchable:
+            self.set_results(self.find())
+
+    @staticmethod
+    def _is_searchable(distillery, engine_query, before=None, after=None):
+        """Return whether a distillery should be searched.
+
+        Parameters
+        ----------
+        distillery : Distillery
+
+        engine_query : EngineQuery or None
+
+        before: datetime.datetime or None
+
+        after: datetime.datetime or None
+
+        Returns
+        -------
+        bool
+
+        """
+        if not engine_query:
+            return False
 
         if (before or after) and not distillery.get_searchable_date_field():
-            results = None
-        else:
-            results = self.distillery.find(
-                self.engine_query, page=page, page_size=page_size)
+            return False
+
+        return True
 
+    def find(self):
+        """Search the distillery with the engine query.
+
+        Returns
+        -------
+        dict or None
+
+        """
+        return self.distillery.find(
+            self.engine_query, page=self.page, page_size=self.page_size)
+
+    def set_results(self, results):
+        """Set the results and result count from a distillery search.
+
+        Parameters
+        ----------
+        results : dict or None
+            A dictionary with keys 'count' and 'results', as returned
+            by :meth:`~find`.
+
+        Returns
+        -------
+        None
+
+        """
         if results and results['count']:
             self.count = results['count']
             self.results = results['results']
@@ -321,15 +403,184 @@ class DistillerySearchResultsList(object):
 
         """
         if query.keywords or query.field_parameters:
-            return [
+            results = [
                 DistillerySearchResults(
                     query, distillery,
-                    page=page, page_size=page_size, before=before, after=after)
+                    page=page, page_size=page_size, before=before, after=after,
+                    search=False)
                 for distillery in distilleries
             ]
+            DistillerySearchResultsList._search(
+                results, page=page, page_size=page_size)
+            return results
 
         return []
 
+    @staticmethod
+    def _get_search_groups(results):
+        """Group DistillerySearchResults that can be searched together.
+
+        Distilleries whose |Engine| supports multi-search are grouped by
+        |Engine| class. Other distilleries are searched on their own.
+
+        Parameters
+        ----------
+        results : list of DistillerySearchResults
+
+        Returns
+        -------
+        list of tuple of (Engine class or None, list of DistillerySearchResults)
+
+        """
+        groups = OrderedDict()
+        singles = []
+
+        for result in results:
+            if not result.searchable:
+                continue
+
+            # pylint: disable=W0212
+            engine_class = result.distillery.collection._get_class()
+
+            if engine_class.MULTI_SEARCH_ENABLED:
+                groups.setdefault(engine_class, []).append(result)
+            else:
+                singles.append((None, [result]))
+
+        return list(groups.items()) + singles
+
+    @staticmethod
+    def _find_many(engine_class, results, page, page_size):
+        """Search several distilleries with a single |Engine| request.
+
+        Parameters
+        ----------
+        engine_class : Engine class
+
+        results : list of DistillerySearchResults
+
+        Returns
+        -------
+        list of dict or None
+            The results of each search. The result is None for a
+            distillery whose |Engine| isn't available.
+
+        """
+        searches = []
+        indexes = []
+
+        for (index, result) in enumerate(results):
+            engine = result.distillery.collection.engine
+            if engine is None:
+                _LOGGER.error('Could not search %s: no engine is available',
+                              result.distillery)
+            else:
+                searches.append((engine, result.engine_query))
+                indexes.append(index)
+
+        found = engine_class.find_many(
+            searches, page=page, page_size=page_size, timeout=QUERY_TIMEOUT)
+
+        data = [None] * len(results)
+        for (index, result_data) in zip(indexes, found):
+            data[index] = result_data
+        return data
+
+    @staticmethod
+    @close_connection
+    def _find_group(engine_class, results, page, page_size):
+        """Search a group of distilleries in a worker thread.
+
+        Parameters
+        ----------
+        engine_class : Engine class or None
+            The |Engine| class for a multi-search, or None to search
+            a single distillery.
+
+        results : list of DistillerySearchResults
+
+        Returns
+        -------
+        list of dict or None
+
+        """
+        if engine_class is None:
+            return [result.find() for result in results]
+
+        return DistillerySearchResultsList._find_many(
+            engine_class, results, page, page_size)
+
+    @staticmethod
+    def _search(results, page, page_size):
+        """Search distilleries concurrently and set their results.
+
+        Searches that don't finish within :const:`~SEARCH_TIMEOUT`
+        seconds are marked as timed out and left without results, so
+        slow backends don't hold up the others. Each call searches in
+        its own thread pool, with at most :const:`~MAX_WORKERS` threads,
+        so searches that are still running after they time out don't
+        take threads from later requests. Their threads exit as soon as
+        those searches return.
+
+        Parameters
+        ----------
+        results : list of DistillerySearchResults
+
+        Returns
+        -------
+        None
+
+        """
+        groups = DistillerySearchResultsList._get_search_groups(results)
+
+        if not groups:
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(MAX_WORKERS, len(groups)))
+        try:
+            futures = {
+                executor.submit(
+                    DistillerySearchResultsList._find_group,
+                    engine_class, group, page, page_size): group
+                for (engine_class, group) in groups
+            }
+            done, not_done = wait(futures, timeout=SEARCH_TIMEOUT)
+        finally:
+            executor.shutdown(wait=False)
+
+        for future in done:
+            group = futures[future]
+            try:
+                group_results = future.result()
+            except Exception as error:  # pylint: disable=W0703
+                _LOGGER.error('An error occurred while searching %s: %s',
+                              ', '.join(str(result.distillery)
+                                        for result in group), error)
+                continue
+
+            for result, data in zip(group, group_results):
+                result.set_results(data)
+
+        for future in not_done:
+            future.cancel()
+            for result in futures[future]:
+                _LOGGER.warning('Search of %s timed out', result.distillery)
+                result.timed_out = True
+
+    def _get_timed_out(self):
+        """Return the names of distilleries whose searches timed out.
+
+        Returns
+        -------
+        list of str
+
+        """
+        return [
+            str(result.distillery) for result in self.results
+            if result.timed_out
+        ]
+
     def _get_results_as_dict(self, request):
         """Return a JSON serializable representation of earch results.
 
@@ -360,7 +611,13 @@ class DistillerySearchResultsList(object):
         dict
 
         """
-        return {
+        result_dict = {
             'count': self.count,
             'results': self._get_results_as_dict(request)
         }
+        timed_out = self._get_timed_out()
+
+        if timed_out:
+            result_dict['timed_out'] = timed_out
+
+        return result_dict
@@ -19,6 +19,7 @@ Tests for the DistillerySearchResults Class.
 """
 
 # standard library
+import threading
 from unittest.mock import patch
 from dateutil import parser
 
@@ -30,6 +31,7 @@ from django.test.client import RequestFactory
 # local
 from cyphon.fieldsets import QueryFieldset
 from distilleries.models import Distillery
+from engines.elasticsearch.engine import ElasticsearchEngine
 from engines.queries import EngineQuery
 from query.search.distillery_search_results import (
     DistillerySearchResults,
@@ -51,6 +53,17 @@ MOCK_FIND = patch(
 )
 
 
+def _mock_find_many(engine_class, results, page, page_size):
+    return [MOCK_RESULTS] * len(results)
+
+
+MOCK_FIND_MANY = patch(
+    'query.search.distillery_search_results.DistillerySearchResultsList'
+    '._find_many',
+    side_effect=_mock_find_many,
+)
+
+
 def get_fieldsets(subqueries):
     fieldsets = []
 
@@ -244,7 +257,7 @@ class DistillerySearchResultsListTestCase(TestCase):
         -------
         DistillerySearchResultsList
         """
-        with MOCK_FIND:
+        with MOCK_FIND, MOCK_FIND_MANY:
             return DistillerySearchResultsList(query)
 
     def setUp(self):
@@ -306,3 +319,127 @@ class DistillerySearchResultsListTestCase(TestCase):
                 }
             }]
         })
+
+    def test_search_groups(self):
+        """
+        Tests that distilleries whose engine supports multi-search are
+        grouped together, and other distilleries are searched alone.
+        """
+        search_query = SearchQuery('test', self.user)
+        results = [
+            DistillerySearchResults(search_query, distillery, search=False)
+            for distillery in Distillery.objects.order_by('pk')
+        ]
+        groups = DistillerySearchResultsList._get_search_groups(results)
+
+        self.assertEqual(len(groups), 3)
+        self.assertEqual(groups[0][0], ElasticsearchEngine)
+        self.assertEqual([result.distillery.pk for result in groups[0][1]],
+                         [3, 4, 5, 6])
+        self.assertEqual(groups[1], (None, [results[0]]))
+        self.assertEqual(groups[2], (None, [results[1]]))
+
+    @patch('query.search.distillery_search_results.SEARCH_TIMEOUT', 0.1)
+    def test_timed_out(self):
+        """
+        Tests that results are returned for the searches that finished
+        when other searches time out.
+        """
+        release = threading.Event()
+        search_query = SearchQuery('test', self.user)
+        factory = RequestFactory()
+        request = factory.get('/api/v1/search/')
+
+        def _slow_find(*args, **kwargs):
+            release.wait(5)
+            return MOCK_RESULTS
+
+        try:
+            with patch('distilleries.models.Distillery.find',
+                       side_effect=_slow_find), MOCK_FIND_MANY:
+                distillery_results_list = DistillerySearchResultsList(
+                    search_query)
+        finally:
+            release.set()
+
+        self.assertEqual(distillery_results_list.count, 4)
+        self.assertEqual(len(distillery_results_list.results), 6)
+
+        result_dict = distillery_results_list.as_dict(request)
+
+        self.assertEqual(len(result_dict['results']), 4)
+        self.assertEqual(sorted(result_dict['timed_out']), [
+            'mongodb.test_database.test_docs',
+            'mongodb.test_database.test_posts',
+        ])
+
+    @patch('query.search.distillery_search_results.MAX_WORKERS', 2)
+    @patch('query.search.distillery_search_results.SEARCH_TIMEOUT', 0.1)
+    def test_timed_out_threads(self):
+        """
+        Tests that searches still running after they time out don't
+        keep later searches from running.
+        """
+        release = threading.Event()
+        search_query = SearchQuery('test', self.user)
+
+        def _slow_find(*args, **kwargs):
+            release.wait(5)
+            return MOCK_RESULTS
+
+        try:
+            with patch('distilleries.models.Distillery.find',
+                       side_effect=_slow_find), MOCK_FIND_MANY:
+                DistillerySearchResultsList(search_query)
+
+            with patch('distilleries.models.Distillery.find',
+                       return_value=MOCK_RESULTS), MOCK_FIND_MANY:
+                distillery_results_list = DistillerySearchResultsList(
+                    search_query)
+        finally:
+            release.set()
+
+        self.assertEqual(distillery_results_list.count, 6)
+        self.assertEqual(distillery_results_list._get_timed_out(), [])
+
+    def test_find_many_no_engine(self):
+        """
+        Tests that distilleries without an engine are left without
+        results while the others in their group are searched.
+        """
+        search_query = SearchQuery('test', self.user)
+        results = [
+            DistillerySearchResults(search_query, distillery, search=False)
+            for distillery in Distillery.objects.filter(pk__in=[3, 4])
+                                                .order_by('pk')
+        ]
+        engine = object()
+        results[0].distillery.collection.engine = None
+        results[1].distillery.collection.engine = engine
+
+        with patch.object(ElasticsearchEngine, 'find_many',
+                          return_value=[MOCK_RESULTS]) as mock_find_many:
+            data = DistillerySearchResultsList._find_many(
+                ElasticsearchEngine, results, 1, 10)
+
+        self.assertEqual(data, [None, MOCK_RESULTS])
+        self.assertEqual(mock_find_many.call_args[0][0],
+                         [(engine, results[1].engine_query)])
+
+    def test_search_error(self):
+        """
+        Tests that results are returned for the other searches when a
+        search raises an error.
+        """
+        search_query = SearchQuery('test', self.user)
+
+        with MOCK_FIND, patch(
+                'query.search.distillery_search_results'
+                '.DistillerySearchResultsList._find_many',
+                side_effect=ValueError('foo')):
+            distillery_results_list = DistillerySearchResultsList(
+                search_query)
+
+        self.assertEqual(distillery_results_list.count, 2)
+        self.assertFalse(any(result.timed_out
+                             for result in distillery_results_list.results))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Load tests the receiver against an in-process stand-in for RabbitMQ.
+
+Run it from the command line with a routing key, the number of messages
+and the batch size, e.g.::
+
+    python receiver/loadtest.py logchutes 10000 100
+
+Messages go through the same chutes and watchdogs as in production, so
+they are saved to the configured warehouses.
+"""
+
+# standard library
+from collections import deque, namedtuple
+import json
+import os
+import sys
+import time
+import uuid
+
+# add path to the Cyphon project folder so the receiver can be found
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# local
+from receiver.receiver import BatchConsumer
+
+Method = namedtuple('Method', ['delivery_tag', 'routing_key', 'redelivered'])
+
+QueueState = namedtuple('QueueState', ['message_count'])
+
+DeclareResult = namedtuple('DeclareResult', ['method'])
+
+
+class StubBroker(object):
+    """A single-queue, single-channel stand-in for RabbitMQ.
+
+    Implements the parts of pika's BlockingConnection and
+    BlockingChannel used by a |BatchConsumer|, so the same object is
+    passed as both. Messages are delivered up to the prefetch count,
+    and unacked messages can be requeued, like with RabbitMQ.
+
+    Parameters
+    ----------
+    routing_key : str
+        The routing key of the published messages.
+
+    """
+
+    def __init__(self, routing_key):
+        self.routing_key = routing_key
+        self.acked = set()
+        self.rejected = set()
+        self._queue = deque()
+        self._unacked = {}
+        self._next_tag = 1
+        self._prefetch_count = 0
+        self._callback = None
+
+    def publish(self, body, redelivered=False):
+        """Add a message to the queue."""
+        self._queue.append((body, redelivered))
+
+    @property
+    def drained(self):
+        """Whether all messages have been acked or rejected."""
+        return not self._queue and not self._unacked
+
+    def basic_qos(self, prefetch_count=0):
+        """Set the number of unacked messages that can be delivered."""
+        self._prefetch_count = prefetch_count
+
+    def basic_consume(self, consumer_callback, queue=None):
+        """Register the consumer's callback."""
+        self._callback = consumer_callback
+
+    def process_data_events(self, time_limit=0):
+        """Deliver messages until the prefetch count is reached."""
+        while self._queue and (not self._prefetch_count or
+                               len(self._unacked) < self._prefetch_count):
+            body, redelivered = self._queue.popleft()
+            method = Method(delivery_tag=self._next_tag,
+                            routing_key=self.routing_key,
+                            redelivered=redelivered)
+            self._next_tag += 1
+            self._unacked[method.delivery_tag] = body
+            self._callback(self, method, None, body)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        """Ack a message, or all messages up to it if `multiple`."""
+        if multiple:
+            tags = [tag for tag in self._unacked if tag <= delivery_tag]
+        else:
+            tags = [delivery_tag]
+        for tag in tags:
+            del self._unacked[tag]
+            self.acked.add(tag)
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        """Reject a message, requeueing it if `requeue`."""
+        body = self._unacked.pop(delivery_tag)
+        if requeue:
+            self.publish(body, redelivered=True)
+        else:
+            self.rejected.add(delivery_tag)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        """Reject a message, requeueing it if `requeue`."""
+        self.basic_nack(delivery_tag, requeue)
+
+    def queue_declare(self, queue, passive=False):
+        """Return the number of messages waiting in the queue."""
+        return DeclareResult(QueueState(message_count=len(self._queue)))
+
+
+def create_message(collection='elasticsearch.cyphon.loadtest'):
+    """Create a message like the ones Logstash sends to Cyphon."""
+    return json.dumps({
+        '@uuid': str(uuid.uuid4()),
+        'collection': collection,
+        'message': 'load test message',
+    }).encode('utf-8')
+
+
+def run_load_test(routing_key, num_messages, batch_size, messages=None):
+    """Process messages from a |StubBroker| with a |BatchConsumer|.
+
+    Parameters
+    ----------
+    routing_key : str
+        Options are 'datachutes', 'logchutes', 'watchdogs'.
+
+    num_messages : int
+        The number of messages to publish.
+
+    batch_size : int
+        The maximum number of messages to process at once.
+
+    messages : list of bytes, optional
+        The messages to publish. By default, they are created with
+        :func:`~create_message`.
+
+    Returns
+    -------
+    |tuple| of (|StubBroker|, |dict|)
+        The broker and the consumer's metrics.
+
+    """
+    broker = StubBroker(routing_key)
+    if messages is None:
+        messages = [create_message() for dummy_num in range(num_messages)]
+    for body in messages:
+        broker.publish(body)
+
+    consumer = BatchConsumer(routing_key, batch_size, batch_timeout=0)
+    consumer.start(broker, routing_key)
+    while not broker.drained:
+        consumer.poll(broker, broker, routing_key)
+    consumer.report(broker, routing_key)
+
+    return broker, consumer.stats.as_dict()
+
+
+if __name__ == '__main__':
+    _ROUTING_KEY = sys.argv[1]
+    _NUM_MESSAGES = int(sys.argv[2])
+    _BATCH_SIZE = int(sys.argv[3])
+
+    _START = time.time()
+    _BROKER, _STATS = run_load_test(_ROUTING_KEY, _NUM_MESSAGES, _BATCH_SIZE)
+    print('%d messages in %.2fs' % (_NUM_MESSAGES, time.time() - _START))
+    for _KEY, _VALUE in sorted(_STATS.items()):
+        print('  %s: %s' % (_KEY, _VALUE))
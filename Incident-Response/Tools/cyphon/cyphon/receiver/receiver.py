@@ -24,6 +24,8 @@ import json
 import logging
 import os
 import sys
+import threading
+import time
 from multiprocessing import Process
 
 # add path to the Cyphon project folder so Cyphon packages can be found
@@ -49,14 +51,29 @@ import six
 # local
 from cyphon.documents import DocumentObj
 from cyphon.transaction import close_connection, close_old_connections
+from engines.writer import buffered_inserts
 from sifter.datasifter.datachutes.models import DataChute
 from sifter.logsifter.logchutes.models import LogChute
-from watchdogs.models import Watchdog
+from watchdogs.models import Watchdog, batched_incidents
 
 LOGGER = logging.getLogger('receiver')
 
 BROKER = settings.RABBITMQ
 
+#: Seconds to wait for a batch to fill before processing a partial one.
+BATCH_TIMEOUT = 1.0
+
+#: Number of batches that can be delivered before they're acked, so the
+#: next batch is already waiting while one is processed.
+PREFETCH_BATCHES = 2
+
+#: Seconds between servicing the connection while a batch is processed,
+#: so heartbeats are still sent to RabbitMQ during long batches.
+HEARTBEAT_INTERVAL = 5.0
+
+#: Seconds between logging receiver metrics.
+STATS_INTERVAL = 60
+
 
 def create_doc_obj(body):
     """Turn a message str into a |DocumentObj|.
@@ -123,55 +140,382 @@ def process_msg(channel, method, properties, body):
                          '\'%s\':\n  %s', body, error)
 
 
-def consume_queue(routing_key='watchdogs'):
-    """Create a queue consumer for RabbitMQ.
+def connect_to_queue(routing_key):
+    """Connect to RabbitMQ and declare the queue for a routing key.
 
     Parameters
     ----------
     routing_key : str
         Options are 'datachutes', 'logchutes', 'watchdogs'.
 
+    Returns
+    -------
+    |tuple| of (pika.BlockingConnection, pika.Channel, |str|)
+        The connection, the channel and the name of the queue.
+
     """
-    try:
-        credentials = pika.PlainCredentials(username=BROKER['USERNAME'],
-                                            password=BROKER['PASSWORD'])
+    credentials = pika.PlainCredentials(username=BROKER['USERNAME'],
+                                        password=BROKER['PASSWORD'])
+
+    parameters = pika.ConnectionParameters(host=BROKER['HOST'],
+                                           virtual_host=BROKER['VHOST'],
+                                           credentials=credentials,
+                                           connection_attempts=6,
+                                           retry_delay=10)
+
+    conn = pika.BlockingConnection(parameters)
+
+    channel = conn.channel()
+    exchange = BROKER['EXCHANGE']
+    durable = BROKER['DURABLE']
 
-        parameters = pika.ConnectionParameters(host=BROKER['HOST'],
-                                               virtual_host=BROKER['VHOST'],
-                                               credentials=credentials,
-                                               connection_attempts=6,
-                                               retry_delay=10)
+    queue_name = routing_key
 
-        conn = pika.BlockingConnection(parameters)
+    channel.exchange_declare(exchange=exchange, durable=durable)
 
-        channel = conn.channel()
-        exchange = BROKER['EXCHANGE']
-        durable = BROKER['DURABLE']
+    channel.queue_declare(queue=queue_name)
 
-        queue_name = routing_key
+    channel.queue_bind(exchange=exchange,
+                       queue=queue_name,
+                       routing_key=routing_key)
 
-        channel.exchange_declare(exchange=exchange, durable=durable)
+    return conn, channel, queue_name
+
+
+class ReceiverStats(object):
+    """Throughput and lag metrics for a |BatchConsumer|.
+
+    Attributes
+    ----------
+    processed : int
+        Number of messages processed and acked.
 
-        channel.queue_declare(queue=queue_name)
+    failed : int
+        Number of messages that couldn't be processed.
 
-        channel.queue_bind(exchange=exchange,
-                           queue=queue_name,
-                           routing_key=routing_key)
+    batches : int
+        Number of batches processed.
+
+    processing_time : float
+        Seconds spent processing batches.
+
+    max_wait : float
+        The longest time, in seconds, that a message has waited in the
+        consumer before its batch was processed.
+
+    backlog : int or None
+        Number of messages waiting in the queue, when last checked.
+
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.processing_time = 0.0
+        self.max_wait = 0.0
+        self.backlog = None
+
+    def record_batch(self, size, failed, duration, wait):
+        """Add the results of a batch to the metrics."""
+        self.processed += size - failed
+        self.failed += failed
+        self.batches += 1
+        self.processing_time += duration
+        self.max_wait = max(self.max_wait, wait)
+
+    @property
+    def throughput(self):
+        """Messages processed per second since the consumer started."""
+        elapsed = time.time() - self.started
+        if elapsed > 0:
+            return self.processed / elapsed
+        return 0.0
+
+    def as_dict(self):
+        """Return the metrics as a |dict|."""
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'processing_time': self.processing_time,
+            'throughput': self.throughput,
+            'max_wait': self.max_wait,
+            'backlog': self.backlog,
+        }
+
+
+class BatchConsumer(object):
+    """Process messages from a queue in batches.
+
+    Up to `batch_size` messages are collected before they are processed
+    together, or fewer if `batch_timeout` seconds pass first. Documents
+    saved while processing a batch are inserted in bulk (see
+    :func:`~engines.writer.buffered_inserts`), and incidents for
+    duplicate |Alerts| are saved together (see
+    :func:`~watchdogs.models.batched_incidents`). Unlike
+    :func:`~process_msg`, messages are acked only after they have been
+    processed and saved, so a message is redelivered if the consumer
+    dies while processing it. A message that fails is requeued once, and then
+    rejected if it fails again. If processing a batch raises an
+    exception, all of its messages are treated as failed.
+
+    Batches are processed outside of the consumer callback, and the
+    connection is serviced every :const:`~HEARTBEAT_INTERVAL` seconds
+    while a batch is processed, so RabbitMQ doesn't drop the connection
+    for missed heartbeats.
+
+    Parameters
+    ----------
+    routing_key : str
+        Options are 'datachutes', 'logchutes', 'watchdogs'.
+
+    batch_size : int
+        The maximum number of messages to process at once.
+
+    batch_timeout : float
+        The maximum number of seconds to wait for a batch to fill.
+
+    """
+
+    def __init__(self, routing_key, batch_size, batch_timeout=BATCH_TIMEOUT):
+        consumers = {
+            'datachutes': DataChute.objects.process_many,
+            'logchutes': LogChute.objects.process_many,
+            'watchdogs': Watchdog.objects.process_many,
+        }
+        self.routing_key = routing_key
+        self.consumer_func = consumers[routing_key]
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.stats = ReceiverStats()
+        self._pending = []
+        self._batch_started = None
+        self._last_report = time.time()
+        self._consuming = False
+
+    def on_message(self, channel, method, properties, body):
+        """Add a message to the current batch.
+
+        Callback function for a queue consumer.
+        """
+        if not self._pending:
+            self._batch_started = time.time()
+        self._pending.append((method, body))
+
+    def _parse(self, channel, batch):
+        """Create DocumentObjs for a batch of messages.
+
+        Rejects messages that can't be parsed, since they would fail
+        again if they were redelivered.
+        """
+        methods = []
+        doc_objs = []
+
+        for method, body in batch:
+            try:
+                doc_objs.append(create_doc_obj(body))
+                methods.append(method)
+            except Exception as error:
+                LOGGER.exception('An error occurred while parsing the '
+                                 'message \'%s\':\n  %s', body, error)
+                channel.basic_reject(delivery_tag=method.delivery_tag,
+                                     requeue=False)
+
+        return methods, doc_objs
+
+    def _settle(self, channel, methods, results):
+        """Ack processed messages and requeue or reject failed ones."""
+        if all(results):
+            if methods:
+                channel.basic_ack(delivery_tag=methods[-1].delivery_tag,
+                                  multiple=True)
+            return
+
+        for method, result in zip(methods, results):
+            if result:
+                channel.basic_ack(delivery_tag=method.delivery_tag)
+            else:
+                channel.basic_nack(delivery_tag=method.delivery_tag,
+                                   requeue=not method.redelivered)
+
+    @staticmethod
+    def _get_heartbeat(connection):
+        """Return a function that services the connection.
+
+        The function processes data events on the connection if
+        :const:`~HEARTBEAT_INTERVAL` seconds have passed since it last
+        did, so heartbeats are sent while a batch is processed.
+        """
+        last_serviced = [time.time()]
+
+        def heartbeat():
+            now = time.time()
+            if now - last_serviced[0] >= HEARTBEAT_INTERVAL:
+                connection.process_data_events(time_limit=0)
+                last_serviced[0] = now
+
+        return heartbeat
+
+    @close_old_connections
+    def flush(self, channel, connection=None):
+        """Process the current batch of messages.
+
+        Up to `batch_size` of the pending messages are processed. If a
+        `connection` is given, it's serviced between documents so
+        heartbeats aren't missed. Messages delivered meanwhile are added
+        to the next batch.
+        """
+        if not self._pending:
+            return
+
+        batch = self._pending[:self.batch_size]
+        self._pending = self._pending[self.batch_size:]
+        wait = time.time() - self._batch_started
+        start = time.time()
+
+        kwargs = {}
+        if connection is not None:
+            kwargs['heartbeat'] = self._get_heartbeat(connection)
+
+        methods, doc_objs = self._parse(channel, batch)
+        try:
+            with batched_incidents(), buffered_inserts() as failed:
+                results = (self.consumer_func(doc_objs, **kwargs)
+                           if doc_objs else [])
+        except Exception as error:
+            # e.g. the engine failed while the writers were flushed, so
+            # it's unknown which documents were saved
+            LOGGER.exception('An error occurred while processing a batch '
+                             'of %d messages:\n  %s', len(methods), error)
+            results = [False] * len(methods)
+        else:
+            # the writers have been flushed, so documents that couldn't be
+            # inserted in bulk are known
+            results = [result and index not in failed
+                       for (index, result) in enumerate(results)]
+        self._settle(channel, methods, results)
+
+        failed = len(batch) - results.count(True)
+        self.stats.record_batch(len(batch), failed, time.time() - start,
+                                wait)
+
+    def _is_due(self):
+        """Whether the current batch is full or has waited long enough."""
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size or
+            time.time() - self._batch_started >= self.batch_timeout)
+
+    def report(self, channel, queue_name):
+        """Check the queue backlog and log the receiver metrics."""
+        try:
+            result = channel.queue_declare(queue=queue_name, passive=True)
+            self.stats.backlog = result.method.message_count
+        except Exception as error:
+            LOGGER.warning('Could not check the backlog of queue %s: %s',
+                           queue_name, error)
+
+        LOGGER.info('%s receiver: %d processed, %d failed, %d batches, '
+                    '%.1f messages/s, max wait %.2fs, backlog %s',
+                    self.routing_key, self.stats.processed, self.stats.failed,
+                    self.stats.batches, self.stats.throughput,
+                    self.stats.max_wait, self.stats.backlog)
+        self._last_report = time.time()
+
+    def start(self, channel, queue_name):
+        """Start consuming messages from a queue."""
+        channel.basic_qos(prefetch_count=self.batch_size * PREFETCH_BATCHES)
+        channel.basic_consume(self.on_message, queue=queue_name)
+        self._consuming = True
+
+    def poll(self, connection, channel, queue_name):
+        """Wait for messages and process the current batch if it's due."""
+        # don't wait for more messages if a batch is already due
+        time_limit = 0 if self._is_due() else self.batch_timeout
+        connection.process_data_events(time_limit=time_limit)
+
+        if self._is_due():
+            self.flush(channel, connection)
+
+        if time.time() - self._last_report >= STATS_INTERVAL:
+            self.report(channel, queue_name)
+
+    def stop(self):
+        """Stop consuming messages after the current poll."""
+        self._consuming = False
+
+    def consume(self, connection, channel, queue_name):
+        """Consume messages from a queue until stopped."""
+        self.start(channel, queue_name)
+        while self._consuming:
+            self.poll(connection, channel, queue_name)
+        while self._pending:
+            self.flush(channel)
+
+
+def consume_queue(routing_key='watchdogs', batch_size=None):
+    """Create a queue consumer for RabbitMQ.
+
+    Parameters
+    ----------
+    routing_key : str
+        Options are 'datachutes', 'logchutes', 'watchdogs'.
+
+    batch_size : int or None
+        If given, messages are processed in batches of up to this size
+        by a |BatchConsumer|. Otherwise, messages are processed one at a
+        time by :func:`~process_msg`.
+
+    """
+    try:
+        conn, channel, queue_name = connect_to_queue(routing_key)
 
         LOGGER.info('Waiting for messages')
         # print(' [*] Waiting for messages. To exit press CTRL+C')
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(process_msg, queue=queue_name)
+        if batch_size:
+            BatchConsumer(routing_key, batch_size).consume(conn, channel,
+                                                           queue_name)
+        else:
+            channel.basic_qos(prefetch_count=1)
+            channel.basic_consume(process_msg, queue=queue_name)
 
-        channel.start_consuming()
+            channel.start_consuming()
 
     except Exception as error:
         LOGGER.exception('An error occurred while consuming messages:\n  %s',
                          error)
 
 
+def consume_queue_in_threads(routing_key='watchdogs', batch_size=None,
+                             num_threads=1):
+    """Run several queue consumers in the current process.
+
+    Each thread has its own connection to RabbitMQ and to the database.
+
+    Parameters
+    ----------
+    routing_key : str
+        Options are 'datachutes', 'logchutes', 'watchdogs'.
+
+    batch_size : int or None
+        The maximum number of messages each consumer processes at once.
+
+    num_threads : int
+        The number of consumers to run.
+
+    """
+    kwargs = {'routing_key': routing_key, 'batch_size': batch_size}
+    threads = [threading.Thread(target=consume_queue, kwargs=kwargs)
+               for dummy_num in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
 @close_old_connections
-def create_consumers(routing_key, num):
+def create_consumers(routing_key, num, batch_size=None, num_threads=1):
     """Create one or more queue consumers.
 
     Parameters
@@ -184,10 +528,24 @@ def create_consumers(routing_key, num):
         A string representation of an integer representing the number of
         consumers to spawn.
 
+    batch_size : int or None
+        If given, each consumer processes messages in batches of up to
+        this size.
+
+    num_threads : int
+        The number of consumers to run in each process.
+
     """
-    kwargs = {'routing_key': routing_key}
+    if num_threads > 1:
+        target = consume_queue_in_threads
+        kwargs = {'routing_key': routing_key, 'batch_size': batch_size,
+                  'num_threads': num_threads}
+    else:
+        target = consume_queue
+        kwargs = {'routing_key': routing_key, 'batch_size': batch_size}
+
     for dummy_num in range(num):
-        process = Process(target=consume_queue, kwargs=kwargs)
+        process = Process(target=target, kwargs=kwargs)
         process.start()
 
 
@@ -200,5 +558,13 @@ if __name__ == '__main__':
         _NUM = int(sys.argv[2])
     except (IndexError, ValueError):
         _NUM = 1
+    try:
+        _BATCH_SIZE = int(sys.argv[3])
+    except (IndexError, ValueError):
+        _BATCH_SIZE = None
+    try:
+        _NUM_THREADS = int(sys.argv[4])
+    except (IndexError, ValueError):
+        _NUM_THREADS = 1
 
-    create_consumers(_ROUTING_KEY, _NUM)
+    create_consumers(_ROUTING_KEY, _NUM, _BATCH_SIZE, _NUM_THREADS)
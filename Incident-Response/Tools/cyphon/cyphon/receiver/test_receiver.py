@@ -34,7 +34,14 @@ from testfixtures import LogCapture
 
 # local
 from cyphon.documents import DocumentObj
-from receiver.receiver import create_doc_obj, process_msg, LOGGER
+from engines.writer import get_writer, tagged_inserts
+from receiver.loadtest import StubBroker, create_message, run_load_test
+from receiver.receiver import (
+    BatchConsumer,
+    create_doc_obj,
+    process_msg,
+    LOGGER,
+)
 from tests.fixture_manager import get_fixtures
 
 LOGGER.removeHandler('console')
@@ -140,3 +147,161 @@ class ProcessMsgTestCase(TransactionTestCase):
                          '"foobar"}\':\n'
                          '  foo'),
                     )
+
+
+class BatchConsumerTestCase(TransactionTestCase):
+    """
+    Tests the BatchConsumer class.
+    """
+
+    def setUp(self):
+        logging.disable(logging.ERROR)
+        self.messages = [create_message() for dummy_num in range(10)]
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    @patch('receiver.receiver.LogChute.objects.process_many',
+           side_effect=lambda doc_objs, **kwargs: [True] * len(doc_objs))
+    def test_batches(self, mock_process):
+        """
+        Tests that messages are processed in batches and acked.
+        """
+        broker, stats = run_load_test('logchutes', 10, 4, self.messages)
+        self.assertEqual(mock_process.call_count, 3)
+        self.assertEqual(
+            [len(call[0][0]) for call in mock_process.call_args_list],
+            [4, 4, 2]
+        )
+        self.assertEqual(len(broker.acked), 10)
+        self.assertEqual(stats['processed'], 10)
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['batches'], 3)
+        self.assertEqual(stats['backlog'], 0)
+
+    def test_ack_after_processing(self):
+        """
+        Tests that messages aren't acked until they've been processed.
+        """
+        broker = StubBroker('datachutes')
+        for body in self.messages[:3]:
+            broker.publish(body)
+
+        def process_many(doc_objs, **kwargs):
+            self.assertEqual(broker.acked, set())
+            return [True] * len(doc_objs)
+
+        with patch('receiver.receiver.DataChute.objects.process_many',
+                   side_effect=process_many):
+            consumer = BatchConsumer('datachutes', 5, batch_timeout=60)
+            consumer.start(broker, 'datachutes')
+            consumer.poll(broker, broker, 'datachutes')
+            self.assertEqual(broker.acked, set())
+            consumer.flush(broker)
+        self.assertEqual(broker.acked, {1, 2, 3})
+
+    def test_failed_inserts(self):
+        """
+        Tests that messages whose documents couldn't be inserted in bulk
+        are requeued.
+        """
+        collection = Mock(pk=1)
+        collection.bulk_insert = Mock(
+            side_effect=lambda docs: [None] + ['1'] * (len(docs) - 1))
+
+        def process_many(doc_objs, **kwargs):
+            for index, dummy_doc_obj in enumerate(doc_objs):
+                with tagged_inserts(index):
+                    get_writer(collection).add({'index': index})
+            return [True] * len(doc_objs)
+
+        with patch('receiver.receiver.DataChute.objects.process_many',
+                   side_effect=process_many):
+            broker, stats = run_load_test('datachutes', 3, 3,
+                                          self.messages[:3])
+        self.assertEqual(broker.acked, {2, 3})
+        self.assertEqual(broker.rejected, {4})
+        self.assertEqual(stats['failed'], 2)
+
+    def test_failed_flush(self):
+        """
+        Tests that a batch is requeued if the engine raises an exception
+        while the writers are flushed, and that the consumer keeps
+        processing messages.
+        """
+        collection = Mock(pk=1)
+        collection.bulk_insert = Mock(
+            side_effect=[RuntimeError('connection lost'), ['1'] * 3])
+
+        def process_many(doc_objs, **kwargs):
+            for index, dummy_doc_obj in enumerate(doc_objs):
+                with tagged_inserts(index):
+                    get_writer(collection).add({'index': index})
+            return [True] * len(doc_objs)
+
+        with patch('receiver.receiver.DataChute.objects.process_many',
+                   side_effect=process_many):
+            broker, stats = run_load_test('datachutes', 3, 3,
+                                          self.messages[:3])
+        self.assertEqual(collection.bulk_insert.call_count, 2)
+        self.assertEqual(broker.acked, {4, 5, 6})
+        self.assertEqual(broker.rejected, set())
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(stats['failed'], 3)
+        self.assertEqual(stats['batches'], 2)
+
+    @patch('receiver.receiver.HEARTBEAT_INTERVAL', 0)
+    def test_heartbeat(self):
+        """
+        Tests that the connection is serviced while a batch is processed,
+        and that messages delivered meanwhile are added to the next batch.
+        """
+        broker = StubBroker('datachutes')
+        for body in self.messages[:2]:
+            broker.publish(body)
+
+        def process_many(doc_objs, heartbeat=None):
+            for body in self.messages[2:4]:
+                broker.publish(body)
+                heartbeat()
+            return [True] * len(doc_objs)
+
+        with patch('receiver.receiver.DataChute.objects.process_many',
+                   side_effect=process_many) as mock_process:
+            consumer = BatchConsumer('datachutes', 2, batch_timeout=60)
+            consumer.start(broker, 'datachutes')
+            consumer.poll(broker, broker, 'datachutes')
+        self.assertEqual(mock_process.call_count, 1)
+        self.assertEqual(broker.acked, {1, 2})
+        self.assertEqual(
+            [method.delivery_tag for (method, dummy_body)
+             in consumer._pending],
+            [3, 4]
+        )
+
+    @patch('receiver.receiver.Watchdog.objects.process_many',
+           side_effect=lambda doc_objs, **kwargs: [False] * len(doc_objs))
+    def test_failed_messages(self, mock_process):
+        """
+        Tests that failed messages are requeued once and then rejected.
+        """
+        broker, stats = run_load_test('watchdogs', 10, 5, self.messages)
+        self.assertEqual(mock_process.call_count, 4)
+        self.assertEqual(len(broker.acked), 0)
+        self.assertEqual(len(broker.rejected), 10)
+        self.assertEqual(stats['processed'], 0)
+        self.assertEqual(stats['failed'], 20)
+
+    @patch('receiver.receiver.LogChute.objects.process_many',
+           side_effect=lambda doc_objs, **kwargs: [True] * len(doc_objs))
+    def test_invalid_messages(self, mock_process):
+        """
+        Tests that messages that can't be parsed are rejected.
+        """
+        messages = [b'foobar'] + self.messages[:2]
+        broker, stats = run_load_test('logchutes', 3, 3, messages)
+        self.assertEqual(len(mock_process.call_args[0][0]), 2)
+        self.assertEqual(broker.rejected, {1})
+        self.assertEqual(broker.acked, {2, 3})
+        self.assertEqual(stats['processed'], 2)
+        self.assertEqual(stats['failed'], 1)
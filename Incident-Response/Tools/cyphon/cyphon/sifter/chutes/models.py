@@ -28,6 +28,7 @@ from django.utils.functional import cached_property
 
 # local
 from cyphon.models import SelectRelatedManager, FindEnabledMixin
+from engines.writer import tagged_inserts
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -87,20 +88,64 @@ class ChuteManager(SelectRelatedManager, FindEnabledMixin):
         """
         return self._default_munger.process(doc_obj)
 
-    def process(self, doc_obj):
+    def _process_with_chutes(self, doc_obj, chutes):
         """
-
+        Takes a DocumentObj and a list of Chutes and processes the
+        document with each of them, or with the default Munger if none
+        of them saved it. Returns a Boolean indicating whether every
+        distilled document was stored.
         """
-        enabled_chutes = self.find_enabled()
         saved = False
+        stored = True
 
-        for chute in enabled_chutes:
+        for chute in chutes:
             result = chute.process(doc_obj)
             if result:
                 saved = True
+            elif result is False:
+                stored = False
 
         if not saved and self._default_munger_enabled:
-            self._process_with_default(doc_obj)
+            if self._process_with_default(doc_obj) is None:
+                stored = False
+
+        return stored
+
+    def process(self, doc_obj):
+        """
+
+        """
+        self._process_with_chutes(doc_obj, self.find_enabled())
+
+    def process_many(self, doc_objs, heartbeat=None):
+        """
+        Takes a list of DocumentObjs and processes each of them like the
+        process method, but only looks up the enabled Chutes once. If a
+        heartbeat function is given, it's called before each document.
+        Returns a list of booleans indicating which documents were
+        processed and stored without errors.
+
+        Inside a :func:`~engines.writer.buffered_inserts` block,
+        distilled documents are tagged with the index of the document
+        they came from, so documents that fail to be inserted later can
+        be traced back to it.
+        """
+        enabled_chutes = list(self.find_enabled())
+        results = []
+
+        for index, doc_obj in enumerate(doc_objs):
+            if heartbeat is not None:
+                heartbeat()
+            try:
+                with tagged_inserts(index):
+                    results.append(
+                        self._process_with_chutes(doc_obj, enabled_chutes))
+            except Exception as error:
+                _LOGGER.exception('An error occurred while processing '
+                                  'document %s:\n  %s', doc_obj.doc_id, error)
+                results.append(False)
+
+        return results
 
 
 class Chute(models.Model):
@@ -145,11 +190,15 @@ class Chute(models.Model):
         """
         Takes a DocumentObj and determines if the data is a match for
         the Chute's sieve. If it is, processes the data with the Chute's
-        munger and returns the document id of the distilled document.
-        Otherwise, returns None.
+        munger and returns the document id of the distilled document,
+        or False if the document couldn't be stored. Otherwise, returns
+        None.
         """
         if self.enabled and self._is_match(doc_obj.data):
-            return self._munge(doc_obj)
+            doc_id = self._munge(doc_obj)
+            if doc_id is None:
+                return False
+            return doc_id
 
     def thread_process(self, queue, **kwargs):
         """
@@ -160,5 +209,5 @@ class Chute(models.Model):
         document. Otherwise, returns None.
         """
         result = self.process(**kwargs)
-        if result is not None:
+        if result:
             queue.put(True)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmarks compiled Condensers against processing their Fittings from
+the database.
+
+Run it from the command line with the Condenser model, the name of a
+Condenser and a corpus of documents with one JSON document per line,
+such as the output of Logstash's ``json_lines`` codec, e.g.::
+
+    python sifter/condensers/benchmark.py logcondensers.LogCondenser \\
+        'syslog' corpus.json
+
+Each document is condensed by loading the Condenser's Fittings from the
+database for every document, like Condensers did before they were
+compiled, then with a cold and a warm
+:const:`~sifter.condensers.models.CONDENSER_CACHE`.
+"""
+
+# standard library
+import json
+import os
+import sys
+import timeit
+
+# add path to the Cyphon project folder so Cyphon packages can be found
+CYPHON_PATH = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(CYPHON_PATH)
+
+# set the default Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cyphon.settings.prod')
+
+# third party
+import django
+django.setup()
+from django.apps import apps
+
+# local
+from sifter.condensers.models import CONDENSER_CACHE
+
+
+def condense_from_database(condenser, data):
+    """Condense data by loading the Condenser's Fittings from the database."""
+    custom_doc = {}
+    for fitting in condenser.fittings.all():
+        if fitting.is_parser():
+            custom_doc[fitting.target_field_name] = fitting.process(data)
+        else:
+            custom_doc[fitting.target_field_name] = condense_from_database(
+                fitting.field_parser, data)
+    return custom_doc
+
+
+def run_benchmark(condenser, corpus, repeat=3):
+    """Time condensing a corpus of documents with a Condenser.
+
+    Parameters
+    ----------
+    condenser : Condenser
+        The Condenser used to condense the documents.
+
+    corpus : list of dict
+        The documents to condense.
+
+    repeat : int
+        The number of times each timing is taken. The best one is kept.
+
+    Returns
+    -------
+    |dict|
+        Seconds taken to condense all documents, keyed by method.
+
+    """
+    def from_database():
+        for data in corpus:
+            condense_from_database(condenser, data)
+
+    def compiled():
+        for data in corpus:
+            condenser.process(data)
+
+    def compiled_cold():
+        CONDENSER_CACHE.clear()
+        compiled()
+
+    return {
+        'database': min(timeit.repeat(from_database, number=1,
+                                      repeat=repeat)),
+        'compiled (cold cache)': min(timeit.repeat(compiled_cold, number=1,
+                                                   repeat=repeat)),
+        'compiled (warm cache)': min(timeit.repeat(compiled, number=1,
+                                                   repeat=repeat)),
+    }
+
+
+if __name__ == '__main__':
+    _MODEL = apps.get_model(sys.argv[1])
+    _CONDENSER = _MODEL.objects.get_by_natural_key(sys.argv[2])
+    with open(sys.argv[3]) as _FILE:
+        _CORPUS = [json.loads(_LINE) for _LINE in _FILE if _LINE.strip()]
+
+    print('%d documents' % len(_CORPUS))
+    for _NAME, _SECONDS in sorted(run_benchmark(_CONDENSER, _CORPUS).items()):
+        print('  %s: %.2fs (%.1fus per document)'
+              % (_NAME, _SECONDS, _SECONDS * 1e6 / len(_CORPUS)))
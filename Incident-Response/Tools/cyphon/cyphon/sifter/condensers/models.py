@@ -19,14 +19,19 @@ Provides abstract classes for defining a crosswalk between a custom data model a
 a model used by an external data platform, such as Twitter.
 
 The crosswalk allows data from a Pipe to be saved in a user-defined format
-(i.e., a Bottle).
+(i.e., a Bottle). Condensers are compiled into plans that are shared through
+the CONDENSER_CACHE, so condensing data doesn't query the database.
 """
 
 # standard library
+import copy
 import logging
+import threading
 
 # third party
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
@@ -34,10 +39,73 @@ from django.utils.translation import ugettext_lazy as _
 # local
 from bottler.bottles.models import Bottle, BottleField
 from parsers.models import Parser
+from utils.cacheutils.cacheutils import ModelCache
+from utils.dateutils.dateutils import DateStats
 
 LOGGER = logging.getLogger(__name__)
 
 
+def _run_plan(plan, data, **kwargs):
+    """
+    Takes a plan compiled by a Condenser and a dictionary of data.
+    Returns a dictionary that distills the data using the plan.
+    """
+    custom_doc = {}
+
+    for field_name, parser, fittings in plan:
+        if fittings is None:
+            custom_doc[field_name] = parser.process(data, **kwargs)
+        else:
+            custom_doc[field_name] = _run_plan(fittings, data, **kwargs)
+
+    return custom_doc
+
+
+def _get_plan_date_stats(plan, prefix=''):
+    """
+    Takes a plan compiled by a Condenser and returns a dictionary of the
+    date parsing statistics for its Parsers, keyed by field name.
+    """
+    stats = {}
+
+    for field_name, parser, fittings in plan:
+        if fittings is None:
+            parser_stats = parser.get_date_stats()
+            if parser_stats is not None:
+                stats[prefix + field_name] = parser_stats
+        else:
+            stats.update(_get_plan_date_stats(
+                fittings, prefix + field_name + '.'))
+
+    return stats
+
+
+def _get_fitting_date_stats(fitting):
+    """
+    Takes a Fitting and returns the DateStats for the dates it parses,
+    creating them if they don't exist yet.
+    """
+    key = (fitting._meta.label, fitting.pk)
+    with _DATE_STATS_LOCK:
+        if key not in _DATE_STATS:
+            _DATE_STATS[key] = DateStats()
+        return _DATE_STATS[key]
+
+
+def _get_plan_parser(fitting):
+    """
+    Takes a Fitting that uses a Parser and returns the Parser to use in
+    a compiled plan. A Parser that uses the 'DATE' method is copied, so
+    Fittings that share it count their dates separately, in DateStats
+    that outlive the plan.
+    """
+    parser = fitting.field_parser
+    if parser.method == 'DATE':
+        parser = copy.copy(parser)
+        parser.set_date_stats(_get_fitting_date_stats(fitting))
+    return parser
+
+
 class Condenser(models.Model):
     """
     Defines a crosswalk for transforming data into a user-defined format defined
@@ -85,35 +153,75 @@ class Condenser(models.Model):
 
     #     return custom_doc
 
-    def _condense(self, data, condenser, **kwargs):
+    def compile(self):
         """
-        Takes a dictionary of data (e.g., of a social media post) and a
-        Condenser. Returns a dictionary that distills the data
-        using the crosswalk defined by the Condenser.
+        Returns a plan for the Condenser's crosswalk, as a tuple of
+        (field name, Parser, plan) tuples. For Fittings that use another
+        Condenser, the nested Condenser's plan is included in place of a
+        Parser. The Fittings, their target fields and their Parsers are
+        loaded together, so running the plan doesn't touch the database.
         """
-        custom_doc = {}
-
-        for fitting in condenser.fittings.all():
+        fittings = self.fittings.select_related('content_type',
+                                                'target_field')
+        plan = []
 
+        for fitting in fittings.prefetch_related('field_parser'):
             if fitting.is_parser():
-                value = fitting.process(data=data, **kwargs)
-                custom_doc[fitting.target_field_name] = value
-
-            # if the field represents another Bottle, use recursion
+                plan.append((fitting.target_field_name,
+                             _get_plan_parser(fitting), None))
             else:
-                condenser = fitting.field_parser
-                custom_doc[fitting.target_field_name] = self._condense(
-                    data=data, condenser=condenser, **kwargs)
+                plan.append((fitting.target_field_name, None,
+                             fitting.field_parser.compile()))
 
-        return custom_doc
+        return tuple(plan)
 
     def process(self, data, **kwargs):
         """
         Takes a dictionary of data (e.g., of a social media post) and a
         Condenser. Returns a dictionary that distills the data
         using the crosswalk defined by the Condenser.
+
+        The Condenser is compiled once and shared through the
+        :const:`~CONDENSER_CACHE`, so this doesn't query the database
+        unless the Condenser's Fittings or Parsers have changed.
         """
-        return self._condense(data=data, condenser=self, **kwargs)
+        return _run_plan(self._get_plan(), data, **kwargs)
+
+    def get_date_stats(self):
+        """
+        Returns a dictionary of statistics on the dates parsed by the
+        Condenser's Fittings that use the 'DATE' method, keyed by the
+        target field name. Fields of nested Condensers use dot notation.
+
+        The statistics are kept for each Fitting outside the
+        :const:`~CONDENSER_CACHE`, so they carry on when the cache is
+        cleared and the Condenser is compiled again. They are counted
+        separately by each process.
+        """
+        return _get_plan_date_stats(self._get_plan())
+
+    def _get_plan(self):
+        """
+        Returns the Condenser's compiled plan from the
+        :const:`~CONDENSER_CACHE`, compiling it if it isn't there.
+        """
+        if self.pk is None:
+            return self.compile()
+
+        return CONDENSER_CACHE.get((self._meta.label, self.pk), self.compile)
+
+
+#: |ModelCache| of compiled Condensers. Compiling a Condenser loads its
+#: Fittings and their Parsers from the database, so the plans are shared
+#: by all Mungers and Funnels using the same Condenser. The cache is
+#: cleared whenever a Condenser, Fitting, Parser or BottleField is saved
+#: or deleted.
+CONDENSER_CACHE = ModelCache('condensers')
+
+# DateStats of Fittings that use the 'DATE' method, keyed by the Fitting's
+# model label and primary key, which are kept when plans are recompiled
+_DATE_STATS = {}
+_DATE_STATS_LOCK = threading.Lock()
 
 
 class Fitting(models.Model):
@@ -261,3 +369,18 @@ class Fitting(models.Model):
         # method to handle data, since the field_parser can be either a
         # Condenser or a Parser
         return self.field_parser.process(data, *args, **kwargs)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def clear_condenser_cache(sender, instance, **kwargs):
+    """
+    Clears the :const:`~CONDENSER_CACHE` when a model used by compiled
+    Condensers is saved or deleted.
+    """
+    if isinstance(instance, (Condenser, Fitting, Parser, BottleField)):
+        CONDENSER_CACHE.clear()
+
+    if isinstance(instance, Fitting) and kwargs.get('signal') is post_delete:
+        with _DATE_STATS_LOCK:
+            _DATE_STATS.pop((instance._meta.label, instance.pk), None)
@@ -68,6 +68,60 @@ class DataChuteTestCase(TestCase):
             mock_doc.has_calls([call(data_1), call(data_2)])
             mock_process.has_calls([call(mock_doc_1), call(mock_doc_2)])
 
+    def test_process_many(self):
+        """
+        Tests the process_many method of the DataChute manager.
+        """
+        valid_doc = DocumentObj(data={'subject': 'This is a Critical Alert'})
+        invalid_doc = DocumentObj(data={'subject': 'This is an Urgent Alert'})
+
+        def process(doc_obj):
+            if doc_obj is invalid_doc:
+                raise Exception('foo')
+            return 1
+
+        with patch('sifter.datasifter.datachutes.models.DataChute.process',
+                   side_effect=process) as mock_process:
+            with patch.object(DataChute.objects, 'find_enabled',
+                              wraps=DataChute.objects.find_enabled) \
+                    as mock_find_enabled:
+                results = DataChute.objects.process_many(
+                    [valid_doc, invalid_doc, valid_doc])
+        self.assertEqual(mock_find_enabled.call_count, 1)
+        self.assertEqual(results, [True, False, True])
+        mock_process.assert_has_calls([call(valid_doc), call(invalid_doc)])
+
+    def test_process_many_not_stored(self):
+        """
+        Tests that the process_many method of the DataChute manager
+        reports documents that couldn't be stored.
+        """
+        stored_doc = DocumentObj(data={'subject': 'This is a Critical Alert'})
+        lost_doc = DocumentObj(data={'subject': 'This is a Critical Alert'})
+
+        def process(doc_obj):
+            if doc_obj is lost_doc:
+                return False
+            return 1
+
+        with patch('sifter.datasifter.datachutes.models.DataChute.process',
+                   side_effect=process):
+            results = DataChute.objects.process_many([stored_doc, lost_doc])
+        self.assertEqual(results, [True, False])
+
+    def test_process_not_stored(self):
+        """
+        Tests the process method for a matching data dictionary that
+        couldn't be stored.
+        """
+        data = {'id': 123, 'subject': 'This is a Critical Alert'}
+        doc_obj = DocumentObj(data=data)
+
+        datachute = DataChute.objects.get(pk=3)
+        datachute.munger.process = Mock(return_value=None)
+
+        self.assertIs(datachute.process(doc_obj), False)
+
     def test_process_match(self):
         """
         Tests the process method for a matching data dictionary.
@@ -32,9 +32,14 @@ import six
 
 # local
 from bottler.bottles.models import BottleField
+from sifter.condensers.models import CONDENSER_CACHE, _DATE_STATS
 from sifter.condensers.tests.mixins import CondenserTestCaseMixin, \
     FittingTestCaseMixin
-from sifter.datasifter.datacondensers.models import DataCondenser, DataFitting
+from sifter.datasifter.datacondensers.models import (
+    DataCondenser,
+    DataFitting,
+    DataParser,
+)
 from tests.fixture_manager import get_fixtures
 
 
@@ -88,6 +93,124 @@ class DataCondenserTestCase(DataCondenserBaseTestCase, CondenserTestCaseMixin):
                 self.assertEqual(actual[item], expected[item])
 
 
+class CompiledDataCondenserTestCase(DataCondenserBaseTestCase):
+    """
+    Tests compiled DataCondensers and the CondenserCache.
+    """
+
+    doc = {
+        'created_at': 'Mon Mar 06 22:48:07 +0000 2017',
+        'id_str': '0123456',
+        'text': 'this is an example post',
+        'coordinates': {'coordinates': [-84.5, 39.1]},
+        'user': {
+            'id_str': '9876',
+            'name': 'Zebra Finch',
+            'screen_name': 'zebrafinch',
+            'profile_image_url': 'https://pbs.twimg.com/zebrafinch.png'
+        }
+    }
+
+    def setUp(self):
+        CONDENSER_CACHE.clear()
+        _DATE_STATS.clear()
+
+    def test_process(self):
+        """
+        Tests that a compiled DataCondenser returns the same result as
+        processing its Fittings from the database.
+        """
+        expected = {fitting.target_field_name: fitting.process(self.doc)
+                    for fitting in self.condenser.fittings.all()}
+        self.assertEqual(self.condenser.process(self.doc), expected)
+        self.assertEqual(expected['user']['link'],
+                         'https://twitter.com/zebrafinch/')
+        self.assertEqual(expected['content']['text'],
+                         'this is an example post')
+
+    def test_process_uses_cache(self):
+        """
+        Tests that the process method doesn't query the database once
+        the DataCondenser has been compiled.
+        """
+        self.condenser.process(self.doc)
+        condenser = DataCondenser.objects.get(name='twitter__post')
+        with self.assertNumQueries(0):
+            actual = condenser.process(self.doc)
+        self.assertEqual(actual['user']['screen_name'], 'zebrafinch')
+
+    def test_parser_saved(self):
+        """
+        Tests that changes to a DataParser are used after it's saved.
+        """
+        self.condenser.process(self.doc)
+        parser = DataParser.objects.get(name='user.screen_name__COPY')
+        parser.source_fields = 'user.name'
+        parser.save()
+        actual = self.condenser.process(self.doc)
+        self.assertEqual(actual['user']['screen_name'], 'Zebra Finch')
+
+    def test_fitting_deleted(self):
+        """
+        Tests that a deleted DataFitting is no longer used.
+        """
+        self.assertIn('location', self.condenser.process(self.doc))
+        DataFitting.objects.get(pk=2).delete()
+        self.assertNotIn('location', self.condenser.process(self.doc))
+
+    def test_get_date_stats(self):
+        """
+        Tests the get_date_stats method for a DataCondenser with a
+        DataParser that uses the 'DATE' method.
+        """
+        self.assertEqual(self.condenser.get_date_stats(), {})
+        parser = DataParser.objects.get(name='created_at__COPY')
+        parser.method = 'DATE'
+        parser.save()
+        for dummy_num in range(3):
+            actual = self.condenser.process(self.doc)
+        self.assertEqual(str(actual['created_date']),
+                         '2017-03-06 22:48:07+00:00')
+        stats = self.condenser.get_date_stats()
+        self.assertEqual(list(stats), ['created_date'])
+        self.assertEqual(stats['created_date']['format_hits'], 1)
+        self.assertEqual(stats['created_date']['memo_hits'], 2)
+
+    def test_date_stats_kept(self):
+        """
+        Tests that date stats carry on when the CONDENSER_CACHE is
+        cleared.
+        """
+        parser = DataParser.objects.get(name='created_at__COPY')
+        parser.method = 'DATE'
+        parser.save()
+        self.condenser.process(self.doc)
+        CONDENSER_CACHE.clear()
+        self.condenser.process(self.doc)
+        stats = self.condenser.get_date_stats()
+        self.assertEqual(stats['created_date']['format_hits'], 2)
+
+    def test_date_stats_shared_parser(self):
+        """
+        Tests that DataFittings using the same DataParser count their
+        dates separately.
+        """
+        parser = DataParser.objects.get(name='created_at__COPY')
+        parser.method = 'DATE'
+        parser.save()
+        fitting = DataFitting.objects.get(pk=2)
+        fitting.content_type = ContentType.objects.get_for_model(DataParser)
+        fitting.object_id = parser.pk
+        fitting.save()
+        for dummy_num in range(3):
+            self.condenser.process(self.doc)
+        stats = self.condenser.get_date_stats()
+        self.assertEqual(sorted(stats), ['created_date', 'location'])
+        for field_name in stats:
+            self.assertEqual(stats[field_name]['format_hits'], 1)
+            self.assertEqual(stats[field_name]['memo_hits'], 2)
+
+
 class DataFittingTestCase(DataCondenserBaseTestCase, FittingTestCaseMixin):
     """
     Tests the DataFitting class.
@@ -28,6 +28,7 @@ from sifter.datasifter.datasieves.models import (
     DataSieve,
     DataSieveNode,
 )
+from sifter.sieves.models import SIEVE_CACHE
 from tests.fixture_manager import get_fixtures
 
 
@@ -141,3 +142,66 @@ class DataSieveNodeTestCase(TestCase):
         node = DataSieveNode(sieve=sieve_1, node_object=sieve_2)
         with self.assertRaises(ValidationError):
             node.clean()
+
+
+class CompiledDataSieveTestCase(TestCase):
+    """
+    Tests compiled DataSieves and the SieveCache.
+    """
+    fixtures = get_fixtures(['datasieves'])
+
+    def setUp(self):
+        SIEVE_CACHE.clear()
+        self.datasieve = DataSieve.objects.get(name="test_datasieve")
+
+    def test_is_match_uses_cache(self):
+        """
+        Tests that the is_match method doesn't query the database once
+        the DataSieve has been compiled.
+        """
+        data = {'subject': 'this is a critical alert'}
+        self.assertTrue(self.datasieve.is_match(data))
+        sieve = DataSieve.objects.get(name="test_datasieve")
+        with self.assertNumQueries(0):
+            self.assertTrue(sieve.is_match(data))
+
+    def test_rule_saved(self):
+        """
+        Tests that changes to a DataRule are used after it's saved.
+        """
+        data = {'subject': 'this is an urgent alert'}
+        self.assertFalse(self.datasieve.is_match(data))
+        rule = DataRule.objects.get(name='subject_contains_critical')
+        rule.value = 'urgent'
+        rule.save()
+        self.assertTrue(self.datasieve.is_match(data))
+
+    def test_node_deleted(self):
+        """
+        Tests that a deleted DataSieveNode is no longer used.
+        """
+        data = {'subject': 'this is a critical notice'}
+        self.assertFalse(self.datasieve.is_match(data))
+        self.datasieve.nodes.get(object_id=4).delete()
+        self.assertTrue(self.datasieve.is_match(data))
+
+    def test_nested_sieves(self):
+        """
+        Tests the compile method for a DataSieve that contains other
+        DataSieves.
+        """
+        sieve = DataSieve.objects.create(name='nested', logic='OR')
+        DataSieveNode.objects.create(sieve=sieve,
+                                     node_object=self.datasieve)
+        DataSieveNode.objects.create(
+            sieve=sieve,
+            node_object=DataSieve.objects.get(name='test_syslog_sieve')
+        )
+        predicate = sieve.compile()
+        for data in [{'subject': 'this is a critical alert'},
+                     {'_type': 'syslog'},
+                     {'subject': 'this is an urgent alert'}]:
+            self.assertEqual(predicate(data), sieve.is_match(data))
+            self.assertEqual(predicate(data), sieve._matches_any(data))
+        self.assertTrue(predicate({'_type': 'syslog'}))
+        self.assertFalse(predicate({'subject': 'this is an urgent alert'}))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmarks compiled Sieves against evaluating their nodes from the
+database.
+
+Run it from the command line with the Sieve model, the name of a Sieve
+and a file with one JSON message per line, e.g.::
+
+    python sifter/sieves/benchmark.py datasieves.DataSieve 'my sieve' \\
+        messages.json
+
+DataSieves and LogSieves can be benchmarked, as their Chutes match
+dictionaries of data. Each message is matched with the node-walking
+path used before Sieves were compiled, then with a cold and a warm
+:const:`~sifter.sieves.models.SIEVE_CACHE`.
+"""
+
+# standard library
+import json
+import os
+import sys
+import timeit
+
+# add path to the Cyphon project folder so Cyphon packages can be found
+CYPHON_PATH = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+sys.path.append(CYPHON_PATH)
+
+# set the default Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cyphon.settings.prod')
+
+# third party
+import django
+django.setup()
+from django.apps import apps
+
+# local
+from sifter.sieves.models import SIEVE_CACHE
+
+
+def match_from_database(sieve, data):
+    """Match data by loading the Sieve's nodes from the database."""
+    if sieve.logic == 'OR':
+        match = sieve._matches_any(data)
+    else:
+        match = sieve._matches_all(data)
+    return not match if sieve.negate else match
+
+
+def run_benchmark(sieve, messages, repeat=3):
+    """Time matching messages against a Sieve.
+
+    Parameters
+    ----------
+    sieve : Sieve
+        The Sieve to match messages against.
+
+    messages : list of dict
+        The messages to match.
+
+    repeat : int
+        The number of times each timing is taken. The best one is kept.
+
+    Returns
+    -------
+    |dict|
+        Seconds taken to match all messages, keyed by matching method.
+
+    """
+    def from_database():
+        for data in messages:
+            match_from_database(sieve, data)
+
+    def compiled():
+        for data in messages:
+            sieve.is_match(data)
+
+    def compiled_cold():
+        SIEVE_CACHE.clear()
+        compiled()
+
+    return {
+        'database': min(timeit.repeat(from_database, number=1,
+                                      repeat=repeat)),
+        'compiled (cold cache)': min(timeit.repeat(compiled_cold, number=1,
+                                                   repeat=repeat)),
+        'compiled (warm cache)': min(timeit.repeat(compiled, number=1,
+                                                   repeat=repeat)),
+    }
+
+
+if __name__ == '__main__':
+    _MODEL = apps.get_model(sys.argv[1])
+    _SIEVE = _MODEL.objects.get_by_natural_key(sys.argv[2])
+    with open(sys.argv[3]) as _FILE:
+        _MESSAGES = [json.loads(_LINE) for _LINE in _FILE if _LINE.strip()]
+
+    _MATCHES = sum(bool(match_from_database(_SIEVE, _DATA))
+                   for _DATA in _MESSAGES)
+    print('%d messages, %d matches' % (len(_MESSAGES), _MATCHES))
+    for _NAME, _SECONDS in sorted(run_benchmark(_SIEVE, _MESSAGES).items()):
+        print('  %s: %.2fs (%.1fus per message)'
+              % (_NAME, _SECONDS, _SECONDS * 1e6 / len(_MESSAGES)))
@@ -37,6 +37,8 @@ import sre_constants
 
 # third party
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
@@ -46,11 +48,44 @@ from django.utils.translation import ugettext_lazy as _
 from cyphon.models import GetByNameManager
 from cyphon.choices import LOGIC_CHOICES, RANGE_CHOICES, REGEX_CHOICES
 from lab.procedures.models import Protocol
+from utils.cacheutils.cacheutils import ModelCache
 from utils.parserutils.parserutils import get_dict_value
 from utils.validators.validators import regex_validator
 
 LOGGER = logging.getLogger(__name__)
 
+_NUMERIC_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+
+def _never_matches(data):
+    """
+    Predicate for Rules that can't match any data.
+    """
+    return False
+
+
+def _join_predicates(logic, negate, predicates):
+    """
+    Takes the logic and negate attributes of a Sieve and a tuple of
+    predicates for its nodes, and returns a single predicate for the Sieve.
+    """
+    if logic == 'OR':
+        def check(data):
+            return any(predicate(data) for predicate in predicates)
+    else:
+        def check(data):
+            return all(predicate(data) for predicate in predicates)
+
+    if negate:
+        return lambda data: not check(data)
+
+    return check
+
 
 class Rule(models.Model):
     """An abstract base class for models that define rules.
@@ -223,6 +258,48 @@ class Rule(models.Model):
         """
         return self._matches_regex(value)
 
+    def _compile_regex_check(self):
+        """
+        Returns a predicate that takes a dictionary or a string of data and
+        returns True if the data matches the Rule's regex, with the regex
+        compiled only once.
+        """
+        regex = self._create_regex()
+        flags = 0 if self.case_sensitive else re.IGNORECASE
+
+        try:
+            pattern = re.compile(regex, flags)
+        except sre_constants.error:
+            LOGGER.error('Cannot parse the regex "%s" for %s "%s"',
+                         regex, self.__class__.__name__, self)
+            return _never_matches
+
+        search = pattern.search
+        get_string = self._get_string
+        return lambda data: search(get_string(data)) is not None
+
+    def _compile_check(self):
+        """
+        Returns a predicate equivalent to the Rule's _check_value method.
+        """
+        return self._compile_regex_check()
+
+    def compile(self):
+        """
+        Returns a function that takes a dictionary or a string of data and
+        returns the same result as the Rule's is_match method, but without
+        parsing the Rule's operator and regex for every call.
+        """
+        if self.protocol is not None:
+            return self.is_match
+
+        check = self._compile_check()
+
+        if self.negate:
+            return lambda data: not check(data)
+
+        return check
+
     def is_match(self, data):
         """
         Takes a dictionary or a string of data and returns True if the data meets
@@ -368,19 +445,35 @@ class FieldRule(Rule):
         """
 
         """
-        operators = {
-            '>': operator.gt,
-            '>=': operator.ge,
-            '<': operator.lt,
-            '<=': operator.le
-        }
         try:
             comparison = self._get_operator_value()
             value = self._get_value(data)
-            return operators[comparison](float(value), float(self.value))
+            return _NUMERIC_OPERATORS[comparison](float(value),
+                                                  float(self.value))
         except (ValueError, TypeError):  # catch TypeError if value is None
             return False
 
+    def _compile_numeric_check(self):
+        """
+        Returns a predicate equivalent to the _numeric_match method, with the
+        comparison and the Rule's value parsed only once.
+        """
+        try:
+            threshold = float(self.value)
+        except (ValueError, TypeError):
+            return _never_matches
+
+        compare = _NUMERIC_OPERATORS[self._get_operator_value()]
+        get_value = self._get_value
+
+        def check(data):
+            try:
+                return compare(float(get_value(data)), threshold)
+            except (ValueError, TypeError):  # catch TypeError if value is None
+                return False
+
+        return check
+
     def _check_value(self, value):
         """
         Takes a value and checks it against the Rule's logic. Returns the result
@@ -396,6 +489,20 @@ class FieldRule(Rule):
         func = methods[operator_type]
         return func(value)
 
+    def _compile_check(self):
+        """
+        Returns a predicate equivalent to the Rule's _check_value method.
+        """
+        operator_type = self._get_operator_type()
+
+        if operator_type == 'EmptyField':
+            return self._is_null
+
+        if operator_type == 'FloatField':
+            return self._compile_numeric_check()
+
+        return self._compile_regex_check()
+
 
 class SieveManager(GetByNameManager):
     """
@@ -474,6 +581,8 @@ class Sieve(models.Model):
         """
         Takes a dictionary of data and returns True if the data matches all
         Rules in the RuleSet. Otherwise, returns False.
+
+        Unlike is_match, this loads the Sieve's nodes from the database.
         """
         for node in self.nodes.all():
             if not node.is_match(data):
@@ -484,12 +593,21 @@ class Sieve(models.Model):
         """
         Takes a dictionary of data and returns True if the data matches
         any Rule in the RuleSet. Otherwise, returns False.
+
+        Unlike is_match, this loads the Sieve's nodes from the database.
         """
         for node in self.nodes.all():
             if node.is_match(data):
                 return True
         return False
 
+    def _compile_nodes(self):
+        """
+        Returns a tuple of compiled predicates for the Sieve's nodes.
+        """
+        nodes = self.nodes.select_related('content_type')
+        return tuple(node.node_object.compile() for node in nodes)
+
     def get_node_number(self):
         """
         Returns the number of nodes associated with the Sieve.
@@ -498,15 +616,35 @@ class Sieve(models.Model):
 
     get_node_number.short_description = _('nodes')
 
+    def compile(self):
+        """
+        Returns a function that takes a dictionary of data and returns
+        the same result as the Sieve's is_match method. Nested Sieves and
+        Rules are compiled along with the Sieve, so the function doesn't
+        touch the database.
+        """
+        return _join_predicates(self.logic, self.negate,
+                                self._compile_nodes())
+
     def is_match(self, data):
         """
         Takes a dictionary of data and returns True if the data meet the
         criteria of the RuleSet. Otherwise, returns False.
+
+        The Sieve's nodes are compiled once and shared through the
+        :const:`~SIEVE_CACHE`, so this doesn't query the database unless
+        the Sieve's Rules have changed.
         """
-        if self.logic == 'AND':
-            match = self._matches_all(data)
-        elif self.logic == 'OR':
-            match = self._matches_any(data)
+        if self.pk is None:
+            predicates = self._compile_nodes()
+        else:
+            predicates = SIEVE_CACHE.get((self._meta.label, self.pk),
+                                         self._compile_nodes)
+
+        if self.logic == 'OR':
+            match = any(predicate(data) for predicate in predicates)
+        else:
+            match = all(predicate(data) for predicate in predicates)
 
         if self.negate:
             return not match
@@ -514,6 +652,14 @@ class Sieve(models.Model):
             return match
 
 
+#: |ModelCache| of compiled Sieves. Compiling a Sieve loads its whole
+#: tree of nodes from the database, so the predicates for its nodes are
+#: shared by all Chutes, Triggers and other objects using the same
+#: Sieve. The cache is cleared whenever a Rule, Sieve, SieveNode or
+#: Protocol is saved or deleted.
+SIEVE_CACHE = ModelCache('sieves')
+
+
 class SieveNode(models.Model):
     """A reference to a Rule or a Sieve.
 
@@ -595,3 +741,14 @@ class SieveNode(models.Model):
         criterion. Otherwise, returns False.
         """
         return self.node_object.is_match(data)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def clear_sieve_cache(sender, instance, **kwargs):
+    """
+    Clears the :const:`~SIEVE_CACHE` when a model used by compiled Sieves is
+    saved or deleted.
+    """
+    if isinstance(instance, (Rule, Sieve, SieveNode, Protocol)):
+        SIEVE_CACHE.clear()
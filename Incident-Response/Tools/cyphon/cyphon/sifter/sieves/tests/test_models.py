@@ -321,3 +321,126 @@ class FieldRuleTestCase(TestCase):
             self.fail('Rule raised ValidationError unexpectedly')
         with self.assertRaises(ValidationError):
             self.assertFalse(invalid_rule.clean())
+
+
+class FieldRuleCompileTestCase(TestCase):
+    """
+    Tests the compile method of the FieldRule class.
+    """
+
+    def setUp(self):
+        logging.disable(logging.ERROR)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def _assert_same_as_is_match(self, rule, data_list):
+        """
+        Asserts that the compiled Rule gives the same results as the
+        Rule's is_match method.
+        """
+        predicate = rule.compile()
+        for data in data_list:
+            self.assertEqual(predicate(data), rule.is_match(data))
+
+    def test_regex(self):
+        """
+        Tests the compile method for a regex pattern.
+        """
+        rule = FieldRule(
+            field_name='subject',
+            operator='CharField:^x',
+            value='critical'
+        )
+        predicate = rule.compile()
+        self.assertTrue(predicate({'subject': 'Critical alert'}))
+        self.assertFalse(predicate({'subject': 'not critical'}))
+        self._assert_same_as_is_match(rule, [
+            {'subject': 'Critical alert'},
+            {'subject': 'not critical'},
+            {'subject': None},
+            {},
+        ])
+
+    def test_case_sensitive(self):
+        """
+        Tests the compile method for a case-sensitive regex pattern.
+        """
+        rule = FieldRule(
+            field_name='subject',
+            operator='CharField:x',
+            value='critical',
+            case_sensitive=True
+        )
+        predicate = rule.compile()
+        self.assertTrue(predicate({'subject': 'a critical alert'}))
+        self.assertFalse(predicate({'subject': 'a CRITICAL alert'}))
+
+    def test_negate(self):
+        """
+        Tests the compile method for a negated Rule.
+        """
+        rule = FieldRule(
+            field_name='subject',
+            operator='CharField:x',
+            value='critical',
+            negate=True
+        )
+        predicate = rule.compile()
+        self.assertFalse(predicate({'subject': 'a critical alert'}))
+        self.assertTrue(predicate({'subject': 'an urgent alert'}))
+
+    def test_numeric(self):
+        """
+        Tests the compile method for numeric comparisons.
+        """
+        data_list = [
+            {'age': '19'},
+            {'age': 20},
+            {'age': '21.5'},
+            {'age': '1foobar'},
+            {'age': None},
+        ]
+        for comparison in ['>', '>=', '<', '<=']:
+            rule = FieldRule(
+                field_name='age',
+                operator='FloatField:' + comparison,
+                value='20'
+            )
+            self._assert_same_as_is_match(rule, data_list)
+
+    def test_invalid_number(self):
+        """
+        Tests the compile method for a numeric comparison with a
+        non-numeric value.
+        """
+        rule = FieldRule(
+            field_name='age',
+            operator='FloatField:>',
+            value='[20]'
+        )
+        self.assertFalse(rule.compile()({'age': '21'}))
+
+    def test_is_null(self):
+        """
+        Tests the compile method for 'is null'.
+        """
+        rule = FieldRule(
+            field_name='subject',
+            operator='EmptyField',
+        )
+        predicate = rule.compile()
+        self.assertFalse(predicate({'subject': 'this is a critical alert'}))
+        self.assertTrue(predicate({'subject': None}))
+
+    def test_invalid_regex(self):
+        """
+        Tests the compile method when the value is not a valid regex.
+        """
+        rule = FieldRule(
+            field_name='subject',
+            operator='CharField:x$',
+            is_regex=True,
+            value='[CRIT-999'
+        )
+        self.assertFalse(rule.compile()({'subject': '[CRIT-999'}))
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Defines a cache for objects compiled from models, shared by the process.
+"""
+
+# standard library
+import threading
+import time
+import uuid
+
+# third party
+from django.core.cache import cache
+
+#: Maximum number of seconds compiled objects are kept in a |ModelCache|.
+MODEL_CACHE_TIMEOUT = 60
+
+#: Number of seconds between checks of a |ModelCache|'s version stamp.
+MODEL_CACHE_CHECK_INTERVAL = 1
+
+
+class ModelCache(object):
+    """Cache of objects compiled from models, shared by the process.
+
+    Objects are compiled on the first request for their key and shared
+    by all threads until the cache is cleared. Clearing the cache also
+    changes a version stamp kept in Django's cache, which other
+    processes check every :const:`~MODEL_CACHE_CHECK_INTERVAL` seconds
+    and clear their own copies of the cache when it changes.
+
+    Parameters
+    ----------
+    name : str
+        A name identifying the cache's version stamp. Caches with the
+        same name in different processes are cleared together.
+
+    timeout : int
+        Maximum number of seconds compiled objects are kept.
+
+    check_interval : int
+        Number of seconds between checks of the version stamp.
+
+    Notes
+    -----
+    The version stamp is only shared between processes if Django's
+    default cache is (e.g., Memcached or Redis). Otherwise, changes made
+    by other processes are picked up once the cache times out.
+
+    Models changed through :meth:`QuerySet.update` don't send signals,
+    so call :meth:`~ModelCache.clear` after using it.
+
+    """
+
+    def __init__(self, name, timeout=MODEL_CACHE_TIMEOUT,
+                 check_interval=MODEL_CACHE_CHECK_INTERVAL):
+        self.name = name
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._values = {}
+        self._version = None
+        self._created = time.monotonic()
+        self._checked = None
+
+    @property
+    def version_key(self):
+        """
+        Returns the key of the cache's version stamp in Django's cache.
+        """
+        return 'model_cache_version:%s' % self.name
+
+    def _reset(self, now):
+        """
+        Removes all objects from the cache. Must be called with the
+        lock held.
+        """
+        self._generation += 1
+        self._values = {}
+        self._created = now
+
+    def _expire(self):
+        """
+        Clears the cache if it has timed out or if it was cleared by
+        another process.
+        """
+        now = time.monotonic()
+        if (self._checked is not None
+                and now - self._checked < self.check_interval):
+            return
+
+        version = cache.get(self.version_key)
+
+        with self._lock:
+            self._checked = now
+            if (version != self._version
+                    or now - self._created >= self.timeout):
+                self._version = version
+                self._reset(now)
+
+    def get(self, key, compile_func):
+        """
+        Takes a key and a function compiling the object for that key.
+        Returns the cached object, calling the function if the key isn't
+        in the cache.
+        """
+        self._expire()
+
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        generation = self._generation
+        value = compile_func()
+
+        with self._lock:
+            # don't cache objects compiled from models that have
+            # changed while they were being compiled
+            if generation == self._generation:
+                self._values[key] = value
+
+        return value
+
+    def clear(self):
+        """
+        Removes all objects from the cache, in this process and (with a
+        shared Django cache) in all other processes.
+        """
+        version = uuid.uuid4().hex
+        cache.set(self.version_key, version, None)
+
+        with self._lock:
+            self._version = version
+            self._reset(time.monotonic())
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Copyright 2017-2019 ControlScan, Inc.
+#
+# This file is part of Cyphon Engine.
+#
+# Cyphon Engine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# Cyphon Engine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
+"""
+Tests the ModelCache class.
+"""
+
+# standard library
+from unittest import TestCase
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
+
+# third party
+from django.core.cache import cache
+
+# local
+from utils.cacheutils.cacheutils import ModelCache
+
+
+class ModelCacheTestCase(TestCase):
+    """
+    Tests the ModelCache class.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.cache = ModelCache('test', timeout=60, check_interval=0)
+
+    def test_get(self):
+        """
+        Tests that the get method compiles an object only once.
+        """
+        compile_func = Mock(return_value='foo')
+        self.assertEqual(self.cache.get(1, compile_func), 'foo')
+        self.assertEqual(self.cache.get(1, compile_func), 'foo')
+        compile_func.assert_called_once_with()
+
+    def test_clear(self):
+        """
+        Tests that the clear method removes compiled objects.
+        """
+        self.cache.get(1, lambda: 'foo')
+        self.cache.clear()
+        self.assertEqual(self.cache.get(1, lambda: 'bar'), 'bar')
+
+    def test_clear_while_compiling(self):
+        """
+        Tests that objects compiled while the cache is cleared aren't
+        cached.
+        """
+        def compile_func():
+            self.cache.clear()
+            return 'foo'
+
+        self.assertEqual(self.cache.get(1, compile_func), 'foo')
+        self.assertEqual(self.cache.get(1, lambda: 'bar'), 'bar')
+
+    def test_cleared_by_other_process(self):
+        """
+        Tests that the cache is cleared when another cache with the same
+        name is cleared.
+        """
+        other_cache = ModelCache('test')
+        self.cache.get(1, lambda: 'foo')
+        other_cache.clear()
+        self.assertEqual(self.cache.get(1, lambda: 'bar'), 'bar')
+
+    def test_other_name(self):
+        """
+        Tests that the cache isn't cleared when a cache with another
+        name is cleared.
+        """
+        other_cache = ModelCache('other')
+        self.cache.get(1, lambda: 'foo')
+        other_cache.clear()
+        self.assertEqual(self.cache.get(1, lambda: 'bar'), 'foo')
+
+    def test_check_interval(self):
+        """
+        Tests that the version stamp isn't checked more often than the
+        check interval.
+        """
+        model_cache = ModelCache('test', check_interval=10)
+        model_cache.get(1, lambda: 'foo')
+        ModelCache('test').clear()
+        self.assertEqual(model_cache.get(1, lambda: 'bar'), 'foo')
+
+    @patch('utils.cacheutils.cacheutils.time.monotonic')
+    def test_timeout(self, mock_monotonic):
+        """
+        Tests that compiled objects are removed when the cache times out.
+        """
+        mock_monotonic.return_value = 1000
+        model_cache = ModelCache('test', timeout=60, check_interval=0)
+        model_cache.get(1, lambda: 'foo')
+
+        mock_monotonic.return_value = 1059
+        self.assertEqual(model_cache.get(1, lambda: 'bar'), 'foo')
+
+        mock_monotonic.return_value = 1060
+        self.assertEqual(model_cache.get(1, lambda: 'bar'), 'bar')
@@ -379,5 +379,116 @@ class FormatDateTestCase(TestCase):
         actual = dt.format_date(date_str, date_format)
         self.assertEqual(actual.year, utc_now.year)
         self.assertEqual(actual.month, 8)
-        self.assertEqual(actual.day, 16)     
+        self.assertEqual(actual.day, 16)
+
+
+class DateParserTestCase(TestCase):
+    """
+    Tests the DateParser class.
+    """
+
+    def test_iso_date(self):
+        """
+        Tests that an ISO 8601 date is parsed with a fast format.
+        """
+        parser = dt.DateParser()
+        date_str = '2017-03-06T22:48:07.123Z'
+        actual = parser.parse(date_str)
+        self.assertEqual(actual, dt.parse_date(date_str))
+        self.assertEqual(str(actual), '2017-03-06 22:48:07.123000+00:00')
+        self.assertEqual(parser.stats['format_hits'], 1)
+        self.assertEqual(parser.stats['fallbacks'], 0)
+
+    def test_email_date(self):
+        """
+        Tests that an RFC 2822 date is parsed with a fast format.
+        """
+        parser = dt.DateParser()
+        actual = parser.parse('Tue, 8 Sep 2015 16:08:59 -0400')
+        self.assertEqual(str(actual), '2015-09-08 16:08:59-04:00')
+        self.assertEqual(parser.stats['format'], '%a, %d %b %Y %H:%M:%S %z')
 
+    def test_syslog_date(self):
+        """
+        Tests that a syslog date is given the current year.
+        """
+        parser = dt.DateParser()
+        utc_now = datetime.datetime.now(datetime.timezone.utc)
+        actual = parser.parse('Aug  6 20:16:38')
+        self.assertEqual(actual.year, utc_now.year)
+        self.assertEqual(actual.month, 8)
+        self.assertEqual(actual.day, 6)
+        self.assertEqual(str(actual.tzinfo), 'UTC')
+
+    def test_learned_format(self):
+        """
+        Tests that the last successful format is tried first.
+        """
+        parser = dt.DateParser()
+        parser.parse('Tue, 8 Sep 2015 16:08:59 -0400')
+        self.assertEqual(parser._get_formats()[0],
+                         '%a, %d %b %Y %H:%M:%S %z')
+        self.assertEqual(len(parser._get_formats()), len(dt.FAST_FORMATS))
+
+    def test_fallback(self):
+        """
+        Tests that parse_date is used for dates that don't match a fast
+        format.
+        """
+        parser = dt.DateParser()
+        actual = parser.parse('1444316990')
+        self.assertEqual(str(actual), '2015-10-08 15:09:50+00:00')
+        self.assertEqual(parser.stats['fallbacks'], 1)
+
+    def test_bad_string(self):
+        """
+        Tests that None is returned for a non-date string.
+        """
+        parser = dt.DateParser()
+        self.assertEqual(parser.parse('foobar'), None)
+        self.assertEqual(parser.parse('foobar'), None)
+        self.assertEqual(parser.stats['failures'], 1)
+        self.assertEqual(parser.stats['memo_hits'], 1)
+
+    def test_none(self):
+        """
+        Tests that None is returned for a non-string.
+        """
+        parser = dt.DateParser()
+        self.assertEqual(parser.parse(None), None)
+
+    def test_memo(self):
+        """
+        Tests that repeated strings are remembered, up to the memo size.
+        """
+        parser = dt.DateParser(memo_size=2)
+        dates = ['2017-03-06T22:48:07Z', '2017-03-06T22:48:08Z',
+                 '2017-03-06T22:48:09Z']
+        for date_str in dates:
+            parser.parse(date_str)
+        parser.parse(dates[2])
+        parser.parse(dates[0])
+        self.assertEqual(parser.stats['memo_hits'], 1)
+        self.assertEqual(parser.stats['format_hits'], 4)
+        self.assertEqual(len(parser._memo), 2)
+
+    def test_date_format(self):
+        """
+        Tests that a given date format is tried first.
+        """
+        parser = dt.DateParser(date_format='%m-%d-%y')
+        actual = parser.parse('08-16-88')
+        self.assertEqual(actual.year, 1988)
+        self.assertEqual(parser.stats['format'], '%m-%d-%y')
+
+    def test_shared_stats(self):
+        """
+        Tests that a DateParser keeps counting in DateStats it's given.
+        """
+        stats = dt.DateStats()
+        dt.DateParser(stats=stats).parse('08-16-88')
+        parser = dt.DateParser(stats=stats)
+        parser.parse('2017-03-06T22:48:07Z')
+        self.assertEqual(parser.stats['fallbacks'], 1)
+        self.assertEqual(parser.stats['format_hits'], 1)
+        self.assertEqual(parser.stats['format'], '%Y-%m-%dT%H:%M:%SZ')
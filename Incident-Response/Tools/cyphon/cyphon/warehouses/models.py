@@ -535,6 +535,31 @@ class Collection(models.Model):
         except Exception as error:  # pylint: disable=W0703
             _LOGGER.exception('Insertion error: %s', error)
 
+    def bulk_insert(self, docs):
+        """Save several documents to the Collection at once.
+
+        Parameters
+        ----------
+        docs : |list| of |dict|
+            Documents to insert into the data store represented by the
+            Collection.
+
+        Returns
+        -------
+        |list| of |str| or |None|
+            The ids of the inserted documents, in the same order as
+            `docs`. The id is |None| for a document that couldn't be
+            inserted.
+
+        """
+        try:
+            return self.engine.bulk_insert(docs)
+
+        # different backends may throw different exceptions
+        except Exception as error:  # pylint: disable=W0703
+            _LOGGER.exception('Insertion error: %s', error)
+            return [None] * len(docs)
+
     def remove_by_id(self, doc_ids):
         """Remove the documents with the given ids.
 
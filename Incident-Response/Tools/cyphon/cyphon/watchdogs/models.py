@@ -16,15 +16,25 @@
 # along with Cyphon Engine. If not, see <http://www.gnu.org/licenses/>.
 """
 Defines Watchdog, Trigger, and Muzzle classes for generating Alerts.
+
+Enabled Watchdogs are kept with their Triggers and Muzzles in the
+WATCHDOG_INDEX, and recent muzzled Alerts are kept in a |MuzzleCache|,
+so inspecting a document doesn't query the database unless it generates
+a new Alert.
 """
 
 # standard library
+from collections import Counter, OrderedDict
 import contextlib
+import functools
 import logging
+import threading
 
 # third party
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError, models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 # local
@@ -32,11 +42,19 @@ from alarms.models import Alarm, AlarmManager
 from alerts.models import Alert
 from categories.models import Category
 from cyphon.choices import ALERT_LEVEL_CHOICES, TIME_UNIT_CHOICES
+from distilleries.models import Distillery
+from utils.cacheutils.cacheutils import ModelCache
 from utils.dbutils.dbutils import json_encodeable
 from sifter.datasifter.datasieves.models import DataSieve
 
 _LOGGER = logging.getLogger(__name__)
 
+MUZZLE_CACHE_SIZE = 1000
+"""|int|
+
+Number of recent muzzled Alerts kept by the |MuzzleCache|.
+"""
+
 
 class WatchdogManager(AlarmManager):
     """
@@ -82,6 +100,264 @@ class WatchdogManager(AlarmManager):
 
         return queryset.distinct()
 
+    def get_relevant(self, distillery):
+        """Get the Watchdogs for inspecting a document from the index.
+
+        Parameters
+        ----------
+        distillery : |Distillery| or |None|
+            The |Distillery| associated with the document to be
+            inspected.
+
+        Returns
+        -------
+        |tuple| of |Watchdogs|
+            The enabled |Watchdogs| for the |Distillery|, with their
+            |Triggers| and |Muzzles| already loaded.
+
+        """
+        key = distillery.pk if distillery else None
+        return WATCHDOG_INDEX.get(key, lambda: _load_watchdogs(distillery))
+
+    def process_many(self, doc_objs, heartbeat=None):
+        """Inspect a batch of documents with Watchdogs.
+
+        Incidents added to previous |Alerts| by duplicate Alerts in the
+        batch are saved together once the batch has been inspected.
+
+        Parameters
+        ----------
+        doc_objs : |list| of |DocumentObj|
+            The documents that Watchdogs should inspect.
+
+        heartbeat : callable, optional
+            A function called before each document is inspected, e.g.
+            to keep a connection to a message broker alive.
+
+        Returns
+        -------
+        |list| of |bool|
+            Whether each document was inspected without errors and
+            any Alerts it generated were saved.
+
+        """
+        with batched_incidents():
+            return super(WatchdogManager, self).process_many(
+                doc_objs, heartbeat=heartbeat)
+
+    def _inspect(self, doc_obj, alarms):
+        """
+        Overrides the parent method so incidents counted for a document
+        that fails aren't saved, since it will be inspected again.
+        """
+        pending = MUZZLE_CACHE.pending
+        num_pending = len(pending) if pending is not None else 0
+        stored = False
+        try:
+            stored = super(WatchdogManager, self)._inspect(doc_obj, alarms)
+            return stored
+        finally:
+            if pending is not None and not stored:
+                del pending[num_pending:]
+
+
+def _load_watchdogs(distillery):
+    """
+    Takes a Distillery and returns a tuple of the Watchdogs relevant to
+    it, with their Triggers and Muzzles.
+    """
+    triggers = Trigger.objects.select_related('sieve').order_by('rank')
+    watchdogs = Watchdog.objects.find_relevant(distillery)
+    watchdogs = watchdogs.prefetch_related(
+        'muzzle',
+        models.Prefetch('triggers', queryset=triggers)
+    )
+    return tuple(watchdogs)
+
+
+#: |ModelCache| of enabled Watchdogs. For each |Distillery|, keeps the
+#: enabled |Watchdogs| covering its Categories, with their |Triggers|
+#: (ordered by rank, with their |DataSieves|) and |Muzzles| already
+#: loaded. The index is cleared whenever a Watchdog, Trigger, Muzzle,
+#: DataSieve, Distillery or Category is saved or deleted, or when their
+#: Categories change.
+WATCHDOG_INDEX = ModelCache('watchdogs')
+
+
+class MuzzleCache(object):
+    """Cache of recent muzzled Alerts, keyed by their muzzle_hash.
+
+    When a |Watchdog| with a |Muzzle| generates an Alert that duplicates
+    one in the cache, an incident is added to the cached Alert with a
+    single UPDATE, instead of relying on the database to reject the new
+    Alert. Inside a :func:`~batched_incidents` block, incidents are
+    counted and saved together when the block exits, and duplicates of
+    Alerts that were deleted meanwhile are saved as new Alerts.
+
+    The least recently used Alerts are dropped when the cache holds
+    more than :const:`~MUZZLE_CACHE_SIZE` Alerts. Alerts are also
+    dropped when they're changed or deleted.
+
+    """
+
+    def __init__(self, size=MUZZLE_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._alerts = OrderedDict()
+        self._local = threading.local()
+
+    def get(self, muzzle_hash):
+        """
+        Takes a muzzle_hash and returns the cached Alert with that hash,
+        or None if it isn't in the cache.
+        """
+        with self._lock:
+            alert = self._alerts.get(muzzle_hash)
+            if alert is not None:
+                self._alerts.move_to_end(muzzle_hash)
+            return alert
+
+    def add(self, alert):
+        """
+        Takes a saved Alert and adds it to the cache.
+        """
+        with self._lock:
+            self._alerts[alert.muzzle_hash] = alert
+            if len(self._alerts) > self.size:
+                self._alerts.popitem(last=False)
+
+    def discard(self, alert_ids):
+        """
+        Takes a collection of Alert ids and removes those Alerts from
+        the cache.
+        """
+        with self._lock:
+            self._alerts = OrderedDict(
+                (muzzle_hash, alert)
+                for (muzzle_hash, alert) in self._alerts.items()
+                if alert.pk not in alert_ids
+            )
+
+    def clear(self):
+        """
+        Removes all Alerts from the cache.
+        """
+        with self._lock:
+            self._alerts = OrderedDict()
+
+    @property
+    def pending(self):
+        """
+        The list of incidents counted in the current thread's
+        :func:`~batched_incidents` block, or None outside of one.
+        """
+        return getattr(self._local, 'pending', None)
+
+    def add_incident(self, alert, fallback=None):
+        """
+        Takes a cached Alert and adds an incident to it. Returns a
+        Boolean indicating whether the incident was added, which is
+        False if the Alert no longer exists.
+
+        Inside a :func:`~batched_incidents` block, the incident is only
+        counted, and True is returned. If the Alert turns out to have
+        been deleted when the incidents are saved, the `fallback`
+        function is called instead, to save the duplicate Alert.
+        """
+        pending = self.pending
+        if pending is not None:
+            pending.append((alert.pk, fallback))
+            return True
+
+        updated = Alert.objects.filter(pk=alert.pk).update(
+            incidents=models.F('incidents') + 1)
+
+        if not updated:
+            self.discard({alert.pk})
+
+        return bool(updated)
+
+    def save_incidents(self, pending):
+        """
+        Takes a list of incidents, as (Alert id, fallback) tuples, and
+        adds them to the Alerts, with one UPDATE for each number of
+        incidents. Calls the fallbacks of incidents for Alerts that no
+        longer exist.
+        """
+        counts = Counter(alert_id for (alert_id, dummy_fallback) in pending)
+        alert_ids_by_count = {}
+        for alert_id, count in counts.items():
+            alert_ids_by_count.setdefault(count, []).append(alert_id)
+
+        with transaction.atomic():
+            missing = set()
+            for count, alert_ids in alert_ids_by_count.items():
+                updated = Alert.objects.filter(pk__in=alert_ids).update(
+                    incidents=models.F('incidents') + count)
+                if updated < len(alert_ids):
+                    missing.update(self._discard_missing(alert_ids))
+
+            for alert_id, fallback in pending:
+                if alert_id in missing and fallback is not None:
+                    fallback()
+
+    def _discard_missing(self, alert_ids):
+        """
+        Takes a list of Alert ids and removes the ones that no longer
+        exist from the cache. Returns the set of missing ids.
+        """
+        existing = Alert.objects.filter(pk__in=alert_ids)\
+                                .values_list('pk', flat=True)
+        missing = set(alert_ids).difference(existing)
+        self.discard(missing)
+        _LOGGER.warning('Incidents could not be added to deleted Alerts: %s',
+                        sorted(missing))
+        return missing
+
+
+MUZZLE_CACHE = MuzzleCache()
+
+
+@contextlib.contextmanager
+def batched_incidents():
+    """Save incidents added to muzzled Alerts together.
+
+    Duplicate Alerts found by the |MuzzleCache| in the block are
+    counted, and their incidents are saved when the block exits.
+    Blocks can be nested, in which case incidents are saved when the
+    outermost block exits. Counts are local to the current thread.
+
+    If the block raises an exception, the incidents are dropped rather
+    than saved, so they aren't counted twice when the documents are
+    inspected again.
+
+    Example
+    -------
+    .. code-block:: python
+
+       with batched_incidents():
+           for doc_obj in doc_objs:
+               Watchdog.objects.process(doc_obj)
+
+    """
+    # pylint: disable=W0212
+    local = MUZZLE_CACHE._local
+    if getattr(local, 'pending', None) is not None:
+        yield
+        return
+
+    local.pending = []
+    try:
+        yield
+    except BaseException:
+        local.pending = None
+        raise
+
+    pending = local.pending
+    local.pending = None
+    if pending:
+        MUZZLE_CACHE.save_incidents(pending)
+
 
 class Watchdog(Alarm):
     """
@@ -158,6 +434,34 @@ class Watchdog(Alarm):
         old_alert.add_incident()
         return old_alert
 
+    def _save_or_increment(self, alert):
+        """
+        Takes a new Alert and saves it, or increments a previous Alert
+        it duplicates. Returns the saved or incremented Alert.
+        """
+        try:
+            alert = self._save_alert(alert)
+        except IntegrityError:
+            alert = self._increment_incidents(alert)
+
+        if self._is_muzzled():
+            MUZZLE_CACHE.add(alert)
+
+        return alert
+
+    def _find_duplicate(self, alert):
+        """
+        Takes a new Alert and returns a cached Alert it duplicates, after
+        adding an incident to it. Returns None if the Watchdog isn't
+        muzzled or the Alert isn't a duplicate of a cached Alert.
+        """
+        if self._is_muzzled():
+            old_alert = MUZZLE_CACHE.get(alert._get_muzzle_hash())
+            fallback = functools.partial(self._save_or_increment, alert)
+            if (old_alert is not None and
+                    MUZZLE_CACHE.add_incident(old_alert, fallback)):
+                return old_alert
+
     def inspect(self, data):
         """Return an Alert level for a document.
 
@@ -201,12 +505,11 @@ class Watchdog(Alarm):
             if alert_level is not None:
                 alert = self._create_alert(alert_level, doc_obj)
 
-                # save the alert or increment incidents on a previous
-                # alert it duplicates
-                try:
-                    return self._save_alert(alert)
-                except IntegrityError:
-                    return self._increment_incidents(alert)
+                old_alert = self._find_duplicate(alert)
+                if old_alert is not None:
+                    return old_alert
+
+                return self._save_or_increment(alert)
 
 
 class TriggerManager(models.Manager):
@@ -384,3 +687,36 @@ class Muzzle(models.Model):
                 cleaned_fields.append(cleaned_field)
 
         return cleaned_fields
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def clear_watchdog_index(sender, instance, **kwargs):
+    """
+    Clears the :const:`~WATCHDOG_INDEX` when a model used by indexed
+    Watchdogs is saved or deleted.
+    """
+    if isinstance(instance, (Watchdog, Trigger, Muzzle, DataSieve,
+                             Distillery, Category)):
+        WATCHDOG_INDEX.clear()
+
+
+@receiver(m2m_changed)
+def clear_watchdog_index_on_categories(sender, instance, **kwargs):
+    """
+    Clears the :const:`~WATCHDOG_INDEX` when the Categories of a
+    Watchdog or a Distillery change.
+    """
+    if isinstance(instance, (Watchdog, Distillery, Category)):
+        WATCHDOG_INDEX.clear()
+
+
+@receiver(post_save, sender=Alert)
+@receiver(post_delete, sender=Alert)
+def discard_muzzled_alert(sender, instance, created=False, **kwargs):
+    """
+    Removes an Alert from the |MuzzleCache| when it's changed or
+    deleted, since its muzzle_hash may no longer be valid.
+    """
+    if not created:
+        MUZZLE_CACHE.discard({instance.pk})
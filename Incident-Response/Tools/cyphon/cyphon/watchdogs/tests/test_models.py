@@ -36,7 +36,15 @@ from cyphon.documents import DocumentObj
 from distilleries.models import Distillery
 from tests.fixture_manager import get_fixtures
 from tests.mock import patch_find_by_id
-from watchdogs.models import Watchdog, Trigger, Muzzle
+from watchdogs.models import (
+    MUZZLE_CACHE,
+    WATCHDOG_INDEX,
+    MuzzleCache,
+    Muzzle,
+    Trigger,
+    Watchdog,
+    batched_incidents,
+)
 
 
 DOC_ID = '666f6f2d6261722d71757578'
@@ -81,6 +89,8 @@ class WatchdogBaseTestCase(TestCase):
         super(WatchdogBaseTestCase, cls).tearDownClass()
 
     def setUp(self):
+        WATCHDOG_INDEX.clear()
+        MUZZLE_CACHE.clear()
         self.distillery = Distillery.objects.get_by_natural_key('mongodb.test_database.test_docs')
         self.email_wdog = Watchdog.objects.get_by_natural_key('inspect_emails')
         self.log_wdog = Watchdog.objects.get_by_natural_key('inspect_logs')
@@ -122,6 +132,85 @@ class WatchdogManagerTestCase(WatchdogBaseTestCase):
         relevant_watchdogs = Watchdog.objects.find_relevant(distillery)
         self.assertEqual(relevant_watchdogs.count(), 2)
 
+    def test_get_relevant(self):
+        """
+        Tests that the get_relevant method returns the same Watchdogs as
+        the find_relevant method, without querying the database once
+        they have been indexed.
+        """
+        distillery = Distillery.objects.get_by_natural_key(
+            'elasticsearch.test_index.test_docs')
+        expected = list(Watchdog.objects.find_relevant(distillery))
+        actual = Watchdog.objects.get_relevant(distillery)
+        self.assertEqual(list(actual), expected)
+        for watchdog in actual:
+            watchdog.inspect(self.data)
+        with self.assertNumQueries(0):
+            watchdogs = Watchdog.objects.get_relevant(distillery)
+            for watchdog in watchdogs:
+                watchdog.inspect(self.data)
+                watchdog._is_muzzled()
+
+    def test_get_relevant_trigger_saved(self):
+        """
+        Tests that changes to a Trigger are used after it's saved.
+        """
+        distillery = Distillery.objects.get_by_natural_key(
+            'elasticsearch.test_index.test_docs')
+        watchdogs = Watchdog.objects.get_relevant(distillery)
+        email_wdog = [wdog for wdog in watchdogs if wdog == self.email_wdog][0]
+        self.assertEqual(email_wdog.inspect(self.data), 'HIGH')
+        trigger = Trigger.objects.get(pk=1)
+        trigger.alert_level = 'MEDIUM'
+        trigger.save()
+        watchdogs = Watchdog.objects.get_relevant(distillery)
+        email_wdog = [wdog for wdog in watchdogs if wdog == self.email_wdog][0]
+        self.assertEqual(email_wdog.inspect(self.data), 'MEDIUM')
+
+    def test_get_relevant_disabled(self):
+        """
+        Tests that a Watchdog is removed from the index when it's
+        disabled.
+        """
+        distillery = Distillery.objects.get_by_natural_key(
+            'elasticsearch.test_index.test_docs')
+        self.assertIn(self.email_wdog,
+                      Watchdog.objects.get_relevant(distillery))
+        self.email_wdog.enabled = False
+        self.email_wdog.save()
+        self.assertNotIn(self.email_wdog,
+                         Watchdog.objects.get_relevant(distillery))
+
+    @patch('watchdogs.models.Watchdog.process')
+    def test_process_many(self, mock_process):
+        """
+        Tests the process_many method.
+        """
+        doc_objs = [
+            DocumentObj(data=DATA, doc_id=str(num),
+                        collection='mongodb.test_database.test_docs')
+            for num in range(3)
+        ]
+        num_watchdogs = Watchdog.objects.find_relevant(self.distillery).count()
+        with patch.object(Watchdog.objects, 'find_relevant',
+                          wraps=Watchdog.objects.find_relevant) \
+                as mock_find_relevant:
+            results = Watchdog.objects.process_many(doc_objs)
+        self.assertEqual(results, [True, True, True])
+        mock_find_relevant.assert_called_once_with(self.distillery)
+        self.assertEqual(doc_objs[2].distillery, self.distillery)
+        self.assertEqual(mock_process.call_count, 3 * num_watchdogs)
+
+    @patch('watchdogs.models.Watchdog.process', return_value=Alert())
+    def test_process_many_not_saved(self, mock_process):
+        """
+        Tests that the process_many method reports documents whose
+        Alerts weren't saved.
+        """
+        doc_obj = DocumentObj(data=DATA, doc_id='1',
+                              collection='mongodb.test_database.test_docs')
+        self.assertEqual(Watchdog.objects.process_many([doc_obj]), [False])
+
 
 class WatchdogTestCase(WatchdogBaseTestCase):
     """
@@ -206,6 +295,108 @@ class WatchdogTestCase(WatchdogBaseTestCase):
         self.assertEqual(old_alert.incidents, old_incidents + 1)
         self.assertEqual(results, old_alert)
 
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_cached(self):
+        """
+        Tests that a duplicate of a cached Alert increments the cached
+        Alert without trying to save a new Alert.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+        self.assertEqual(MUZZLE_CACHE.get(alert.muzzle_hash), alert)
+
+        with patch('watchdogs.models.Watchdog._save_alert') as mock_save:
+            result = self.email_wdog.process(self.doc_obj)
+
+        self.assertFalse(mock_save.called)
+        self.assertEqual(result, alert)
+        self.assertEqual(Alert.objects.get(pk=alert.pk).incidents, 2)
+
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_batched(self):
+        """
+        Tests that incidents for duplicate Alerts are saved when a
+        batched_incidents block exits.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+
+        with batched_incidents():
+            for dummy_num in range(3):
+                result = self.email_wdog.process(self.doc_obj)
+                self.assertEqual(result, alert)
+            self.assertEqual(Alert.objects.get(pk=alert.pk).incidents, 1)
+
+        self.assertEqual(Alert.objects.get(pk=alert.pk).incidents, 4)
+
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_batched_deleted(self):
+        """
+        Tests that duplicates of a cached Alert that was deleted by
+        another process are saved as a new Alert when a
+        batched_incidents block exits.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+        alert_id = alert.pk
+        Alert.objects.filter(pk=alert_id).delete()
+        MUZZLE_CACHE.add(alert)
+
+        with batched_incidents():
+            for dummy_num in range(2):
+                self.email_wdog.process(self.doc_obj)
+
+        self.assertFalse(Alert.objects.filter(pk=alert_id).exists())
+        new_alert = Alert.objects.get(muzzle_hash=alert.muzzle_hash)
+        self.assertEqual(new_alert.incidents, 2)
+        self.assertEqual(MUZZLE_CACHE.get(alert.muzzle_hash), new_alert)
+
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_batched_error(self):
+        """
+        Tests that incidents aren't saved when a batched_incidents
+        block raises an exception.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+
+        with self.assertRaises(ValueError):
+            with batched_incidents():
+                self.email_wdog.process(self.doc_obj)
+                raise ValueError('foo')
+
+        self.assertEqual(Alert.objects.get(pk=alert.pk).incidents, 1)
+
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_batched_failed_doc(self):
+        """
+        Tests that incidents counted for a document that fails aren't
+        saved when a batched_incidents block exits.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+        failing_alarm = Mock()
+        failing_alarm.process.side_effect = ValueError('foo')
+
+        with batched_incidents():
+            self.assertTrue(Watchdog.objects._inspect(self.doc_obj,
+                                                      [self.email_wdog]))
+            with self.assertRaises(ValueError):
+                Watchdog.objects._inspect(self.doc_obj,
+                                          [self.email_wdog, failing_alarm])
+
+        self.assertEqual(Alert.objects.get(pk=alert.pk).incidents, 2)
+
+    @patch_find_by_id(DATA)
+    def test_process_muzzled_deleted(self):
+        """
+        Tests that a new Alert is created when the Alert it duplicates
+        has been deleted.
+        """
+        alert = self.email_wdog.process(self.doc_obj)
+        alert_id = alert.pk
+        alert.delete()
+        self.assertIsNone(MUZZLE_CACHE.get(alert.muzzle_hash))
+
+        new_alert = self.email_wdog.process(self.doc_obj)
+        self.assertNotEqual(new_alert.pk, alert_id)
+        self.assertEqual(new_alert.incidents, 1)
+
     @patch_find_by_id(DATA)
     def test_process_muzzled_disabled(self):
         """
@@ -400,6 +591,40 @@ class MuzzleTestCase(TestCase):
         self.assertEqual(actual, expected)
 
 
+class MuzzleCacheTestCase(TestCase):
+    """
+    Tests the MuzzleCache class.
+    """
+
+    def test_lru(self):
+        """
+        Tests that the least recently used Alert is dropped when the
+        cache is full.
+        """
+        cache = MuzzleCache(size=2)
+        alerts = [Alert(pk=num, muzzle_hash=str(num)) for num in range(3)]
+        cache.add(alerts[0])
+        cache.add(alerts[1])
+        cache.get('0')
+        cache.add(alerts[2])
+        self.assertEqual(cache.get('0'), alerts[0])
+        self.assertIsNone(cache.get('1'))
+        self.assertEqual(cache.get('2'), alerts[2])
+
+    def test_discard(self):
+        """
+        Tests the discard method.
+        """
+        cache = MuzzleCache()
+        alerts = [Alert(pk=num, muzzle_hash=str(num)) for num in range(3)]
+        for alert in alerts:
+            cache.add(alert)
+        cache.discard({0, 2})
+        self.assertIsNone(cache.get('0'))
+        self.assertEqual(cache.get('1'), alerts[1])
+        self.assertIsNone(cache.get('2'))
+
+
 class WatchdogTransactionTestCase(TransactionTestCase):
     """
     Tests the Watchdog class.
@@ -415,6 +640,7 @@ class WatchdogTransactionTestCase(TransactionTestCase):
     )
 
     def setUp(self):
+        MUZZLE_CACHE.clear()
         self.distillery = Distillery.objects.get_by_natural_key('mongodb.test_database.test_docs')
         self.email_wdog = Watchdog.objects.get_by_natural_key('inspect_emails')
 
@@ -449,10 +449,12 @@ rst_epilog = """
 .. |Article| replace:: :class:`~articles.models.Article`
 .. |Articles| replace:: :class:`Articles<articles.models.Article>`
 .. |BACKEND_CHOICES| replace:: :attr:`~engines.registry.BACKEND_CHOICES`
+.. |BatchConsumer| replace:: :class:`~receiver.receiver.BatchConsumer`
 .. |Bottle| replace:: :class:`~bottler.bottles.models.Bottle`
 .. |Bottles| replace:: :class:`Bottles<bottler.bottles.models.Bottle>`
 .. |BottleField| replace:: :class:`~bottler.bottles.models.BottleField`
 .. |BottleFields| replace:: :class:`BottleFields<bottler.bottles.models.BottleField>`
+.. |BulkWriter| replace:: :class:`~engines.writer.BulkWriter`
 .. |Cargo| replace:: :class:`~ambassador.transport.Cargo`
 .. |Cargos| replace:: :class:`Cargos<ambassador.transport.Cargo>`
 .. |Carrier| replace:: :class:`~responder.carrier.Carrier`
@@ -581,6 +583,7 @@ rst_epilog = """
 .. |MailSieves| replace:: :class:`MailSieves<sifter.mailsifter.mailsieves.models.MailSieve>`
 .. |MailSieveNode| replace:: :class:`~sifter.mailsifter.mailsieves.models.MailSieveNode`
 .. |MailSieveNodes| replace:: :class:`MailSieveNodes<sifter.mailsifter.mailsieves.models.MailSieveNode>`
+.. |ModelCache| replace:: :class:`~utils.cacheutils.cacheutils.ModelCache`
 .. |MongoDbEngine| replace:: :class:`~engines.mongodb.engine.MongoDbEngine`
 .. |Monitor| replace:: :class:`~monitors.models.Monitor`
 .. |Monitors| replace:: :class:`Monitors<monitors.models.Monitor>`
@@ -588,6 +591,7 @@ rst_epilog = """
 .. |Mungers| replace:: :class:`Mungers<sifter.mungers.models.Munger>`
 .. |Muzzle| replace:: :class:`~watchdogs.models.Muzzle`
 .. |Muzzles| replace:: :class:`Muzzles<watchdogs.models.Muzzle>`
+.. |MuzzleCache| replace:: :class:`~watchdogs.models.MuzzleCache`
 .. |OPERATOR_CHOICES| replace:: :const:`~cyphon.choices.OPERATOR_CHOICES`
 .. |Passport| replace:: :class:`~ambassador.passports.models.Passport`
 .. |Passports| replace:: :class:`Passports<ambassador.passports.models.Passport>`
@@ -637,6 +641,7 @@ rst_epilog = """
 .. |Stamps| replace:: :class:`Stamps<ambassador.stamps.models.Stamp>`
 .. |Stream| replace:: :class:`~aggregator.streams.models.Stream`
 .. |Streams| replace:: :class:`Streams<aggregator.streams.models.Stream>`
+.. |StubBroker| replace:: :class:`~receiver.loadtest.StubBroker`
 .. |TARGET_TYPE_CHOICES| replace:: :const:`~cyphon.choices.TARGET_TYPE_CHOICES`
 .. |Tag| replace:: :class:`~tags.models.Tag`
 .. |Tags| replace:: :class:`Tags<tags.models.Tag>`
@@ -4,6 +4,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import contextlib
+import functools
 import itertools
 from typing import Any
 from typing import Iterator
@@ -35,6 +37,27 @@ class GrrApiContext(object):
   # be refactored with protocols (or better yet: completely removed and replaced
   # with properly typed methods).
 
+  def _SendPageRequest(
+      self,
+      handler_name: str,
+      args: Any,
+      offset: int,
+  ) -> message.Message:
+    """Sends a request for a single page starting at a given offset."""
+    args_copy = utils.CopyProto(args)
+    args_copy.offset = offset
+    args_copy.count = self.connector.page_size
+    result = self.connector.SendRequest(handler_name, args_copy)
+
+    if result is None:
+      detail = f"No response returned for '{handler_name}'"
+      raise TypeError(detail)
+    if not hasattr(result, "items"):
+      detail = f"Incorrect result type for '{handler_name}': {type(result)}"
+      raise TypeError(detail)
+
+    return result
+
   def _GeneratePages(
       self,
       handler_name: str,
@@ -44,18 +67,7 @@ class GrrApiContext(object):
     offset = args.offset
 
     while True:
-      args_copy = utils.CopyProto(args)
-      args_copy.offset = offset
-      args_copy.count = self.connector.page_size
-      result = self.connector.SendRequest(handler_name, args_copy)
-
-      if result is None:
-        detail = f"No response returned for '{handler_name}'"
-        raise TypeError(detail)
-      if not hasattr(result, "items"):
-        detail = f"Incorrect result type for '{handler_name}': {type(result)}"
-        raise TypeError(detail)
-
+      result = self._SendPageRequest(handler_name, args, offset)
       yield result
 
       if not result.items:
@@ -63,12 +75,77 @@ class GrrApiContext(object):
 
       offset += self.connector.page_size
 
+  def _GeneratePagesConcurrently(
+      self,
+      handler_name: str,
+      args: Any,
+      max_workers: int,
+  ) -> Iterator[message.Message]:
+    """Generates iterator pages, fetching several pages at a time.
+
+    The first page is fetched on its own: it tells how many items there are
+    and makes sure the connector is initialized before it is used from
+    multiple threads. The remaining pages known from the total count are then
+    requested by offset in parallel, while at most `2 * max_workers` of them
+    are kept in flight. Pages are yielded in the offset order. Anything added
+    after the first page was fetched is collected by the sequential paging.
+
+    Args:
+      handler_name: A handler to which the requests should be delivered to.
+      args: Arguments of the requests. `offset` and `count` are respected.
+      max_workers: Maximum number of concurrent requests.
+
+    Yields:
+      Pages that the server responded with, in order.
+    """
+    page_size = self.connector.page_size
+
+    first_page = self._SendPageRequest(handler_name, args, args.offset)
+    yield first_page
+
+    if not first_page.items:
+      return
+
+    end = args.offset + (getattr(first_page, "total_count", 0) or 0)
+    if args.count:
+      end = min(end, args.offset + args.count)
+
+    offsets = range(args.offset + page_size, end, page_size)
+    next_offset = args.offset + page_size
+
+    fetch = functools.partial(self._SendPageRequest, handler_name, args)
+    with contextlib.closing(utils.MapConcurrently(fetch, offsets,
+                                                  max_workers)) as pages:
+      for page in pages:
+        yield page
+
+        if not page.items:
+          return
+
+        next_offset += page_size
+
+    tail_args = utils.CopyProto(args)
+    tail_args.offset = next_offset
+    for page in self._GeneratePages(handler_name, tail_args):
+      yield page
+
   def SendIteratorRequest(
       self,
       handler_name: str,
       args: Any,
+      max_workers: int = 1,
   ) -> utils.ItemsIterator:
-    """Sends an iterator request."""
+    """Sends an iterator request.
+
+    Args:
+      handler_name: A handler to which the request should be delivered to.
+      args: Arguments of the request to pass to the handler.
+      max_workers: Maximum number of pages requested concurrently. With the
+        default of 1 pages are requested one after another.
+
+    Returns:
+      An iterator over items of all the pages, in order.
+    """
     if not args or not hasattr(args, "count"):
       result = self.connector.SendRequest(handler_name, args)
 
@@ -79,7 +156,11 @@ class GrrApiContext(object):
       total_count = getattr(result, "total_count", None)
       return utils.ItemsIterator(items=result.items, total_count=total_count)
     else:
-      pages = self._GeneratePages(handler_name, args)
+      if max_workers > 1:
+        pages = self._GeneratePagesConcurrently(handler_name, args,
+                                                max_workers)
+      else:
+        pages = self._GeneratePages(handler_name, args)
       first_page = next(pages)
       total_count = getattr(first_page, "total_count", None)
 
@@ -0,0 +1,426 @@
+#!/usr/bin/env python
+"""Bulk export of hunt results and collected files.
+
+Fetching results of big hunts page by page and downloading collected files one
+after another is dominated by round trips to the server. The functions below
+keep several requests in flight instead, while bounding the number of
+concurrent connections, and write results straight to local files.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import base64
+import functools
+import io
+import itertools
+import json
+import os
+import shutil
+import stat
+import tempfile
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+from google.protobuf import descriptor
+from google.protobuf import json_format
+from google.protobuf import message
+from grr_api_client import errors
+from grr_api_client import hunt as hunt_lib
+from grr_api_client import utils
+from grr_api_client import vfs
+from grr_response_proto import flows_pb2
+from grr_response_proto import jobs_pb2
+
+# Default number of concurrent requests for results pages and file downloads.
+DEFAULT_MAX_CONNECTIONS: int = 4
+
+# Default number of results in a single row group of written Parquet files.
+DEFAULT_PARQUET_ROW_GROUP_SIZE: int = 10000
+
+# Path prefixes of VFS paths per path type, see `ToCategorizedPath` in the GRR
+# server.
+_PATH_TYPE_PREFIXES = {
+    jobs_pb2.PathSpec.OS: "fs/os",
+    jobs_pb2.PathSpec.TSK: "fs/tsk",
+    jobs_pb2.PathSpec.NTFS: "fs/ntfs",
+    jobs_pb2.PathSpec.REGISTRY: "registry",
+    jobs_pb2.PathSpec.TMPFILE: "temp",
+}
+
+
+class ParquetNotAvailableError(errors.Error):
+  """Raised when results are written to Parquet without pyarrow installed."""
+
+
+def PathSpecToVfsPath(pathspec: jobs_pb2.PathSpec) -> str:
+  """Converts a client pathspec to a path in the client's VFS.
+
+  Args:
+    pathspec: A (possibly nested) pathspec, e.g. of a collected file.
+
+  Returns:
+    A VFS path that can be passed to `ClientRef.File`.
+
+  Raises:
+    ValueError: If the pathspec has a path type without a VFS representation.
+  """
+  components = []
+  last = pathspec
+  while True:
+    path = last.path
+    if last.offset:
+      path += ":%s" % last.offset
+    if last.stream_name:
+      path += ":%s" % last.stream_name
+    components.extend(component for component in path.split("/") if component)
+
+    if not last.HasField("nested_path"):
+      break
+    last = last.nested_path
+
+  try:
+    prefix = _PATH_TYPE_PREFIXES[last.pathtype]
+  except KeyError:
+    raise ValueError("Unknown path type: `%s`" % last.pathtype)
+
+  return "/".join([prefix] + components)
+
+
+def _ResultStatEntry(
+    result: hunt_lib.HuntResult) -> Optional[jobs_pb2.StatEntry]:
+  """Returns a stat entry of a file collected by a hunt (if any)."""
+  payload = result.payload
+  if isinstance(payload, jobs_pb2.StatEntry):
+    return payload
+  if isinstance(payload, flows_pb2.FileFinderResult):
+    return payload.stat_entry
+  if isinstance(payload, flows_pb2.CollectSingleFileResult):
+    return payload.stat
+
+  return None
+
+
+def HuntResultFile(result: hunt_lib.HuntResult) -> Optional[vfs.FileRef]:
+  """Returns a reference to a regular file referenced by a hunt result.
+
+  Args:
+    result: A hunt result.
+
+  Returns:
+    A reference to the file in the VFS of the client that sent the result or
+    `None` if the result does not reference a regular file.
+  """
+  stat_entry = _ResultStatEntry(result)
+  if stat_entry is None or not stat_entry.HasField("pathspec"):
+    return None
+  if stat.S_ISDIR(stat_entry.st_mode):
+    return None
+
+  try:
+    path = PathSpecToVfsPath(stat_entry.pathspec)
+  except ValueError:
+    return None
+
+  return result.client.File(path)
+
+
+def _LocalFilePath(output_dir: str, file_ref: vfs.FileRef) -> str:
+  """Returns a local path to which a file from the VFS is downloaded."""
+  # Relative components are dropped, so that files can not be written outside
+  # of the output directory.
+  components = [
+      component for component in file_ref.path.split("/")
+      if component not in ("", ".", "..")
+  ]
+  return os.path.join(output_dir, file_ref.client_id, *components)
+
+
+def _DownloadFile(output_dir: str, file_ref: vfs.FileRef) -> str:
+  """Downloads a single file, returns a path of the local copy."""
+  file_path = _LocalFilePath(output_dir, file_ref)
+  os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+  # The file is written to its final location only after it was downloaded
+  # completely, so that interrupted downloads do not leave truncated copies.
+  temp_file_path = file_path + ".part"
+  file_ref.GetBlob().WriteToFile(temp_file_path)
+  os.replace(temp_file_path, file_path)
+
+  return file_path
+
+
+def DownloadFiles(
+    file_refs: Iterable[vfs.FileRef],
+    output_dir: str,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+) -> List[str]:
+  """Downloads files from clients' VFS concurrently.
+
+  Files are stored as `<output_dir>/<client id>/<VFS path>`. The same file
+  referenced multiple times is downloaded only once.
+
+  Args:
+    file_refs: References to the files to download.
+    output_dir: A directory to download the files to.
+    max_connections: Maximum number of concurrent downloads.
+
+  Returns:
+    Local paths of the downloaded files, in the order of `file_refs`.
+  """
+  def UniqueRefs() -> Iterator[vfs.FileRef]:
+    seen = set()
+    for file_ref in file_refs:
+      key = (file_ref.client_id, file_ref.path)
+      if key not in seen:
+        seen.add(key)
+        yield file_ref
+
+  download = functools.partial(_DownloadFile, output_dir)
+  return list(utils.MapConcurrently(download, UniqueRefs(), max_connections))
+
+
+def DownloadHuntFiles(
+    hunt: hunt_lib.HuntBase,
+    output_dir: str,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+) -> List[str]:
+  """Downloads files collected by a hunt, one connection per file.
+
+  Unlike `HuntBase.GetFilesArchive`, which streams a single archive generated
+  by the server, this downloads the files directly and concurrently.
+
+  Args:
+    hunt: A hunt that collected the files.
+    output_dir: A directory to download the files to.
+    max_connections: Maximum number of concurrent requests.
+
+  Returns:
+    Local paths of the downloaded files.
+  """
+  # Results are listed before the downloads start, so that there are never
+  # more than `max_connections` requests in flight.
+  results = hunt.ListResults(max_workers=max_connections)
+  file_refs = list(filter(None, map(HuntResultFile, results)))
+  return DownloadFiles(file_refs, output_dir, max_connections=max_connections)
+
+
+def _PayloadToDict(result: hunt_lib.HuntResult) -> Dict[str, Any]:
+  """Converts a hunt result to a JSON-compatible dictionary."""
+  payload = result.payload
+  if isinstance(payload, utils.UnknownProtobuf):
+    payload_dict = {
+        "@type": payload.original_value.type_url,
+        "value": base64.b64encode(payload.original_value.value).decode("ascii"),
+    }
+  else:
+    payload_dict = json_format.MessageToDict(payload)
+
+  return {
+      "client_id": result.client.client_id,
+      "timestamp": result.timestamp,
+      "payload_type": result.data.payload_type,
+      "payload": payload_dict,
+  }
+
+
+def WriteResultsToJsonl(
+    results: Iterable[hunt_lib.HuntResult],
+    file_path: str,
+) -> int:
+  """Writes hunt results to a file with one JSON object per line.
+
+  Args:
+    results: Hunt results to write, e.g. `hunt.ListResults(max_workers=4)`.
+    file_path: A path of the file to write.
+
+  Returns:
+    Number of written results.
+  """
+  count = 0
+  with io.open(file_path, "w", encoding="utf-8") as fd:
+    for result in results:
+      fd.write(json.dumps(_PayloadToDict(result), sort_keys=True))
+      fd.write("\n")
+      count += 1
+
+  return count
+
+
+def _ScalarValue(field: descriptor.FieldDescriptor, value: Any) -> Any:
+  if field.enum_type:
+    enum_value = field.enum_type.values_by_number.get(value)
+    return enum_value.name if enum_value else value
+
+  return value
+
+
+def _FlattenMessage(msg: message.Message) -> Dict[str, Any]:
+  """Converts a message to a flat dictionary suitable for columnar output.
+
+  Similar to `utils.MessageToFlatDict`, but also supports repeated fields:
+  repeated scalars become lists and repeated messages become lists of their
+  JSON representations.
+
+  Args:
+    msg: A message to convert.
+
+  Returns:
+    A flat dictionary corresponding to the given message.
+  """
+  result = {}
+
+  def Recurse(msg: message.Message, prefix: str) -> None:
+    for field, value in msg.ListFields():
+      name = prefix + field.name
+      if field.label == descriptor.FieldDescriptor.LABEL_REPEATED:
+        if field.type == descriptor.FieldDescriptor.TYPE_MESSAGE:
+          result[name] = [json_format.MessageToJson(item) for item in value]
+        else:
+          result[name] = [_ScalarValue(field, item) for item in value]
+      elif field.type == descriptor.FieldDescriptor.TYPE_MESSAGE:
+        Recurse(value, name + ".")
+      else:
+        result[name] = _ScalarValue(field, value)
+
+  Recurse(msg, "")
+  return result
+
+
+def _ResultRow(result: hunt_lib.HuntResult) -> Dict[str, Any]:
+  """Converts a hunt result to a flat dictionary of column values."""
+  row = {
+      "client_id": result.client.client_id,
+      "timestamp": result.timestamp,
+      "payload_type": result.data.payload_type,
+  }
+
+  payload = result.payload
+  if not isinstance(payload, utils.UnknownProtobuf):
+    for name, value in _FlattenMessage(payload).items():
+      row["payload." + name] = value
+
+  return row
+
+
+def _RowsToTable(pyarrow: Any, rows: List[Dict[str, Any]]) -> Any:
+  """Converts rows to a `pyarrow.Table` with columns in order of appearance."""
+  columns = {}  # type: Dict[str, List[Any]]
+  for count, row in enumerate(rows):
+    for name in row:
+      if name not in columns:
+        columns[name] = [None] * count
+    for name, values in columns.items():
+      values.append(row.get(name))
+
+  return pyarrow.table(columns)
+
+
+def _ConformTable(pyarrow: Any, table: Any, schema: Any) -> Any:
+  """Casts a table to a (wider) schema, filling missing columns with nulls."""
+  columns = []
+  for field in schema:
+    if field.name in table.column_names:
+      columns.append(table.column(field.name).cast(field.type))
+    else:
+      columns.append(pyarrow.nulls(table.num_rows, type=field.type))
+
+  return pyarrow.Table.from_arrays(columns, schema=schema)
+
+
+def WriteResultsToParquet(
+    results: Iterable[hunt_lib.HuntResult],
+    file_path: str,
+    row_group_size: int = DEFAULT_PARQUET_ROW_GROUP_SIZE,
+) -> int:
+  """Writes hunt results to a Parquet file.
+
+  Payload fields become columns named after their paths (e.g.
+  `stat_entry.pathspec.path`). Results of different payload types can be
+  written to the same file: columns missing for a result are left empty.
+
+  Results are written in row groups of `row_group_size`, so only a single row
+  group is held in memory. A Parquet file has a single schema though: when a
+  row group brings new columns, the following row groups go to a new temporary
+  file, and the temporary files are merged (again row group by row group) once
+  all results are written.
+
+  This requires the optional `pyarrow` package.
+
+  Args:
+    results: Hunt results to write, e.g. `hunt.ListResults(max_workers=4)`.
+    file_path: A path of the file to write.
+    row_group_size: Maximum number of results in a single row group.
+
+  Returns:
+    Number of written results.
+
+  Raises:
+    ParquetNotAvailableError: If `pyarrow` is not installed.
+  """
+  try:
+    # pytype: disable=import-error
+    # pylint: disable=g-import-not-at-top
+    import pyarrow
+    from pyarrow import parquet
+    # pylint: enable=g-import-not-at-top
+    # pytype: enable=import-error
+  except ImportError:
+    raise ParquetNotAvailableError(
+        "Writing Parquet files requires the pyarrow package.")
+
+  results = iter(results)
+  count = 0
+
+  temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(file_path)))
+  try:
+    part_paths = []
+    writer = None
+    try:
+      while True:
+        rows = list(map(_ResultRow, itertools.islice(results, row_group_size)))
+        if not rows:
+          break
+
+        table = _RowsToTable(pyarrow, rows)
+        count += table.num_rows
+
+        if writer is None:
+          schema = table.schema
+        else:
+          schema = pyarrow.unify_schemas([writer.schema, table.schema])
+          if not schema.equals(writer.schema):
+            writer.close()
+            writer = None
+
+        if writer is None:
+          part_path = os.path.join(temp_dir, f"part-{len(part_paths)}.parquet")
+          part_paths.append(part_path)
+          writer = parquet.ParquetWriter(part_path, schema)
+
+        writer.write_table(_ConformTable(pyarrow, table, schema))
+    finally:
+      if writer is not None:
+        writer.close()
+
+    if not part_paths:
+      parquet.write_table(pyarrow.table({}), file_path)
+    elif len(part_paths) == 1:
+      os.replace(part_paths[0], file_path)
+    else:
+      schema = pyarrow.unify_schemas(
+          [parquet.read_schema(part_path) for part_path in part_paths])
+      with parquet.ParquetWriter(file_path, schema) as writer:
+        for part_path in part_paths:
+          part = parquet.ParquetFile(part_path)
+          for index in range(part.num_row_groups):
+            table = part.read_row_group(index)
+            writer.write_table(_ConformTable(pyarrow, table, schema))
+  finally:
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+  return count
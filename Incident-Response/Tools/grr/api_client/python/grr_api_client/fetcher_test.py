@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+import io
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+from absl.testing import absltest
+
+from grr_api_client import client as client_lib
+from grr_api_client import connectors
+from grr_api_client import context as context_lib
+from grr_api_client import fetcher
+from grr_api_client import hunt as hunt_lib
+from grr_api_client import utils
+from grr_response_proto import flows_pb2
+from grr_response_proto import jobs_pb2
+from grr_response_proto.api import hunt_pb2
+
+try:
+  # pylint: disable=g-import-not-at-top
+  from pyarrow import parquet
+  # pylint: enable=g-import-not-at-top
+except ImportError:
+  parquet = None
+
+
+class FakeServerConnector(connectors.Connector):
+  """Serves hunt results and file contents from memory with random delays."""
+
+  def __init__(self, num_results, page_size):
+    super().__init__()
+
+    self._page_size = page_size
+    self._lock = threading.Lock()
+    self._random = random.Random(0)
+
+    self.results = []
+    self.files = {}
+    for i in range(num_results):
+      self.AddResult(i)
+
+    self.offsets = []
+    self.concurrent_requests = 0
+    self.max_concurrent_requests = 0
+
+  def AddResult(self, i):
+    client_id = "C.%016x" % (i % 7)
+    path = "/home/user%d/file%d" % (i % 7, i)
+
+    payload = flows_pb2.FileFinderResult()
+    payload.stat_entry.pathspec.pathtype = jobs_pb2.PathSpec.OS
+    payload.stat_entry.pathspec.path = path
+    payload.stat_entry.st_mode = 0o100644
+
+    result = hunt_pb2.ApiHuntResult(
+        client_id=client_id,
+        timestamp=i,
+        payload_type="FileFinderResult")
+    result.payload.Pack(payload)
+    self.results.append(result)
+
+    self.files[(client_id, "fs/os" + path)] = ("content%d" % i).encode("ascii")
+
+  @property
+  def page_size(self):
+    return self._page_size
+
+  def _Delay(self):
+    with self._lock:
+      self.concurrent_requests += 1
+      self.max_concurrent_requests = max(self.max_concurrent_requests,
+                                         self.concurrent_requests)
+      delay = self._random.uniform(0, 0.005)
+
+    # Random delays make later pages arrive before earlier ones.
+    time.sleep(delay)
+
+    with self._lock:
+      self.concurrent_requests -= 1
+
+  def SendRequest(self, handler_name, args):
+    if handler_name != "ListHuntResults":
+      raise ValueError("Unexpected handler: %s" % handler_name)
+
+    with self._lock:
+      self.offsets.append(args.offset)
+    self._Delay()
+
+    result = hunt_pb2.ApiListHuntResultsResult()
+    result.items.extend(self.results[args.offset:args.offset + args.count])
+    result.total_count = len(self.results)
+    return result
+
+  def SendStreamingRequest(self, handler_name, args):
+    if handler_name != "GetFileBlob":
+      raise ValueError("Unexpected handler: %s" % handler_name)
+
+    self._Delay()
+    content = self.files[(args.client_id, args.file_path)]
+    return utils.BinaryChunkIterator(chunks=iter([content[:4], content[4:]]))
+
+
+class ConcurrentPagingTest(absltest.TestCase):
+
+  def _Timestamps(self, connector, **kwargs):
+    context = context_lib.GrrApiContext(connector=connector)
+    hunt = hunt_lib.HuntRef(hunt_id="H:123456", context=context)
+    return [result.timestamp for result in hunt.ListResults(**kwargs)]
+
+  def testSequentialPaging(self):
+    connector = FakeServerConnector(num_results=95, page_size=10)
+    self.assertEqual(self._Timestamps(connector), list(range(95)))
+    self.assertEqual(connector.max_concurrent_requests, 1)
+
+  def testResultsAreCompleteAndOrdered(self):
+    connector = FakeServerConnector(num_results=995, page_size=10)
+
+    timestamps = self._Timestamps(connector, max_workers=4)
+    self.assertEqual(timestamps, list(range(995)))
+    self.assertGreater(connector.max_concurrent_requests, 1)
+    self.assertLessEqual(connector.max_concurrent_requests, 4)
+    # Every page is requested exactly once, plus the final empty page.
+    self.assertCountEqual(connector.offsets, list(range(0, 1001, 10)))
+
+  def testPagesAreFetchedOnDemand(self):
+    connector = FakeServerConnector(num_results=1000, page_size=10)
+    context = context_lib.GrrApiContext(connector=connector)
+    hunt = hunt_lib.HuntRef(hunt_id="H:123456", context=context)
+
+    results = hunt.ListResults(max_workers=2)
+    self.assertEqual([next(results).timestamp for _ in range(15)],
+                     list(range(15)))
+    # The first page and at most 2 * max_workers pages ahead are requested.
+    self.assertLessEqual(len(connector.offsets), 1 + 1 + 2 * 2)
+
+  def testEmptyResults(self):
+    connector = FakeServerConnector(num_results=0, page_size=10)
+    self.assertEmpty(self._Timestamps(connector, max_workers=4))
+    self.assertEqual(connector.offsets, [0])
+
+  def testResultsAddedWhileFetching(self):
+    connector = FakeServerConnector(num_results=50, page_size=10)
+    context = context_lib.GrrApiContext(connector=connector)
+    hunt = hunt_lib.HuntRef(hunt_id="H:123456", context=context)
+
+    results = hunt.ListResults(max_workers=4)
+    first = next(results)
+    # Results that arrive after the total count was reported are fetched too.
+    for i in range(50, 75):
+      connector.AddResult(i)
+
+    timestamps = [first.timestamp] + [result.timestamp for result in results]
+    self.assertEqual(timestamps, list(range(75)))
+
+  def testOffsetAndCount(self):
+    connector = FakeServerConnector(num_results=200, page_size=10)
+    context = context_lib.GrrApiContext(connector=connector)
+
+    args = hunt_pb2.ApiListHuntResultsArgs(
+        hunt_id="H:123456", offset=15, count=42)
+    items = context.SendIteratorRequest(
+        "ListHuntResults", args, max_workers=4)
+
+    self.assertEqual([item.timestamp for item in items], list(range(15, 57)))
+    self.assertLess(max(connector.offsets), 15 + 42 + 2 * 4 * 10)
+
+
+class FetcherTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.connector = FakeServerConnector(num_results=100, page_size=10)
+    self.context = context_lib.GrrApiContext(connector=self.connector)
+    self.hunt = hunt_lib.HuntRef(hunt_id="H:123456", context=self.context)
+    self.output_dir = self.create_tempdir().full_path
+
+  def testPathSpecToVfsPath(self):
+    pathspec = jobs_pb2.PathSpec(
+        pathtype=jobs_pb2.PathSpec.OS, path="/dev/sda1")
+    pathspec.nested_path.pathtype = jobs_pb2.PathSpec.NTFS
+    pathspec.nested_path.path = "/Windows/notepad.exe"
+    pathspec.nested_path.stream_name = "Zone.Identifier"
+
+    self.assertEqual(
+        fetcher.PathSpecToVfsPath(pathspec),
+        "fs/ntfs/dev/sda1/Windows/notepad.exe:Zone.Identifier")
+
+  def testHuntResultFileSkipsDirectories(self):
+    payload = jobs_pb2.StatEntry(st_mode=0o40755)
+    payload.pathspec.path = "/home"
+    data = hunt_pb2.ApiHuntResult(client_id="C.1000000000000000")
+    data.payload.Pack(payload)
+
+    result = hunt_lib.HuntResult(data=data, context=self.context)
+    self.assertIsNone(fetcher.HuntResultFile(result))
+
+  def testDownloadHuntFiles(self):
+    paths = fetcher.DownloadHuntFiles(
+        self.hunt, self.output_dir, max_connections=4)
+
+    self.assertLen(paths, 100)
+    self.assertLessEqual(self.connector.max_concurrent_requests, 4)
+    for i, path in enumerate(paths):
+      self.assertEqual(
+          path,
+          os.path.join(self.output_dir, "C.%016x" % (i % 7), "fs", "os",
+                       "home", "user%d" % (i % 7), "file%d" % i))
+      with io.open(path, "rb") as fd:
+        self.assertEqual(fd.read(), ("content%d" % i).encode("ascii"))
+
+  def testDownloadFilesSkipsDuplicates(self):
+    client = client_lib.ClientRef(
+        client_id="C.%016x" % 0, context=self.context)
+    file_ref = client.File("fs/os/home/user0/file0")
+
+    paths = fetcher.DownloadFiles([file_ref, file_ref], self.output_dir)
+    self.assertLen(paths, 1)
+
+  def testWriteResultsToJsonl(self):
+    file_path = os.path.join(self.output_dir, "results.jsonl")
+
+    count = fetcher.WriteResultsToJsonl(
+        self.hunt.ListResults(max_workers=4), file_path)
+    self.assertEqual(count, 100)
+
+    with io.open(file_path, "r", encoding="utf-8") as fd:
+      rows = list(map(json.loads, fd))
+
+    self.assertEqual([row["timestamp"] for row in rows], list(range(100)))
+    self.assertEqual(rows[3]["client_id"], "C.%016x" % 3)
+    self.assertEqual(rows[3]["payload_type"], "FileFinderResult")
+    self.assertEqual(rows[3]["payload"]["statEntry"]["pathspec"]["path"],
+                     "/home/user3/file3")
+
+  @absltest.skipIf(parquet is None, "pyarrow is not installed")
+  def testWriteResultsToParquet(self):
+    file_path = os.path.join(self.output_dir, "results.parquet")
+
+    # A result of another payload type brings new columns in the last row
+    # group.
+    payload = jobs_pb2.StatEntry(st_size=42)
+    data = hunt_pb2.ApiHuntResult(client_id="C.1000000000000000", timestamp=100)
+    data.payload.Pack(payload)
+    results = itertools.chain(
+        self.hunt.ListResults(max_workers=4),
+        [hunt_lib.HuntResult(data=data, context=self.context)])
+
+    count = fetcher.WriteResultsToParquet(results, file_path, row_group_size=7)
+    self.assertEqual(count, 101)
+
+    table = parquet.read_table(file_path).to_pydict()
+    self.assertEqual(table["timestamp"], list(range(101)))
+    self.assertEqual(table["client_id"][3], "C.%016x" % 3)
+    self.assertEqual(table["payload_type"][3], "FileFinderResult")
+    self.assertEqual(table["payload.stat_entry.pathspec.path"][3],
+                     "/home/user3/file3")
+    self.assertIsNone(table["payload.stat_entry.pathspec.path"][100])
+    self.assertEqual(table["payload.st_size"], [None] * 100 + [42])
+
+    # Temporary files are removed.
+    self.assertEqual(os.listdir(self.output_dir), ["results.parquet"])
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -295,9 +295,14 @@ class HuntBase(object):
 
     return Hunt(data=data, context=self._context)
 
-  def ListResults(self) -> utils.ItemsIterator[HuntResult]:
+  def ListResults(
+      self,
+      max_workers: int = 1,
+  ) -> utils.ItemsIterator[HuntResult]:
+    """Lists hunt results, requesting up to `max_workers` pages at a time."""
     args = hunt_pb2.ApiListHuntResultsArgs(hunt_id=self.hunt_id)
-    items = self._context.SendIteratorRequest("ListHuntResults", args)
+    items = self._context.SendIteratorRequest(
+        "ListHuntResults", args, max_workers=max_workers)
     return utils.MapItemsIterator(
         lambda data: HuntResult(data=data, context=self._context), items)
 
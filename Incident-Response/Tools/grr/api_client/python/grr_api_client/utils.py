@@ -5,12 +5,16 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import collections
+from concurrent import futures
+import itertools
 import time
 from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import IO
+from typing import Iterable
 from typing import Iterator
+from typing import Optional
 from typing import Tuple
 from typing import TypeVar
 from typing import Union
@@ -113,6 +117,60 @@ class BinaryChunkIterator(object):
       self.WriteToStream(fd)
 
 
+def MapConcurrently(
+    function: Callable[[_T1], _T2],
+    items: Iterable[_T1],
+    max_workers: int,
+    max_pending: Optional[int] = None,
+) -> Iterator[_T2]:
+  """Lazily maps items via given function using a pool of threads.
+
+  Results are yielded in the order of the input items. At most `max_pending`
+  items are processed ahead of the consumer, so that long (or infinite) inputs
+  do not pile up in memory. Items that are still pending when the iteration is
+  interrupted are not processed.
+
+  Args:
+    function: A function to apply to every item.
+    items: Items to map.
+    max_workers: Maximum number of concurrent calls of the function.
+    max_pending: Maximum number of items processed ahead of the consumer.
+      Defaults to `2 * max_workers`.
+
+  Yields:
+    Results of the function, in the order of the input items.
+
+  Raises:
+    ValueError: If `max_workers` or `max_pending` is not positive.
+  """
+  if max_workers < 1:
+    raise ValueError(f"Incorrect number of workers: {max_workers}")
+
+  if max_pending is None:
+    max_pending = 2 * max_workers
+  if max_pending < 1:
+    raise ValueError(f"Incorrect number of pending items: {max_pending}")
+
+  items = iter(items)
+
+  with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    pending = collections.deque()
+
+    def Submit(count: int) -> None:
+      for item in itertools.islice(items, count):
+        pending.append(executor.submit(function, item))
+
+    try:
+      Submit(max_pending)
+      while pending:
+        result = pending.popleft().result()
+        Submit(1)
+        yield result
+    finally:
+      for future in pending:
+        future.cancel()
+
+
 # Default poll interval in seconds.
 DEFAULT_POLL_INTERVAL: int = 15
 
@@ -1,4 +1,7 @@
 #!/usr/bin/env python
+import random
+import time
+
 from absl.testing import absltest
 
 from google.protobuf import empty_pb2
@@ -50,5 +53,46 @@ class MessageToFlatDictTest(absltest.TestCase):
     self.assertEqual(dct, {"value": 1337 * 2})
 
 
+class MapConcurrentlyTest(absltest.TestCase):
+
+  def testPreservesOrder(self):
+    delays = [random.uniform(0, 0.002) for _ in range(100)]
+
+    def Sleep(i):
+      time.sleep(delays[i])
+      return i * 2
+
+    results = utils.MapConcurrently(Sleep, range(100), max_workers=8)
+    self.assertEqual(list(results), [i * 2 for i in range(100)])
+
+  def testIsLazy(self):
+    processed = []
+    results = utils.MapConcurrently(
+        processed.append, range(1000), max_workers=2)
+
+    next(results)
+    results.close()
+    self.assertLessEqual(len(processed), 1 + 2 * 2)
+
+  def testIncorrectNumberOfWorkers(self):
+    with self.assertRaises(ValueError):
+      list(utils.MapConcurrently(lambda _: None, range(10), max_workers=0))
+
+  def testRespectsMaxPending(self):
+    processed = []
+    results = utils.MapConcurrently(
+        processed.append, range(1000), max_workers=4, max_pending=1)
+
+    next(results)
+    results.close()
+    self.assertLessEqual(len(processed), 1 + 1)
+
+  def testIncorrectNumberOfPendingItems(self):
+    with self.assertRaises(ValueError):
+      list(
+          utils.MapConcurrently(
+              lambda _: None, range(10), max_workers=1, max_pending=0))
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -2,12 +2,16 @@
 """Module containing functions for converting messages to dataframe."""
 import collections
 import datetime
+import glob
+import os
 import stat
-from typing import Text, Sequence, List, Any, Dict, Optional
+from typing import Text, Sequence, List, Any, Dict, Optional, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 
 from google.protobuf import descriptor
+from google.protobuf import json_format
 from google.protobuf import message
 from grr_response_proto import osquery_pb2
 from grr_response_proto import semantic_pb2
@@ -127,6 +131,294 @@ def _get_pretty_value(value: Any, desc: descriptor.FieldDescriptor,
   return data
 
 
+# Default number of messages converted into a single dataframe chunk.
+DEFAULT_CHUNK_SIZE = 100000
+
+_INT_TYPES = {
+    descriptor.FieldDescriptor.CPPTYPE_INT32: ('int64', 'Int64'),
+    descriptor.FieldDescriptor.CPPTYPE_INT64: ('int64', 'Int64'),
+    descriptor.FieldDescriptor.CPPTYPE_UINT32: ('uint64', 'UInt64'),
+    descriptor.FieldDescriptor.CPPTYPE_UINT64: ('uint64', 'UInt64'),
+}
+
+# Nullable counterparts of dtypes that can not represent missing values.
+_NULLABLE_DTYPES = {
+    np.dtype('int64'): 'Int64',
+    np.dtype('uint64'): 'UInt64',
+    np.dtype('bool'): 'boolean',
+}
+
+
+class _ColumnsBuilder(object):
+  """Accumulates values of protobuf fields in per-column lists.
+
+  Column names are the same as the ones produced by `from_message`. Fields of
+  nested messages are flattened, repeated fields are kept as lists of values.
+  """
+
+  def __init__(self) -> None:
+    self.size = 0
+    self._values = {}  # type: Dict[Text, List[Any]]
+    self._descs = {}  # type: Dict[Text, descriptor.FieldDescriptor]
+
+  def add(self, msg: message.Message) -> None:
+    self._add_fields(msg, '')
+    self.size += 1
+
+    # Fields that are not set in the message are represented by `None`.
+    for values in self._values.values():
+      if len(values) < self.size:
+        values.append(None)
+
+  def _add_fields(self, msg: message.Message, prefix: Text) -> None:
+    for desc, value in msg.ListFields():
+      name = prefix + desc.name
+
+      if desc.label == desc.LABEL_REPEATED:
+        if desc.type == desc.TYPE_MESSAGE:
+          value = [
+              json_format.MessageToDict(_, preserving_proto_field_name=True)
+              for _ in value
+          ]
+        else:
+          value = list(value)
+      elif desc.type == desc.TYPE_MESSAGE:
+        self._add_fields(value, name + '.')
+        continue
+
+      values = self._values.get(name)
+      if values is None:
+        values = self._values[name] = [None] * self.size
+        self._descs[name] = desc
+      values.append(value)
+
+  def build(self) -> pd.DataFrame:
+    """Builds a dataframe out of the accumulated values."""
+    data = collections.OrderedDict()
+    for name, values in self._values.items():
+      desc = self._descs[name]
+      column = _to_column(values, desc)
+      data[name] = column
+
+      pretty_column = _to_pretty_column(column, desc)
+      if pretty_column is not None:
+        data[name + '.pretty'] = pretty_column
+
+    return pd.DataFrame(data=data, index=pd.RangeIndex(self.size))
+
+
+def _to_column(values: List[Any],
+               desc: descriptor.FieldDescriptor) -> pd.Series:
+  """Converts values of a single field to a typed column."""
+  if desc.label == desc.LABEL_REPEATED or desc.type == desc.TYPE_BYTES:
+    return pd.Series(values, dtype=object)
+
+  if desc.type == desc.TYPE_ENUM:
+    names = {_.number: _.name for _ in desc.enum_type.values}
+    categories = [_.name for _ in desc.enum_type.values]
+    return pd.Series(
+        pd.Categorical([names.get(_) for _ in values], categories=categories))
+
+  if desc.type == desc.TYPE_STRING:
+    return pd.Series(pd.Categorical(values))
+
+  has_missing = any(_ is None for _ in values)
+
+  if desc.cpp_type == desc.CPPTYPE_BOOL:
+    return pd.Series(values, dtype='boolean' if has_missing else 'bool')
+
+  if desc.cpp_type in _INT_TYPES:
+    dtype, nullable_dtype = _INT_TYPES[desc.cpp_type]
+    return pd.Series(values, dtype=nullable_dtype if has_missing else dtype)
+
+  if desc.cpp_type in (desc.CPPTYPE_FLOAT, desc.CPPTYPE_DOUBLE):
+    return pd.Series(values, dtype='float64')
+
+  return pd.Series(values, dtype=object)
+
+
+def _to_pretty_column(column: pd.Series,
+                      desc: descriptor.FieldDescriptor) -> Optional[pd.Series]:
+  """Returns a pretty column for a given column (if any)."""
+  if desc.label == desc.LABEL_REPEATED:
+    return None
+
+  sem_type = desc.GetOptions().Extensions[semantic_pb2.sem_type].type
+
+  if desc.type == desc.TYPE_BYTES:
+    return column.map(lambda _: None if _ is None else repr(_))
+
+  if sem_type == 'RDFDatetime':
+    return pd.to_datetime(column.astype('float64'), unit='us')
+
+  if sem_type == 'StatMode':
+    # There are few distinct modes, so they are formatted only once each.
+    modes = column.dropna().unique()
+    pretty_modes = {mode: stat.filemode(int(mode)) for mode in modes}
+    return column.map(pretty_modes).astype('category')
+
+  return None
+
+
+def _concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+  """Concatenates dataframe chunks preserving types of their columns.
+
+  Categorical columns get the union of categories of all the chunks and columns
+  missing in some of the chunks are made nullable, so that `pd.concat` does not
+  fall back to columns of objects.
+
+  Columns are concatenated one at a time and removed from the chunks right
+  after, so that at most a single column is held twice in memory.
+
+  Args:
+    chunks: Dataframes to concatenate. They are emptied in the process.
+
+  Returns:
+    A single dataframe with rows of all the chunks.
+  """
+  if not chunks:
+    return pd.DataFrame()
+  if len(chunks) == 1:
+    return chunks[0]
+
+  dtypes = collections.OrderedDict()
+  categories = collections.defaultdict(collections.OrderedDict)
+  for chunk in chunks:
+    for name, column in chunk.items():
+      if isinstance(column.dtype, pd.CategoricalDtype):
+        categories[name].update(dict.fromkeys(column.cat.categories))
+      else:
+        dtypes.setdefault(name, column.dtype)
+
+  for name in categories:
+    dtypes[name] = pd.CategoricalDtype(list(categories[name]))
+
+  for name, dtype in dtypes.items():
+    if not all(name in chunk for chunk in chunks):
+      dtypes[name] = _NULLABLE_DTYPES.get(dtype, dtype)
+
+  sizes = [len(chunk) for chunk in chunks]
+
+  data = collections.OrderedDict()
+  for name, dtype in dtypes.items():
+    pieces = []
+    for chunk, size in zip(chunks, sizes):
+      if name in chunk:
+        pieces.append(chunk.pop(name).astype(dtype))
+      else:
+        pieces.append(pd.Series(index=pd.RangeIndex(size), dtype=dtype))
+    data[name] = pd.concat(pieces, ignore_index=True)
+
+  return pd.DataFrame(data=data, index=pd.RangeIndex(sum(sizes)), copy=False)
+
+
+def iter_dataframes(
+    msgs: Iterable[message.Message],
+    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+  """Lazily converts protobuf messages to dataframes of at most given size.
+
+  Unlike `from_sequence`, messages are not converted one by one: values are
+  collected per field and every chunk is built from typed column arrays.
+  Integer, float and boolean fields are stored in numeric columns (nullable if
+  a field is not set in some messages), strings and enums are stored as
+  categoricals and repeated fields are stored as lists.
+
+  Args:
+    msgs: Messages (of the same type) to convert.
+    chunk_size: Maximum number of rows in a single dataframe.
+
+  Yields:
+    Dataframes with consecutive chunks of messages.
+  """
+  builder = _ColumnsBuilder()
+  for msg in msgs:
+    builder.add(msg)
+    if builder.size >= chunk_size:
+      yield builder.build()
+      builder = _ColumnsBuilder()
+
+  if builder.size:
+    yield builder.build()
+
+
+def from_messages(msgs: Iterable[message.Message],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+  """Converts protobuf messages to a single dataframe chunk by chunk.
+
+  Args:
+    msgs: Messages (of the same type) to convert.
+    chunk_size: Number of messages converted at once.
+
+  Returns:
+    Pandas dataframe representing given messages.
+  """
+  return _concat_chunks(list(iter_dataframes(msgs, chunk_size)))
+
+
+def to_parquet(msgs: Iterable[message.Message],
+               path: Text,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+  """Converts protobuf messages to dataframes and spills them to Parquet.
+
+  Only a single chunk of messages is kept in memory at a time. Every chunk is
+  written to a separate file in the given directory, so that the result can be
+  read back lazily with `read_parquet`. Requires the `pyarrow` package.
+
+  Args:
+    msgs: Messages (of the same type) to convert.
+    path: A directory to write Parquet files to. It must not exist or be empty,
+      so that files of an earlier conversion are not mixed with the new ones.
+    chunk_size: Number of messages in a single Parquet file.
+
+  Returns:
+    Number of written rows.
+
+  Raises:
+    ValueError: If the given directory is not empty.
+  """
+  os.makedirs(path, exist_ok=True)
+  if os.listdir(path):
+    raise ValueError('Directory is not empty: {}'.format(path))
+
+  count = 0
+  for idx, dframe in enumerate(iter_dataframes(msgs, chunk_size)):
+    filename = os.path.join(path, 'part-{:05d}.parquet'.format(idx))
+    dframe.to_parquet(filename, engine='pyarrow', index=False)
+    count += len(dframe)
+
+  return count
+
+
+def read_parquet(
+    path: Text,
+    columns: Optional[List[Text]] = None) -> Iterator[pd.DataFrame]:
+  """Lazily reads dataframes written by `to_parquet`.
+
+  Args:
+    path: A directory with Parquet files.
+    columns: Columns to read. If not specified, all columns are read. Columns
+      missing in some of the files are filled with missing values.
+
+  Yields:
+    Dataframes, one per Parquet file, in the order they were written.
+  """
+  for filename in sorted(glob.glob(os.path.join(path, 'part-*.parquet'))):
+    if columns is None:
+      yield pd.read_parquet(filename, engine='pyarrow')
+      continue
+
+    # pylint: disable=g-import-not-at-top
+    from pyarrow import parquet
+    # pylint: enable=g-import-not-at-top
+
+    present = set(parquet.ParquetFile(filename).schema.names)
+    dframe = pd.read_parquet(
+        filename,
+        engine='pyarrow',
+        columns=[_ for _ in columns if _ in present])
+    yield dframe.reindex(columns=columns)
+
+
 def reindex_dataframe(df: pd.DataFrame,
                       priority_columns: List[Text] = None,
                       ignore_columns: List[Text] = None) -> pd.DataFrame:
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+import importlib
+import os
+
+from absl.testing import absltest
+import pandas as pd
+
+from grr_colab import convert
+from grr_response_proto import jobs_pb2
+from grr_response_proto import sysinfo_pb2
+
+
+def _stat_entry(idx: int) -> jobs_pb2.StatEntry:
+  entry = jobs_pb2.StatEntry()
+  entry.pathspec.pathtype = jobs_pb2.PathSpec.OS
+  entry.pathspec.path = '/foo/bar{}'.format(idx)
+  entry.st_size = idx
+  entry.st_mode = 0o100644 if idx % 2 else 0o40755
+  entry.st_mtime = 1580000000 + idx
+  return entry
+
+
+class FromMessagesTest(absltest.TestCase):
+
+  def testSameValuesAsFromSequence(self):
+    entries = [_stat_entry(_) for _ in range(10)]
+
+    expected = convert.from_sequence(entries)
+    dframe = convert.from_messages(entries, chunk_size=3)
+
+    self.assertCountEqual(dframe.columns, expected.columns)
+    for column in ['pathspec.path', 'pathspec.pathtype', 'st_mode.pretty']:
+      self.assertEqual(list(dframe[column]), list(expected[column]))
+    for column in ['st_size', 'st_mode', 'st_mtime']:
+      self.assertEqual(list(dframe[column]), list(expected[column]))
+
+  def testTypedColumns(self):
+    dframe = convert.from_messages([_stat_entry(_) for _ in range(10)])
+
+    self.assertEqual(dframe['st_size'].dtype, 'uint64')
+    self.assertIsInstance(dframe['pathspec.path'].dtype, pd.CategoricalDtype)
+    self.assertIsInstance(dframe['pathspec.pathtype'].dtype,
+                          pd.CategoricalDtype)
+    self.assertIsInstance(dframe['st_mode.pretty'].dtype, pd.CategoricalDtype)
+
+  def testDatetimeColumns(self):
+    agents = [
+        sysinfo_pb2.ManagementAgent(last_success=1580000000000000),
+        sysinfo_pb2.ManagementAgent(name='foo'),
+    ]
+
+    dframe = convert.from_messages(agents)
+
+    self.assertEqual(dframe['last_success.pretty'][0],
+                     pd.Timestamp(1580000000000000, unit='us'))
+    self.assertTrue(pd.isna(dframe['last_success.pretty'][1]))
+
+  def testCategoriesAreMergedAcrossChunks(self):
+    dframe = convert.from_messages([_stat_entry(_) for _ in range(10)],
+                                   chunk_size=4)
+
+    self.assertLen(dframe, 10)
+    self.assertIsInstance(dframe['pathspec.path'].dtype, pd.CategoricalDtype)
+    self.assertEqual(
+        list(dframe['pathspec.path']), ['/foo/bar{}'.format(_)
+                                        for _ in range(10)])
+
+  def testMissingFields(self):
+    entries = [_stat_entry(_) for _ in range(4)]
+    entries[1].ClearField('st_size')
+    entries[3].ClearField('st_size')
+    entries[3].st_uid = 1000
+
+    dframe = convert.from_messages(entries, chunk_size=2)
+
+    self.assertEqual(dframe['st_size'].dtype, 'UInt64')
+    self.assertTrue(pd.isna(dframe['st_size'][1]))
+    self.assertEqual(dframe['st_size'][2], 2)
+    self.assertTrue(pd.isna(dframe['st_uid'][0]))
+    self.assertEqual(dframe['st_uid'][3], 1000)
+
+  def testRepeatedFields(self):
+    process = sysinfo_pb2.Process(pid=1, cmdline=['foo', '--bar'])
+    process.connections.add(pid=1)
+
+    dframe = convert.from_messages([process])
+
+    self.assertEqual(dframe['cmdline'][0], ['foo', '--bar'])
+    self.assertEqual(dframe['connections'][0], [{'pid': 1}])
+
+  def testEmpty(self):
+    self.assertTrue(convert.from_messages([]).empty)
+
+
+class IterDataframesTest(absltest.TestCase):
+
+  def testChunks(self):
+    entries = (_stat_entry(_) for _ in range(10))
+
+    sizes = [len(_) for _ in convert.iter_dataframes(entries, chunk_size=4)]
+    self.assertEqual(sizes, [4, 4, 2])
+
+
+@absltest.skipIf(
+    importlib.util.find_spec('pyarrow') is None, 'pyarrow is not installed')
+class ParquetTest(absltest.TestCase):
+
+  def testRoundTrip(self):
+    path = os.path.join(self.create_tempdir().full_path, 'stat')
+
+    entries = (_stat_entry(_) for _ in range(10))
+    self.assertEqual(convert.to_parquet(entries, path, chunk_size=4), 10)
+
+    dframes = list(convert.read_parquet(path))
+    self.assertEqual([len(_) for _ in dframes], [4, 4, 2])
+
+    dframe = pd.concat(dframes, ignore_index=True)
+    self.assertEqual(
+        list(dframe['pathspec.path']), ['/foo/bar{}'.format(_)
+                                        for _ in range(10)])
+    self.assertEqual(list(dframe['st_size']), list(range(10)))
+
+  def testReadColumns(self):
+    path = os.path.join(self.create_tempdir().full_path, 'stat')
+
+    entries = [_stat_entry(_) for _ in range(4)]
+    entries[3].st_uid = 1000
+    convert.to_parquet(entries, path, chunk_size=2)
+
+    dframes = list(convert.read_parquet(path, columns=['st_size', 'st_uid']))
+    self.assertEqual(list(dframes[0].columns), ['st_size', 'st_uid'])
+    self.assertTrue(dframes[0]['st_uid'].isna().all())
+    self.assertEqual(dframes[1]['st_uid'][1], 1000)
+
+  def testRefusesNonEmptyDirectory(self):
+    path = os.path.join(self.create_tempdir().full_path, 'stat')
+
+    convert.to_parquet([_stat_entry(_) for _ in range(10)], path, chunk_size=2)
+    with self.assertRaises(ValueError):
+      convert.to_parquet([_stat_entry(0)], path, chunk_size=2)
+
+    dframes = list(convert.read_parquet(path))
+    self.assertEqual(sum(len(_) for _ in dframes), 10)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -265,8 +265,8 @@ def grr_ls_impl(path: Optional[Text] = None,
   filesystem = _get_filesystem(path_type)
 
   if cached:
-    return convert.from_sequence(filesystem.cached.ls(path))
-  return convert.from_sequence(filesystem.ls(path))
+    return convert.from_messages(filesystem.cached.ls(path))
+  return convert.from_messages(filesystem.ls(path))
 
 
 def grr_stat_impl(path: Text, path_type: Text = OS) -> pd.DataFrame:
@@ -290,7 +290,7 @@ def grr_stat_impl(path: Text, path_type: Text = OS) -> pd.DataFrame:
   path = _build_absolute_path(path)
   filesystem = _get_filesystem(path_type)
 
-  return convert.from_sequence(filesystem.glob(path))
+  return convert.from_messages(filesystem.glob(path))
 
 
 def grr_head_impl(
@@ -361,8 +361,8 @@ def grr_grep_impl(pattern: Text,
   filesystem = _get_filesystem(path_type)
 
   if fixed_strings:
-    return convert.from_sequence(filesystem.fgrep(path, byte_pattern))
-  return convert.from_sequence(filesystem.grep(path, byte_pattern))
+    return convert.from_messages(filesystem.fgrep(path, byte_pattern))
+  return convert.from_messages(filesystem.grep(path, byte_pattern))
 
 
 def grr_fgrep_impl(literal: Text,
@@ -396,7 +396,7 @@ def grr_fgrep_impl(literal: Text,
   path = _build_absolute_path(path)
   filesystem = _get_filesystem(path_type)
 
-  return convert.from_sequence(filesystem.fgrep(path, byte_literal))
+  return convert.from_messages(filesystem.fgrep(path, byte_literal))
 
 
 def grr_interrogate_impl() -> pd.DataFrame:
@@ -280,6 +280,10 @@ class GetClientStats(actions.ActionPlugin):
     response.io_samples = self.grr_worker.stats_collector.IOSamplesBetween(
         start_time=arg.start_time, end_time=arg.end_time)
 
+    comms_stats = self.grr_worker.stats_collector.CommsStats()
+    if comms_stats is not None:
+      response.comms_stats = comms_stats
+
     self.Send(response)
 
   def Send(self, response):
@@ -159,7 +159,8 @@ class MockStatsCollector(client_stats.ClientStatsCollector):
           write_bytes=300),
   ]
 
-  def __init__(self):
+  def __init__(self, worker):
+    self._worker = worker
     self._cpu_samples = self.CPU_SAMPLES
     self._io_samples = self.IO_SAMPLES
 
@@ -168,7 +169,7 @@ class MockClientWorker(object):
   """Mock client worker for GetClientStatsActionTest."""
 
   def __init__(self, client=None):
-    self.stats_collector = MockStatsCollector()
+    self.stats_collector = MockStatsCollector(self)
     self.client = client
 
   def start(self):  # pylint: disable=invalid-name
@@ -215,6 +216,27 @@ class GetClientStatsActionTest(client_test_lib.EmptyActionTest):
       self.assertEqual(response.io_samples[i].write_bytes, 100 * (i + 1))
 
     self.assertEqual(response.boot_time, 100 * 1e6)
+    self.assertFalse(response.HasField("comms_stats"))
+
+  def testReturnsCommsStats(self):
+    client = mock.Mock()
+    client.batch_controller = comms.AdaptiveBatchController(
+        max_post_size=1024 * 1024 * 1024, max_poll_backoff=60)
+    client.batch_controller.RecordResponse(
+        503, sent_bytes=1024, duration=1, bundle_full=False)
+
+    results = self.RunAction(
+        admin.GetClientStats,
+        grr_worker=MockClientWorker(client=client),
+        arg=rdf_client_action.GetClientStatsRequest())
+
+    comms_stats = results[0].comms_stats
+    self.assertEqual(comms_stats.post_size,
+                     comms.AdaptiveBatchController.INITIAL_POST_SIZE // 2)
+    self.assertEqual(comms_stats.num_posts, 1)
+    self.assertEqual(comms_stats.num_backpressure_responses, 1)
+    self.assertEqual(comms_stats.poll_backoff,
+                     comms.AdaptiveBatchController.MIN_POLL_BACKOFF)
 
   def testFiltersDataPointsByStartTime(self):
     start_time = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(117)
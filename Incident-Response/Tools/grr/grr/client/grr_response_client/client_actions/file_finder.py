@@ -44,10 +44,11 @@ def FileFinderOSFromClient(
 
   for path in GetExpandedPaths(args):
     try:
-      content_conditions = conditions.ContentCondition.Parse(args.conditions)
-      for content_condition in content_conditions:
+      content_conditions = list(
+          conditions.ContentCondition.Parse(args.conditions))
+      if content_conditions:
         with io.open(path, "rb") as fd:
-          result = list(content_condition.Search(fd))
+          result = conditions.ContentCondition.SearchAll(fd, content_conditions)
         if not result:
           raise _SkipFileException()
       stat = stat_cache.Get(path, follow_symlink=opts.resolve_links)
@@ -132,12 +133,15 @@ class FileFinderOS(actions.ActionPlugin):
     if self._content_conditions and stat.IsDirectory():
       raise _SkipFileException()
 
-    for content_condition in self._content_conditions:
-      with io.open(filepath, "rb") as fd:
-        result = list(content_condition.Search(fd))
-      if not result:
-        raise _SkipFileException()
-      matches.extend(result)
+    if not self._content_conditions:
+      return
+
+    with io.open(filepath, "rb") as fd:
+      result = conditions.ContentCondition.SearchAll(fd,
+                                                     self._content_conditions)
+    if not result:
+      raise _SkipFileException()
+    matches.extend(result)
 
 
 def GetExpandedPaths(
@@ -5,8 +5,12 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import abc
+import collections
+import heapq
 import re
+from typing import Iterable
 from typing import Iterator
+from typing import List
 from typing import NamedTuple
 from typing import Optional
 from typing import Pattern
@@ -143,7 +147,11 @@ class ContentCondition(metaclass=abc.ABCMeta):
   """An abstract class representing conditions on the file contents."""
 
   @abc.abstractmethod
-  def Search(self, fd):
+  def GetMatcher(self) -> "Matcher":
+    """Returns a matcher object for the pattern this condition looks for."""
+    pass
+
+  def Search(self, fd) -> Iterator[rdf_client.BufferReference]:
     """Searches specified file for particular content.
 
     Args:
@@ -152,7 +160,8 @@ class ContentCondition(metaclass=abc.ABCMeta):
     Yields:
       `BufferReference` objects pointing to file parts with matching content.
     """
-    pass
+    for match in self.Scan(fd, self.GetMatcher()):
+      yield match
 
   @staticmethod
   def Parse(conditions):
@@ -168,6 +177,7 @@ class ContentCondition(metaclass=abc.ABCMeta):
     classes = {
         kind.CONTENTS_LITERAL_MATCH: LiteralMatchCondition,
         kind.CONTENTS_REGEX_MATCH: RegexMatchCondition,
+        kind.CONTENTS_MULTI_LITERAL_MATCH: MultiLiteralMatchCondition,
     }
 
     for condition in conditions:
@@ -196,19 +206,87 @@ class ContentCondition(metaclass=abc.ABCMeta):
     offset = self.params.start_offset
     amount = self.params.length
     for chunk in streamer.StreamFile(fd, offset=offset, amount=amount):
-      for span in chunk.Scan(matcher):
-        ctx_begin = max(span.begin - self.params.bytes_before, 0)
-        ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
-        ctx_data = chunk.data[ctx_begin:ctx_end]
-
-        yield rdf_client.BufferReference(
-            offset=chunk.offset + ctx_begin,
-            length=len(ctx_data),
-            data=ctx_data)
+      for match in self.ScanChunk(chunk, matcher):
+        yield match
 
         if self.params.mode == self.params.Mode.FIRST_HIT:
           return
 
+  def ScanChunk(
+      self, chunk: streaming.Chunk,
+      matcher: "Matcher") -> Iterator[rdf_client.BufferReference]:
+    """Scans a single chunk of a file searching for given pattern.
+
+    Args:
+      chunk: A `streaming.Chunk` object with the data to search.
+      matcher: A matcher object specifying a pattern to search for.
+
+    Yields:
+      `BufferReference` objects pointing to file parts with matching content.
+    """
+    for span in chunk.Scan(matcher):
+      yield self._BufferReference(chunk, span)
+
+  def _BufferReference(self, chunk: streaming.Chunk,
+                       span: "Matcher.Span") -> rdf_client.BufferReference:
+    """Returns a reference to a match with the requested context around it."""
+    ctx_begin = max(span.begin - self.params.bytes_before, 0)
+    ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
+    ctx_data = chunk.data[ctx_begin:ctx_end]
+
+    return rdf_client.BufferReference(
+        offset=chunk.offset + ctx_begin, length=len(ctx_data), data=ctx_data)
+
+  @classmethod
+  def SearchAll(
+      cls, fd,
+      conditions: List["ContentCondition"]) -> List[rdf_client.BufferReference]:
+    """Searches specified file for content matching all given conditions.
+
+    Unlike calling `Search` for every condition, conditions searching the same
+    range of the file share a single streaming pass over it.
+
+    Args:
+      fd: A file descriptor of the file that needs to be searched.
+      conditions: A list of `ContentCondition` objects.
+
+    Returns:
+      A list of `BufferReference` objects pointing to file parts with matching
+      content, ordered by condition. If any of the conditions has no hits, the
+      list is empty.
+    """
+    matches = [[] for _ in conditions]
+
+    ranges = collections.OrderedDict()
+    for index, condition in enumerate(conditions):
+      params = condition.params
+      ranges.setdefault((params.start_offset, params.length), []).append(index)
+
+    streamer = streaming.Streamer(
+        chunk_size=cls.CHUNK_SIZE, overlap_size=cls.OVERLAP_SIZE)
+
+    for (offset, amount), indices in ranges.items():
+      matchers = {index: conditions[index].GetMatcher() for index in indices}
+
+      for chunk in streamer.StreamFile(fd, offset=offset, amount=amount):
+        for index in list(matchers):
+          condition = conditions[index]
+          for match in condition.ScanChunk(chunk, matchers[index]):
+            matches[index].append(match)
+
+            if condition.params.mode == condition.params.Mode.FIRST_HIT:
+              del matchers[index]
+              break
+
+        if not matchers:
+          break
+
+      # There is no need to look at other ranges if a condition is not met.
+      if not all(matches[index] for index in indices):
+        return []
+
+    return [match for hits in matches for match in hits]
+
 
 class LiteralMatchCondition(ContentCondition):
   """A content condition that lookups a literal pattern."""
@@ -217,10 +295,8 @@ class LiteralMatchCondition(ContentCondition):
     super().__init__()
     self.params = params.contents_literal_match
 
-  def Search(self, fd):
-    matcher = LiteralMatcher(self.params.literal.AsBytes())
-    for match in self.Scan(fd, matcher):
-      yield match
+  def GetMatcher(self) -> "LiteralMatcher":
+    return LiteralMatcher(self.params.literal.AsBytes())
 
 
 class RegexMatchCondition(ContentCondition):
@@ -230,12 +306,27 @@ class RegexMatchCondition(ContentCondition):
     super().__init__()
     self.params = params.contents_regex_match
 
-  def Search(self, fd) -> Iterator[rdf_client.BufferReference]:
+  def GetMatcher(self) -> "RegexMatcher":
     regex = re.compile(self.params.regex.AsBytes(), flags=re.I | re.S | re.M)
+    return RegexMatcher(regex)
 
-    matcher = RegexMatcher(regex)
-    for match in self.Scan(fd, matcher):
-      yield match
+
+class MultiLiteralMatchCondition(ContentCondition):
+  """A content condition that lookups any of several literal patterns."""
+
+  def __init__(self, params):
+    super().__init__()
+    self.params = params.contents_multi_literal_match
+
+  def GetMatcher(self) -> "MultiLiteralMatcher":
+    return MultiLiteralMatcher(self.params.literals)
+
+  def ScanChunk(
+      self, chunk: streaming.Chunk,
+      matcher: "MultiLiteralMatcher") -> Iterator[rdf_client.BufferReference]:
+    # Overlapping hits of different literals are all reported.
+    for span in matcher.ScanChunk(chunk):
+      yield self._BufferReference(chunk, span)
 
 
 class Matcher(metaclass=abc.ABCMeta):
@@ -304,3 +395,56 @@ class LiteralMatcher(Matcher):
       return None
 
     return Matcher.Span(begin=offset, end=offset + len(self._literal))
+
+
+class MultiLiteralMatcher(Matcher):
+  """A matcher looking up any of several byte strings.
+
+  Every literal is looked up with `bytes.find`, which is a lot faster than
+  walking the data byte by byte in Python even for hundreds of literals. If
+  several literals match, the one that begins first is reported (the longest
+  one if several literals begin at the same position).
+
+  Args:
+    literals: Byte string patterns that the matcher matches.
+  """
+
+  def __init__(self, literals: Iterable[bytes]):
+    super().__init__()
+
+    literals = list(literals)
+    for literal in literals:
+      precondition.AssertType(literal, bytes)
+
+    # Duplicates would be reported twice by `ScanChunk`.
+    literals = sorted(set(literal for literal in literals if literal))
+    self.matchers = [LiteralMatcher(literal) for literal in literals]
+
+  def Match(self, data: bytes, position: int) -> Optional[Matcher.Span]:
+    precondition.AssertType(data, bytes)
+    precondition.AssertType(position, int)
+
+    result = None
+    for matcher in self.matchers:
+      span = matcher.Match(data, position)
+      if span is None:
+        continue
+      if result is None or (span.begin, -span.end) < (result.begin,
+                                                       -result.end):
+        result = span
+
+    return result
+
+  def ScanChunk(self, chunk: streaming.Chunk) -> Iterator[Matcher.Span]:
+    """Yields spans of all occurrences of the literals within the chunk.
+
+    Unlike `chunk.Scan(self)`, this reports hits of different literals even if
+    they overlap.
+
+    Args:
+      chunk: A `streaming.Chunk` object with the data to search.
+
+    Yields:
+      `Matcher.Span` objects ordered by their position.
+    """
+    return heapq.merge(*[chunk.Scan(matcher) for matcher in self.matchers])
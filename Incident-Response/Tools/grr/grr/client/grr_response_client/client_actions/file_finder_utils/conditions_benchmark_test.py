@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Benchmarks for content conditions looking up many literals."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import io
+import os
+import random
+
+from absl import app
+
+from grr_response_client.client_actions.file_finder_utils import conditions
+from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
+from grr_response_core.lib.util import temp
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class ContentConditionsBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares per-literal conditions with a single multi-literal condition."""
+
+  REPEATS = 3
+  units = "s"
+
+  FILE_SIZE = 4 * 1024 * 1024
+  NUM_LITERALS = 200
+
+  def setUp(self):
+    super().setUp()
+
+    rand = random.Random(0)
+    alphabet = b"abcdefghijklmnopqrstuvwxyz "
+
+    self.literals = []
+    for _ in range(self.NUM_LITERALS):
+      length = rand.randint(8, 16)
+      self.literals.append(bytes(rand.choice(alphabet) for _ in range(length)))
+
+    self.temp_filepath = temp.TempFilePath()
+    self.addCleanup(lambda: os.remove(self.temp_filepath))
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(bytes(rand.choice(alphabet) for _ in range(self.FILE_SIZE)))
+      # Make sure that the last literal is found, so that all the conditions
+      # have to be evaluated.
+      fd.write(self.literals[-1])
+
+  def _SearchEachLiteral(self):
+    params = [
+        rdf_file_finder.FileFinderCondition.ContentsLiteralMatch(
+            literal=literal, mode="FIRST_HIT") for literal in self.literals
+    ]
+
+    matches = []
+    for condition in map(conditions.LiteralMatchCondition, params):
+      with io.open(self.temp_filepath, "rb") as fd:
+        matches.extend(condition.Search(fd))
+    return len(matches)
+
+  def _SearchAllLiteralsInOnePass(self):
+    params = [
+        rdf_file_finder.FileFinderCondition.ContentsLiteralMatch(
+            literal=literal, mode="FIRST_HIT") for literal in self.literals
+    ]
+
+    content_conditions = list(map(conditions.LiteralMatchCondition, params))
+    with io.open(self.temp_filepath, "rb") as fd:
+      return len(conditions.ContentCondition.SearchAll(fd, content_conditions))
+
+  def _SearchMultiLiteral(self):
+    params = rdf_file_finder.FileFinderCondition.ContentsMultiLiteralMatch(
+        literals=self.literals, mode="ALL_HITS")
+
+    condition = conditions.MultiLiteralMatchCondition(params)
+    with io.open(self.temp_filepath, "rb") as fd:
+      return len(list(condition.Search(fd)))
+
+  def testManyLiterals(self):
+    self.TimeIt(
+        self._SearchEachLiteral,
+        name="%d literal conditions" % self.NUM_LITERALS)
+    self.TimeIt(
+        self._SearchAllLiteralsInOnePass,
+        name="%d literal conditions, one pass" % self.NUM_LITERALS)
+    self.TimeIt(
+        self._SearchMultiLiteral,
+        name="Multi-literal condition (%d literals)" % self.NUM_LITERALS)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
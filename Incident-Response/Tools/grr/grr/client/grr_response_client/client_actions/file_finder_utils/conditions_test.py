@@ -9,10 +9,12 @@ import platform
 import re
 import subprocess
 import unittest
+from unittest import mock
 
 from absl import app
 from absl.testing import absltest
 
+from grr_response_client import streaming
 from grr_response_client.client_actions.file_finder_utils import conditions
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
@@ -111,6 +113,85 @@ class LiteralMatcherTest(absltest.TestCase):
     self.assertFalse(span)
 
 
+class MultiLiteralMatcherTest(absltest.TestCase):
+
+  def testMatchLiteral(self):
+    matcher = conditions.MultiLiteralMatcher([b"foo", b"bar"])
+
+    span = matcher.Match(b"quuxbarfoo", 0)
+    self.assertTrue(span)
+    self.assertEqual(span.begin, 4)
+    self.assertEqual(span.end, 7)
+
+    span = matcher.Match(b"quuxbarfoo", 5)
+    self.assertTrue(span)
+    self.assertEqual(span.begin, 7)
+    self.assertEqual(span.end, 10)
+
+  def testMatchOverlappingLiterals(self):
+    matcher = conditions.MultiLiteralMatcher([b"he", b"she", b"his", b"hers"])
+
+    span = matcher.Match(b"ushers", 0)
+    self.assertTrue(span)
+    self.assertEqual(span.begin, 1)
+    self.assertEqual(span.end, 4)
+
+    span = matcher.Match(b"ushers", 2)
+    self.assertTrue(span)
+    self.assertEqual(span.begin, 2)
+    self.assertEqual(span.end, 6)
+
+    span = matcher.Match(b"xhisx", 0)
+    self.assertTrue(span)
+    self.assertEqual(span.begin, 1)
+    self.assertEqual(span.end, 4)
+
+  def testNoMatchLiteral(self):
+    matcher = conditions.MultiLiteralMatcher([b"norf", b"thud"])
+
+    span = matcher.Match(b"quux", 0)
+    self.assertFalse(span)
+
+    span = matcher.Match(b"thudnorf", 5)
+    self.assertFalse(span)
+
+  def testNoLiterals(self):
+    matcher = conditions.MultiLiteralMatcher([])
+
+    span = matcher.Match(b"quux", 0)
+    self.assertFalse(span)
+
+  def testMatchesSameAsLiteralMatcher(self):
+    literals = [b"ab", b"bba", b"aab", b"b"]
+    data = b"aabbabaabbbabaaab"
+
+    matcher = conditions.MultiLiteralMatcher(literals)
+    for position in range(len(data)):
+      expected = None
+      for literal in literals:
+        span = conditions.LiteralMatcher(literal).Match(data, position)
+        if span is None:
+          continue
+        if expected is None or (span.begin, -span.end) < (expected.begin,
+                                                           -expected.end):
+          expected = span
+
+      self.assertEqual(matcher.Match(data, position), expected)
+
+
+  def testScanChunkReportsOverlappingLiterals(self):
+    matcher = conditions.MultiLiteralMatcher([b"he", b"she", b"his", b"hers"])
+    chunk = streaming.Chunk(offset=0, data=b"ushers and his")
+
+    spans = list(matcher.ScanChunk(chunk))
+    self.assertEqual(spans, [
+        conditions.Matcher.Span(begin=1, end=4),
+        conditions.Matcher.Span(begin=2, end=4),
+        conditions.Matcher.Span(begin=2, end=6),
+        conditions.Matcher.Span(begin=11, end=14),
+    ])
+
+
 class ConditionTestMixin(object):
 
   def setUp(self):
@@ -563,6 +644,171 @@ class RegexMatchCondition(ConditionTestMixin, absltest.TestCase):
     self.assertEqual(results[0].length, 4)
 
 
+class MultiLiteralMatchConditionTest(ConditionTestMixin, absltest.TestCase):
+
+  def testNoHits(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foo bar quux")
+
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_multi_literal_match.literals = [b"baz", b"norf"]
+    params.contents_multi_literal_match.mode = "ALL_HITS"
+    condition = conditions.MultiLiteralMatchCondition(params)
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = list(condition.Search(fd))
+    self.assertFalse(results)
+
+  def testSomeHits(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foo bar foo baz")
+
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_multi_literal_match.literals = [b"foo", b"baz", b"norf"]
+    params.contents_multi_literal_match.mode = "ALL_HITS"
+    condition = conditions.MultiLiteralMatchCondition(params)
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = list(condition.Search(fd))
+    self.assertLen(results, 3)
+    self.assertEqual(results[0].data, b"foo")
+    self.assertEqual(results[0].offset, 0)
+    self.assertEqual(results[0].length, 3)
+    self.assertEqual(results[1].data, b"foo")
+    self.assertEqual(results[1].offset, 8)
+    self.assertEqual(results[1].length, 3)
+    self.assertEqual(results[2].data, b"baz")
+    self.assertEqual(results[2].offset, 12)
+    self.assertEqual(results[2].length, 3)
+
+  def testFirstHit(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"bar foo baz foo")
+
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_multi_literal_match.literals = [b"foo", b"baz"]
+    params.contents_multi_literal_match.mode = "FIRST_HIT"
+    condition = conditions.MultiLiteralMatchCondition(params)
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = list(condition.Search(fd))
+    self.assertLen(results, 1)
+    self.assertEqual(results[0].data, b"foo")
+    self.assertEqual(results[0].offset, 4)
+    self.assertEqual(results[0].length, 3)
+
+  def testContext(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foo bar baz")
+
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_multi_literal_match.literals = [b"foo", b"baz"]
+    params.contents_multi_literal_match.mode = "ALL_HITS"
+    params.contents_multi_literal_match.bytes_before = 2
+    params.contents_multi_literal_match.bytes_after = 2
+    condition = conditions.MultiLiteralMatchCondition(params)
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = list(condition.Search(fd))
+    self.assertLen(results, 2)
+    self.assertEqual(results[0].data, b"foo b")
+    self.assertEqual(results[0].offset, 0)
+    self.assertEqual(results[0].length, 5)
+    self.assertEqual(results[1].data, b"r baz")
+    self.assertEqual(results[1].offset, 6)
+    self.assertEqual(results[1].length, 5)
+
+
+  def testAllHitsReportsOverlappingLiterals(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foobar")
+
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_multi_literal_match.literals = [b"foob", b"obar"]
+    params.contents_multi_literal_match.mode = "ALL_HITS"
+    condition = conditions.MultiLiteralMatchCondition(params)
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = list(condition.Search(fd))
+    self.assertLen(results, 2)
+    self.assertEqual(results[0].data, b"foob")
+    self.assertEqual(results[0].offset, 0)
+    self.assertEqual(results[1].data, b"obar")
+    self.assertEqual(results[1].offset, 2)
+
+
+class SearchAllTest(ConditionTestMixin, absltest.TestCase):
+
+  def _LiteralMatchCondition(self, literal, **kwargs):
+    params = rdf_file_finder.FileFinderCondition.ContentsLiteralMatch(
+        literal=literal, mode="ALL_HITS", **kwargs)
+    return conditions.LiteralMatchCondition(params)
+
+  def testReturnsHitsOfAllConditions(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foo bar foo 42")
+
+    params = rdf_file_finder.FileFinderCondition.ContentsRegexMatch(
+        regex=b"\\d+", mode="FIRST_HIT")
+    content_conditions = [
+        self._LiteralMatchCondition(b"foo"),
+        conditions.RegexMatchCondition(params),
+        self._LiteralMatchCondition(b"o", start_offset=9),
+    ]
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = conditions.ContentCondition.SearchAll(fd, content_conditions)
+
+    self.assertEqual([(result.offset, result.data) for result in results],
+                     [(0, b"foo"), (8, b"foo"), (12, b"42"), (9, b"o"),
+                      (10, b"o")])
+
+  def testMatchesSearch(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"quux norf " * 100)
+
+    content_conditions = [
+        self._LiteralMatchCondition(b"quux", bytes_after=3),
+        self._LiteralMatchCondition(b"norf", start_offset=5, length=500),
+    ]
+
+    expected = []
+    with io.open(self.temp_filepath, "rb") as fd:
+      for condition in content_conditions:
+        expected.extend(condition.Search(fd))
+
+      results = conditions.ContentCondition.SearchAll(fd, content_conditions)
+
+    self.assertEqual(results, expected)
+
+  def testNoHitsIfAnyConditionIsNotMet(self):
+    with io.open(self.temp_filepath, "wb") as fd:
+      fd.write(b"foo bar")
+
+    content_conditions = [
+        self._LiteralMatchCondition(b"foo"),
+        self._LiteralMatchCondition(b"baz"),
+    ]
+
+    with io.open(self.temp_filepath, "rb") as fd:
+      results = conditions.ContentCondition.SearchAll(fd, content_conditions)
+    self.assertEmpty(results)
+
+  def testReadsFileOnce(self):
+    content_conditions = [
+        self._LiteralMatchCondition(literal)
+        for literal in [b"foo", b"bar", b"baz"]
+    ]
+
+    fd = io.BytesIO(b"foo bar baz")
+    with mock.patch.object(fd, "read", wraps=fd.read) as read:
+      results = conditions.ContentCondition.SearchAll(fd, content_conditions)
+
+    self.assertLen(results, 3)
+    # One read returning the data and one hitting the end of the file.
+    self.assertEqual(read.call_count, 2)
+
+
 def main(argv):
   test_lib.main(argv)
 
@@ -7,10 +7,14 @@ from __future__ import unicode_literals
 import abc
 import collections
 import contextlib
+import heapq
 import io
 import os
+import queue
 import re
 import shutil
+import threading
+from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import Iterator
@@ -284,26 +288,79 @@ class UnprivilegedYaraWrapper(YaraWrapper):
     return result
 
 
+class _ScanCancelledError(Exception):
+  """Raised in scan workers when a parallel scan is aborted."""
+
+
+class _ScanContext(object):
+  """A scanner used to scan processes one after another.
+
+  Attributes:
+    yara_wrapper: The YARA wrapper used for scanning.
+    progress: A function called before scanning every chunk of memory.
+    scanned_bytes: Amount of memory scanned in the current process.
+  """
+
+  def __init__(self, yara_wrapper: YaraWrapper, progress: Callable[[], None]):
+    self.yara_wrapper = yara_wrapper
+    self.progress = progress
+    self.scanned_bytes = 0
+
+
+def _PartitionProcesses(processes: List[psutil.Process],
+                        num_partitions: int) -> List[List[psutil.Process]]:
+  """Splits processes into partitions of roughly the same memory size.
+
+  Processes are assigned, largest first, to the partition with the smallest
+  total resident memory so far.
+
+  Args:
+    processes: Processes to split.
+    num_partitions: Number of partitions.
+
+  Returns:
+    A list of `num_partitions` lists of processes.
+  """
+
+  def ResidentSize(process):
+    try:
+      return process.memory_info().rss
+    except Exception:  # pylint: disable=broad-except
+      return 0
+
+  sizes = {process.pid: ResidentSize(process) for process in processes}
+  partitions = [[] for _ in range(num_partitions)]
+  heap = [(0, i) for i in range(num_partitions)]
+  for process in sorted(processes, key=lambda p: sizes[p.pid], reverse=True):
+    total_size, i = heapq.heappop(heap)
+    partitions[i].append(process)
+    heapq.heappush(heap, (total_size + sizes[process.pid], i))
+
+  return partitions
+
+
 class YaraProcessScan(actions.ActionPlugin):
   """Scans the memory of a number of processes using Yara."""
   in_rdfvalue = rdf_memory.YaraProcessScanRequest
   out_rdfvalues = [rdf_memory.YaraProcessScanResponse]
 
-  def __init__(self, grr_worker=None):
-    super().__init__(grr_worker=grr_worker)
-    self._yara_wrapper = None
+  # How often the progress is reported while waiting for parallel scan
+  # workers.
+  _PROGRESS_INTERVAL_SECS = 1
 
-  def _ScanRegion(self, process, chunks, deadline):
+  def _ScanRegion(self, process, chunks, deadline, context):
     for chunk in chunks:
-      self.Progress()
+      context.progress()
 
       time_left = (deadline - rdfvalue.RDFDatetime.Now()).ToInt(
           rdfvalue.SECONDS)
 
-      for m in self._yara_wrapper.Match(process, chunk, time_left):
+      for m in context.yara_wrapper.Match(process, chunk, time_left):
         yield m
 
-  def _GetMatches(self, psutil_process, scan_request):
+      context.scanned_bytes += chunk.amount
+
+  def _GetMatches(self, psutil_process, scan_request, context):
     if scan_request.per_process_timeout:
       deadline = rdfvalue.RDFDatetime.Now() + scan_request.per_process_timeout
     else:
@@ -321,7 +378,7 @@ class YaraProcessScan(actions.ActionPlugin):
         for region in client_utils.MemoryRegions(process, scan_request):
           chunks = streamer.StreamRanges(
               offset=region.start, amount=region.size)
-          for m in self._ScanRegion(process, chunks, deadline):
+          for m in self._ScanRegion(process, chunks, deadline, context):
             matches.append(m)
             if 0 < scan_request.max_results_per_process <= len(matches):
               return matches
@@ -335,12 +392,13 @@ class YaraProcessScan(actions.ActionPlugin):
   # multiple responses for 100 processes each.
   _RESULTS_PER_RESPONSE = 100
 
-  def _ScanProcess(self, process, scan_request, scan_response):
+  def _ScanProcess(self, process, scan_request, scan_response, context):
     rdf_process = rdf_client.Process.FromPsutilProcess(process)
 
+    context.scanned_bytes = 0
     start_time = rdfvalue.RDFDatetime.Now()
     try:
-      matches = self._GetMatches(process, scan_request)
+      matches = self._GetMatches(process, scan_request, context)
       scan_time = rdfvalue.RDFDatetime.Now() - start_time
       scan_time_us = scan_time.ToInt(rdfvalue.MICROSECONDS)
     except YaraTimeoutError:
@@ -350,6 +408,8 @@ class YaraProcessScan(actions.ActionPlugin):
               error="Scanning timed out (%s)." %
               (rdfvalue.RDFDatetime.Now() - start_time)))
       return
+    except _ScanCancelledError:
+      raise
     except Exception as e:  # pylint: disable=broad-except
       scan_response.errors.Append(
           rdf_memory.ProcessMemoryError(process=rdf_process, error=str(e)))
@@ -358,11 +418,112 @@ class YaraProcessScan(actions.ActionPlugin):
     if matches:
       scan_response.matches.Append(
           rdf_memory.YaraProcessScanMatch(
-              process=rdf_process, match=matches, scan_time_us=scan_time_us))
+              process=rdf_process,
+              match=matches,
+              scan_time_us=scan_time_us,
+              scanned_bytes=context.scanned_bytes))
     else:
       scan_response.misses.Append(
           rdf_memory.YaraProcessScanMiss(
-              process=rdf_process, scan_time_us=scan_time_us))
+              process=rdf_process,
+              scan_time_us=scan_time_us,
+              scanned_bytes=context.scanned_bytes))
+
+  def _ScanProcessesSequentially(self, processes, scan_request):
+    """Scans processes one after another.
+
+    Args:
+      processes: psutil processes to scan.
+      scan_request: The YaraProcessScanRequest sent by the server.
+
+    Yields:
+      YaraProcessScanResponses, each with results of a single process.
+    """
+    yara_wrapper = self._CreateYaraWrapper(scan_request, processes)
+    with yara_wrapper:
+      context = _ScanContext(yara_wrapper, self.Progress)
+      for process in processes:
+        self.Progress()
+        scan_response = rdf_memory.YaraProcessScanResponse()
+        self._ScanProcess(process, scan_request, scan_response, context)
+        yield scan_response
+
+  def _ScanProcessesInParallel(self, processes, scan_request, num_workers):
+    """Scans processes in parallel using a pool of scanners.
+
+    Every worker thread scans its share of the processes with its own YARA
+    wrapper, so with sandboxing enabled every worker talks to a separate
+    unprivileged scanner process. The CPU time of the scanners is accounted
+    for the action, so `Progress` calls of this (the action's) thread enforce
+    the CPU and runtime limits of the whole scan.
+
+    Args:
+      processes: psutil processes to scan.
+      scan_request: The YaraProcessScanRequest sent by the server.
+      num_workers: Number of processes scanned at the same time.
+
+    Yields:
+      YaraProcessScanResponses, each with results of a single process.
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def Progress():
+      if stop.is_set():
+        raise _ScanCancelledError()
+
+    def Work(partition):
+      try:
+        yara_wrapper = self._CreateYaraWrapper(scan_request, partition)
+        with yara_wrapper:
+          context = _ScanContext(yara_wrapper, Progress)
+          for process in partition:
+            Progress()
+            scan_response = rdf_memory.YaraProcessScanResponse()
+            self._ScanProcess(process, scan_request, scan_response, context)
+            results.put(scan_response)
+      except _ScanCancelledError:
+        pass
+      except Exception as e:  # pylint: disable=broad-except
+        results.put(e)
+      finally:
+        # Signals that the worker has finished.
+        results.put(None)
+
+    workers = [
+        threading.Thread(target=Work, args=(partition,))
+        for partition in _PartitionProcesses(processes, num_workers)
+    ]
+    for worker in workers:
+      worker.start()
+
+    try:
+      num_running = len(workers)
+      while num_running:
+        self.Progress()
+        try:
+          result = results.get(timeout=self._PROGRESS_INTERVAL_SECS)
+        except queue.Empty:
+          continue
+
+        if result is None:
+          num_running -= 1
+        elif isinstance(result, Exception):
+          raise result
+        else:
+          yield result
+    finally:
+      # Workers finish the chunk they are scanning and stop.
+      stop.set()
+      for worker in workers:
+        worker.join()
+
+  def _CreateYaraWrapper(self, scan_request, processes) -> YaraWrapper:
+    if self._UseSandboxing(scan_request):
+      return UnprivilegedYaraWrapper(
+          str(scan_request.yara_signature), processes)
+    else:
+      return DirectYaraWrapper(str(scan_request.yara_signature))
 
   def _SaveSignatureShard(self, scan_request):
     """Writes a YaraSignatureShard received from the server to disk.
@@ -428,25 +589,28 @@ class YaraProcessScan(actions.ActionPlugin):
                         scan_request.cmdline_regex,
                         scan_request.ignore_grr_process, scan_response.errors))
 
-    if self._UseSandboxing(args):
-      self._yara_wrapper: YaraWrapper = UnprivilegedYaraWrapper(
-          str(scan_request.yara_signature), processes)
+    num_workers = min(scan_request.num_scan_workers, len(processes),
+                      os.cpu_count() or 1)
+    if num_workers > 1:
+      process_responses = self._ScanProcessesInParallel(
+          processes, scan_request, num_workers)
     else:
-      self._yara_wrapper: YaraWrapper = DirectYaraWrapper(
-          str(scan_request.yara_signature))
-
-    with self._yara_wrapper:
-      for process in processes:
-        self.Progress()
-        num_results = (
-            len(scan_response.errors) + len(scan_response.matches) +
-            len(scan_response.misses))
-        if num_results >= self._RESULTS_PER_RESPONSE:
-          self.SendReply(scan_response)
-          scan_response = rdf_memory.YaraProcessScanResponse()
-        self._ScanProcess(process, scan_request, scan_response)
-
-      self.SendReply(scan_response)
+      process_responses = self._ScanProcessesSequentially(
+          processes, scan_request)
+
+    for process_response in process_responses:
+      num_results = (
+          len(scan_response.errors) + len(scan_response.matches) +
+          len(scan_response.misses))
+      if num_results >= self._RESULTS_PER_RESPONSE:
+        self.SendReply(scan_response)
+        scan_response = rdf_memory.YaraProcessScanResponse()
+
+      scan_response.errors.Extend(process_response.errors)
+      scan_response.matches.Extend(process_response.matches)
+      scan_response.misses.Extend(process_response.misses)
+
+    self.SendReply(scan_response)
 
   def _UseSandboxing(self, args: rdf_memory.YaraProcessScanRequest) -> bool:
     if (args.implementation_type ==
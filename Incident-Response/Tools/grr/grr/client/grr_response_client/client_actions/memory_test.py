@@ -5,6 +5,8 @@ from __future__ import division
 from __future__ import unicode_literals
 
 import os
+import threading
+import time
 from unittest import mock
 
 from absl import app
@@ -244,5 +246,81 @@ class ProcessFilteringTest(client_test_lib.EmptyActionTest):
     self.assertEqual(results[0].matches[0].process.pid, 1)
 
 
+class ParallelScanTest(client_test_lib.EmptyActionTest):
+
+  NUM_PROCESSES = 20
+
+  def setUp(self):
+    super().setUp()
+
+    processes = []
+    for pid in range(self.NUM_PROCESSES):
+      process = Process(pid, "proc%d" % pid)
+      process.memory_info().rss = pid * 1024
+      processes.append(process)
+
+    patcher = mock.patch.object(
+        psutil, "process_iter", return_value=processes)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+    patcher = mock.patch.object(os, "cpu_count", return_value=8)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def _Scan(self, num_scan_workers):
+    scan_request = rdf_memory.YaraProcessScanRequest(
+        signature_shard=rdf_memory.YaraSignatureShard(index=0, payload=b"123"),
+        num_signature_shards=1,
+        num_scan_workers=num_scan_workers)
+
+    thread_ids = set()
+
+    def GetMatches(self, psutil_process, scan_request, context):
+      del self, scan_request  # Unused.
+      thread_ids.add(threading.get_ident())
+      time.sleep(0.01)
+      context.scanned_bytes = psutil_process.pid
+      if psutil_process.pid % 2:
+        return []
+      return [rdf_memory.YaraMatch(rule_name="foo")]
+
+    with mock.patch.object(memory.YaraProcessScan, "_GetMatches", GetMatches):
+      results = self.ExecuteAction(memory.YaraProcessScan, arg=scan_request)
+
+    return results[:-1], thread_ids
+
+  def testAllProcessesAreScannedOnce(self):
+    responses, thread_ids = self._Scan(num_scan_workers=4)
+
+    self.assertLen(thread_ids, 4)
+    matches = [m for r in responses for m in r.matches]
+    misses = [m for r in responses for m in r.misses]
+    self.assertCountEqual([m.process.pid for m in matches],
+                          range(0, self.NUM_PROCESSES, 2))
+    self.assertCountEqual([m.process.pid for m in misses],
+                          range(1, self.NUM_PROCESSES, 2))
+    for result in matches + misses:
+      self.assertEqual(result.scanned_bytes, result.process.pid)
+
+  def testSequentialScan(self):
+    responses, thread_ids = self._Scan(num_scan_workers=0)
+
+    self.assertLen(thread_ids, 1)
+    self.assertLen(responses, 1)
+    self.assertEqual([m.process.pid for m in responses[0].matches],
+                     list(range(0, self.NUM_PROCESSES, 2)))
+
+  def testPartitionProcesses(self):
+    processes = list(psutil.process_iter())
+    partitions = memory._PartitionProcesses(processes, 3)
+
+    self.assertLen(partitions, 3)
+    self.assertCountEqual([p.pid for part in partitions for p in part],
+                          range(self.NUM_PROCESSES))
+    sizes = [sum(p.memory_info().rss for p in part) for part in partitions]
+    self.assertLessEqual(max(sizes) - min(sizes), self.NUM_PROCESSES * 1024)
+
+
 if __name__ == "__main__":
   app.run(test_lib.main)
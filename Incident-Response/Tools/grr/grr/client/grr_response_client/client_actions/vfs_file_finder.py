@@ -69,15 +69,13 @@ class VfsFileFinder(actions.ActionPlugin):
 
 def _CheckConditionsShortCircuit(content_conditions, pathspec):
   """Checks all `content_conditions` until one yields no matches."""
-  matches = []
-  for cond in content_conditions:
-    with vfs.VFSOpen(pathspec) as vfs_file:
-      cur_matches = list(cond.Search(vfs_file))
-    if cur_matches:
-      matches.extend(cur_matches)
-    else:  # As soon as one condition does not match, we skip the file.
-      return []  # Return no matches to indicate skipping this file.
-  return matches
+  if not content_conditions:
+    return []
+
+  with vfs.VFSOpen(pathspec) as vfs_file:
+    # Returns no matches as soon as one condition does not match, to indicate
+    # skipping this file.
+    return conditions.ContentCondition.SearchAll(vfs_file, content_conditions)
 
 
 def _GetExpandedPaths(
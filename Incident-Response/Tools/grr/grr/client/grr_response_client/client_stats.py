@@ -85,6 +85,19 @@ class ClientStatsCollector(threading.Thread):
     """
     return _SamplesBetween(self._io_samples, start_time, end_time)
 
+  def CommsStats(self):
+    """Returns the state of the client's adaptive message batching.
+
+    Returns:
+      A `ClientCommsStats` instance or None if the worker does not belong to an
+      HTTP client.
+    """
+    batch_controller = getattr(self._worker.client, "batch_controller", None)
+    if batch_controller is None:
+      return None
+
+    return batch_controller.GetStats()
+
   def run(self):
     while not self.exit:
       self._Collect()
@@ -66,6 +66,13 @@ Examples:
    resent the last message. If it does not succeed it starts searching for a new
    URL/Proxy combination as in example 1.
 
+The amount of data sent in a single POST is controlled by the
+AdaptiveBatchController() object. It sizes message bundles so that a POST takes
+roughly the same time regardless of link speed and compressibility of the data,
+shrinks them and backs off polling when the server reports it is overloaded
+(500/502/503/504 responses, but not connection errors), and sends back-to-back
+POSTs while the output queue is backlogged.
+Client.max_post_size is the upper bound on the size of a single POST.
 """
 from __future__ import absolute_import
 from __future__ import division
@@ -99,6 +106,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import type_info
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import client_stats as rdf_client_stats
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
@@ -107,11 +115,20 @@ from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 class HTTPObject(object):
   """Data returned from a HTTP connection."""
 
-  def __init__(self, url="", data="", proxy="", code=500, duration=0):
+  def __init__(self,
+               url="",
+               data="",
+               proxy="",
+               code=500,
+               duration=0,
+               connection_error=False):
     self.url = url
     self.data = data
     self.proxy = proxy
     self.code = code
+    # True if the server could not be reached at all, i.e. the code does not
+    # come from an HTTP response.
+    self.connection_error = connection_error
     # Contains the decoded data from the 'control' endpoint.
     self.messages = self.source = self.nonce = None
     self.duration = duration
@@ -285,6 +302,7 @@ class HTTPManager(object):
     # Start checking the proxy from the last value found.
     tries = 0
     last_error = 500
+    connection_error = True
 
     while tries < len(self.proxies):
       proxy_index = self.last_proxy_index % len(self.proxies)
@@ -328,6 +346,7 @@ class HTTPManager(object):
         # enroll.
         if e.response is not None:
           last_error = e.response.status_code
+          connection_error = False
           if last_error == 406:
             # A 406 is not considered an error as the frontend is reachable. If
             # we considered it as an error the client would be unable to send
@@ -346,6 +365,7 @@ class HTTPManager(object):
         self.last_proxy_index = proxy_index + 1
         tries += 1
         last_error = 500
+        connection_error = True
       # Catch unexpected exceptions. If the error is proxy related it makes
       # sense to cycle the proxy before reraising. One error we have seen here
       # is ProxySchemeUnknown but urllib can raise many different exceptions, it
@@ -357,9 +377,10 @@ class HTTPManager(object):
         self.last_proxy_index = proxy_index + 1
         tries += 1
         last_error = 500
+        connection_error = True
 
     # We failed to connect at all here.
-    return HTTPObject(code=last_error)
+    return HTTPObject(code=last_error, connection_error=connection_error)
 
   def _RetryRequest(self, timeout=None, **request_args):
     """Retry the request a few times before we determine it failed.
@@ -479,6 +500,163 @@ class Timer(object):
                           max(self.poll_min, self.sleep_time) * self.poll_slew)
 
 
+class AdaptiveBatchController(object):
+  """Sizes message bundles and paces POSTs based on observed server responses.
+
+  Bundle sizes are chosen so that a single POST takes about
+  TARGET_POST_DURATION seconds at the measured upload throughput: slow links
+  get small bundles which don't run into HTTP timeouts, fast links get large
+  ones which amortize the per-request overhead. Sizes are tracked in bytes on
+  the wire and converted to the (uncompressed) size drained from the output
+  queue using the observed compression ratio.
+
+  HTTP 500/502/503/504 responses mean that the frontend (or a load balancer in
+  front of it) is overloaded: the bundle size is halved and polling backs off
+  exponentially. A 406 response means that the client has to enroll first, so
+  only minimal bundles are sent until the server accepts messages again.
+  Connection errors say nothing about the server load and leave the bundle
+  size alone: retrying and slowing down polling is up to the HTTPManager.
+  """
+
+  # Desired duration of a single POST in seconds.
+  TARGET_POST_DURATION = 5.0
+
+  # Bundle sizes (in bytes on the wire) never go below this.
+  MIN_POST_SIZE = 64 * 1024
+
+  # Bundle size (in bytes on the wire) used before throughput is known.
+  INITIAL_POST_SIZE = 1024 * 1024
+
+  # Bundles grow at most by this factor from one POST to the next.
+  MAX_GROWTH_FACTOR = 2.0
+
+  # Weight of the newest sample in the throughput and compression averages.
+  SMOOTHING_FACTOR = 0.3
+
+  # Assumed best compression ratio, bounds the size of drained bundles.
+  MIN_COMPRESSION_RATIO = 0.05
+
+  # First poll delay (in seconds) after the server pushed back.
+  MIN_POLL_BACKOFF = 1.0
+
+  BACKPRESSURE_CODES = frozenset([500, 502, 503, 504])
+
+  def __init__(self, max_post_size=None, max_poll_backoff=None):
+    """Constructor.
+
+    Args:
+      max_post_size: Maximum POST size in bytes. Defaults to config
+        Client.max_post_size.
+      max_poll_backoff: Maximum poll delay in seconds after the server pushed
+        back. Defaults to config Client.error_poll_min.
+    """
+    if max_post_size is None:
+      max_post_size = config.CONFIG["Client.max_post_size"]
+    if max_poll_backoff is None:
+      max_poll_backoff = config.CONFIG["Client.error_poll_min"]
+
+    self.max_post_size = max_post_size
+    self.max_poll_backoff = max_poll_backoff
+
+    self.post_size = self._ClampPostSize(self.INITIAL_POST_SIZE)
+    self.compression_ratio = 1.0
+    # Upload throughput in bytes per second, None until first measured.
+    self.throughput = None
+    # Extra delay in seconds before the next poll.
+    self.poll_backoff = 0.0
+    # True if the last POST left messages in the output queue.
+    self.backlogged = False
+
+    self.num_posts = 0
+    self.num_backpressure_responses = 0
+    self.num_enrollment_responses = 0
+
+  def _ClampPostSize(self, size):
+    return int(max(min(self.MIN_POST_SIZE, self.max_post_size),
+                   min(self.max_post_size, size)))
+
+  def _Smooth(self, average, sample):
+    if average is None:
+      return sample
+    return (self.SMOOTHING_FACTOR * sample +
+            (1 - self.SMOOTHING_FACTOR) * average)
+
+  def DrainSize(self):
+    """Returns how many bytes to drain from the output queue for a POST."""
+    return int(self.post_size / self.compression_ratio)
+
+  def RecordResponse(self,
+                     code,
+                     sent_bytes,
+                     duration,
+                     bundle_full,
+                     connection_error=False):
+    """Updates the estimates after a POST.
+
+    Args:
+      code: The HTTP status code of the response.
+      sent_bytes: The number of bytes sent in the POST.
+      duration: The time the POST took in seconds.
+      bundle_full: True if the size of the sent bundle was limited by
+        DrainSize(), i.e. more messages were left in the output queue.
+      connection_error: True if the server could not be reached, in which case
+        the code does not come from an HTTP response.
+    """
+    if connection_error:
+      # Don't post back-to-back while the server can't be reached.
+      self.backlogged = False
+      return
+
+    self.num_posts += 1
+
+    if code == 200:
+      self.poll_backoff = 0.0
+      self.backlogged = bundle_full
+
+      # Only full bundles tell us anything about compression and throughput,
+      # small ones are dominated by the request latency.
+      if bundle_full and sent_bytes:
+        ratio = sent_bytes / self.DrainSize()
+        ratio = max(self.MIN_COMPRESSION_RATIO, min(1.0, ratio))
+        self.compression_ratio = self._Smooth(self.compression_ratio, ratio)
+
+        if duration > 0:
+          self.throughput = self._Smooth(self.throughput,
+                                         sent_bytes / duration)
+
+      if self.throughput is not None:
+        self.post_size = self._ClampPostSize(
+            min(self.throughput * self.TARGET_POST_DURATION,
+                self.post_size * self.MAX_GROWTH_FACTOR))
+
+    elif code == 406:
+      self.num_enrollment_responses += 1
+      self.backlogged = False
+      self.post_size = self._ClampPostSize(self.MIN_POST_SIZE)
+
+    elif code in self.BACKPRESSURE_CODES:
+      self.num_backpressure_responses += 1
+      self.backlogged = False
+      self.post_size = self._ClampPostSize(self.post_size / 2)
+      self.poll_backoff = min(self.max_poll_backoff,
+                              max(self.MIN_POLL_BACKOFF, self.poll_backoff * 2))
+
+    else:
+      self.backlogged = False
+
+  def GetStats(self):
+    """Returns the current state as a `ClientCommsStats` instance."""
+    return rdf_client_stats.ClientCommsStats(
+        post_size=self.post_size,
+        drain_size=self.DrainSize(),
+        compression_ratio=self.compression_ratio,
+        throughput=self.throughput or 0,
+        poll_backoff=self.poll_backoff,
+        num_posts=self.num_posts,
+        num_backpressure_responses=self.num_backpressure_responses,
+        num_enrollment_responses=self.num_enrollment_responses)
+
+
 class GRRClientWorker(threading.Thread):
   """This client worker runs the main loop in another thread.
 
@@ -933,7 +1111,8 @@ class GRRHTTPClient(object):
   server messages.
 
   The client then creates a HTTPManager() instance to control communication with
-  the front end over HTTP, and a Timer() instance to control polling policy.
+  the front end over HTTP, a Timer() instance to control polling policy and an
+  AdaptiveBatchController() instance to control the size of POST requests.
 
   The HTTP client simply reads pending messages from the client worker queues
   and makes POST requests to the server. The POST request may return the
@@ -982,6 +1161,9 @@ class GRRHTTPClient(object):
     # This controls our polling frequency.
     self.timer = Timer()
 
+    # This controls how much data we send in a single request.
+    self.batch_controller = AdaptiveBatchController()
+
     # The time we last sent an enrollment request. Enrollment requests are
     # throttled especially to a maximum of one every 10 minutes.
     self.last_enrollment_time = 0
@@ -1104,9 +1286,14 @@ class GRRHTTPClient(object):
     if self.http_manager.consecutive_connection_errors == 0:
       # Grab some messages to send
       message_list = self.client_worker.Drain(
-          max_size=config.CONFIG["Client.max_post_size"])
+          max_size=self.batch_controller.DrainSize())
+      # If messages are left behind, the bundle size was limited by the batch
+      # controller.
+      bundle_full = (
+          bool(message_list.job) and self.client_worker.OutQueueSize() > 0)
     else:
       message_list = rdf_flows.MessageList()
+      bundle_full = False
 
     # If any outbound messages require fast poll we switch to fast poll mode.
     for message in message_list.job:
@@ -1132,6 +1319,12 @@ class GRRHTTPClient(object):
     nonce = self.communicator.EncodeMessages(message_list, payload)
     payload_data = payload.SerializeToBytes()
     response = self.MakeRequest(payload_data)
+    self.batch_controller.RecordResponse(
+        response.code,
+        sent_bytes=len(payload_data),
+        duration=response.duration,
+        bundle_full=bundle_full,
+        connection_error=response.connection_error)
 
     # Unable to decode response or response not valid.
     if response.code != 200 or response.messages is None:
@@ -1273,9 +1466,19 @@ class GRRHTTPClient(object):
         # And done for now.
         sys.exit(-1)
 
-      self.timer.Wait()
+      self.Wait()
       self.client_worker.Heartbeat()
 
+  def Wait(self):
+    """Waits until the next request should be made."""
+    if self.batch_controller.poll_backoff:
+      # The server is overloaded, give it some extra time to recover.
+      self.http_manager.Wait(self.batch_controller.poll_backoff)
+
+    # If there is more data waiting to be sent we do so right away.
+    if not self.batch_controller.backlogged:
+      self.timer.Wait()
+
   def InitiateEnrolment(self):
     """Initiate the enrollment process.
 
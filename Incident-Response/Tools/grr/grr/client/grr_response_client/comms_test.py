@@ -9,6 +9,7 @@ import time
 from unittest import mock
 
 from absl import app
+from absl.testing import absltest
 import requests
 
 from grr_response_client import comms
@@ -243,6 +244,29 @@ class HTTPManagerTest(test_lib.GRRBaseTest):
 
     self.assertEqual(result.data, "Good")
 
+  def testConnectionErrorIsNotAnHTTPError(self):
+    instrumentor = RequestsInstrumentor()
+    instrumentor.responses = [requests.ConnectionError("Error", response=None)]
+    instrumentor.responses *= 9
+
+    manager = MockHTTPManager()
+    with instrumentor.instrument():
+      result = manager.OpenServerEndpoint("control")
+
+    self.assertFalse(result.Success())
+    self.assertTrue(result.connection_error)
+
+  def testServerErrorIsAnHTTPError(self):
+    instrumentor = RequestsInstrumentor()
+    instrumentor.responses = [_make_http_response(code=503)] * 9
+
+    manager = MockHTTPManager()
+    with instrumentor.instrument():
+      result = manager.OpenServerEndpoint("control")
+
+    self.assertEqual(result.code, 503)
+    self.assertFalse(result.connection_error)
+
 
 class SizeLimitedQueueTest(test_lib.GRRBaseTest):
 
@@ -371,6 +395,145 @@ class GRRClientWorkerTest(test_lib.GRRBaseTest):
     self.assertEqual(messages[0].payload, rdfvalue.RDFDatetime(0))
 
 
+class AdaptiveBatchControllerTest(absltest.TestCase):
+  """Tests the AdaptiveBatchController class."""
+
+  MB = 1024 * 1024
+
+  def _MakeController(self):
+    return comms.AdaptiveBatchController(
+        max_post_size=64 * self.MB, max_poll_backoff=60)
+
+  def testStartsWithInitialPostSize(self):
+    controller = self._MakeController()
+    self.assertEqual(controller.post_size,
+                     comms.AdaptiveBatchController.INITIAL_POST_SIZE)
+    self.assertEqual(controller.DrainSize(), controller.post_size)
+    self.assertFalse(controller.backlogged)
+
+  def testPostSizeIsLimitedByMaxPostSize(self):
+    controller = comms.AdaptiveBatchController(
+        max_post_size=1000, max_poll_backoff=60)
+    self.assertEqual(controller.post_size, 1000)
+
+    controller.RecordResponse(
+        200, sent_bytes=1000, duration=0.001, bundle_full=True)
+    self.assertEqual(controller.post_size, 1000)
+
+  def testPostSizeGrowsOnFastLinks(self):
+    controller = self._MakeController()
+
+    post_sizes = []
+    for _ in range(10):
+      controller.RecordResponse(
+          200, sent_bytes=controller.post_size, duration=0.1, bundle_full=True)
+      post_sizes.append(controller.post_size)
+
+    # The size at most doubles with every request and is capped at
+    # max_post_size.
+    self.assertEqual(post_sizes[:6],
+                     [2 * self.MB, 4 * self.MB, 8 * self.MB, 16 * self.MB,
+                      32 * self.MB, 64 * self.MB])
+    self.assertEqual(post_sizes[-1], 64 * self.MB)
+    self.assertTrue(controller.backlogged)
+
+  def testPostSizeFollowsThroughputOnSlowLinks(self):
+    controller = self._MakeController()
+
+    # 128 KiB per second.
+    for _ in range(20):
+      controller.RecordResponse(
+          200,
+          sent_bytes=controller.post_size,
+          duration=controller.post_size / (128 * 1024),
+          bundle_full=True)
+
+    target = 128 * 1024 * comms.AdaptiveBatchController.TARGET_POST_DURATION
+    self.assertAlmostEqual(controller.post_size, target, delta=1024)
+
+  def testSmallBundlesDoNotAffectEstimates(self):
+    controller = self._MakeController()
+
+    controller.RecordResponse(200, sent_bytes=10, duration=1, bundle_full=False)
+
+    self.assertIsNone(controller.throughput)
+    self.assertEqual(controller.compression_ratio, 1.0)
+    self.assertEqual(controller.post_size,
+                     comms.AdaptiveBatchController.INITIAL_POST_SIZE)
+    self.assertFalse(controller.backlogged)
+
+  def testDrainSizeAccountsForCompression(self):
+    controller = self._MakeController()
+
+    for _ in range(20):
+      drain_size = controller.DrainSize()
+      controller.RecordResponse(
+          200, sent_bytes=drain_size // 4, duration=100, bundle_full=True)
+
+    self.assertAlmostEqual(controller.compression_ratio, 0.25, places=2)
+    self.assertAlmostEqual(
+        controller.DrainSize() / controller.post_size, 4, delta=0.1)
+
+  def testBackpressureShrinksPostSizeAndBacksOff(self):
+    controller = self._MakeController()
+    initial_post_size = controller.post_size
+
+    backoffs = []
+    for _ in range(8):
+      controller.RecordResponse(503, sent_bytes=10, duration=0,
+                                bundle_full=True)
+      backoffs.append(controller.poll_backoff)
+
+    self.assertEqual(backoffs, [1, 2, 4, 8, 16, 32, 60, 60])
+    self.assertEqual(controller.post_size,
+                     comms.AdaptiveBatchController.MIN_POST_SIZE)
+    self.assertLess(controller.post_size, initial_post_size)
+    self.assertEqual(controller.num_backpressure_responses, 8)
+    self.assertFalse(controller.backlogged)
+
+    controller.RecordResponse(200, sent_bytes=10, duration=1, bundle_full=False)
+    self.assertEqual(controller.poll_backoff, 0)
+
+  def testConnectionErrorsDoNotShrinkPostSize(self):
+    controller = self._MakeController()
+    controller.RecordResponse(
+        200, sent_bytes=10, duration=1, bundle_full=True)
+    post_size = controller.post_size
+    self.assertTrue(controller.backlogged)
+
+    controller.RecordResponse(
+        500, sent_bytes=10, duration=0, bundle_full=True,
+        connection_error=True)
+
+    self.assertEqual(controller.post_size, post_size)
+    self.assertEqual(controller.poll_backoff, 0)
+    self.assertEqual(controller.num_backpressure_responses, 0)
+    self.assertFalse(controller.backlogged)
+
+  def testEnrollmentResetsPostSize(self):
+    controller = self._MakeController()
+
+    controller.RecordResponse(406, sent_bytes=10, duration=0, bundle_full=True)
+
+    self.assertEqual(controller.post_size,
+                     comms.AdaptiveBatchController.MIN_POST_SIZE)
+    self.assertEqual(controller.poll_backoff, 0)
+    self.assertEqual(controller.num_enrollment_responses, 1)
+
+  def testGetStats(self):
+    controller = self._MakeController()
+    controller.RecordResponse(
+        200, sent_bytes=controller.post_size // 2, duration=1, bundle_full=True)
+
+    stats = controller.GetStats()
+    self.assertEqual(stats.post_size, controller.post_size)
+    self.assertEqual(stats.drain_size, controller.DrainSize())
+    self.assertAlmostEqual(stats.compression_ratio,
+                           controller.compression_ratio)
+    self.assertAlmostEqual(stats.throughput, controller.throughput)
+    self.assertEqual(stats.num_posts, 1)
+
+
 def main(argv):
   test_lib.main(argv)
 
@@ -13,6 +13,12 @@ config_lib.DEFINE_list("Artifacts.artifact_dirs", [
     "%(grr_response_core/artifacts/local@grr-response-core|resource)"
 ], "A list directories to load artifacts from.")
 
+config_lib.DEFINE_string(
+    "Artifacts.registry_cache_path", "",
+    "If set, validated artifacts are cached in this file, so that server "
+    "processes don't parse and validate the artifact definitions on startup "
+    "when neither the artifact files nor the datastore artifacts changed.")
+
 config_lib.DEFINE_list(
     "Artifacts.knowledge_base", [
         "LinuxReleaseInfo",
@@ -6,6 +6,7 @@ from __future__ import division
 from __future__ import unicode_literals
 
 from grr_response_core.lib import config_lib
+from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import config as rdf_config
 
 # The Admin UI web application.
@@ -119,6 +120,15 @@ config_lib.DEFINE_bool(
     "support will automatically set client rate to 0 in FileFinder hunts "
     "matching certain criteria (no recursive globs, no file downloads, etc).")
 
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration,
+    "AdminUI.client_index_cache_refresh_interval",
+    default=None,
+    help="If set, client searches are answered from an in-memory copy of the "
+    "client keyword index that is reread from the database at this interval. "
+    "Keyword changes made by other processes show up only after a refresh. "
+    "Examples: 30s, 5m.")
+
 # Temporary option that allows limiting access to legacy UI renderers. Useful
 # when giving access to GRR AdminUI to parties that have to use the HTTP API
 # only.
@@ -135,6 +135,16 @@ config_lib.DEFINE_integer(
     "Maximum time messages remain valid within the "
     "system.")
 
+config_lib.DEFINE_integer(
+    "Frontend.blob_ingestion_threads", 4,
+    "Number of threads decompressing and hashing blobs received from clients. "
+    "If 0, blobs are processed on the thread that received them.")
+
+config_lib.DEFINE_integer(
+    "Frontend.blob_ingestion_concurrent_writes", 4,
+    "Maximum number of blob store writes of received blobs running at the same "
+    "time. Blobs received while all writes are busy are written together.")
+
 config_lib.DEFINE_bool(
     "Server.initialized", False, "True once config_updater initialize has been "
     "run at least once.")
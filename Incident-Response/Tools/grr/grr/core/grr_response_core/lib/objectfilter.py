@@ -84,6 +84,13 @@ filter is easy. Three basic filter implementations are given:
   attribute name, so that it only accesses attributes, not methods.
   DictFilterImplementation: search path expansion is done on dictionary access
   to the given object. So "a.b" expands the object obj to obj["a"]["b"]
+
+Filtering large collections with Matches walks the filter tree and splits and
+resolves every search path again for each object. Filter(objects) instead
+compiles the filter once into a plan: a single predicate in which nested AND
+and OR filters are flattened, clauses are evaluated in the order most likely
+to short-circuit and search paths are turned into expansion functions with the
+attribute names already resolved. The plan gives the same results as Matches.
 """
 
 from __future__ import absolute_import
@@ -142,14 +149,31 @@ class Filter(metaclass=abc.ABCMeta):
             "%s is not a valid value expander" % (self.value_expander_cls))
       self.value_expander = self.value_expander_cls()
     self.args = arguments or []
+    self._plan = None
 
   @abc.abstractmethod
   def Matches(self, obj):
     """Whether object obj matches this filter."""
 
+  def CompilePlan(self):
+    """Compiles this filter into a predicate equivalent to Matches.
+
+    Filters that don't know how to compile themselves fall back to Matches.
+
+    Returns:
+      A callable taking an object and returning whether it matches the filter.
+    """
+    return self.Matches
+
+  def EstimateCost(self):
+    """Returns a rough relative cost of evaluating this filter on an object."""
+    return 10
+
   def Filter(self, objects):
     """Returns a list of objects that pass the filter."""
-    return list(filter(self.Matches, objects))
+    if self._plan is None:
+      self._plan = self.CompilePlan()
+    return list(filter(self._plan, objects))
 
   def __str__(self) -> Text:
     return "%s(%s)" % (self.__class__.__name__, ", ".join(
@@ -168,6 +192,17 @@ class AndFilter(Filter):
         return False
     return True
 
+  def EstimateCost(self):
+    return sum(child_filter.EstimateCost() for child_filter in self.args)
+
+  def CompilePlan(self):
+    child_filters = _FlattenFilters(self.args, AndFilter)
+    if not child_filters:
+      return _MatchAll
+    if len(child_filters) == 1:
+      return child_filters[0].CompilePlan()
+    return ShortCircuitPlan(child_filters).AllMatch
+
 
 class OrFilter(Filter):
   """Performs a boolean OR of the given Filter instances as arguments.
@@ -183,6 +218,104 @@ class OrFilter(Filter):
         return True
     return False
 
+  def EstimateCost(self):
+    return sum(child_filter.EstimateCost() for child_filter in self.args)
+
+  def CompilePlan(self):
+    child_filters = _FlattenFilters(self.args, OrFilter)
+    if not child_filters:
+      return _MatchAll
+    if len(child_filters) == 1:
+      return child_filters[0].CompilePlan()
+    return ShortCircuitPlan(child_filters).AnyMatches
+
+
+def _MatchAll(_):
+  return True
+
+
+class ShortCircuitPlan(object):
+  """Evaluates clauses in the order most likely to short-circuit early.
+
+  Filters have no side effects, so the clauses of AND and OR filters can be
+  evaluated in any order. Clauses start ordered by their estimated cost. Every
+  REORDER_INTERVAL objects they are reordered by their estimated cost divided
+  by the rate at which they short-circuited the evaluation so far, so that
+  cheap clauses rejecting most objects of an AND filter (or accepting most
+  objects of an OR filter) go first.
+  """
+
+  REORDER_INTERVAL = 1024
+
+  def __init__(self, filters):
+    self._costs = [child_filter.EstimateCost() for child_filter in filters]
+    self._num_evaluated = [0] * len(filters)
+    self._num_short_circuits = [0] * len(filters)
+    self._num_calls = 0
+    self._order = [(i, child_filter.CompilePlan())
+                   for i, child_filter in enumerate(filters)]
+
+  def _Reorder(self):
+
+    def Rank(clause):
+      i, _ = clause
+      return (self._costs[i] * (self._num_evaluated[i] + 1) /
+              (self._num_short_circuits[i] + 1))
+
+    self._order = sorted(self._order, key=Rank)
+
+  def AllMatch(self, obj):
+    """Whether obj matches all the clauses."""
+    self._num_calls += 1
+    if self._num_calls % self.REORDER_INTERVAL == 0:
+      self._Reorder()
+
+    for i, plan in self._order:
+      self._num_evaluated[i] += 1
+      if not plan(obj):
+        self._num_short_circuits[i] += 1
+        return False
+    return True
+
+  def AnyMatches(self, obj):
+    """Whether obj matches at least one of the clauses."""
+    self._num_calls += 1
+    if self._num_calls % self.REORDER_INTERVAL == 0:
+      self._Reorder()
+
+    for i, plan in self._order:
+      self._num_evaluated[i] += 1
+      if plan(obj):
+        self._num_short_circuits[i] += 1
+        return True
+    return False
+
+
+def _FlattenFilters(filters, filter_cls):
+  """Inlines nested filter_cls filters and orders the result by cost.
+
+  Only filters of exactly filter_cls are inlined, since subclasses may change
+  the way their arguments are combined. Nested filters without arguments match
+  everything, so they are kept as they are.
+
+  Args:
+    filters: A list of filters combined by filter_cls.
+    filter_cls: AndFilter or OrFilter.
+
+  Returns:
+    A list of filters, cheapest first, with the same meaning when combined by
+    filter_cls.
+  """
+  flattened = []
+  for child_filter in filters:
+    if child_filter.__class__ is filter_cls and child_filter.args:
+      flattened.extend(_FlattenFilters(child_filter.args, filter_cls))
+    else:
+      flattened.append(child_filter)
+
+  # Sorting is stable, so clauses of the same cost keep their order.
+  return sorted(flattened, key=lambda child_filter: child_filter.EstimateCost())
+
 
 class Operator(Filter):
   """Base class for all operators."""
@@ -193,6 +326,12 @@ class IdentityFilter(Operator):
   def Matches(self, _):
     return True
 
+  def EstimateCost(self):
+    return 0
+
+  def CompilePlan(self):
+    return _MatchAll
+
 
 class UnaryOperator(Operator):
   """Base class for unary operators."""
@@ -228,6 +367,9 @@ class BinaryOperator(Operator):
 class GenericBinaryOperator(BinaryOperator):
   """Allows easy implementations of operators."""
 
+  # Relative cost of a single Operation call.
+  OPERATION_COST = 1
+
   def Operation(self, x, y):
     """Performs the operation between two values."""
 
@@ -250,6 +392,36 @@ class GenericBinaryOperator(BinaryOperator):
       return True
     return False
 
+  def EstimateCost(self):
+    return _PathLength(self.left_operand) + self.OPERATION_COST
+
+  def CompilePlan(self):
+    expand = self.value_expander.CompileExpansion(self.left_operand)
+    if type(self).Operate is not GenericBinaryOperator.Operate:
+      operate = self.Operate
+      return lambda obj: operate(expand(obj))
+
+    operation = self.Operation
+    right_operand = self.right_operand
+
+    # Same as Operate(expand(obj)), without the extra call per object.
+    def Matches(obj):
+      for val in expand(obj):
+        try:
+          if operation(val, right_operand):
+            return True
+        except (ValueError, TypeError):
+          continue
+      return False
+
+    return Matches
+
+
+def _PathLength(path):
+  if isinstance(path, str):
+    return path.count(ValueExpander.FIELD_SEPARATOR) + 1
+  return len(path)
+
 
 class Equals(GenericBinaryOperator):
   """Matches objects when the right operand equals the expanded value."""
@@ -261,10 +433,13 @@ class Equals(GenericBinaryOperator):
 class NotEquals(GenericBinaryOperator):
   """Matches when the right operand isn't equal to the expanded value."""
 
+  def __init__(self, *children, **kwargs):
+    super().__init__(*children, **kwargs)
+    self._equals = Equals(
+        arguments=self.args, value_expander=self.value_expander_cls)
+
   def Operate(self, values):
-    return not Equals(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+    return not self._equals.Operate(values)
 
 
 class Less(GenericBinaryOperator):
@@ -310,16 +485,21 @@ class Contains(GenericBinaryOperator):
 class NotContains(GenericBinaryOperator):
   """Whether the right operand is not contained in the values."""
 
+  def __init__(self, *children, **kwargs):
+    super().__init__(*children, **kwargs)
+    self._contains = Contains(
+        arguments=self.args, value_expander=self.value_expander_cls)
+
   def Operate(self, values):
-    return not Contains(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+    return not self._contains.Operate(values)
 
 
 # TODO(user): Change to an N-ary Operator?
 class InSet(GenericBinaryOperator):
   """Whether all values are contained within the right operand."""
 
+  OPERATION_COST = 2
+
   def Operation(self, x, y):
     """Whether x is fully contained in y."""
     if x in y:
@@ -342,15 +522,22 @@ class InSet(GenericBinaryOperator):
 class NotInSet(GenericBinaryOperator):
   """Whether at least a value is not present in the right operand."""
 
+  OPERATION_COST = InSet.OPERATION_COST
+
+  def __init__(self, *children, **kwargs):
+    super().__init__(*children, **kwargs)
+    self._inset = InSet(
+        arguments=self.args, value_expander=self.value_expander_cls)
+
   def Operate(self, values):
-    return not InSet(
-        arguments=self.args,
-        value_expander=self.value_expander_cls).Operate(values)
+    return not self._inset.Operate(values)
 
 
 class Regexp(GenericBinaryOperator):
   """Whether the value matches the regexp in the right operand."""
 
+  OPERATION_COST = 4
+
   def __init__(self, *children, **kwargs):
     super().__init__(*children, **kwargs)
     try:
@@ -441,6 +628,23 @@ class Context(Operator):
           return True
     return False
 
+  def EstimateCost(self):
+    # The condition is usually evaluated on several sub objects.
+    return _PathLength(self.context) + 4 * self.condition.EstimateCost()
+
+  def CompilePlan(self):
+    expand = self.value_expander.CompileExpansion(self.context)
+    condition = self.condition.CompilePlan()
+
+    def Matches(obj):
+      for object_list in expand(obj):
+        for sub_object in object_list:
+          if condition(sub_object):
+            return True
+      return False
+
+    return Matches
+
 
 OP2FN = {
     "equals": Equals,
@@ -548,6 +752,86 @@ class ValueExpander(object):
       for value in self._AtNonLeaf(attr_value, path):
         yield value
 
+  def CompileExpansion(self, path):
+    """Returns a function expanding the given path on objects.
+
+    Calling the returned function on an object is equivalent to calling
+    Expand(obj, path), but the path is split and the attribute names for every
+    level are resolved only once.
+
+    Args:
+      path: A list of strings or a string separated by FIELD_SEPARATOR.
+
+    Returns:
+      A callable taking an object and returning an iterator over the values.
+    """
+    if isinstance(path, str):
+      path = path.split(self.FIELD_SEPARATOR)
+    path = list(path)
+
+    cls = type(self)
+    if (cls.Expand is not ValueExpander.Expand or
+        cls._AtNonLeaf is not ValueExpander._AtNonLeaf):
+      # Expanders changing how paths are traversed get the generic version.
+      return lambda obj: self.Expand(obj, path)
+
+    attr_names = [self._GetAttributeName(path[i:]) for i in range(len(path))]
+    leaf_index = len(path) - 1
+    get_value = self._GetValue
+    at_leaf = self._AtLeaf
+
+    if leaf_index == 0 and cls._AtLeaf is ValueExpander._AtLeaf:
+      # The most common case, a single attribute, doesn't need generators.
+      attr_name = attr_names[0]
+
+      def ExpandAttribute(obj):
+        attr_value = get_value(obj, attr_name)
+        if attr_value is None:
+          return ()
+        if isinstance(attr_value, collections.Mapping):
+          return [{k: v} for k, v in attr_value.items()]
+        return (attr_value,)
+
+      return ExpandAttribute
+
+    # Both functions mirror Expand and _AtNonLeaf, for the path starting at
+    # index i.
+    def ExpandFrom(obj, i):
+      attr_value = get_value(obj, attr_names[i])
+      if attr_value is None:
+        return
+
+      if i == leaf_index:
+        for value in at_leaf(attr_value):
+          yield value
+      else:
+        for value in AtNonLeaf(attr_value, i):
+          yield value
+
+    def AtNonLeaf(attr_value, i):
+      try:
+        if isinstance(attr_value, collections.Mapping):
+          sub_obj = attr_value.get(path[i + 1])
+          if leaf_index - i > 1:
+            sub_obj = ExpandFrom(sub_obj, i + 2)
+          if isinstance(sub_obj, str):
+            yield sub_obj
+          elif isinstance(sub_obj, collections.Mapping):
+            for k, v in sub_obj.items():
+              yield {k: v}
+          else:
+            for value in sub_obj:
+              yield value
+        else:
+          for sub_obj in attr_value:
+            for value in ExpandFrom(sub_obj, i + 1):
+              yield value
+      except TypeError:
+        for value in ExpandFrom(attr_value, i + 1):
+          yield value
+
+    return lambda obj: ExpandFrom(obj, 0)
+
 
 class AttributeValueExpander(ValueExpander):
   """An expander that gives values based on object attribute names."""
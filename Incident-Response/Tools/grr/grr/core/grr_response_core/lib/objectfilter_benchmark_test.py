@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""Benchmarks for objectfilter over large collections of results."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import random
+
+from absl import app
+
+from grr_response_core.lib import objectfilter
+from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import client_network as rdf_client_network
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class ObjectFilterBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares per-object Matches calls with compiled filter plans."""
+
+  REPEATS = 3
+  units = "s"
+
+  NUM_OBJECTS = 20000
+
+  STAT_ENTRY_QUERIES = [
+      "st_uid isnot 0 and st_size > 1024",
+      "(st_size > 1024 and st_mode inset [33188, 33261]) and "
+      "pathspec.path regexp '^/etc/'",
+  ]
+
+  PROCESS_QUERIES = [
+      "name inset ['sshd', 'xinetd', 'telnetd'] and username isnot 'root'",
+      "@connections(state is 'LISTEN' and local_address.port < 1024)",
+  ]
+
+  def setUp(self):
+    super().setUp()
+
+    rand = random.Random(0)
+    dirs = ["/etc", "/usr/bin", "/var/log", "/home/user", "/tmp"]
+    names = ["sshd", "xinetd", "cron", "bash", "python", "nginx", "telnetd"]
+    users = ["root", "user", "nobody", "www-data"]
+
+    self.stat_entries = []
+    for i in range(self.NUM_OBJECTS):
+      path = "%s/file%d" % (rand.choice(dirs), i)
+      self.stat_entries.append(
+          rdf_client_fs.StatEntry(
+              pathspec=rdf_paths.PathSpec.OS(path=path),
+              st_mode=rand.choice([16877, 33188, 33261, 41471]),
+              st_uid=rand.choice([0, 0, 0, 1000]),
+              st_size=rand.randint(0, 1024 * 1024)))
+
+    self.processes = []
+    for i in range(self.NUM_OBJECTS):
+      connections = []
+      for _ in range(rand.randint(0, 3)):
+        connections.append(
+            rdf_client_network.NetworkConnection(
+                state=rand.choice(["LISTEN", "ESTABLISHED", "CLOSE_WAIT"]),
+                local_address=rdf_client_network.NetworkEndpoint(
+                    ip="0.0.0.0", port=rand.randint(1, 65535))))
+
+      name = rand.choice(names)
+      self.processes.append(
+          rdf_client.Process(
+              pid=i,
+              ppid=1,
+              name=name,
+              exe="/usr/sbin/%s" % name,
+              username=rand.choice(users),
+              connections=connections))
+
+  def _Compile(self, query):
+    parser = objectfilter.Parser(query).Parse()
+    return parser.Compile(objectfilter.LowercaseAttributeFilterImplementation)
+
+  def _MatchEach(self, query, objects):
+    filt = self._Compile(query)
+    return len([obj for obj in objects if filt.Matches(obj)])
+
+  def _FilterWithPlan(self, query, objects):
+    return len(self._Compile(query).Filter(objects))
+
+  def _Benchmark(self, queries, objects):
+    for query in queries:
+      self.TimeIt(
+          self._MatchEach,
+          name="Matches: %s" % query,
+          query=query,
+          objects=objects)
+      self.TimeIt(
+          self._FilterWithPlan,
+          name="Filter: %s" % query,
+          query=query,
+          objects=objects)
+
+  def testStatEntries(self):
+    self._Benchmark(self.STAT_ENTRY_QUERIES, self.stat_entries)
+
+  def testProcesses(self):
+    self._Benchmark(self.PROCESS_QUERIES, self.processes)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
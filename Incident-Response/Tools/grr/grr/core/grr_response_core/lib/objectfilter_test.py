@@ -527,6 +527,106 @@ class ObjectFilterTest(absltest.TestCase):
     filter_ = parser.Compile(self.filter_imp)
     self.assertEqual(filter_.Matches(obj), False)
 
+  def testCompileExpansion(self):
+    paths = [
+        "size", "Size", "mapping.string", "mapping.float", "attributes",
+        "hash.md5", "non_callable_repeated.desmond", "mapping.hashes",
+        "mapping.nested.attrs", "mapping.nested", "mapping.missing",
+        "mapping.missing.attrs", "nonexistent", "hash.mink.boo", "hash.mink",
+        "non_callable_leaf", "Callable", "Callable.a", "novalues.a"
+    ]
+    for path in paths:
+      expand = self.value_expander().CompileExpansion(path)
+      self.assertListEqual(
+          list(expand(self.file)),
+          list(self.value_expander().Expand(self.file, path)),
+          msg=path)
+
+    path = "imported_dlls.imported_functions"
+    expand = self.value_expander().CompileExpansion(path)
+    self.assertListEqual([list(value) for value in expand(self.file)],
+                         [["FindWindow", "CreateFileA"], ["RegQueryValueEx"]])
+
+  def testCompilePlan(self):
+    queries = [
+        "name is 'boot.ini'",
+        "name isnot 'boot.ini'",
+        "size < 20 and name contains 'boot'",
+        "size > 20 or name contains 'boot'",
+        "size > 20 or (name contains 'boot' and (size < 5 or size == 10))",
+        "(size == 10 and hash.md5 inset ['123abc', '456def']) and "
+        "attributes notinset ['Backup']",
+        "name regexp 'b[aeiou]+t' and mapping.string notcontains 'x'",
+        "@imported_dlls(imported_functions contains 'RegQueryValueEx' "
+        "AND num_imported_functions == 1)",
+        "@imported_dlls(imported_functions contains 'RegQueryValueEx' "
+        "AND num_imported_functions == 2)",
+        "nonexistent is 1 or mapping.nested.attrs contains 'Archive'",
+    ]
+    objs = [self.file, DummyObject("size", 10), DummyObject("name", "boot")]
+    for query in queries:
+      filter_ = objectfilter.Parser(query).Parse().Compile(self.filter_imp)
+      plan = filter_.CompilePlan()
+      for obj in objs:
+        self.assertEqual(plan(obj), filter_.Matches(obj), msg=query)
+      self.assertListEqual(
+          filter_.Filter(objs), [obj for obj in objs if filter_.Matches(obj)])
+
+  def _RecordingClause(self, evaluated, path, value):
+    """Returns an Equals filter that records its evaluations in evaluated."""
+
+    class RecordingEquals(objectfilter.Equals):
+
+      def Operate(self, values):
+        evaluated.append(self.left_operand)
+        return super().Operate(values)
+
+    return RecordingEquals([path, value], value_expander=self.value_expander)
+
+  def testCompilePlanFlattensAndOrdersClauses(self):
+    evaluated = []
+    filter_ = objectfilter.AndFilter([
+        objectfilter.AndFilter([
+            self._RecordingClause(evaluated, "non_callable_repeated.desmond",
+                                  ["brotha", "sista"]),
+            objectfilter.AndFilter(
+                [self._RecordingClause(evaluated, "size", 11)]),
+        ]),
+        self._RecordingClause(evaluated, "name", filename),
+    ])
+
+    self.assertFalse(filter_.CompilePlan()(self.file))
+    # The cheapest failing clause short-circuits the rest of the filter.
+    self.assertListEqual(evaluated, ["size"])
+
+  def testShortCircuitPlanReordersClauses(self):
+    evaluated = []
+    # The cheaper clause always passes, the other one rejects every object.
+    plan = objectfilter.ShortCircuitPlan([
+        self._RecordingClause(evaluated, "name", filename),
+        self._RecordingClause(evaluated, "mapping.string", "nope"),
+    ])
+    plan.REORDER_INTERVAL = 10
+
+    self.assertFalse(plan.AllMatch(self.file))
+    self.assertListEqual(evaluated, ["name", "mapping.string"])
+
+    for _ in range(10):
+      self.assertFalse(plan.AllMatch(self.file))
+
+    del evaluated[:]
+    self.assertFalse(plan.AllMatch(self.file))
+    self.assertListEqual(evaluated, ["mapping.string"])
+
+  def testCompilePlanWithoutArguments(self):
+    self.assertTrue(objectfilter.AndFilter().CompilePlan()(self.file))
+    self.assertTrue(objectfilter.OrFilter().CompilePlan()(self.file))
+    filter_ = objectfilter.OrFilter([
+        objectfilter.OrFilter(),
+        objectfilter.Equals(["size", 11], value_expander=self.value_expander)
+    ])
+    self.assertTrue(filter_.CompilePlan()(self.file))
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -383,6 +383,24 @@ class ArtifactDescriptor(rdf_structs.RDFProtoStruct):
   ]
 
 
+class CachedArtifact(rdf_structs.RDFProtoStruct):
+  """An artifact in the artifact registry cache."""
+
+  protobuf = artifact_pb2.CachedArtifact
+  rdf_deps = [
+      Artifact,
+  ]
+
+
+class ArtifactRegistryCache(rdf_structs.RDFProtoStruct):
+  """Validated artifacts of the artifact registry, persisted across restarts."""
+
+  protobuf = artifact_pb2.ArtifactRegistryCache
+  rdf_deps = [
+      CachedArtifact,
+  ]
+
+
 class ExpandedSource(rdf_structs.RDFProtoStruct):
   """An RDFValue representing a source and everything it depends on."""
   protobuf = artifact_pb2.ExpandedSource
@@ -85,10 +85,16 @@ class IOSample(rdf_structs.RDFProtoStruct):
         write_count=max(sample.write_count for sample in samples))
 
 
+class ClientCommsStats(rdf_structs.RDFProtoStruct):
+  """State of the client's adaptive message batching."""
+  protobuf = jobs_pb2.ClientCommsStats
+
+
 class ClientStats(rdf_structs.RDFProtoStruct):
   """A client stat object."""
   protobuf = jobs_pb2.ClientStats
   rdf_deps = [
+      ClientCommsStats,
       CpuSample,
       IOSample,
       rdfvalue.RDFDatetime,
@@ -63,6 +63,10 @@ class FileFinderContentsLiteralMatchCondition(rdf_structs.RDFProtoStruct):
   rdf_deps = [rdfvalue.RDFBytes]
 
 
+class FileFinderContentsMultiLiteralMatchCondition(rdf_structs.RDFProtoStruct):
+  protobuf = flows_pb2.FileFinderContentsMultiLiteralMatchCondition
+
+
 class FileFinderCondition(rdf_structs.RDFProtoStruct):
   """An RDF value representing file finder conditions."""
 
@@ -70,6 +74,7 @@ class FileFinderCondition(rdf_structs.RDFProtoStruct):
   rdf_deps = [
       FileFinderAccessTimeCondition,
       FileFinderContentsLiteralMatchCondition,
+      FileFinderContentsMultiLiteralMatchCondition,
       FileFinderContentsRegexMatchCondition,
       FileFinderInodeChangeTimeCondition,
       FileFinderModificationTimeCondition,
@@ -113,6 +118,13 @@ class FileFinderCondition(rdf_structs.RDFProtoStruct):
     opts = FileFinderContentsLiteralMatchCondition(**kwargs)
     return cls(condition_type=condition_type, contents_literal_match=opts)
 
+  @classmethod
+  def ContentsMultiLiteralMatch(cls, **kwargs):
+    condition_type = cls.Type.CONTENTS_MULTI_LITERAL_MATCH
+    opts = FileFinderContentsMultiLiteralMatchCondition(**kwargs)
+    return cls(
+        condition_type=condition_type, contents_multi_literal_match=opts)
+
   @classmethod
   def ContentsRegexMatch(cls, **kwargs):
     condition_type = cls.Type.CONTENTS_REGEX_MATCH
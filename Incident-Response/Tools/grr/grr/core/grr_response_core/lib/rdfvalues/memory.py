@@ -71,12 +71,12 @@ class YaraMatch(rdf_structs.RDFProtoStruct):
 
 class YaraProcessScanMatch(rdf_structs.RDFProtoStruct):
   protobuf = flows_pb2.YaraProcessScanMatch
-  rdf_deps = [rdf_client.Process, YaraMatch]
+  rdf_deps = [rdfvalue.ByteSize, rdf_client.Process, YaraMatch]
 
 
 class YaraProcessScanMiss(rdf_structs.RDFProtoStruct):
   protobuf = flows_pb2.YaraProcessScanMiss
-  rdf_deps = [rdf_client.Process]
+  rdf_deps = [rdfvalue.ByteSize, rdf_client.Process]
 
 
 class YaraProcessScanResponse(rdf_structs.RDFProtoStruct):
@@ -1149,6 +1149,39 @@ class StreamingTarGenerator(object):
 
     return self._stream.GetValueAndReset()
 
+  def WriteHardLink(self, arcname=None, target_arcname=None, st=None):
+    """Writes a hard link pointing to an already written archive member.
+
+    Args:
+      arcname: The name of the link in the archive.
+      target_arcname: The name of the archive member the link points to.
+      st: A stat object to be used for setting headers.
+
+    Returns:
+      Chunk of binary data.
+
+    Raises:
+      ValueError: If st is omitted.
+    """
+    precondition.AssertType(arcname, Text)
+    precondition.AssertType(target_arcname, Text)
+
+    if st is None:
+      raise ValueError("Stat object can't be None.")
+
+    info = self._tar_fd.tarinfo()
+    info.tarfile = self._tar_fd
+    info.type = tarfile.LNKTYPE
+    info.name = arcname
+    info.linkname = target_arcname
+    info.size = 0
+    info.mode = st.st_mode
+    info.mtime = st.st_mtime or time.time()
+
+    self._tar_fd.addfile(info)
+
+    return self._stream.GetValueAndReset()
+
   def WriteFileChunk(self, chunk):
     """Writes file chunk."""
 
@@ -1,10 +1,12 @@
 #!/usr/bin/env python
 """Central registry for artifacts."""
 
+import hashlib
 import io
 import logging
 import os
 import threading
+import time
 
 from grr_response_core import config
 from grr_response_core.lib import artifact_utils
@@ -91,16 +93,137 @@ class ArtifactRegistrySources(object):
                       dirpath, error)
 
 
+class ArtifactRegistryCacheFile(object):
+  """A file holding an rdf_artifacts.ArtifactRegistryCache.
+
+  The file is shared by all server processes, so it is replaced atomically.
+  """
+
+  def __init__(self, path):
+    self.path = path
+
+  def Read(self):
+    """Returns the cached registry or None if there is no usable cache."""
+    try:
+      with io.open(self.path, mode="rb") as fd:
+        data = fd.read()
+    except (IOError, OSError):
+      return None
+
+    try:
+      return rdf_artifacts.ArtifactRegistryCache.FromSerializedBytes(data)
+    except Exception as e:  # pylint: disable=broad-except
+      logging.warning("Ignoring corrupted artifact registry cache %s: %s",
+                      self.path, e)
+      return None
+
+  def Write(self, cache):
+    """Replaces the cached registry."""
+    tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+    try:
+      with io.open(tmp_path, mode="wb") as fd:
+        fd.write(cache.SerializeToBytes())
+      os.replace(tmp_path, self.path)
+    except (IOError, OSError) as e:
+      logging.warning("Failed to write artifact registry cache %s: %s",
+                      self.path, e)
+
+
+def _DigestFiles(file_paths):
+  """Returns a digest of the given artifact files and of the GRR version."""
+  hasher = hashlib.sha256()
+  hasher.update(
+      ("%s\0%d\0" % (config.CONFIG["Source.version_string"],
+                      ArtifactRegistry.CACHE_FORMAT_VERSION)).encode("utf-8"))
+
+  for file_path in file_paths:
+    try:
+      with io.open(file_path, mode="rb") as fd:
+        data = fd.read()
+    except (IOError, OSError):
+      # Missing files are skipped by the loader as well.
+      data = None
+
+    hasher.update(file_path.encode("utf-8") + b"\0")
+    if data is None:
+      hasher.update(b"-\0")
+    else:
+      hasher.update(b"%d\0" % len(data))
+      hasher.update(data)
+
+  return hasher.digest()
+
+
 class ArtifactRegistry(object):
   """A global registry of artifacts."""
 
+  # Bump when changes to artifact loading or validation make cached registries
+  # of the same GRR version stale.
+  CACHE_FORMAT_VERSION = 1
+
   def __init__(self):
     self._artifacts = {}
     self._sources = ArtifactRegistrySources()
     self._dirty = False
+    # Digest of the artifact files, if the registry cache is enabled and
+    # artifacts were loaded from all sources.
+    self._files_digest = None
+    self._cache = None
     # Field required by the utils.Synchronized annotation.
     self.lock = threading.RLock()
 
+  def _GetCacheFile(self):
+    path = config.CONFIG["Artifacts.registry_cache_path"]
+    if not path:
+      return None
+    return ArtifactRegistryCacheFile(path)
+
+  def _DigestDatastoreArtifacts(self, artifact_list):
+    """Returns a digest of the datastore artifacts and of their environment.
+
+    Datastore artifacts are validated against the artifacts that are already
+    registered, so the digest covers those as well.
+
+    Args:
+      artifact_list: Artifacts read from the datastore.
+
+    Returns:
+      A digest or None if the registry cache is not used.
+    """
+    if self._files_digest is None:
+      return None
+
+    hasher = hashlib.sha256(self._files_digest)
+    for name, artifact in sorted(self._artifacts.items()):
+      hasher.update(("%s\0%s\0" % (name, artifact.loaded_from)).encode("utf-8"))
+
+    for artifact in sorted(artifact_list, key=lambda artifact: artifact.name):
+      data = artifact.SerializeToBytes()
+      hasher.update(b"%d\0" % len(data))
+      hasher.update(data)
+
+    return hasher.digest()
+
+  def _WriteCache(self, datastore_digest):
+    """Persists the currently registered artifacts."""
+    cache_file = self._GetCacheFile()
+    if cache_file is None:
+      return
+
+    cache = rdf_artifacts.ArtifactRegistryCache(
+        files_digest=self._files_digest, datastore_digest=datastore_digest)
+    for name in sorted(self._artifacts):
+      artifact = self._artifacts[name]
+      cached_artifact = rdf_artifacts.CachedArtifact(
+          loaded_from=artifact.loaded_from, artifact=artifact)
+      if artifact.loaded_from.startswith("file:"):
+        cache.file_artifacts.Append(cached_artifact)
+      elif artifact.loaded_from.startswith("datastore:"):
+        cache.datastore_artifacts.Append(cached_artifact)
+
+    cache_file.Write(cache)
+    self._cache = cache
+
   def _LoadArtifactsFromDatastore(self):
     """Load artifacts from the data store."""
     loaded_artifacts = []
@@ -116,6 +239,19 @@ class ArtifactRegistry(object):
 
     artifact_list = data_store.REL_DB.ReadAllArtifacts()
 
+    datastore_digest = self._DigestDatastoreArtifacts(artifact_list)
+    if (datastore_digest is not None and self._cache is not None and
+        self._cache.datastore_digest == datastore_digest):
+      for cached_artifact in self._cache.datastore_artifacts:
+        artifact_value = cached_artifact.artifact
+        error_message = artifact_value.error_message
+        self.RegisterArtifact(
+            artifact_value,
+            source=cached_artifact.loaded_from,
+            overwrite_if_exists=True)
+        artifact_value.error_message = error_message
+      return
+
     for artifact_value in artifact_list:
       try:
         self.RegisterArtifact(
@@ -154,6 +290,9 @@ class ArtifactRegistry(object):
           loaded_artifacts.remove(artifact_obj)
           revalidate = True
 
+    if datastore_digest is not None:
+      self._WriteCache(datastore_digest)
+
   @utils.Synchronized
   def ArtifactsFromYaml(self, yaml_content):
     """Get a list of Artifacts from yaml."""
@@ -266,21 +405,60 @@ class ArtifactRegistry(object):
   @utils.Synchronized
   def UnregisterArtifact(self, artifact_name):
     try:
-      del self._artifacts[artifact_name]
+      artifact_obj = self._artifacts.pop(artifact_name)
     except KeyError:
       raise ValueError("Artifact %s unknown." % artifact_name)
 
+    if not artifact_obj.loaded_from.startswith("datastore"):
+      # The registry no longer matches the artifact files.
+      self._files_digest = None
+
   @utils.Synchronized
   def ClearRegistry(self):
     self._artifacts = {}
+    self._files_digest = None
     self._dirty = True
 
   def _ReloadArtifacts(self):
     """Load artifacts from all sources."""
+    start_time = time.time()
     self._artifacts = {}
-    self._LoadArtifactsFromFiles(self._sources.GetAllFiles())
+    self._files_digest = None
+    self._cache = None
+
+    # Files are loaded in a stable order, so that the cached artifacts are the
+    # same as the ones loaded from the files.
+    file_paths = sorted(set(self._sources.GetAllFiles()))
+
+    files_digest = None
+    cache = None
+    cache_file = self._GetCacheFile()
+    if cache_file is not None:
+      files_digest = _DigestFiles(file_paths)
+      cache = cache_file.Read()
+
+    if cache is not None and cache.files_digest == files_digest:
+      for cached_artifact in cache.file_artifacts:
+        self.RegisterArtifact(
+            cached_artifact.artifact,
+            source=cached_artifact.loaded_from,
+            overwrite_if_exists=True)
+      self._cache = cache
+      loaded_from_cache = True
+    else:
+      self._LoadArtifactsFromFiles(file_paths)
+      loaded_from_cache = False
+
+    # Only set once all the file artifacts are loaded and valid, so that a
+    # partially loaded registry is never cached.
+    self._files_digest = files_digest
     self.ReloadDatastoreArtifacts()
 
+    logging.info("Loaded %d artifacts in %.3f seconds%s.",
+                 len(self._artifacts),
+                 time.time() - start_time,
+                 " from %s" % cache_file.path if loaded_from_cache else "")
+
   def _UnregisterDatastoreArtifacts(self):
     """Remove artifacts that came from the datastore."""
     to_remove = []
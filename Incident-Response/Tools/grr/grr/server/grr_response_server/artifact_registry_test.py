@@ -3,6 +3,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import io
+import os
+import shutil
 from unittest import mock
 
 from absl import app
@@ -271,5 +274,105 @@ class ArtifactRegistryTest(absltest.TestCase):
     self.assertIsNotNone(registry.GetArtifact("Foo"))
 
 
+class ArtifactRegistryCacheTest(absltest.TestCase):
+
+  ARTIFACT_YAML = """
+name: {name}
+doc: Cached test artifact.
+sources:
+- type: FILE
+  attributes:
+    paths: [/etc/passwd]
+supported_os: [Linux]
+"""
+
+  def setUp(self):
+    super().setUp()
+
+    tmpdir = temp.TempDirPath()
+    self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+
+    self.artifacts_dir = os.path.join(tmpdir, "artifacts")
+    os.mkdir(self.artifacts_dir)
+    self._WriteArtifactFile("CacheTestFileArtifact")
+
+    self.cache_path = os.path.join(tmpdir, "registry.cache")
+    config_overrider = test_lib.ConfigOverrider(
+        {"Artifacts.registry_cache_path": self.cache_path})
+    config_overrider.Start()
+    self.addCleanup(config_overrider.Stop)
+
+  def _WriteArtifactFile(self, *names):
+    content = "---\n".join(
+        self.ARTIFACT_YAML.format(name=name) for name in names)
+    with io.open(
+        os.path.join(self.artifacts_dir, "test.yaml"), "w",
+        encoding="utf-8") as fd:
+      fd.write(content)
+
+  def _LoadRegistry(self):
+    registry = ar.ArtifactRegistry()
+    registry.AddDirSource(self.artifacts_dir)
+    registry.GetArtifacts()
+    return registry
+
+  def testFileArtifactsAreLoadedFromCache(self):
+    self._LoadRegistry()
+    self.assertTrue(os.path.exists(self.cache_path))
+
+    with mock.patch.object(ar, "Validate", wraps=ar.Validate) as validate:
+      registry = self._LoadRegistry()
+      validate.assert_not_called()
+
+    artifact = registry.GetArtifact("CacheTestFileArtifact")
+    self.assertEqual(artifact.loaded_from,
+                     "file:%s" % os.path.join(self.artifacts_dir, "test.yaml"))
+
+  def testChangedFilesInvalidateCache(self):
+    self._LoadRegistry()
+    self._WriteArtifactFile("CacheTestFileArtifact", "CacheTestOtherArtifact")
+
+    with mock.patch.object(ar, "Validate", wraps=ar.Validate) as validate:
+      registry = self._LoadRegistry()
+      self.assertEqual(validate.call_count, 2)
+
+    self.assertIsNotNone(registry.GetArtifact("CacheTestOtherArtifact"))
+
+  def testCorruptedCacheIsIgnored(self):
+    with io.open(self.cache_path, "wb") as fd:
+      fd.write(b"\xff" * 16)
+
+    registry = self._LoadRegistry()
+    self.assertIsNotNone(registry.GetArtifact("CacheTestFileArtifact"))
+
+  def testDatastoreArtifactsAreLoadedFromCache(self):
+    data_store.REL_DB.WriteArtifact(
+        rdf_artifacts.Artifact(
+            name="CacheTestDatastoreArtifact", doc="Datastore artifact."))
+    self._LoadRegistry()
+
+    with mock.patch.object(ar, "Validate", wraps=ar.Validate) as validate:
+      registry = self._LoadRegistry()
+      validate.assert_not_called()
+
+    artifact = registry.GetArtifact("CacheTestDatastoreArtifact")
+    self.assertEqual(artifact.loaded_from, "datastore:")
+
+  def testReloadDatastoreArtifactsUpdatesCache(self):
+    registry = self._LoadRegistry()
+
+    data_store.REL_DB.WriteArtifact(
+        rdf_artifacts.Artifact(
+            name="CacheTestNewDatastoreArtifact", doc="Datastore artifact."))
+    registry.ReloadDatastoreArtifacts()
+    self.assertIsNotNone(registry.GetArtifact("CacheTestNewDatastoreArtifact"))
+
+    with mock.patch.object(ar, "Validate", wraps=ar.Validate) as validate:
+      registry = self._LoadRegistry()
+      validate.assert_not_called()
+
+    self.assertIsNotNone(registry.GetArtifact("CacheTestNewDatastoreArtifact"))
+
+
 if __name__ == "__main__":
   app.run(test_lib.main)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""Pipelined ingestion of blobs received from clients.
+
+Blobs sent by clients (e.g. during file collection) are written to the blob
+store directly on the frontend, before the request of the client is answered.
+Decompressing and hashing them is CPU heavy: both `zlib` and `hashlib` release
+the GIL while processing big buffers, so this is done in a pool of threads.
+Up to a configured number of frontend threads write to the blob store at the
+same time. Blobs received while all of them are busy are queued and written in
+a single blob store write by whichever writer becomes free first.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from concurrent import futures
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import zlib
+
+from grr_response_core import config
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_core.stats import metrics
+from grr_response_server import blob_store
+from grr_response_server.rdfvalues import objects as rdf_objects
+
+BLOB_INGESTION_BYTES = metrics.Counter(
+    "blob_ingestion_bytes", docstring="Uncompressed bytes of ingested blobs.")
+BLOB_INGESTION_QUEUE_DEPTH = metrics.Gauge(
+    "blob_ingestion_queue_depth",
+    int,
+    docstring="Number of blobs waiting to be written to the blob store.")
+BLOB_INGESTION_BATCH_SIZE = metrics.Event(
+    "blob_ingestion_batch_size",
+    bins=[1, 2, 5, 10, 20, 50, 100, 200, 500, 1000])
+BLOB_INGESTION_LATENCY = metrics.Event(
+    "blob_ingestion_latency",
+    bins=[0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50])
+
+
+def _DecompressAndHash(
+    blob: rdf_protodict.DataBlob) -> Tuple[rdf_objects.BlobID, bytes]:
+  """Returns the blob id and uncompressed data of a blob sent by a client."""
+  data = blob.data
+
+  compression_type = rdf_protodict.DataBlob.CompressionType
+  if blob.compression == compression_type.ZCOMPRESSION:
+    data = zlib.decompress(data)
+  elif blob.compression == compression_type.UNCOMPRESSED:
+    pass
+  else:
+    raise ValueError("Unsupported compression")
+
+  return rdf_objects.BlobID.FromBlobData(data), data
+
+
+class _PendingWrite(object):
+  """Blobs of a single `Ingest` call waiting to be written."""
+
+  def __init__(self, blobs: Dict[rdf_objects.BlobID, bytes]):
+    self.blobs = blobs
+    self.done = threading.Event()
+    self.error: Optional[Exception] = None
+
+
+class BlobIngestionPipeline(object):
+  """Decompresses, hashes and writes blobs sent by clients."""
+
+  def __init__(self, num_threads: int, max_concurrent_writes: int = 1):
+    """Initializes the pipeline.
+
+    Args:
+      num_threads: Number of threads used for decompressing and hashing. If 0,
+        blobs are processed on the calling thread.
+      max_concurrent_writes: Maximum number of blob store writes running at the
+        same time.
+
+    Raises:
+      ValueError: If `max_concurrent_writes` is not positive.
+    """
+    if max_concurrent_writes < 1:
+      raise ValueError(
+          "Incorrect number of concurrent writes: %d" % max_concurrent_writes)
+
+    if num_threads > 0:
+      self._executor = futures.ThreadPoolExecutor(
+          max_workers=num_threads, thread_name_prefix="BlobIngestion")
+    else:
+      self._executor = None
+
+    # Guards the list of pending writes and the number of writers. It is never
+    # held while writing to the blob store.
+    self._lock = threading.Lock()
+    self._pending: List[Tuple[blob_store.BlobStore, _PendingWrite]] = []
+    self._max_concurrent_writes = max_concurrent_writes
+    self._num_writers = 0
+    self._num_queued_blobs = 0
+
+  def _DecompressAndHashAll(
+      self, blobs: List[rdf_protodict.DataBlob]
+  ) -> List[Tuple[rdf_objects.BlobID, bytes]]:
+    # Handing a single blob over to another thread would only add latency.
+    if self._executor is None or len(blobs) < 2:
+      return list(map(_DecompressAndHash, blobs))
+
+    return list(self._executor.map(_DecompressAndHash, blobs))
+
+  def _UpdateQueueDepth(self, delta: int) -> None:
+    with self._lock:
+      self._num_queued_blobs += delta
+      BLOB_INGESTION_QUEUE_DEPTH.SetValue(self._num_queued_blobs)
+
+  def Ingest(
+      self, bs: blob_store.BlobStore,
+      blobs: Iterable[rdf_protodict.DataBlob]) -> List[rdf_objects.BlobID]:
+    """Writes blobs sent by a client to the blob store.
+
+    Blobs are guaranteed to be written when this method returns.
+
+    Args:
+      bs: The blob store to write the blobs to.
+      blobs: DataBlobs sent by the client. Blobs without data are ignored.
+
+    Returns:
+      Ids of the written blobs.
+
+    Raises:
+      ValueError: If one of the blobs uses an unsupported compression.
+    """
+    blobs = [blob for blob in blobs if blob.data]
+    if not blobs:
+      return []
+
+    start_time = time.time()
+    self._UpdateQueueDepth(len(blobs))
+    try:
+      blob_ids_and_data = self._DecompressAndHashAll(blobs)
+      self._Write(bs, _PendingWrite(dict(blob_ids_and_data)))
+    finally:
+      self._UpdateQueueDepth(-len(blobs))
+
+    BLOB_INGESTION_BYTES.Increment(
+        sum(len(data) for _, data in blob_ids_and_data))
+    BLOB_INGESTION_LATENCY.RecordEvent(time.time() - start_time)
+
+    return [blob_id for blob_id, _ in blob_ids_and_data]
+
+  def _Write(self, bs: blob_store.BlobStore, write: _PendingWrite) -> None:
+    """Writes blobs, together with blobs of concurrent calls."""
+    with self._lock:
+      self._pending.append((bs, write))
+      is_writer = self._num_writers < self._max_concurrent_writes
+      if is_writer:
+        self._num_writers += 1
+
+    # If all writers are busy, one of them picks the blobs up when it is done
+    # with its current batch.
+    while is_writer:
+      with self._lock:
+        batch, self._pending = self._pending, []
+        if not batch:
+          self._num_writers -= 1
+          break
+
+      # Calls of different blob stores (e.g. in tests) are not coalesced.
+      for batch_bs in set(pending_bs for pending_bs, _ in batch):
+        writes = [w for pending_bs, w in batch if pending_bs is batch_bs]
+        self._WriteBatch(batch_bs, writes)
+
+    write.done.wait()
+    if write.error is not None:
+      raise write.error
+
+  def _WriteBatch(self, bs: blob_store.BlobStore,
+                  writes: List[_PendingWrite]) -> None:
+    blobs = {}
+    for write in writes:
+      blobs.update(write.blobs)
+
+    BLOB_INGESTION_BATCH_SIZE.RecordEvent(len(blobs))
+    try:
+      bs.WriteBlobs(blobs)
+      error = None
+    except Exception as e:  # pylint: disable=broad-except
+      error = e
+
+    for write in writes:
+      write.error = error
+      write.done.set()
+
+
+_pipeline: Optional[BlobIngestionPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def GetPipeline() -> BlobIngestionPipeline:
+  """Returns the blob ingestion pipeline shared by the whole process."""
+  global _pipeline
+
+  with _pipeline_lock:
+    if _pipeline is None:
+      _pipeline = BlobIngestionPipeline(
+          config.CONFIG["Frontend.blob_ingestion_threads"],
+          config.CONFIG["Frontend.blob_ingestion_concurrent_writes"])
+    return _pipeline
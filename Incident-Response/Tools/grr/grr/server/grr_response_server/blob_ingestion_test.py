@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Tests for the blob ingestion pipeline."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import threading
+from unittest import mock
+import zlib
+
+from absl import app
+from absl.testing import absltest
+
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_server import blob_ingestion
+from grr_response_server.databases import mem_blobs
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import test_lib
+
+
+class _BlockingBlobStore(mem_blobs.InMemoryBlobStore):
+  """Blob store that blocks the first write until it is released."""
+
+  def __init__(self):
+    super().__init__()
+    self.write_started = threading.Event()
+    self.release_write = threading.Event()
+    self.writes = []
+    self.error = None
+
+  def WriteBlobs(self, blob_id_data_map):
+    self.writes.append(dict(blob_id_data_map))
+    self.write_started.set()
+    self.release_write.wait()
+
+    if self.error is not None:
+      raise self.error
+    super().WriteBlobs(blob_id_data_map)
+
+
+def _Blob(data, compress=False):
+  ct = rdf_protodict.DataBlob.CompressionType
+  if compress:
+    return rdf_protodict.DataBlob(
+        data=zlib.compress(data), compression=ct.ZCOMPRESSION)
+  return rdf_protodict.DataBlob(data=data, compression=ct.UNCOMPRESSED)
+
+
+class BlobIngestionPipelineTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.pipeline = blob_ingestion.BlobIngestionPipeline(
+        num_threads=4, max_concurrent_writes=1)
+    self.blob_store = _BlockingBlobStore()
+    self.blob_store.release_write.set()
+
+  def testWritesDecompressedBlobs(self):
+    datas = [b"foo" * 1000, b"bar", b"baz" * 10]
+    blobs = [_Blob(datas[0], compress=True), _Blob(datas[1]), _Blob(datas[2])]
+
+    blob_ids = self.pipeline.Ingest(self.blob_store, blobs)
+
+    self.assertEqual(blob_ids,
+                     [rdf_objects.BlobID.FromBlobData(d) for d in datas])
+    self.assertEqual(
+        self.blob_store.ReadBlobs(blob_ids), dict(zip(blob_ids, datas)))
+    self.assertLen(self.blob_store.writes, 1)
+
+  def testIgnoresEmptyBlobs(self):
+    self.assertEmpty(self.pipeline.Ingest(self.blob_store, [_Blob(b"")]))
+    self.assertEmpty(self.blob_store.writes)
+
+  def testRaisesOnUnsupportedCompression(self):
+    # DataBlob only accepts known compression types.
+    blob = mock.Mock(data=b"foo", compression=42)
+
+    with self.assertRaises(ValueError):
+      self.pipeline.Ingest(self.blob_store, [_Blob(b"bar"), blob])
+    self.assertEmpty(self.blob_store.writes)
+
+  def testProcessesInlineWithoutThreads(self):
+    pipeline = blob_ingestion.BlobIngestionPipeline(num_threads=0)
+
+    blob_ids = pipeline.Ingest(self.blob_store, [_Blob(b"foo"), _Blob(b"bar")])
+    self.assertLen(self.blob_store.ReadBlobs(blob_ids), 2)
+
+  def _IngestConcurrently(self, num_callers):
+    self.blob_store.release_write.clear()
+    errors = [None] * num_callers
+
+    def Ingest(i):
+      try:
+        self.pipeline.Ingest(self.blob_store, [_Blob(b"blob%d" % i)])
+      except Exception as e:  # pylint: disable=broad-except
+        errors[i] = e
+
+    # The first caller blocks in the blob store, the others queue up behind it.
+    threads = [threading.Thread(target=Ingest, args=(0,))]
+    threads[0].start()
+    self.blob_store.write_started.wait()
+    for i in range(1, num_callers):
+      threads.append(threading.Thread(target=Ingest, args=(i,)))
+      threads[-1].start()
+
+    # pylint: disable=protected-access
+    while len(self.pipeline._pending) < num_callers - 1:
+      threading.Event().wait(0.001)
+    # pylint: enable=protected-access
+    self.blob_store.release_write.set()
+
+    for thread in threads:
+      thread.join()
+    return errors
+
+  def testCoalescesConcurrentWrites(self):
+    errors = self._IngestConcurrently(10)
+
+    self.assertEqual(errors, [None] * 10)
+    # The first write and a single write for all the callers queued behind it.
+    self.assertEqual([len(w) for w in self.blob_store.writes], [1, 9])
+    self.assertLen(self.blob_store.blobs, 10)
+
+  def testPropagatesWriteErrorsToAllCallersOfBatch(self):
+    self.blob_store.error = IOError("Write failed.")
+
+    errors = self._IngestConcurrently(5)
+
+    self.assertLen(self.blob_store.writes, 2)
+    for error in errors:
+      self.assertIs(error, self.blob_store.error)
+
+  def testWritesConcurrentlyUpToLimit(self):
+    pipeline = blob_ingestion.BlobIngestionPipeline(
+        num_threads=0, max_concurrent_writes=2)
+    self.blob_store.release_write.clear()
+
+    threads = [
+        threading.Thread(
+            target=pipeline.Ingest, args=(self.blob_store, [_Blob(b"blob%d" % i)
+                                                           ]))
+        for i in range(3)
+    ]
+    for thread in threads:
+      thread.start()
+
+    # Two callers write at the same time, the third one waits for a writer.
+    def NumReceivedBlobs():
+      return (sum(len(w) for w in self.blob_store.writes) +
+              len(pipeline._pending))  # pylint: disable=protected-access
+
+    while NumReceivedBlobs() < 3:
+      threading.Event().wait(0.001)
+    self.assertLen(self.blob_store.writes, 2)
+    self.blob_store.release_write.set()
+
+    for thread in threads:
+      thread.join()
+    self.assertLen(self.blob_store.blobs, 3)
+
+  def testRaisesOnIncorrectNumberOfConcurrentWrites(self):
+    with self.assertRaises(ValueError):
+      blob_ingestion.BlobIngestionPipeline(
+          num_threads=0, max_concurrent_writes=0)
+
+
+if __name__ == "__main__":
+  app.run(test_lib.main)
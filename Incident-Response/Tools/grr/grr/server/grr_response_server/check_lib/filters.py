@@ -10,6 +10,7 @@ import stat
 
 from grr_response_core.lib import objectfilter
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
 from grr_response_core.lib.parsers import config_file
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
@@ -227,13 +228,24 @@ class AttrFilter(Filter):
 class ObjectFilter(Filter):
   """An objectfilter result processor that accepts runtime parameters."""
 
+  # Compiled filters keep their query plan, so checks reuse them across runs.
+  _compiled_filters = utils.FastStore(max_size=1000)
+
   def _Compile(self, expression):
+    try:
+      return self._compiled_filters.Get(expression)
+    except KeyError:
+      pass
+
     try:
       of = objectfilter.Parser(expression).Parse()
-      return of.Compile(objectfilter.LowercaseAttributeFilterImplementation)
+      filt = of.Compile(objectfilter.LowercaseAttributeFilterImplementation)
     except objectfilter.Error as e:
       raise DefinitionError(e)
 
+    self._compiled_filters.Put(expression, filt)
+    return filt
+
   def ParseObjs(self, objs, expression):
     """Parse one or more objects using an objectfilter expression."""
     filt = self._Compile(expression)
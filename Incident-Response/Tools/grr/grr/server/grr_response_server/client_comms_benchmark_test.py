@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""Benchmarks for client message batching against a simulated frontend."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import os
+import time
+
+from absl import app
+import requests
+
+from grr_response_client import comms
+from grr_response_core import config
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
+from grr_response_server import data_store
+from grr_response_server import frontend_lib
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+from grr.test_lib import worker_mocks
+
+
+class FixedBatchController(comms.AdaptiveBatchController):
+  """Always sends bundles of Client.max_post_size, like older clients did."""
+
+  def DrainSize(self):
+    return self.max_post_size
+
+  def RecordResponse(self, code, sent_bytes, duration, bundle_full):
+    self.num_posts += 1
+
+
+class FakeFrontend(object):
+  """A frontend behind a link with limited bandwidth, on a simulated clock.
+
+  Requests whose upload takes longer than `deadline` seconds are rejected with
+  HTTP 503, like an overloaded frontend that sheds long running requests.
+  """
+
+  def __init__(self, server_communicator, bandwidth, latency, deadline=None):
+    self.server_communicator = server_communicator
+    self.bandwidth = bandwidth
+    self.latency = latency
+    self.deadline = deadline
+    self.clock = None
+    self.num_messages = 0
+
+  def Sleep(self, timeout):
+    self.clock.time += timeout
+
+  # pylint: disable=invalid-name
+  def request(self, url=None, data=None, **kwargs):
+    """Handles a single request from the client."""
+    del kwargs  # Unused.
+
+    response = requests.Response()
+    if "server.pem" in url:
+      response.status_code = 200
+      response._content = str(
+          config.CONFIG["Frontend.certificate"]).encode("ascii")
+      return response
+
+    upload_time = len(data) / self.bandwidth
+    if self.deadline is not None and upload_time > self.deadline:
+      self.clock.time += self.latency + self.deadline
+      response.status_code = 503
+      raise requests.ConnectionError("Overloaded", response=response)
+
+    self.clock.time += self.latency + upload_time
+
+    client_communication = rdf_flows.ClientCommunication.FromSerializedBytes(
+        data)
+    messages, source, timestamp = self.server_communicator.DecodeMessages(
+        client_communication)
+    self.num_messages += len(messages)
+
+    response_communication = rdf_flows.ClientCommunication()
+    self.server_communicator.EncodeMessages(
+        rdf_flows.MessageList(),
+        response_communication,
+        destination=source,
+        timestamp=timestamp,
+        api_version=client_communication.api_version)
+
+    response.status_code = 200
+    response._content = response_communication.SerializeToBytes()
+    return response
+
+  # pylint: enable=invalid-name
+
+class ClientCommsBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares fixed and adaptive message batching on different links."""
+
+  REPEATS = 1
+  units = "s"
+
+  NUM_MESSAGES = 128
+  MESSAGE_SIZE = 64 * 1024
+
+  # Upper bound of iterations of the client's main loop.
+  MAX_POLLS = 200
+
+  def setUp(self):
+    super().setUp()
+
+    config_stubber = test_lib.PreserveConfig()
+    config_stubber.Start()
+    self.addCleanup(config_stubber.Stop)
+
+    # Creating the first client generates and stores the client's key.
+    self._MakeClient(comms.AdaptiveBatchController)
+
+    certificate = self.ClientCertFromPrivateKey(
+        config.CONFIG["Client.private_key"])
+    data_store.REL_DB.WriteClientMetadata(
+        certificate.GetCN()[len("aff4:/"):],
+        certificate=certificate,
+        fleetspeak_enabled=False)
+
+    self.server_communicator = frontend_lib.ServerCommunicator(
+        certificate=config.CONFIG["Frontend.certificate"],
+        private_key=config.CONFIG["PrivateKeys.server_key"])
+
+  def _MakeClient(self, controller_cls):
+    client = comms.GRRHTTPClient(
+        ca_cert=config.CONFIG["CA.certificate"],
+        worker_cls=worker_mocks.DisabledNannyClientWorker)
+    # Disable stats collection for the benchmark.
+    client.client_worker.last_stats_sent_time = time.time() + 3600
+    client.http_manager.retry_error_limit = 2
+    client.batch_controller = controller_cls()
+    return client
+
+  def _SendBacklog(self, controller_cls, frontend):
+    """Sends a backlog of messages, returns a summary of the transfer."""
+    client = self._MakeClient(controller_cls)
+    for i in range(self.NUM_MESSAGES):
+      client.client_worker.SendReply(
+          rdf_protodict.DataBlob(data=os.urandom(self.MESSAGE_SIZE)),
+          session_id=rdfvalue.SessionID("W:session"),
+          response_id=i,
+          request_id=1)
+
+    frontend.num_messages = 0
+    with test_lib.FakeTime(rdfvalue.RDFDatetime.Now()) as clock:
+      frontend.clock = clock
+      start_time = clock.time
+
+      with utils.MultiStubber((requests, "request", frontend.request),
+                              (time, "sleep", frontend.Sleep)):
+        for _ in range(self.MAX_POLLS):
+          if frontend.num_messages >= self.NUM_MESSAGES:
+            break
+          if client.client_worker.OutQueueSize() == 0:
+            break
+
+          client.RunOnce()
+          client.Wait()
+
+      return "%.1fs simulated, %d POSTs, %d/%d messages delivered" % (
+          clock.time - start_time, client.batch_controller.num_posts,
+          frontend.num_messages, self.NUM_MESSAGES)
+
+  def _Benchmark(self, name, **frontend_args):
+    for controller_cls in [FixedBatchController, comms.AdaptiveBatchController]:
+      frontend = FakeFrontend(self.server_communicator, **frontend_args)
+      self.TimeIt(
+          self._SendBacklog,
+          name="%s (%s)" % (name, controller_cls.__name__),
+          controller_cls=controller_cls,
+          frontend=frontend)
+
+  def testFastLink(self):
+    self._Benchmark("100 MB/s", bandwidth=100 * 1024 * 1024, latency=0.001)
+
+  def testSlowLink(self):
+    self._Benchmark("1 MB/s", bandwidth=1024 * 1024, latency=0.1)
+
+  def testOverloadedFrontend(self):
+    self._Benchmark(
+        "1 MB/s, 4s deadline",
+        bandwidth=1024 * 1024,
+        latency=0.1,
+        deadline=4)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
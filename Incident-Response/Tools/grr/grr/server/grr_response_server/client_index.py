@@ -4,15 +4,264 @@
 An index of client machines, associating likely identifiers to client IDs.
 """
 
+import array
+import bisect
 import functools
+import heapq
+import logging
 import operator
-from typing import Mapping, Iterable, Sequence, Text
-
+import threading
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Text
+from typing import Tuple
+
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.util import precondition
 from grr_response_server import data_store
+from grr_response_server.databases import db_utils
 from grr_response_server.rdfvalues import objects as rdf_objects
 
+# Keywords associated with clients before this long ago are ignored, unless a
+# start_date: keyword says otherwise.
+_DEFAULT_LOOKBACK = rdfvalue.Duration.From(180, rdfvalue.DAYS)
+
+# The in-memory index used for lookups, see InitIndexCache.
+_INDEX_CACHE: Optional["ClientIndexCache"] = None
+
+
+def InitIndexCache():
+  """Enables the in-memory client index if it is configured."""
+  global _INDEX_CACHE
+
+  interval = config.CONFIG["AdminUI.client_index_cache_refresh_interval"]
+  if interval:
+    _INDEX_CACHE = ClientIndexCache(interval)
+  else:
+    _INDEX_CACHE = None
+
+
+def _Intersect(posting_lists: Sequence[array.array]) -> array.array:
+  """Intersects sorted posting lists, starting with the shortest one."""
+  posting_lists = sorted(posting_lists, key=len)
+
+  result = posting_lists[0]
+  for other in posting_lists[1:]:
+    matches = array.array("Q")
+    lo = 0
+    for value in result:
+      lo = bisect.bisect_left(other, value, lo)
+      if lo == len(other):
+        break
+      if other[lo] == value:
+        matches.append(value)
+
+    result = matches
+    if not result:
+      break
+
+  return result
+
+
+def _Union(posting_lists: Sequence[array.array]) -> array.array:
+  """Merges sorted posting lists into a single one without duplicates."""
+  result = array.array("Q")
+  for value in heapq.merge(*posting_lists):
+    if not result or result[-1] != value:
+      result.append(value)
+  return result
+
+
+class ClientIndexCache(object):
+  """An in-memory copy of the client keyword index.
+
+  Posting lists are kept as sorted arrays of integer client ids. They are many
+  times smaller than sets of client id strings and are intersected without
+  building intermediate sets.
+
+  The whole index is reread from the database once it gets older than the
+  refresh interval. Only the first load blocks lookups: later ones run in a
+  background thread while lookups keep using the previous copy. Keyword changes
+  made through ClientIndex in this process are applied to the cache right away.
+  Keywords the cache doesn't know about (e.g. ones added by other processes
+  since the last refresh) are looked up in the database.
+  """
+
+  def __init__(self, refresh_interval: rdfvalue.Duration):
+    self._refresh_interval = refresh_interval
+    self._lock = threading.RLock()
+    self._initial_load_lock = threading.Lock()
+    self._posting_lists: Dict[Text, array.array] = {}
+    self._sorted_keywords: List[Text] = []
+    self._last_refresh_time: Optional[rdfvalue.RDFDatetime] = None
+    self._refresh_thread: Optional[threading.Thread] = None
+    # Keyword changes made while the index is being reread. They are replayed
+    # on top of the reread index, which might not include them.
+    self._pending_changes: Optional[List[Tuple[bool, Text, List[Text]]]] = None
+
+  def _RefreshIfNeeded(self):
+    """Loads the index or starts rereading it if the cached one is too old."""
+    now = rdfvalue.RDFDatetime.Now()
+    with self._lock:
+      if self._last_refresh_time is not None:
+        if (self._refresh_thread is None and
+            now - self._last_refresh_time >= self._refresh_interval):
+          self._pending_changes = []
+          self._refresh_thread = threading.Thread(
+              name="ClientIndexCacheRefresh", target=self._RefreshInBackground)
+          self._refresh_thread.daemon = True
+          self._refresh_thread.start()
+        return
+
+    # There is nothing to answer lookups with yet, so they have to wait.
+    with self._initial_load_lock:
+      with self._lock:
+        if self._last_refresh_time is not None:
+          return
+        self._pending_changes = []
+
+      self._Refresh()
+
+  def _RefreshInBackground(self):
+    try:
+      self._Refresh()
+    except Exception:  # pylint: disable=broad-except
+      logging.exception("Error while refreshing the client index cache.")
+
+  def _Refresh(self):
+    """Rereads the index from the database and swaps it in."""
+    now = rdfvalue.RDFDatetime.Now()
+    try:
+      keyword_index = data_store.REL_DB.ReadClientKeywordIndex(
+          start_time=now - _DEFAULT_LOOKBACK)
+
+      posting_lists = {}
+      for keyword, client_ids in keyword_index.items():
+        client_ids = set(map(db_utils.ClientIDToInt, client_ids))
+        posting_lists[keyword] = array.array("Q", sorted(client_ids))
+      sorted_keywords = sorted(posting_lists)
+
+      with self._lock:
+        self._posting_lists = posting_lists
+        self._sorted_keywords = sorted_keywords
+        self._last_refresh_time = now
+
+        for add, client_id, keywords in self._pending_changes:
+          if add:
+            self._AddClientKeywords(client_id, keywords)
+          else:
+            self._RemoveClientKeywords(client_id, keywords)
+    finally:
+      with self._lock:
+        self._pending_changes = None
+        self._refresh_thread = None
+
+  def _PostingList(self, keyword: Text) -> array.array:
+    """Returns the posting list of a keyword, expanding `*` prefix queries."""
+    if not keyword.endswith("*"):
+      return self._posting_lists.get(keyword, array.array("Q"))
+
+    prefix = keyword[:-1]
+    start = bisect.bisect_left(self._sorted_keywords, prefix)
+    posting_lists = []
+    for other in self._sorted_keywords[start:]:
+      if not other.startswith(prefix):
+        break
+      posting_lists.append(self._posting_lists[other])
+
+    return _Union(posting_lists)
+
+  def _ReadUnknownPostingLists(
+      self, keywords: Sequence[Text]) -> Dict[Text, array.array]:
+    """Reads posting lists of keywords missing from the cache from the DB."""
+    with self._lock:
+      unknown_keywords = [
+          keyword for keyword in keywords
+          if not keyword.endswith("*") and keyword not in self._posting_lists
+      ]
+
+    if not unknown_keywords:
+      return {}
+
+    keyword_map = data_store.REL_DB.ListClientsForKeywords(
+        unknown_keywords,
+        start_time=rdfvalue.RDFDatetime.Now() - _DEFAULT_LOOKBACK)
+
+    posting_lists = {}
+    for keyword, client_ids in keyword_map.items():
+      client_ids = set(map(db_utils.ClientIDToInt, client_ids))
+      posting_lists[keyword] = array.array("Q", sorted(client_ids))
+    return posting_lists
+
+  def LookupClients(self, keywords: Iterable[Text]) -> List[Text]:
+    """Returns a sorted list of clients associated with all the keywords."""
+    keywords = list(keywords)
+    self._RefreshIfNeeded()
+    unknown_posting_lists = self._ReadUnknownPostingLists(keywords)
+    with self._lock:
+      posting_lists = [
+          unknown_posting_lists.get(keyword) or self._PostingList(keyword)
+          for keyword in keywords
+      ]
+      return list(map(db_utils.IntToClientID, _Intersect(posting_lists)))
+
+  def ReadClientPostingLists(
+      self, keywords: Iterable[Text]) -> Dict[Text, List[Text]]:
+    """Returns a dict mapping each keyword to a list of matching clients."""
+    keywords = list(keywords)
+    self._RefreshIfNeeded()
+    unknown_posting_lists = self._ReadUnknownPostingLists(keywords)
+    with self._lock:
+      result = {}
+      for keyword in keywords:
+        posting_list = (
+            unknown_posting_lists.get(keyword) or self._PostingList(keyword))
+        result[keyword] = list(map(db_utils.IntToClientID, posting_list))
+      return result
+
+  def AddClientKeywords(self, client_id: Text, keywords: Iterable[Text]):
+    """Associates the keywords with the client in the cached index."""
+    keywords = list(keywords)
+    with self._lock:
+      self._AddClientKeywords(client_id, keywords)
+      if self._pending_changes is not None:
+        self._pending_changes.append((True, client_id, keywords))
+
+  def RemoveClientKeyword(self, client_id: Text, keyword: Text):
+    """Removes the association of the keyword to the client from the cache."""
+    with self._lock:
+      self._RemoveClientKeywords(client_id, [keyword])
+      if self._pending_changes is not None:
+        self._pending_changes.append((False, client_id, [keyword]))
+
+  def _AddClientKeywords(self, client_id: Text, keywords: Iterable[Text]):
+    value = db_utils.ClientIDToInt(client_id)
+    for keyword in keywords:
+      posting_list = self._posting_lists.get(keyword)
+      if posting_list is None:
+        posting_list = self._posting_lists[keyword] = array.array("Q")
+        bisect.insort(self._sorted_keywords, keyword)
+
+      idx = bisect.bisect_left(posting_list, value)
+      if idx == len(posting_list) or posting_list[idx] != value:
+        posting_list.insert(idx, value)
+
+  def _RemoveClientKeywords(self, client_id: Text, keywords: Iterable[Text]):
+    value = db_utils.ClientIDToInt(client_id)
+    for keyword in keywords:
+      posting_list = self._posting_lists.get(keyword)
+      if posting_list is None:
+        continue
+
+      idx = bisect.bisect_left(posting_list, value)
+      if idx < len(posting_list) and posting_list[idx] == value:
+        del posting_list[idx]
+
 
 def GetClientIDsForHostnames(
     hostnames: Iterable[str]) -> Mapping[str, Sequence[str]]:
@@ -52,8 +301,7 @@ class ClientIndex(object):
 
   def _AnalyzeKeywords(self, keywords):
     """Extracts a start time from a list of keywords if present."""
-    start_time = rdfvalue.RDFDatetime.Now() - rdfvalue.Duration.From(
-        180, rdfvalue.DAYS)
+    start_time = rdfvalue.RDFDatetime.Now() - _DEFAULT_LOOKBACK
     filtered_keywords = []
 
     for k in keywords:
@@ -71,9 +319,27 @@ class ClientIndex(object):
 
     return start_time, filtered_keywords
 
+  def _UseIndexCache(self, keywords):
+    """Checks if the in-memory index can answer a query for the keywords."""
+    # The cache only holds keywords within the default lookback.
+    return _INDEX_CACHE is not None and not any(
+        k.startswith(self.START_TIME_PREFIX) for k in keywords)
+
+  def _CheckNoPrefixKeywords(self, keywords):
+    """Raises if a query the cache can't answer uses prefix keywords."""
+    for keyword in keywords:
+      if keyword.endswith("*"):
+        raise ValueError(
+            "Prefix keywords (%s) are only supported with the client index "
+            "cache enabled and without a start_date: keyword." % keyword)
+
   def LookupClients(self, keywords: Iterable[str]) -> Sequence[str]:
     """Returns a list of client URNs associated with keywords.
 
+    If the in-memory index is enabled, a keyword ending with `*` matches all
+    keywords starting with the preceding prefix. Such keywords are rejected
+    when the query is answered from the database.
+
     Args:
       keywords: The list of keywords to search by.
 
@@ -81,7 +347,8 @@ class ClientIndex(object):
       A list of client URNs.
 
     Raises:
-      ValueError: A string (single keyword) was passed instead of an iterable.
+      ValueError: A string (single keyword) was passed instead of an iterable,
+        or a prefix keyword was used without the in-memory index.
     """
     if isinstance(keywords, str):
       raise ValueError(
@@ -89,6 +356,11 @@ class ClientIndex(object):
 
     start_time, filtered_keywords = self._AnalyzeKeywords(keywords)
 
+    if self._UseIndexCache(keywords):
+      return _INDEX_CACHE.LookupClients(
+          list(map(self._NormalizeKeyword, filtered_keywords)))
+
+    self._CheckNoPrefixKeywords(filtered_keywords)
     keyword_map = data_store.REL_DB.ListClientsForKeywords(
         list(map(self._NormalizeKeyword, filtered_keywords)),
         start_time=start_time)
@@ -108,8 +380,13 @@ class ClientIndex(object):
       A dict mapping each keyword to a list of matching clients.
     """
 
+    keywords = list(keywords)
     start_time, filtered_keywords = self._AnalyzeKeywords(keywords)
 
+    if self._UseIndexCache(keywords):
+      return _INDEX_CACHE.ReadClientPostingLists(filtered_keywords)
+
+    self._CheckNoPrefixKeywords(filtered_keywords)
     return data_store.REL_DB.ListClientsForKeywords(
         filtered_keywords, start_time=start_time)
 
@@ -212,6 +489,8 @@ class ClientIndex(object):
     keywords.add(self._NormalizeKeyword(client.client_id))
 
     data_store.REL_DB.AddClientKeywords(client.client_id, keywords)
+    if _INDEX_CACHE is not None:
+      _INDEX_CACHE.AddClientKeywords(client.client_id, keywords)
 
   def AddClientLabels(self, client_id: str, labels: Iterable[str]):
     precondition.AssertIterableType(labels, Text)
@@ -222,6 +501,8 @@ class ClientIndex(object):
       keywords.add("label:" + keyword_string)
 
     data_store.REL_DB.AddClientKeywords(client_id, keywords)
+    if _INDEX_CACHE is not None:
+      _INDEX_CACHE.AddClientKeywords(client_id, keywords)
 
   def RemoveAllClientLabels(self, client_id: str):
     """Removes all labels for a given client.
@@ -246,3 +527,6 @@ class ClientIndex(object):
       # there is one).
       data_store.REL_DB.RemoveClientKeyword(client_id, keyword)
       data_store.REL_DB.RemoveClientKeyword(client_id, "label:%s" % keyword)
+      if _INDEX_CACHE is not None:
+        _INDEX_CACHE.RemoveClientKeyword(client_id, keyword)
+        _INDEX_CACHE.RemoveClientKeyword(client_id, "label:%s" % keyword)
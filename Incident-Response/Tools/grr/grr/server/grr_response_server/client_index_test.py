@@ -10,6 +10,8 @@ import ipaddress
 
 from absl import app
 
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_network as rdf_client_network
 from grr_response_server import client_index
@@ -130,6 +132,12 @@ class ClientIndexTest(test_lib.GRRBaseTest):
     # Universal keyword should find everything.
     self.assertCountEqual(index.LookupClients(["."]), list(clients))
 
+    # Prefix keywords need the in-memory index.
+    with self.assertRaises(ValueError):
+      index.LookupClients(["host:host-*"])
+    with self.assertRaises(ValueError):
+      index.ReadClientPostingLists(["host:host-*"])
+
   def testAddTimestamp(self):
     index = client_index.ClientIndex()
 
@@ -174,6 +182,126 @@ class ClientIndexTest(test_lib.GRRBaseTest):
     self.assertEqual(index.LookupClients(["testlabel_1"]), [])
     self.assertEqual(index.LookupClients(["testlabel_2"]), [])
 
+  def _EnableIndexCache(self, refresh_interval):
+    stubber = utils.Stubber(
+        client_index, "_INDEX_CACHE",
+        client_index.ClientIndexCache(
+            rdfvalue.Duration.From(refresh_interval, rdfvalue.SECONDS)))
+    stubber.Start()
+    self.addCleanup(stubber.Stop)
+
+  def testAddLookupClientsWithIndexCache(self):
+    self._EnableIndexCache(60)
+    index = client_index.ClientIndex()
+
+    clients = self._SetupClients(3)
+    for client_id, client in clients.items():
+      data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+      index.AddClient(client)
+
+    self.assertEqual(
+        index.LookupClients(["192.168.0.1"]), ["C.1000000000000001"])
+    self.assertEqual(
+        index.LookupClients(["mac:aabbccddee02"]), ["C.1000000000000002"])
+    self.assertEqual(
+        index.LookupClients(["192.168.0", "Host-2"]), ["C.1000000000000002"])
+    self.assertEqual(index.LookupClients(["192.168.0", "missing"]), [])
+    self.assertEqual(index.LookupClients(["."]), sorted(clients))
+
+    # Keywords ending with a star are prefix queries.
+    self.assertEqual(index.LookupClients(["host:host-*"]), sorted(clients))
+    self.assertEqual(
+        index.LookupClients(["host:host-*", "ip:192.168.0.3"]),
+        ["C.1000000000000003"])
+
+    hostnames = ["host-1.example.com", "host-3.example.com", "missing"]
+    self.assertEqual(
+        client_index.GetClientIDsForHostnames(hostnames), {
+            "host-1.example.com": ["C.1000000000000001"],
+            "host-3.example.com": ["C.1000000000000003"],
+            "missing": [],
+        })
+
+  def _WaitForIndexCacheRefresh(self):
+    refresh_thread = client_index._INDEX_CACHE._refresh_thread
+    if refresh_thread is not None:
+      refresh_thread.join()
+
+  def testIndexCacheIsRefreshed(self):
+    client_id_1 = "C.1000000000000001"
+    client_id_2 = "C.1000000000000002"
+    data_store.REL_DB.WriteClientMetadata(client_id_1, fleetspeak_enabled=False)
+    data_store.REL_DB.WriteClientMetadata(client_id_2, fleetspeak_enabled=False)
+    data_store.REL_DB.AddClientKeywords(client_id_1, ["foo"])
+
+    with test_lib.FakeTime(1600000000):
+      self._EnableIndexCache(60)
+      index = client_index.ClientIndex()
+      self.assertEqual(index.LookupClients(["foo"]), [client_id_1])
+
+      # Keywords written behind the index's back are not visible right away.
+      data_store.REL_DB.AddClientKeywords(client_id_2, ["foo"])
+      self.assertEqual(index.LookupClients(["foo"]), [client_id_1])
+
+    with test_lib.FakeTime(1600000061):
+      # The index is reread in the background.
+      index.LookupClients(["foo"])
+      self._WaitForIndexCacheRefresh()
+      self.assertEqual(
+          index.LookupClients(["foo"]), [client_id_1, client_id_2])
+
+  def testIndexCacheReadsUnknownKeywordsFromDatabase(self):
+    self._EnableIndexCache(60)
+    index = client_index.ClientIndex()
+
+    client_id = "C.1000000000000001"
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+    self.assertEqual(index.LookupClients(["bar"]), [])
+
+    # Keywords the cache doesn't know are answered like without the cache.
+    data_store.REL_DB.AddClientKeywords(client_id, ["bar"])
+    self.assertEqual(index.LookupClients(["bar"]), [client_id])
+    self.assertEqual(
+        index.ReadClientPostingLists(["bar", "missing"]), {
+            "bar": [client_id],
+            "missing": [],
+        })
+
+  def testIndexCacheKeepsChangesMadeDuringRefresh(self):
+    self._EnableIndexCache(60)
+    index = client_index.ClientIndex()
+
+    client_id = next(iter(self._SetupClients(1).keys()))
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+
+    read_client_keyword_index = data_store.REL_DB.ReadClientKeywordIndex
+
+    def ReadClientKeywordIndex(*args, **kwargs):
+      result = read_client_keyword_index(*args, **kwargs)
+      # The label is added after the index was read, but before it is used.
+      index.AddClientLabels(client_id, ["testlabel"])
+      return result
+
+    with utils.Stubber(data_store.REL_DB, "ReadClientKeywordIndex",
+                       ReadClientKeywordIndex):
+      index.LookupClients(["."])
+
+    self.assertEqual(index.LookupClients(["label:testlabel"]), [client_id])
+
+  def testRemoveLabelsWithIndexCache(self):
+    self._EnableIndexCache(60)
+
+    client_id = next(iter(self._SetupClients(1).keys()))
+    data_store.REL_DB.WriteClientMetadata(client_id, fleetspeak_enabled=False)
+
+    index = client_index.ClientIndex()
+    index.AddClientLabels(client_id, ["testlabel_1", "testlabel_2"])
+    self.assertEqual(index.LookupClients(["label:testlabel_1"]), [client_id])
+
+    index.RemoveClientLabels(client_id, ["testlabel_1"])
+    self.assertEqual(index.LookupClients(["label:testlabel_1"]), [])
+    self.assertEqual(index.LookupClients(["label:testlabel_2"]), [client_id])
+
   def _HostsHaveLabel(self, expected_hosts, label, index):
     client_ids = index.LookupClients(["label:%s" % label])
     client_data = data_store.REL_DB.MultiReadClientSnapshot(client_ids)
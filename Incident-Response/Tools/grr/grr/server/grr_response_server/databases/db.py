@@ -28,6 +28,7 @@ from grr_response_core.lib.rdfvalues import client_stats as rdf_client_stats
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import stats as rdf_stats
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import compatibility
 from grr_response_core.lib.util import precondition
 from grr_response_server import fleet_utils
@@ -62,6 +63,10 @@ MAX_COUNT = 1024**3
 
 CLIENT_IDS_BATCH_SIZE = 500000
 
+# Size of a bucket of hunt's client completion histogram. Whole minutes keep
+# the number of buckets of a long-running hunt small.
+HUNT_COMPLETION_BUCKET_SECONDS = 60
+
 _EMAIL_REGEX = re.compile(r"[^@]+@([^@]+)$")
 MAX_EMAIL_LENGTH = 255
 
@@ -436,6 +441,17 @@ FlowStateAndTimestamps = collections.namedtuple("FlowStateAndTimestamps", [
     "last_update_time",
 ])
 
+# A single bucket of a hunt's client completion histogram: number of top-level
+# hunt flows created within the bucket and number of non-running top-level
+# hunt flows last updated within the bucket. The timestamp is the start of the
+# bucket.
+HuntClientCompletionBucket = collections.namedtuple(
+    "HuntClientCompletionBucket", [
+        "timestamp",
+        "num_started_clients",
+        "num_completed_clients",
+    ])
+
 
 class ClientPath(object):
   """An immutable class representing certain path on a given client.
@@ -941,6 +957,21 @@ class Database(metaclass=abc.ABCMeta):
         ids.
     """
 
+  @abc.abstractmethod
+  def ReadClientKeywordIndex(
+      self,
+      start_time: Optional[rdfvalue.RDFDatetime] = None
+  ) -> Dict[Text, List[Text]]:
+    """Reads the whole client keyword index.
+
+    Args:
+      start_time: If set, should be an rdfvalue.RDFDatime and the function will
+        only return keywords associated after this time.
+
+    Returns:
+      A dict mapping every keyword to a non-empty list of client ids.
+    """
+
   @abc.abstractmethod
   def RemoveClientKeyword(self, client_id: Text, keyword: Text) -> None:
     """Removes the association of a particular client to a keyword.
@@ -1392,6 +1423,41 @@ class Database(metaclass=abc.ABCMeta):
       A list of `rdf_objects.PathInfo` instances sorted by path components.
     """
 
+  def IterDescendantPathInfos(self,
+                              client_id,
+                              path_type,
+                              components,
+                              timestamp=None,
+                              max_depth=None):
+    """Iterates over path info records of descendants of given path.
+
+    This is a streaming variant of `ListDescendantPathInfos`: implementations
+    may read the records in batches, so listings of whole client filesystems
+    don't have to be held in memory. Records written while the iterator is
+    consumed may or may not be returned. Errors about the base path are raised
+    by the call itself, not by the returned iterator.
+
+    Args:
+      client_id: An identifier string for a client.
+      path_type: A type of a path to retrieve path information for.
+      components: A tuple of path components of a path to retrieve descendent
+        path information for.
+      timestamp: If set, lists only descendants that existed at that timestamp.
+      max_depth: If set, the maximum number of generations to descend, otherwise
+        unlimited.
+
+    Returns:
+      An iterator over `rdf_objects.PathInfo` instances sorted by path
+      components.
+    """
+    return iter(
+        self.ListDescendantPathInfos(
+            client_id,
+            path_type,
+            components,
+            timestamp=timestamp,
+            max_depth=max_depth))
+
   @abc.abstractmethod
   def WritePathInfos(self, client_id, path_infos):
     """Writes a collection of path_info records for a client.
@@ -1924,6 +1990,48 @@ class Database(metaclass=abc.ABCMeta):
       A list of rdf_flow_objects.Flow objects.
     """
 
+  @abc.abstractmethod
+  def CountFlowObjectsByCreator(
+      self,
+      client_id: Text,
+      creator: Text,
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> int:
+    """Counts parent flows started by a user on a client.
+
+    Args:
+      client_id: The client id.
+      creator: Username of the user who started the flows.
+      min_create_time: the minimum creation time (inclusive)
+
+    Returns:
+      Number of flows (not including child flows).
+    """
+
+  @abc.abstractmethod
+  def ReadLatestFlowObjectWithArgs(
+      self,
+      client_id: Text,
+      flow_class_name: Text,
+      flow_args: Optional[rdf_structs.RDFProtoStruct],
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> Optional[rdf_flow_objects.Flow]:
+    """Reads the latest parent flow with the given class and arguments.
+
+    Arguments are compared by their digests (see
+    `rdf_flow_objects.FlowArgsDigest`), so finding such a flow does not
+    require reading all flows of the client.
+
+    Args:
+      client_id: The client id.
+      flow_class_name: Name of the flow class.
+      flow_args: Arguments of the flow (None is equivalent to EmptyFlowArgs).
+      min_create_time: the minimum creation time (inclusive)
+
+    Returns:
+      An rdf_flow_objects.Flow object or None if there is no such flow.
+    """
+
   @abc.abstractmethod
   def ReadChildFlowObjects(self, client_id, flow_id):
     """Reads flow objects that were started by a given flow from the database.
@@ -2793,6 +2901,22 @@ class Database(metaclass=abc.ABCMeta):
       sorting order).
     """
 
+  @abc.abstractmethod
+  def ReadHuntClientCompletionHistogram(self, hunt_id):
+    """Reads hunt's client completion histogram.
+
+    The histogram is maintained incrementally when hunt flows are written or
+    updated, so reading it doesn't require reading all hunt flows.
+
+    Args:
+      hunt_id: The id of the hunt to read the histogram for.
+
+    Returns:
+      A list of HuntClientCompletionBucket objects sorted by timestamp. Every
+      bucket covers HUNT_COMPLETION_BUCKET_SECONDS seconds. Buckets in which
+      no flows were started or completed are omitted.
+    """
+
   @abc.abstractmethod
   def WriteSignedBinaryReferences(self, binary_id, references):
     """Writes blob references for a signed binary to the DB.
@@ -3161,6 +3285,15 @@ class DatabaseValidationWrapper(Database):
       precondition.AssertIterableType(value, Text)
     return result
 
+  def ReadClientKeywordIndex(
+      self,
+      start_time: Optional[rdfvalue.RDFDatetime] = None
+  ) -> Dict[Text, List[Text]]:
+    if start_time:
+      _ValidateTimestamp(start_time)
+
+    return self.delegate.ReadClientKeywordIndex(start_time=start_time)
+
   def RemoveClientKeyword(self, client_id: Text, keyword: Text) -> None:
     precondition.ValidateClientId(client_id)
     precondition.AssertType(keyword, Text)
@@ -3421,6 +3554,25 @@ class DatabaseValidationWrapper(Database):
         timestamp=timestamp,
         max_depth=max_depth)
 
+  def IterDescendantPathInfos(self,
+                              client_id,
+                              path_type,
+                              components,
+                              timestamp=None,
+                              max_depth=None):
+    precondition.ValidateClientId(client_id)
+    _ValidateEnumType(path_type, rdf_objects.PathInfo.PathType)
+    _ValidatePathComponents(components)
+    precondition.AssertOptionalType(timestamp, rdfvalue.RDFDatetime)
+    precondition.AssertOptionalType(max_depth, int)
+
+    return self.delegate.IterDescendantPathInfos(
+        client_id,
+        path_type,
+        components,
+        timestamp=timestamp,
+        max_depth=max_depth)
+
   def FindPathInfoByPathID(self, client_id, path_type, path_id, timestamp=None):
     precondition.ValidateClientId(client_id)
 
@@ -3732,6 +3884,34 @@ class DatabaseValidationWrapper(Database):
         max_create_time=max_create_time,
         include_child_flows=include_child_flows)
 
+  def CountFlowObjectsByCreator(
+      self,
+      client_id: Text,
+      creator: Text,
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> int:
+    precondition.ValidateClientId(client_id)
+    _ValidateUsername(creator)
+    precondition.AssertType(min_create_time, rdfvalue.RDFDatetime)
+    return self.delegate.CountFlowObjectsByCreator(client_id, creator,
+                                                   min_create_time)
+
+  def ReadLatestFlowObjectWithArgs(
+      self,
+      client_id: Text,
+      flow_class_name: Text,
+      flow_args: Optional[rdf_structs.RDFProtoStruct],
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> Optional[rdf_flow_objects.Flow]:
+    precondition.ValidateClientId(client_id)
+    precondition.AssertType(flow_class_name, Text)
+    precondition.AssertOptionalType(flow_args, rdf_structs.RDFProtoStruct)
+    precondition.AssertType(min_create_time, rdfvalue.RDFDatetime)
+    return self.delegate.ReadLatestFlowObjectWithArgs(client_id,
+                                                      flow_class_name,
+                                                      flow_args,
+                                                      min_create_time)
+
   def ReadChildFlowObjects(self, client_id, flow_id):
     precondition.ValidateClientId(client_id)
     precondition.ValidateFlowId(flow_id)
@@ -4256,6 +4436,10 @@ class DatabaseValidationWrapper(Database):
     _ValidateHuntId(hunt_id)
     return self.delegate.ReadHuntFlowsStatesAndTimestamps(hunt_id)
 
+  def ReadHuntClientCompletionHistogram(self, hunt_id):
+    _ValidateHuntId(hunt_id)
+    return self.delegate.ReadHuntClientCompletionHistogram(hunt_id)
+
   def WriteSignedBinaryReferences(self, binary_id, references):
     precondition.AssertType(binary_id, rdf_objects.SignedBinaryID)
     precondition.AssertType(references, rdf_objects.BlobReferences)
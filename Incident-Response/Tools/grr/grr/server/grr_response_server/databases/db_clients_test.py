@@ -846,6 +846,24 @@ class DatabaseTestClientsMixin(object):
     self.assertEqual(res["hostname1"], [])
     self.assertEqual(res["hostname2"], [client_id])
 
+  def testReadClientKeywordIndex(self):
+    d = self.db
+    client_id_1 = db_test_utils.InitializeClient(self.db)
+    client_id_2 = db_test_utils.InitializeClient(self.db)
+
+    d.AddClientKeywords(client_id_1, ["joe", "machine"])
+    change_time = rdfvalue.RDFDatetime.Now()
+    d.AddClientKeywords(client_id_2, ["fred", "machine"])
+
+    res = d.ReadClientKeywordIndex()
+    self.assertCountEqual(res, ["joe", "fred", "machine"])
+    self.assertEqual(res["joe"], [client_id_1])
+    self.assertEqual(res["fred"], [client_id_2])
+    self.assertCountEqual(res["machine"], [client_id_1, client_id_2])
+
+    res = d.ReadClientKeywordIndex(start_time=change_time)
+    self.assertEqual(res, {"fred": [client_id_2], "machine": [client_id_2]})
+
   def testRemoveClientKeyword(self):
     d = self.db
     client_id = db_test_utils.InitializeClient(self.db)
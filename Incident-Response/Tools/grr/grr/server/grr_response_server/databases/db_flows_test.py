@@ -23,6 +23,7 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import flow_runner as rdf_flow_runner
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
+from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
 from grr.test_lib import test_lib
 
 
@@ -227,6 +228,24 @@ class DatabaseTestFlowMixin(object):
     # expired. Make sure that the requests have been deleted from the db.
     self.assertEqual(self.db.ReadAllClientActionRequests(client_id), [])
 
+  def testWrittenFlowObjectIsNotAffectedByLaterChanges(self):
+    client_id = self._SetupClient()
+    flow_obj = rdf_flow_objects.Flow(
+        client_id=client_id,
+        flow_id="1234ABCD",
+        create_time=rdfvalue.RDFDatetime.Now())
+    flow_obj.output_plugins.Append(
+        rdf_output_plugin.OutputPluginDescriptor(plugin_name="Foo"))
+    self.db.WriteFlowObject(flow_obj)
+
+    flow_obj.output_plugins[0].plugin_name = "Bar"
+    flow_obj.output_plugins.Append(
+        rdf_output_plugin.OutputPluginDescriptor(plugin_name="Baz"))
+
+    read_flow_obj = self.db.ReadFlowObject(client_id, "1234ABCD")
+    self.assertEqual([p.plugin_name for p in read_flow_obj.output_plugins],
+                     ["Foo"])
+
   def testFlowWritingUnknownClient(self):
     flow_id = u"1234ABCD"
     client_id = u"C.1234567890123456"
@@ -600,6 +619,111 @@ class DatabaseTestFlowMixin(object):
         include_child_flows=False)
     self.assertEqual([f.flow_id for f in flows], ["0000000A"])
 
+  def testCountFlowObjectsByCreator(self):
+    now = rdfvalue.RDFDatetime.Now()
+    client_id_1 = self._SetupClient("C.1111111111111111")
+    client_id_2 = self._SetupClient("C.2222222222222222")
+
+    def WriteFlow(client_id, flow_id, creator, create_time, **kwargs):
+      self.db.WriteFlowObject(
+          rdf_flow_objects.Flow(
+              client_id=client_id,
+              flow_id=flow_id,
+              creator=creator,
+              create_time=create_time,
+              **kwargs))
+
+    WriteFlow(client_id_1, "0000000A", "foo",
+              now - rdfvalue.Duration.From(2, rdfvalue.HOURS))
+    WriteFlow(client_id_1, "0000000B", "foo", now)
+    WriteFlow(client_id_1, "0000000C", "foo", now)
+    WriteFlow(client_id_1, "0000000D", "foo", now, parent_flow_id="0000000C")
+    WriteFlow(client_id_1, "0000000E", "bar", now)
+    WriteFlow(client_id_2, "0000000F", "foo", now)
+
+    self.assertEqual(
+        self.db.CountFlowObjectsByCreator(
+            client_id_1, "foo", now - rdfvalue.Duration.From(1, rdfvalue.DAYS)),
+        3)
+    self.assertEqual(
+        self.db.CountFlowObjectsByCreator(client_id_1, "foo", now), 2)
+    self.assertEqual(
+        self.db.CountFlowObjectsByCreator(client_id_1, "bar", now), 1)
+    self.assertEqual(
+        self.db.CountFlowObjectsByCreator(client_id_2, "bar", now), 0)
+
+    # Updates of existing flows are not counted.
+    flow_obj = self.db.ReadFlowObject(client_id_1, "0000000B")
+    flow_obj.next_request_to_process = 42
+    self.db.WriteFlowObject(flow_obj)
+    self.assertEqual(
+        self.db.CountFlowObjectsByCreator(client_id_1, "foo", now), 2)
+
+  def testReadLatestFlowObjectWithArgs(self):
+    now = rdfvalue.RDFDatetime.Now()
+    client_id = self._SetupClient()
+    args = rdf_file_finder.CollectSingleFileArgs(path="/foo")
+
+    def WriteFlow(flow_id, create_time, flow_args, **kwargs):
+      self.db.WriteFlowObject(
+          rdf_flow_objects.Flow(
+              client_id=client_id,
+              flow_id=flow_id,
+              flow_class_name="CollectSingleFile",
+              create_time=create_time,
+              args=flow_args,
+              **kwargs))
+
+    WriteFlow("0000000A", now - rdfvalue.Duration.From(2, rdfvalue.HOURS),
+              args)
+    WriteFlow("0000000B", now - rdfvalue.Duration.From(1, rdfvalue.HOURS),
+              args)
+    WriteFlow("0000000C", now,
+              rdf_file_finder.CollectSingleFileArgs(path="/bar"))
+    WriteFlow("0000000D", now, args, parent_flow_id="0000000C")
+
+    flow_obj = self.db.ReadLatestFlowObjectWithArgs(
+        client_id, "CollectSingleFile",
+        rdf_file_finder.CollectSingleFileArgs(path="/foo"),
+        now - rdfvalue.Duration.From(1, rdfvalue.DAYS))
+    self.assertEqual(flow_obj.flow_id, "0000000B")
+    self.assertEqual(flow_obj.args, args)
+
+    self.assertIsNone(
+        self.db.ReadLatestFlowObjectWithArgs(
+            client_id, "CollectSingleFile", args,
+            now - rdfvalue.Duration.From(30, rdfvalue.MINUTES)))
+    self.assertIsNone(
+        self.db.ReadLatestFlowObjectWithArgs(
+            client_id, "FileFinder", args,
+            now - rdfvalue.Duration.From(1, rdfvalue.DAYS)))
+    self.assertIsNone(
+        self.db.ReadLatestFlowObjectWithArgs(
+            client_id, "CollectSingleFile",
+            rdf_file_finder.CollectSingleFileArgs(path="/baz"),
+            now - rdfvalue.Duration.From(1, rdfvalue.DAYS)))
+
+  def testReadLatestFlowObjectWithArgsSetToDefaults(self):
+    client_id, flow_id = self._SetupClientAndFlow(
+        flow_class_name="CollectSingleFile",
+        args=rdf_file_finder.CollectSingleFileArgs(
+            path="/foo", max_size_bytes=0))
+
+    flow_obj = self.db.ReadLatestFlowObjectWithArgs(
+        client_id, "CollectSingleFile",
+        rdf_file_finder.CollectSingleFileArgs(path="/foo"),
+        rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0))
+    self.assertEqual(flow_obj.flow_id, flow_id)
+
+  def testReadLatestFlowObjectWithEmptyArgs(self):
+    client_id, flow_id = self._SetupClientAndFlow(
+        flow_class_name="DummyFlow", args=rdf_flows.EmptyFlowArgs())
+
+    flow_obj = self.db.ReadLatestFlowObjectWithArgs(
+        client_id, "DummyFlow", None,
+        rdfvalue.RDFDatetime.FromSecondsSinceEpoch(0))
+    self.assertEqual(flow_obj.flow_id, flow_id)
+
   def testUpdateUnknownFlow(self):
     _, flow_id = self._SetupClientAndFlow()
 
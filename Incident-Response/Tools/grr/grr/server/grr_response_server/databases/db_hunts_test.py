@@ -61,6 +61,20 @@ class DatabaseTestHuntMixin(object):
     self.assertGreater(read_hunt_obj.create_time, then)
     self.assertGreater(read_hunt_obj.last_update_time, then)
 
+  def testWrittenHuntObjectIsNotAffectedByLaterChanges(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    hunt_obj.output_plugins.Append(
+        rdf_output_plugin.OutputPluginDescriptor(plugin_name="Foo"))
+    self.db.WriteHuntObject(hunt_obj)
+
+    hunt_obj.output_plugins[0].plugin_name = "Bar"
+    hunt_obj.output_plugins.Append(
+        rdf_output_plugin.OutputPluginDescriptor(plugin_name="Baz"))
+
+    read_hunt_obj = self.db.ReadHuntObject(hunt_obj.hunt_id)
+    self.assertEqual([p.plugin_name for p in read_hunt_obj.output_plugins],
+                     ["Foo"])
+
   def testHuntObjectCannotBeOverwritten(self):
     hunt_id = "ABCDEF42"
     hunt_obj_v1 = rdf_hunt_objects.Hunt(hunt_id=hunt_id, description="foo")
@@ -1437,6 +1451,61 @@ class DatabaseTestHuntMixin(object):
             create_time=flow_obj.create_time,
             last_update_time=flow_obj.last_update_time))
 
+  def testReadHuntClientCompletionHistogramReturnsEmptyListForNewHunt(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    buckets = self.db.ReadHuntClientCompletionHistogram(hunt_obj.hunt_id)
+    self.assertEmpty(buckets)
+
+  def testReadHuntClientCompletionHistogramWorksCorrectlyForMultipleFlows(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    bucket_size = db.HUNT_COMPLETION_BUCKET_SECONDS
+    started = collections.Counter()
+    completed = collections.Counter()
+    for i in range(10):
+      client_id, flow_id = self._SetupHuntClientAndFlow(
+          hunt_id=hunt_obj.hunt_id)
+
+      if i % 2 == 0:
+        flow_state = rdf_flow_objects.Flow.FlowState.RUNNING
+      else:
+        flow_state = rdf_flow_objects.Flow.FlowState.FINISHED
+      self.db.UpdateFlow(client_id, flow_id, flow_state=flow_state)
+
+      flow_obj = self.db.ReadFlowObject(client_id, flow_id)
+      create_time = flow_obj.create_time.AsSecondsSinceEpoch()
+      started[create_time - create_time % bucket_size] += 1
+      if flow_state != rdf_flow_objects.Flow.FlowState.RUNNING:
+        last_update_time = flow_obj.last_update_time.AsSecondsSinceEpoch()
+        completed[last_update_time - last_update_time % bucket_size] += 1
+
+    buckets = self.db.ReadHuntClientCompletionHistogram(hunt_obj.hunt_id)
+    timestamps = [b.timestamp.AsSecondsSinceEpoch() for b in buckets]
+    self.assertEqual(timestamps, sorted(set(started) | set(completed)))
+    for bucket in buckets:
+      ts = bucket.timestamp.AsSecondsSinceEpoch()
+      self.assertEqual(bucket.num_started_clients, started[ts])
+      self.assertEqual(bucket.num_completed_clients, completed[ts])
+
+  def testReadHuntClientCompletionHistogramIgnoresNestedFlows(self):
+    hunt_obj = rdf_hunt_objects.Hunt(description="foo")
+    self.db.WriteHuntObject(hunt_obj)
+
+    _, flow_id = self._SetupHuntClientAndFlow(
+        hunt_id=hunt_obj.hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING)
+    self._SetupHuntClientAndFlow(
+        hunt_id=hunt_obj.hunt_id,
+        parent_flow_id=flow_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.FINISHED)
+
+    buckets = self.db.ReadHuntClientCompletionHistogram(hunt_obj.hunt_id)
+    self.assertEqual(sum(b.num_started_clients for b in buckets), 1)
+    self.assertEqual(sum(b.num_completed_clients for b in buckets), 0)
+
   def testReadHuntOutputPluginLogEntriesReturnsEntryFromSingleHuntFlow(self):
     hunt_obj = rdf_hunt_objects.Hunt(description="foo")
     self.db.WriteHuntObject(hunt_obj)
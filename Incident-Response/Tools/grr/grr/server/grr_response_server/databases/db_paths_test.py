@@ -1104,6 +1104,34 @@ class DatabaseTestPathsMixin(object):
     self.assertEqual(results_2[0].hash_entry.md5, b"norf")
     self.assertEqual(results_2[0].hash_entry.sha256, b"blargh")
 
+  def testListDescendantPathInfosTimestampExplicitBelowMaxDepth(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    timestamp_0 = self.db.Now()
+
+    path_info = rdf_objects.PathInfo.OS(components=("foo", "bar", "baz"))
+    path_info.stat_entry.st_size = 42
+    self.db.WritePathInfos(client_id, [path_info])
+    timestamp_1 = self.db.Now()
+
+    results_0 = self.db.ListDescendantPathInfos(
+        client_id=client_id,
+        path_type=rdf_objects.PathInfo.PathType.OS,
+        components=("foo",),
+        timestamp=timestamp_0,
+        max_depth=1)
+    self.assertEmpty(results_0)
+
+    # `foo/bar` has no stat entry itself, but it has an explicit descendant.
+    results_1 = self.db.ListDescendantPathInfos(
+        client_id=client_id,
+        path_type=rdf_objects.PathInfo.PathType.OS,
+        components=("foo",),
+        timestamp=timestamp_1,
+        max_depth=1)
+    self.assertLen(results_1, 1)
+    self.assertEqual(results_1[0].components, ("foo", "bar"))
+
   def testListDescendantPathInfosWildcards(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
@@ -1219,6 +1247,74 @@ class DatabaseTestPathsMixin(object):
     self.assertEqual(results[0].components, ("__", "__bar__"))
     self.assertEqual(results[1].components, ("__", "__baz__"))
 
+  def testIterDescendantPathInfosMatchesListDescendantPathInfos(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    path_info_1 = rdf_objects.PathInfo.OS(components=("foo", "bar", "baz"))
+    path_info_1.stat_entry.st_size = 1
+    path_info_2 = rdf_objects.PathInfo.OS(components=("foo", "quux"))
+    path_info_2.hash_entry.sha256 = b"thud"
+    self.db.WritePathInfos(client_id, [path_info_1, path_info_2])
+
+    for timestamp in [None, self.db.Now()]:
+      for max_depth in [None, 1]:
+        list_results = self.db.ListDescendantPathInfos(
+            client_id=client_id,
+            path_type=rdf_objects.PathInfo.PathType.OS,
+            components=("foo",),
+            timestamp=timestamp,
+            max_depth=max_depth)
+        iter_results = self.db.IterDescendantPathInfos(
+            client_id=client_id,
+            path_type=rdf_objects.PathInfo.PathType.OS,
+            components=("foo",),
+            timestamp=timestamp,
+            max_depth=max_depth)
+
+        self.assertEqual(list(iter_results), list_results)
+
+  def testIterDescendantPathInfosSortedByComponents(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    # `foo.txt` sorts before `foo/bar` as a string, but after it as components.
+    path_info_1 = rdf_objects.PathInfo.OS(components=("foo.txt",))
+    path_info_2 = rdf_objects.PathInfo.OS(components=("foo", "bar"))
+    path_info_3 = rdf_objects.PathInfo.OS(components=("Foo",))
+    self.db.WritePathInfos(client_id, [path_info_1, path_info_2, path_info_3])
+
+    results = self.db.IterDescendantPathInfos(
+        client_id=client_id,
+        path_type=rdf_objects.PathInfo.PathType.OS,
+        components=())
+
+    self.assertEqual([tuple(result.components) for result in results], [
+        ("Foo",),
+        ("foo",),
+        ("foo", "bar"),
+        ("foo.txt",),
+    ])
+
+  def testIterDescendantPathInfosNonexistentDirectory(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    with self.assertRaises(db.UnknownPathError):
+      self.db.IterDescendantPathInfos(
+          client_id=client_id,
+          path_type=rdf_objects.PathInfo.PathType.OS,
+          components=("foo", "bar"))
+
+  def testIterDescendantPathInfosNotDirectory(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    path_info = rdf_objects.PathInfo.OS(components=("foo",), directory=False)
+    self.db.WritePathInfos(client_id, [path_info])
+
+    with self.assertRaises(db.NotDirectoryPathError):
+      self.db.IterDescendantPathInfos(
+          client_id=client_id,
+          path_type=rdf_objects.PathInfo.PathType.OS,
+          components=("foo",))
+
   def testListChildPathInfosRoot(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
@@ -9,8 +9,6 @@ import sys
 import threading
 
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib import utils
-from grr_response_core.lib.util import precondition
 from grr_response_server.databases import db
 from grr_response_server.databases import mem_artifacts
 from grr_response_server.databases import mem_blobs
@@ -49,7 +47,22 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
   def __init__(self):
     super().__init__()
     self._Init()
+    # Guards flows with their requests, responses, results and logs, client
+    # action requests, flow processing requests and hunt counters (which are
+    # updated on flow writes). Flows processed inline call into any other
+    # table while holding it, so it comes first in the lock order below.
+    self.flows_lock = threading.RLock()
+    # Guards all tables, except for the ones that have their own locks.
     self.lock = threading.RLock()
+    # Guards hunt objects and their output plugin states.
+    self.hunts_lock = threading.RLock()
+    # Blobs and paths are mostly written by frontends, while flows are being
+    # processed by workers, so they have their own locks. Methods holding them
+    # only do single (atomic) lookups in other tables.
+    self.paths_lock = threading.RLock()
+    self.blobs_lock = threading.RLock()
+    # If several locks are needed, they have to be acquired in the order they
+    # are defined above.
 
   def _Init(self):
     self.artifacts = {}
@@ -86,17 +99,26 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
     self.users = {}
     self.handler_thread = None
     self.handler_stop = True
-    # Maps (client_id, flow_id) to flow objects.
+    # Maps (client_id, flow_id) to snapshots (see mem_utils.Snapshot) of flow
+    # objects.
     self.flows = {}
-    # Maps (client_id, flow_id) to flow request id to the request.
+    # Maps (client_id, creator) to a sorted list of creation times of parent
+    # flows. Used for throttling flows.
+    self.flow_create_times_by_creator = {}
+    # Maps (client_id, flow_class_name, args digest) to a sorted list of
+    # (create_time, flow_id) of parent flows. Used for throttling flows.
+    self.flows_by_args_digest = {}
+    # Maps (client_id, flow_id) to flow request id to a snapshot of the
+    # request.
     self.flow_requests = {}
-    # Maps (client_id, flow_id) to flow request id to a list of responses.
+    # Maps (client_id, flow_id) to flow request id to response id to a snapshot
+    # of the response.
     self.flow_responses = {}
     # Maps (client_id, flow_id, request_id) to FlowProcessingRequest rdfvalues.
     self.flow_processing_requests = {}
-    # Maps (client_id, flow_id) to [FlowResult].
+    # Maps (client_id, flow_id) to a list of snapshots of FlowResult.
     self.flow_results = {}
-    # Maps (client_id, flow_id) to [FlowError].
+    # Maps (client_id, flow_id) to a list of snapshots of FlowError.
     self.flow_errors = {}
     # Maps (client_id, flow_id) to [FlowLogEntry].
     self.flow_log_entries = {}
@@ -106,17 +128,24 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
     self.flow_handler_stop = True
     self.flow_handler_num_being_processed = 0
     self.api_audit_entries = []
+    # Maps hunt_id to a snapshot of the hunt object.
     self.hunts = {}
     self.hunt_output_plugins_states = {}
+    # Maps hunt_id to a collections.Counter with the hunt's counters.
+    self.hunt_counters = {}
+    # Maps hunt_id to a dict mapping seconds since epoch to a list
+    # [num_started_clients, num_completed_clients].
+    self.hunt_completion_buckets = {}
     self.signed_binary_references = {}
     self.client_graph_series = {}
     # Maps (client_id, creator, scheduled_flow_id) to ScheduledFlow.
     self.scheduled_flows = {}
 
-  @utils.Synchronized
   def ClearTestDB(self):
     self.UnregisterMessageHandler()
-    self._Init()
+    with self.flows_lock, self.lock, self.hunts_lock:
+      with self.paths_lock, self.blobs_lock:
+        self._Init()
 
   def _AllPathIDs(self):
     result = set()
@@ -141,22 +170,6 @@ class InMemoryDB(mem_artifacts.InMemoryDBArtifactsMixin,
 
     return (from_time, to_time)
 
-  def _DeepCopy(self, obj):
-    """Creates an object copy by serializing/deserializing it.
-
-    RDFStruct.Copy() doesn't deep-copy repeated fields which may lead to
-    hard to catch bugs.
-
-    Args:
-      obj: RDFValue to be copied.
-
-    Returns:
-      A deep copy of the passed RDFValue.
-    """
-    precondition.AssertType(obj, rdfvalue.RDFValue)
-
-    return obj.__class__.FromSerializedBytes(obj.SerializeToBytes())
-
   def Now(self) -> rdfvalue.RDFDatetime:
     del self  # Unused.
     return rdfvalue.RDFDatetime.Now()
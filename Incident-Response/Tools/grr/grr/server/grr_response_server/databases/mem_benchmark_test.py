@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""Benchmarks for the in memory database."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import threading
+
+from absl import app
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_server import flow
+from grr_response_server.databases import db
+from grr_response_server.databases import db_test_utils
+from grr_response_server.databases import mem
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class InMemoryDBFlowBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Measures the time to process flows with concurrent workers.
+
+  Every worker thread runs flows through the same database calls the flow
+  processing code makes: requests, responses, processing and results. Results
+  of finished flows are then read a few times, like the UI does when it polls
+  them.
+  """
+
+  REPEATS = 3
+  units = "s"
+
+  NUM_FLOWS = 384
+  NUM_REQUESTS = 3
+  NUM_RESPONSES = 10
+  NUM_RESULTS = 10
+  NUM_POLLS = 3
+
+  def _StatEntry(self, i):
+    return rdf_client_fs.StatEntry(
+        pathspec=rdf_paths.PathSpec.OS(path="/home/foo/bar%d" % i),
+        st_size=i,
+        st_mode=0o644)
+
+  def _RunFlow(self, db_obj, client_id):
+    flow_id = flow.RandomFlowId()
+    db_obj.WriteFlowObject(
+        rdf_flow_objects.Flow(
+            client_id=client_id,
+            flow_id=flow_id,
+            flow_class_name="FileFinder",
+            creator="test",
+            next_request_to_process=1))
+    flow_obj = db_obj.LeaseFlowForProcessing(
+        client_id, flow_id, rdfvalue.Duration.From(1, rdfvalue.MINUTES))
+
+    db_obj.WriteFlowRequests([
+        rdf_flow_objects.FlowRequest(
+            client_id=client_id, flow_id=flow_id, request_id=i)
+        for i in range(1, self.NUM_REQUESTS + 1)
+    ])
+    for request_id in range(1, self.NUM_REQUESTS + 1):
+      responses = [
+          rdf_flow_objects.FlowResponse(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=request_id,
+              response_id=i,
+              payload=self._StatEntry(i))
+          for i in range(1, self.NUM_RESPONSES + 1)
+      ]
+      responses.append(
+          rdf_flow_objects.FlowStatus(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=request_id,
+              response_id=self.NUM_RESPONSES + 1))
+      db_obj.WriteFlowResponses(responses)
+      db_obj.ReadFlowObject(client_id, flow_id)
+
+    ready = db_obj.ReadFlowRequestsReadyForProcessing(
+        client_id, flow_id, next_needed_request=1)
+    db_obj.WriteFlowResults([
+        rdf_flow_objects.FlowResult(
+            client_id=client_id, flow_id=flow_id, payload=self._StatEntry(i))
+        for i in range(self.NUM_RESULTS)
+    ])
+    db_obj.DeleteFlowRequests([request for request, _ in ready.values()])
+
+    flow_obj.next_request_to_process = self.NUM_REQUESTS + 1
+    flow_obj.flow_state = flow_obj.FlowState.FINISHED
+    db_obj.ReleaseProcessedFlow(flow_obj)
+
+    for _ in range(self.NUM_POLLS):
+      db_obj.ReadFlowObject(client_id, flow_id)
+      db_obj.CountFlowResults(client_id, flow_id)
+      db_obj.ReadFlowResults(client_id, flow_id, 0, self.NUM_RESULTS)
+
+  def _RunFlows(self, num_threads):
+    """Runs NUM_FLOWS flows in given number of threads."""
+    db_obj = db.DatabaseValidationWrapper(mem.InMemoryDB())
+    client_ids = [
+        db_test_utils.InitializeClient(db_obj) for _ in range(num_threads)
+    ]
+
+    def Worker(client_id):
+      for _ in range(self.NUM_FLOWS // num_threads):
+        self._RunFlow(db_obj, client_id)
+
+    threads = [
+        threading.Thread(target=Worker, args=(client_id,))
+        for client_id in client_ids
+    ]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+
+  def testConcurrentFlows(self):
+    for num_threads in [1, 8, 32, 128]:
+      self.TimeIt(
+          self._RunFlows,
+          name="%d flows, %d threads" % (self.NUM_FLOWS, num_threads),
+          num_threads=num_threads)
+
+
+class InMemoryDBHuntResultsBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Measures reading results of a large hunt, like the UI does."""
+
+  REPEATS = 10
+  units = "ms"
+
+  NUM_CLIENTS = 200
+  NUM_RESULTS = 25
+  PAGE_SIZE = 50
+
+  def setUp(self):
+    super().setUp()
+
+    self.db = db.DatabaseValidationWrapper(mem.InMemoryDB())
+    hunt_obj = rdf_hunt_objects.Hunt(creator="test")
+    self.db.WriteHuntObject(hunt_obj)
+    self.hunt_id = hunt_obj.hunt_id
+
+    for _ in range(self.NUM_CLIENTS):
+      client_id = db_test_utils.InitializeClient(self.db)
+      self.db.WriteFlowObject(
+          rdf_flow_objects.Flow(
+              client_id=client_id,
+              flow_id=self.hunt_id,
+              parent_hunt_id=self.hunt_id))
+      self.db.WriteFlowResults([
+          rdf_flow_objects.FlowResult(
+              client_id=client_id,
+              flow_id=self.hunt_id,
+              hunt_id=self.hunt_id,
+              payload=rdf_client_fs.StatEntry(
+                  pathspec=rdf_paths.PathSpec.OS(path="/home/foo/bar%d" % i),
+                  st_size=i)) for i in range(self.NUM_RESULTS)
+      ])
+
+  def testReadHuntResults(self):
+    self.TimeIt(
+        self.db.ReadHuntResults,
+        name="ReadHuntResults (first page)",
+        hunt_id=self.hunt_id,
+        offset=0,
+        count=self.PAGE_SIZE)
+    self.TimeIt(
+        self.db.ReadHuntResults,
+        name="ReadHuntResults (last page)",
+        hunt_id=self.hunt_id,
+        offset=self.NUM_CLIENTS * self.NUM_RESULTS - self.PAGE_SIZE,
+        count=self.PAGE_SIZE)
+
+  def testCountHuntResults(self):
+    self.TimeIt(
+        self.db.CountHuntResults, name="CountHuntResults", hunt_id=self.hunt_id)
+
+  def testReadsDuringHuntResultsScan(self):
+    """Measures reads of other tables while hunt results are being counted."""
+    client_id = db_test_utils.InitializeClient(self.db)
+    stop = threading.Event()
+
+    def Scan():
+      while not stop.is_set():
+        self.db.CountHuntResults(self.hunt_id)
+
+    scan_thread = threading.Thread(target=Scan)
+    scan_thread.start()
+    try:
+      self.TimeIt(
+          self.db.ReadHuntObject,
+          name="ReadHuntObject during scan",
+          hunt_id=self.hunt_id)
+      self.TimeIt(
+          self.db.ReadClientMetadata,
+          name="ReadClientMetadata during scan",
+          client_id=client_id)
+    finally:
+      stop.set()
+      scan_thread.join()
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
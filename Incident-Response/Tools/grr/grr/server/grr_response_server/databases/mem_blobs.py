@@ -7,8 +7,8 @@ from __future__ import unicode_literals
 import threading
 
 
-from grr_response_core.lib import utils
 from grr_response_server import blob_store
+from grr_response_server.databases import mem_utils
 
 
 class _BlobRecord(object):
@@ -26,12 +26,12 @@ class _BlobRecord(object):
 class InMemoryDBBlobsMixin(blob_store.BlobStore):
   """InMemoryDB mixin for blobs related functions."""
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("blobs_lock")
   def WriteBlobs(self, blob_id_data_map):
     """Writes given blobs."""
     self.blobs.update(blob_id_data_map)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("blobs_lock")
   def ReadBlobs(self, blob_ids):
     """Reads given blobs."""
 
@@ -41,7 +41,7 @@ class InMemoryDBBlobsMixin(blob_store.BlobStore):
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("blobs_lock")
   def CheckBlobsExist(self, blob_ids):
     """Checks if given blobs exit."""
 
@@ -51,12 +51,12 @@ class InMemoryDBBlobsMixin(blob_store.BlobStore):
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("blobs_lock")
   def WriteHashBlobReferences(self, references_by_hash):
     for k, vs in references_by_hash.items():
       self.blob_refs_by_hashes[k] = [v.Copy() for v in vs]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("blobs_lock")
   def ReadHashBlobReferences(self, hashes):
     result = {}
     for hash_id in hashes:
@@ -75,4 +75,4 @@ class InMemoryBlobStore(InMemoryDBBlobsMixin):
 
     self.blobs = {}
     self.blob_refs_by_hashes = {}
-    self.lock = threading.RLock()
+    self.blobs_lock = threading.RLock()
@@ -13,6 +13,7 @@ from grr_response_core.lib.rdfvalues import client_stats as rdf_client_stats
 from grr_response_core.lib.util import collection
 from grr_response_server import fleet_utils
 from grr_response_server.databases import db
+from grr_response_server.databases import mem_utils
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
@@ -243,6 +244,19 @@ class InMemoryDBClientMixin(object):
         res[kw].append(client_id)
     return res
 
+  @utils.Synchronized
+  def ReadClientKeywordIndex(self, start_time=None):
+    """Reads the whole client keyword index."""
+    res = {}
+    for kw, timestamps in self.keywords.items():
+      client_ids = [
+          client_id for client_id, timestamp in timestamps.items()
+          if start_time is None or timestamp >= start_time
+      ]
+      if client_ids:
+        res[kw] = client_ids
+    return res
+
   @utils.Synchronized
   def RemoveClientKeyword(self, client_id, keyword):
     """Removes the association of a particular client to a keyword."""
@@ -462,6 +476,7 @@ class InMemoryDBClientMixin(object):
                                                day_bucket)
     return fleet_stats_builder.Build()
 
+  @mem_utils.Synchronized("flows_lock")
   @utils.Synchronized
   def DeleteClient(self, client_id):
     """Deletes a client with all associated metadata."""
@@ -481,7 +496,14 @@ class InMemoryDBClientMixin(object):
     self.client_stats.pop(client_id, None)
 
     for key in [k for k in self.flows if k[0] == client_id]:
-      self.flows.pop(key)
+      flow = self.flows.pop(key)
+      self._UpdateHuntFlowStats(self._GetHuntFlowStats(flow.view), None)
+    for key in [
+        k for k in self.flow_create_times_by_creator if k[0] == client_id
+    ]:
+      self.flow_create_times_by_creator.pop(key)
+    for key in [k for k in self.flows_by_args_digest if k[0] == client_id]:
+      self.flows_by_args_digest.pop(key)
     for key in [k for k in self.flow_requests if k[0] == client_id]:
       self.flow_requests.pop(key)
     for key in [k for k in self.flow_processing_requests if k[0] == client_id]:
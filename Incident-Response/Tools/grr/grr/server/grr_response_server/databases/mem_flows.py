@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import bisect
 import collections
 import logging
 import sys
@@ -15,8 +16,10 @@ from typing import Dict, List, Optional, Sequence, Text
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import compatibility
 from grr_response_server.databases import db
+from grr_response_server.databases import mem_utils
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
@@ -30,6 +33,11 @@ class TimeOutWhileWaitingForFlowsToBeProcessedError(Error):
   """Raised by WaitUntilNoFlowsToProcess when waiting longer than time limit."""
 
 
+# CPU time used by flows is stored as is, as floats lose precision when they are
+# serialized (the MySQL database stores it in separate columns).
+_FLOW_UNSERIALIZED_FIELDS = ("cpu_time_used",)
+
+
 class InMemoryDBFlowMixin(object):
   """InMemoryDB mixin for flow handling."""
 
@@ -123,7 +131,7 @@ class InMemoryDBFlowMixin(object):
 
     return leased_requests
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadAllClientActionRequests(self, client_id):
     """Reads all client action requests available for a given client_id."""
     res = []
@@ -150,7 +158,7 @@ class InMemoryDBFlowMixin(object):
     self.client_action_requests.pop(key, None)
     self.client_action_request_leases.pop(key, None)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def DeleteClientActionRequests(self, requests):
     """Deletes a list of client action requests from the db."""
     to_delete = []
@@ -164,7 +172,7 @@ class InMemoryDBFlowMixin(object):
     for client_id, flow_id, request_id in to_delete:
       self._DeleteClientActionRequest(client_id, flow_id, request_id)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def LeaseClientActionRequests(self,
                                 client_id,
                                 lease_time=None,
@@ -204,7 +212,7 @@ class InMemoryDBFlowMixin(object):
 
     return leased_requests
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def WriteClientActionRequests(self, requests):
     """Writes messages that should go to the client to the db."""
     for r in requests:
@@ -218,9 +226,24 @@ class InMemoryDBFlowMixin(object):
       request_key = (r.client_id, r.flow_id, r.request_id)
       self.client_action_requests[request_key] = r
 
-  @utils.Synchronized
   def WriteFlowObject(self, flow_obj, allow_update=True):
     """Writes a flow object to the database."""
+    now = rdfvalue.RDFDatetime.Now()
+
+    updates = {"last_update_time": now}
+    if flow_obj.create_time is None:
+      updates["create_time"] = now
+    # Snapshots are taken before acquiring the lock, as copying is the most
+    # expensive part of writes.
+    snapshot = mem_utils.Snapshot(
+        flow_obj, unserialized_fields=_FLOW_UNSERIALIZED_FIELDS, **updates)
+
+    with self.flows_lock:
+      self._WriteFlowSnapshot(snapshot, allow_update)
+
+  def _WriteFlowSnapshot(self, snapshot, allow_update):
+    """Writes a snapshot of a flow object to the database."""
+    flow_obj = snapshot.view
     if flow_obj.client_id not in self.metadatas:
       raise db.UnknownClientError(flow_obj.client_id)
 
@@ -229,24 +252,35 @@ class InMemoryDBFlowMixin(object):
     if not allow_update and key in self.flows:
       raise db.FlowExistsError(flow_obj.client_id, flow_obj.flow_id)
 
-    now = rdfvalue.RDFDatetime.Now()
+    old_stats = None
+    if key in self.flows:
+      old_stats = self._GetHuntFlowStats(self.flows[key].view)
+    elif not flow_obj.parent_flow_id:
+      self._IndexFlowForThrottling(snapshot.view)
 
-    clone = flow_obj.Copy()
-    clone.last_update_time = now
-    if clone.create_time is None:
-      clone.create_time = now
+    self.flows[key] = snapshot
+    self._UpdateHuntFlowStats(old_stats, self._GetHuntFlowStats(snapshot.view))
 
-    self.flows[key] = clone
+  def _IndexFlowForThrottling(self, flow_obj):
+    """Adds a new parent flow to the indexes used for throttling flows."""
+    create_times = self.flow_create_times_by_creator.setdefault(
+        (flow_obj.client_id, flow_obj.creator), [])
+    bisect.insort(create_times, flow_obj.create_time)
 
-  @utils.Synchronized
+    digest = rdf_flow_objects.FlowArgsDigest(flow_obj.args)
+    flows = self.flows_by_args_digest.setdefault(
+        (flow_obj.client_id, flow_obj.flow_class_name, digest), [])
+    bisect.insort(flows, (flow_obj.create_time, flow_obj.flow_id))
+
+  @mem_utils.Synchronized("flows_lock")
   def ReadFlowObject(self, client_id, flow_id):
     """Reads a flow object from the database."""
     try:
-      return self.flows[(client_id, flow_id)].Copy()
+      return self.flows[(client_id, flow_id)].Get()
     except KeyError:
       raise db.UnknownFlowError(client_id, flow_id)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadAllFlowObjects(
       self,
       client_id: Optional[Text] = None,
@@ -256,24 +290,58 @@ class InMemoryDBFlowMixin(object):
   ) -> List[rdf_flow_objects.Flow]:
     """Returns all flow objects."""
     res = []
-    for flow in self.flows.values():
+    for snapshot in self.flows.values():
+      flow = snapshot.view
       if ((client_id is None or flow.client_id == client_id) and
           (min_create_time is None or flow.create_time >= min_create_time) and
           (max_create_time is None or flow.create_time <= max_create_time) and
           (include_child_flows or not flow.parent_flow_id)):
-        res.append(flow.Copy())
+        res.append(snapshot.Get())
     return res
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
+  def CountFlowObjectsByCreator(
+      self,
+      client_id: Text,
+      creator: Text,
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> int:
+    """Counts parent flows started by a user on a client."""
+    create_times = self.flow_create_times_by_creator.get((client_id, creator),
+                                                         [])
+    return len(create_times) - bisect.bisect_left(create_times, min_create_time)
+
+  @mem_utils.Synchronized("flows_lock")
+  def ReadLatestFlowObjectWithArgs(
+      self,
+      client_id: Text,
+      flow_class_name: Text,
+      flow_args: Optional[rdf_structs.RDFProtoStruct],
+      min_create_time: rdfvalue.RDFDatetime,
+  ) -> Optional[rdf_flow_objects.Flow]:
+    """Reads the latest parent flow with the given class and arguments."""
+    digest = rdf_flow_objects.FlowArgsDigest(flow_args)
+    flows = self.flows_by_args_digest.get((client_id, flow_class_name, digest))
+    if not flows:
+      return None
+
+    create_time, flow_id = flows[-1]
+    if create_time < min_create_time:
+      return None
+
+    return self.flows[(client_id, flow_id)].Get()
+
+  @mem_utils.Synchronized("flows_lock")
   def ReadChildFlowObjects(self, client_id, flow_id):
     """Reads flows that were started by a given flow from the database."""
     res = []
-    for flow in self.flows.values():
+    for snapshot in self.flows.values():
+      flow = snapshot.view
       if flow.client_id == client_id and flow.parent_flow_id == flow_id:
-        res.append(flow)
+        res.append(snapshot.Get())
     return res
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def LeaseFlowForProcessing(self, client_id, flow_id, processing_time):
     """Marks a flow as being processed on this worker and returns it."""
     rdf_flow = self.ReadFlowObject(client_id, flow_id)
@@ -302,7 +370,7 @@ class InMemoryDBFlowMixin(object):
     rdf_flow.processing_deadline = processing_deadline
     return rdf_flow
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def UpdateFlow(self,
                  client_id,
                  flow_id,
@@ -316,40 +384,48 @@ class InMemoryDBFlowMixin(object):
     """Updates flow objects in the database."""
 
     try:
-      flow = self.flows[(client_id, flow_id)]
+      snapshot = self.flows[(client_id, flow_id)]
     except KeyError:
       raise db.UnknownFlowError(client_id, flow_id)
 
-    if flow_obj != db.Database.unchanged:
-      new_flow = flow_obj.Copy()
-
-      # Some fields cannot be updated.
-      new_flow.client_id = flow.client_id
-      new_flow.flow_id = flow.flow_id
-      new_flow.long_flow_id = flow.long_flow_id
-      new_flow.parent_flow_id = flow.parent_flow_id
-      new_flow.parent_hunt_id = flow.parent_hunt_id
-      new_flow.flow_class_name = flow.flow_class_name
-      new_flow.creator = flow.creator
-
-      self.flows[(client_id, flow_id)] = new_flow
-      flow = new_flow
+    flow = snapshot.view
+    old_stats = self._GetHuntFlowStats(flow)
 
+    updates = {}
     if flow_state != db.Database.unchanged:
-      flow.flow_state = flow_state
+      updates["flow_state"] = flow_state
     if client_crash_info != db.Database.unchanged:
-      flow.client_crash_info = client_crash_info
+      updates["client_crash_info"] = client_crash_info
     if pending_termination != db.Database.unchanged:
-      flow.pending_termination = pending_termination
+      updates["pending_termination"] = pending_termination
     if processing_on != db.Database.unchanged:
-      flow.processing_on = processing_on
+      updates["processing_on"] = processing_on
     if processing_since != db.Database.unchanged:
-      flow.processing_since = processing_since
+      updates["processing_since"] = processing_since
     if processing_deadline != db.Database.unchanged:
-      flow.processing_deadline = processing_deadline
-    flow.last_update_time = rdfvalue.RDFDatetime.Now()
+      updates["processing_deadline"] = processing_deadline
+    updates["last_update_time"] = rdfvalue.RDFDatetime.Now()
 
-  @utils.Synchronized
+    if flow_obj != db.Database.unchanged:
+      # Some fields cannot be updated.
+      snapshot = mem_utils.Snapshot(
+          flow_obj,
+          unserialized_fields=_FLOW_UNSERIALIZED_FIELDS,
+          client_id=flow.client_id,
+          flow_id=flow.flow_id,
+          long_flow_id=flow.long_flow_id,
+          parent_flow_id=flow.parent_flow_id,
+          parent_hunt_id=flow.parent_hunt_id,
+          flow_class_name=flow.flow_class_name,
+          creator=flow.creator,
+          **updates)
+    else:
+      snapshot = snapshot.Update(**updates)
+
+    self.flows[(client_id, flow_id)] = snapshot
+    self._UpdateHuntFlowStats(old_stats, self._GetHuntFlowStats(snapshot.view))
+
+  @mem_utils.Synchronized("flows_lock")
   def UpdateFlows(self,
                   client_id_flow_id_pairs,
                   pending_termination=db.Database.unchanged):
@@ -361,9 +437,16 @@ class InMemoryDBFlowMixin(object):
       except db.UnknownFlowError:
         pass
 
-  @utils.Synchronized
   def WriteFlowRequests(self, requests):
     """Writes a list of flow requests to the database."""
+    now = rdfvalue.RDFDatetime.Now()
+    snapshots = [mem_utils.Snapshot(r, timestamp=now) for r in requests]
+
+    with self.flows_lock:
+      self._WriteFlowRequestSnapshots(requests, snapshots)
+
+  def _WriteFlowRequestSnapshots(self, requests, snapshots):
+    """Writes snapshots of flow requests to the database."""
     flow_processing_requests = []
 
     for request in requests:
@@ -371,14 +454,13 @@ class InMemoryDBFlowMixin(object):
         raise db.AtLeastOneUnknownFlowError([(request.client_id,
                                               request.flow_id)])
 
-    for request in requests:
+    for request, snapshot in zip(requests, snapshots):
       key = (request.client_id, request.flow_id)
       request_dict = self.flow_requests.setdefault(key, {})
-      request_dict[request.request_id] = request.Copy()
-      request_dict[request.request_id].timestamp = rdfvalue.RDFDatetime.Now()
+      request_dict[request.request_id] = snapshot
 
       if request.needs_processing:
-        flow = self.flows[(request.client_id, request.flow_id)]
+        flow = self.flows[(request.client_id, request.flow_id)].view
         if flow.next_request_to_process == request.request_id:
           flow_processing_requests.append(
               rdf_flows.FlowProcessingRequest(
@@ -389,7 +471,7 @@ class InMemoryDBFlowMixin(object):
     if flow_processing_requests:
       self.WriteFlowProcessingRequests(flow_processing_requests)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def UpdateIncrementalFlowRequests(
       self, client_id: str, flow_id: str,
       next_response_id_updates: Dict[int, int]) -> None:
@@ -399,10 +481,11 @@ class InMemoryDBFlowMixin(object):
 
     request_dict = self.flow_requests[(client_id, flow_id)]
     for request_id, next_response_id in next_response_id_updates.items():
-      request_dict[request_id].next_response_id = next_response_id
-      request_dict[request_id].timestamp = rdfvalue.RDFDatetime.Now()
+      request_dict[request_id] = request_dict[request_id].Update(
+          next_response_id=next_response_id,
+          timestamp=rdfvalue.RDFDatetime.Now())
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def DeleteFlowRequests(self, requests):
     """Deletes a list of flow requests from the database."""
     for request in requests:
@@ -424,14 +507,21 @@ class InMemoryDBFlowMixin(object):
       except KeyError:
         pass
 
-  @utils.Synchronized
   def WriteFlowResponses(self, responses):
     """Writes FlowMessages and updates corresponding requests."""
+    now = rdfvalue.RDFDatetime.Now()
+    snapshots = [mem_utils.Snapshot(r, timestamp=now) for r in responses]
+
+    with self.flows_lock:
+      self._WriteFlowResponseSnapshots(responses, snapshots)
+
+  def _WriteFlowResponseSnapshots(self, responses, snapshots):
+    """Writes snapshots of FlowMessages and updates corresponding requests."""
     status_available = {}
     requests_updated = set()
     task_ids_by_request = {}
 
-    for response in responses:
+    for response, snapshot in zip(responses, snapshots):
       flow_key = (response.client_id, response.flow_id)
       if flow_key not in self.flows:
         logging.error("Received response for unknown flow %s, %s.",
@@ -445,11 +535,8 @@ class InMemoryDBFlowMixin(object):
         continue
 
       response_dict = self.flow_responses.setdefault(flow_key, {})
-      clone = response.Copy()
-      clone.timestamp = rdfvalue.RDFDatetime.Now()
-
       response_dict.setdefault(response.request_id,
-                               {})[response.response_id] = clone
+                               {})[response.response_id] = snapshot
 
       if isinstance(response, rdf_flow_objects.FlowStatus):
         status_available[(response.client_id, response.flow_id,
@@ -465,16 +552,16 @@ class InMemoryDBFlowMixin(object):
     # Every time we get a status we store how many responses are expected.
     for status in status_available.values():
       request_dict = self.flow_requests[(status.client_id, status.flow_id)]
-      request = request_dict[status.request_id]
-      request.nr_responses_expected = status.response_id
+      request_dict[status.request_id] = request_dict[status.request_id].Update(
+          nr_responses_expected=status.response_id)
 
     # And we check for all updated requests if we need to process them.
     needs_processing = []
     for client_id, flow_id, request_id in requests_updated:
       flow_key = (client_id, flow_id)
-      flow = self.flows[flow_key]
+      flow = self.flows[flow_key].view
       request_dict = self.flow_requests[flow_key]
-      request = request_dict[request_id]
+      request = request_dict[request_id].view
 
       added_for_processing = False
       if request.nr_responses_expected and not request.needs_processing:
@@ -482,7 +569,8 @@ class InMemoryDBFlowMixin(object):
         responses = response_dict.get(request_id, {})
 
         if len(responses) == request.nr_responses_expected:
-          request.needs_processing = True
+          request_dict[request_id] = request_dict[request_id].Update(
+              needs_processing=True)
           self._DeleteClientActionRequest(client_id, flow_id, request_id)
 
           if flow.next_request_to_process == request_id:
@@ -503,7 +591,7 @@ class InMemoryDBFlowMixin(object):
 
     return needs_processing
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadAllFlowRequestsAndResponses(self, client_id, flow_id):
     """Reads all requests and responses for a given flow from the database."""
     flow_key = (client_id, flow_id)
@@ -517,11 +605,15 @@ class InMemoryDBFlowMixin(object):
 
     res = []
     for request_id in sorted(request_dict):
-      res.append((request_dict[request_id], response_dict.get(request_id, {})))
+      responses = response_dict.get(request_id, {})
+      res.append((request_dict[request_id].Get(), {
+          response_id: snapshot.Get()
+          for response_id, snapshot in responses.items()
+      }))
 
     return res
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def DeleteAllFlowRequestsAndResponses(self, client_id, flow_id):
     """Deletes all requests and responses for a given flow from the database."""
     flow_key = (client_id, flow_id)
@@ -540,7 +632,7 @@ class InMemoryDBFlowMixin(object):
     except KeyError:
       pass
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadFlowRequestsReadyForProcessing(self,
                                          client_id,
                                          flow_id,
@@ -560,22 +652,12 @@ class InMemoryDBFlowMixin(object):
         break
       request = request_dict[request_id]
 
-      if not request.needs_processing:
+      if not request.view.needs_processing:
         break
 
-      responses = sorted(
-          response_dict.get(request_id, {}).values(),
-          key=lambda response: response.response_id)
-      # Serialize/deserialize responses to better simulate the
-      # real DB behavior (where serialization/deserialization is almost
-      # guaranteed to be done).
-      # TODO(user): change mem-db implementation to do
-      # serialization/deserialization everywhere in a generic way.
-      responses = [
-          r.__class__.FromSerializedBytes(r.SerializeToBytes())
-          for r in responses
-      ]
-      res[request_id] = (request, responses)
+      responses = response_dict.get(request_id, {})
+      res[request_id] = (request.Get(),
+                         [responses[i].Get() for i in sorted(responses)])
       next_needed_request += 1
 
     # Do a pass for incremental requests.
@@ -585,36 +667,26 @@ class InMemoryDBFlowMixin(object):
         continue
 
       request = request_dict[request_id]
-      if not request.callback_state:
+      if not request.view.callback_state:
         continue
 
-      responses = response_dict.get(request_id, {}).values()
-      responses = [
-          r for r in responses if r.response_id >= request.next_response_id
+      responses = response_dict.get(request_id, {})
+      response_ids = [
+          i for i in sorted(responses) if i >= request.view.next_response_id
       ]
-      responses = sorted(responses, key=lambda response: response.response_id)
-
-      # Serialize/deserialize responses to better simulate the
-      # real DB behavior (where serialization/deserialization is almost
-      # guaranteed to be done).
-      # TODO(user): change mem-db implementation to do
-      # serialization/deserialization everywhere in a generic way.
-      responses = [
-          r.__class__.FromSerializedBytes(r.SerializeToBytes())
-          for r in responses
-      ]
-      res[request_id] = (request, responses)
+      res[request_id] = (request.Get(),
+                         [responses[i].Get() for i in response_ids])
 
     return res
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReleaseProcessedFlow(self, flow_obj):
     """Releases a flow that the worker was processing to the database."""
     key = (flow_obj.client_id, flow_obj.flow_id)
     next_id_to_process = flow_obj.next_request_to_process
     request_dict = self.flow_requests.get(key, {})
     if (next_id_to_process in request_dict and
-        request_dict[next_id_to_process].needs_processing):
+        request_dict[next_id_to_process].view.needs_processing):
       return False
 
     self.UpdateFlow(
@@ -632,7 +704,7 @@ class InMemoryDBFlowMixin(object):
         return False
     return True
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def WriteFlowProcessingRequests(self, requests):
     """Writes a list of flow processing requests to the database."""
     # If we don't have a handler thread running, we might be able to process the
@@ -654,12 +726,12 @@ class InMemoryDBFlowMixin(object):
       key = (r.client_id, r.flow_id)
       self.flow_processing_requests[key] = cloned_request
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadFlowProcessingRequests(self):
     """Reads all flow processing requests from the database."""
     return list(self.flow_processing_requests.values())
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def AckFlowProcessingRequests(self, requests):
     """Deletes a list of flow processing requests from the database."""
     for r in requests:
@@ -667,7 +739,7 @@ class InMemoryDBFlowMixin(object):
       if key in self.flow_processing_requests:
         del self.flow_processing_requests[key]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def DeleteAllFlowProcessingRequests(self):
     self.flow_processing_requests = {}
 
@@ -681,7 +753,7 @@ class InMemoryDBFlowMixin(object):
 
     for request in self._GetFlowRequestsReadyForProcessing():
       handler(request)
-      with self.lock:
+      with self.flows_lock:
         self.flow_processing_requests.pop((request.client_id, request.flow_id),
                                           None)
 
@@ -706,7 +778,7 @@ class InMemoryDBFlowMixin(object):
         raise RuntimeError("Flow processing handler did not join in time.")
       self.flow_handler_thread = None
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def _GetFlowRequestsReadyForProcessing(self):
     now = rdfvalue.RDFDatetime.Now()
     todo = []
@@ -731,7 +803,7 @@ class InMemoryDBFlowMixin(object):
 
     start_time = time.time()
     while True:
-      with self.lock:
+      with self.flows_lock:
         # If the thread is dead, or there are no requests
         # to be processed/being processed, we stop waiting
         # and return from the function.
@@ -749,7 +821,7 @@ class InMemoryDBFlowMixin(object):
   def _HandleFlowProcessingRequestLoop(self, handler):
     """Handler thread for the FlowProcessingRequest queue."""
     while not self.flow_handler_stop:
-      with self.lock:
+      with self.flows_lock:
         todo = self._GetFlowRequestsReadyForProcessing()
         for request in todo:
           self.flow_handler_num_being_processed += 1
@@ -758,63 +830,111 @@ class InMemoryDBFlowMixin(object):
 
       for request in todo:
         handler(request)
-        with self.lock:
+        with self.flows_lock:
           self.flow_handler_num_being_processed -= 1
 
       time.sleep(0.2)
 
-  @utils.Synchronized
   def _WriteFlowResultsOrErrors(self, container, items):
+    now = rdfvalue.RDFDatetime.Now()
+    snapshots = []
     for i in items:
-      dest = container.setdefault((i.client_id, i.flow_id), [])
-      to_write = i.Copy()
-      to_write.timestamp = rdfvalue.RDFDatetime.Now()
-      dest.append(to_write)
+      to_write = mem_utils.Snapshot(i, timestamp=now)
+      # The payload is parsed right away, as its type might not be known anymore
+      # when it's read (see _ThawFlowResultOrError).
+      _ = to_write.view.payload
+      snapshots.append(to_write)
+
+    with self.flows_lock:
+      self._WriteFlowResultOrErrorSnapshots(container, snapshots)
+
+  def _WriteFlowResultOrErrorSnapshots(self, container, snapshots):
+    for to_write in snapshots:
+      key = (to_write.view.client_id, to_write.view.flow_id)
+      flow = self.flows.get(key)
+      old_stats = None
+      if container is self.flow_results and flow is not None:
+        old_stats = self._GetHuntFlowStats(flow.view)
+
+      container.setdefault(key, []).append(to_write)
+
+      if old_stats is not None:
+        self._UpdateHuntFlowStats(old_stats, self._GetHuntFlowStats(flow.view))
 
   def WriteFlowResults(self, results):
     """Writes flow results for a given flow."""
     self._WriteFlowResultsOrErrors(self.flow_results, results)
 
-  @utils.Synchronized
-  def _ReadFlowResultsOrErrors(self,
-                               container,
-                               client_id,
-                               flow_id,
-                               offset,
-                               count,
-                               with_tag=None,
-                               with_type=None,
-                               with_substring=None):
-    """Reads flow results/errors of a given flow using given query options."""
-    results = sorted(
-        [x.Copy() for x in container.get((client_id, flow_id), [])],
-        key=lambda r: r.timestamp)
-
-    # This is done in order to pass the tests that try to deserialize
-    # value of an unrecognized type.
-    for r in results:
-      cls_name = compatibility.GetName(r.payload.__class__)
-      if cls_name not in rdfvalue.RDFValue.classes:
-        r.payload = rdf_objects.SerializedValueOfUnrecognizedType(
-            type_name=cls_name, value=r.payload.SerializeToBytes())
+  def _FilterFlowResultsOrErrors(self,
+                                 container,
+                                 client_id,
+                                 flow_id,
+                                 with_tag=None,
+                                 with_type=None,
+                                 with_substring=None):
+    """Returns snapshots of flow results/errors matching given options."""
+    items = sorted(
+        container.get((client_id, flow_id), []), key=lambda i: i.view.timestamp)
 
     if with_tag is not None:
-      results = [i for i in results if i.tag == with_tag]
+      items = [i for i in items if i.view.tag == with_tag]
 
     if with_type is not None:
-      results = [
-          i for i in results
-          if compatibility.GetName(i.payload.__class__) == with_type
+      items = [
+          i for i in items
+          if compatibility.GetName(i.view.payload.__class__) == with_type
       ]
 
     if with_substring is not None:
       encoded_substring = with_substring.encode("utf8")
-      results = [
-          i for i in results
-          if encoded_substring in i.payload.SerializeToBytes()
+      items = [
+          i for i in items
+          if encoded_substring in i.view.payload.SerializeToBytes()
       ]
 
-    return results[offset:offset + count]
+    return items
+
+  def _ThawFlowResultOrError(self, snapshot):
+    """Returns a flow result/error that can be returned to the caller."""
+    payload = snapshot.view.payload
+    cls_name = compatibility.GetName(payload.__class__)
+    if cls_name in rdfvalue.RDFValue.classes:
+      return snapshot.Get()
+
+    # This is done in order to pass the tests that try to deserialize
+    # value of an unrecognized type. The stored payload can't be parsed anymore,
+    # so the item is built from the fields of the view.
+    fields = {
+        name: getattr(snapshot.view, name)
+        for name in ("client_id", "flow_id", "hunt_id", "timestamp", "tag")
+        if snapshot.view.HasField(name)
+    }
+    return snapshot.view.__class__(
+        payload=rdf_objects.SerializedValueOfUnrecognizedType(
+            type_name=cls_name, value=payload.SerializeToBytes()),
+        **fields)
+
+  @mem_utils.Synchronized("flows_lock")
+  def _ReadFlowResultsOrErrors(self,
+                               container,
+                               client_id,
+                               flow_id,
+                               offset,
+                               count,
+                               with_tag=None,
+                               with_type=None,
+                               with_substring=None):
+    """Reads flow results/errors of a given flow using given query options."""
+    items = self._FilterFlowResultsOrErrors(
+        container,
+        client_id,
+        flow_id,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring)
+    return [
+        self._ThawFlowResultOrError(i) for i in items[offset:offset + count]
+    ]
 
   def ReadFlowResults(self,
                       client_id,
@@ -835,25 +955,23 @@ class InMemoryDBFlowMixin(object):
         with_type=with_type,
         with_substring=with_substring)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowResults(self, client_id, flow_id, with_tag=None, with_type=None):
     """Counts flow results of a given flow using given query options."""
     return len(
-        self.ReadFlowResults(
+        self._FilterFlowResultsOrErrors(
+            self.flow_results,
             client_id,
             flow_id,
-            0,
-            sys.maxsize,
             with_tag=with_tag,
             with_type=with_type))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowResultsByType(self, client_id, flow_id):
     """Returns counts of flow results grouped by result type."""
     result = collections.Counter()
-    for hr in self.ReadFlowResults(client_id, flow_id, 0, sys.maxsize):
-      key = compatibility.GetName(hr.payload.__class__)
-      result[key] += 1
+    for item in self.flow_results.get((client_id, flow_id), []):
+      result[compatibility.GetName(item.view.payload.__class__)] += 1
 
     return result
 
@@ -886,29 +1004,27 @@ class InMemoryDBFlowMixin(object):
         with_tag=with_tag,
         with_type=with_type)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowErrors(self, client_id, flow_id, with_tag=None, with_type=None):
     """Counts flow errors of a given flow using given query options."""
     return len(
-        self.ReadFlowErrors(
+        self._FilterFlowResultsOrErrors(
+            self.flow_errors,
             client_id,
             flow_id,
-            0,
-            sys.maxsize,
             with_tag=with_tag,
             with_type=with_type))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowErrorsByType(self, client_id, flow_id):
     """Returns counts of flow errors grouped by error type."""
     result = collections.Counter()
-    for hr in self.ReadFlowErrors(client_id, flow_id, 0, sys.maxsize):
-      key = compatibility.GetName(hr.payload.__class__)
-      result[key] += 1
+    for item in self.flow_errors.get((client_id, flow_id), []):
+      result[compatibility.GetName(item.view.payload.__class__)] += 1
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def WriteFlowLogEntries(self, entries):
     """Writes flow output plugin log entries for a given flow."""
     flow_ids = [(e.client_id, e.flow_id) for e in entries]
@@ -922,7 +1038,7 @@ class InMemoryDBFlowMixin(object):
       to_write.timestamp = rdfvalue.RDFDatetime.Now()
       dest.append(to_write)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadFlowLogEntries(self,
                          client_id,
                          flow_id,
@@ -939,12 +1055,12 @@ class InMemoryDBFlowMixin(object):
 
     return entries[offset:offset + count]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowLogEntries(self, client_id, flow_id):
     """Returns number of flow log entries of a given flow."""
     return len(self.ReadFlowLogEntries(client_id, flow_id, 0, sys.maxsize))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def WriteFlowOutputPluginLogEntries(self, entries):
     """Writes flow output plugin log entries."""
     flow_ids = [(e.client_id, e.flow_id) for e in entries]
@@ -959,7 +1075,7 @@ class InMemoryDBFlowMixin(object):
       to_write.timestamp = rdfvalue.RDFDatetime.Now()
       dest.append(to_write)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadFlowOutputPluginLogEntries(self,
                                      client_id,
                                      flow_id,
@@ -979,7 +1095,7 @@ class InMemoryDBFlowMixin(object):
 
     return entries[offset:offset + count]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountFlowOutputPluginLogEntries(self,
                                       client_id,
                                       flow_id,
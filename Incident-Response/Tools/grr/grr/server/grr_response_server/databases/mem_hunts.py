@@ -4,41 +4,111 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
 import sys
 
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client_stats as rdf_client_stats
 from grr_response_core.lib.rdfvalues import stats as rdf_stats
 from grr_response_core.lib.util import compatibility
 from grr_response_server.databases import db
+from grr_response_server.databases import mem_utils
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import flow_runner as rdf_flow_runner
 from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 
 
+_HuntFlowStats = collections.namedtuple("_HuntFlowStats", [
+    "hunt_id",
+    "flow_state",
+    "create_bucket",
+    "completion_bucket",
+    "cpu_seconds",
+    "network_bytes_sent",
+    "num_results",
+])
+
+
+def _CompletionBucket(timestamp):
+  seconds = timestamp.AsSecondsSinceEpoch()
+  return seconds - seconds % db.HUNT_COMPLETION_BUCKET_SECONDS
+
+
 class InMemoryDBHuntMixin(object):
   """Hunts-related DB methods implementation."""
 
+  def _GetHuntFlowStats(self, flow_obj):
+    """Returns flow's contribution to hunt stats (None for non-hunt flows)."""
+    if not flow_obj.parent_hunt_id or flow_obj.parent_flow_id:
+      return None
+
+    if flow_obj.flow_state != rdf_flow_objects.Flow.FlowState.RUNNING:
+      completion_bucket = _CompletionBucket(flow_obj.last_update_time)
+    else:
+      completion_bucket = None
+
+    return _HuntFlowStats(
+        hunt_id=flow_obj.parent_hunt_id,
+        flow_state=flow_obj.flow_state,
+        create_bucket=_CompletionBucket(flow_obj.create_time),
+        completion_bucket=completion_bucket,
+        cpu_seconds=(flow_obj.cpu_time_used.user_cpu_time +
+                     flow_obj.cpu_time_used.system_cpu_time),
+        network_bytes_sent=flow_obj.network_bytes_sent,
+        num_results=len(
+            self.flow_results.get((flow_obj.client_id, flow_obj.flow_id), [])))
+
+  def _ApplyHuntFlowStats(self, stats, sign):
+    counters = self.hunt_counters.setdefault(stats.hunt_id,
+                                             collections.Counter())
+    counters["num_clients"] += sign
+    counters[int(stats.flow_state)] += sign
+    counters["num_clients_with_results"] += sign * (stats.num_results > 0)
+    counters["num_results"] += sign * stats.num_results
+    counters["total_cpu_seconds"] += sign * stats.cpu_seconds
+    counters["total_network_bytes_sent"] += sign * stats.network_bytes_sent
+
+    buckets = self.hunt_completion_buckets.setdefault(stats.hunt_id, {})
+    buckets.setdefault(stats.create_bucket, [0, 0])[0] += sign
+    if stats.completion_bucket is not None:
+      buckets.setdefault(stats.completion_bucket, [0, 0])[1] += sign
+
+  def _UpdateHuntFlowStats(self, old_stats, new_stats):
+    """Incrementally updates hunt counters and completion buckets.
+
+    Args:
+      old_stats: _HuntFlowStats of a flow before the change (None if the flow
+        didn't exist or is not a top-level hunt flow).
+      new_stats: _HuntFlowStats of a flow after the change (None if the flow
+        was deleted or is not a top-level hunt flow).
+    """
+    if old_stats == new_stats:
+      return
+
+    if old_stats is not None:
+      self._ApplyHuntFlowStats(old_stats, -1)
+    if new_stats is not None:
+      self._ApplyHuntFlowStats(new_stats, 1)
+
   def _GetHuntFlows(self, hunt_id):
+    """Returns snapshots of top-level flows of a hunt."""
     top_level_flows = [
         f for f in self.flows.values()
-        if f.parent_hunt_id == hunt_id and not f.parent_flow_id
+        if f.view.parent_hunt_id == hunt_id and not f.view.parent_flow_id
     ]
-    return sorted(top_level_flows, key=lambda f: f.client_id)
+    return sorted(top_level_flows, key=lambda f: f.view.client_id)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def WriteHuntObject(self, hunt_obj):
     """Writes a hunt object to the database."""
     if hunt_obj.hunt_id in self.hunts:
       raise db.DuplicatedHuntError(hunt_id=hunt_obj.hunt_id)
 
-    clone = self._DeepCopy(hunt_obj)
-    clone.create_time = rdfvalue.RDFDatetime.Now()
-    clone.last_update_time = rdfvalue.RDFDatetime.Now()
-    self.hunts[(hunt_obj.hunt_id)] = clone
+    now = rdfvalue.RDFDatetime.Now()
+    self.hunts[hunt_obj.hunt_id] = mem_utils.Snapshot(
+        hunt_obj, create_time=now, last_update_time=now)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def UpdateHuntObject(self, hunt_id, start_time=None, **kwargs):
     """Updates the hunt object by applying the update function."""
     hunt_obj = self.ReadHuntObject(hunt_id)
@@ -61,9 +131,9 @@ class InMemoryDBHuntMixin(object):
       hunt_obj.last_start_time = start_time
 
     hunt_obj.last_update_time = rdfvalue.RDFDatetime.Now()
-    self.hunts[hunt_obj.hunt_id] = hunt_obj
+    self.hunts[hunt_obj.hunt_id] = mem_utils.Snapshot(hunt_obj)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def ReadHuntOutputPluginsStates(self, hunt_id):
     if hunt_id not in self.hunts:
       raise db.UnknownHuntError(hunt_id)
@@ -74,7 +144,7 @@ class InMemoryDBHuntMixin(object):
         for s in serialized_states
     ]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def WriteHuntOutputPluginsStates(self, hunt_id, states):
 
     if hunt_id not in self.hunts:
@@ -84,7 +154,7 @@ class InMemoryDBHuntMixin(object):
         s.SerializeToBytes() for s in states
     ]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def UpdateHuntOutputPluginState(self, hunt_id, state_index, update_fn):
     """Updates hunt output plugin state for a given output plugin."""
 
@@ -104,22 +174,26 @@ class InMemoryDBHuntMixin(object):
 
     return state.plugin_state
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
+  @mem_utils.Synchronized("hunts_lock")
   def DeleteHuntObject(self, hunt_id):
     try:
       del self.hunts[hunt_id]
     except KeyError:
       raise db.UnknownHuntError(hunt_id)
 
-  @utils.Synchronized
+    self.hunt_counters.pop(hunt_id, None)
+    self.hunt_completion_buckets.pop(hunt_id, None)
+
+  @mem_utils.Synchronized("hunts_lock")
   def ReadHuntObject(self, hunt_id):
     """Reads a hunt object from the database."""
     try:
-      return self._DeepCopy(self.hunts[hunt_id])
+      return self.hunts[hunt_id].Get()
     except KeyError:
       raise db.UnknownHuntError(hunt_id)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def ReadHuntObjects(self,
                       offset,
                       count,
@@ -136,12 +210,12 @@ class InMemoryDBHuntMixin(object):
       filter_fns.append(lambda h: with_description_match in h.description)
     filter_fn = lambda h: all(f(h) for f in filter_fns)
 
-    result = [self._DeepCopy(h) for h in self.hunts.values() if filter_fn(h)]
+    result = [h.Get() for h in self.hunts.values() if filter_fn(h.view)]
     return sorted(
         result, key=lambda h: h.create_time,
         reverse=True)[offset:offset + (count or db.MAX_COUNT)]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("hunts_lock")
   def ListHuntObjects(self,
                       offset,
                       count,
@@ -160,19 +234,20 @@ class InMemoryDBHuntMixin(object):
 
     result = []
     for h in self.hunts.values():
-      if not filter_fn(h):
+      if not filter_fn(h.view):
         continue
-      result.append(rdf_hunt_objects.HuntMetadata.FromHunt(h))
+      result.append(rdf_hunt_objects.HuntMetadata.FromHunt(h.view))
 
     return sorted(
         result, key=lambda h: h.create_time,
         reverse=True)[offset:offset + (count or db.MAX_COUNT)]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntLogEntries(self, hunt_id, offset, count, with_substring=None):
     """Reads hunt log entries of a given hunt using given query options."""
     all_entries = []
-    for flow_obj in self._GetHuntFlows(hunt_id):
+    for flow in self._GetHuntFlows(hunt_id):
+      flow_obj = flow.view
       for entry in self.ReadFlowLogEntries(
           flow_obj.client_id,
           flow_obj.flow_id,
@@ -190,12 +265,12 @@ class InMemoryDBHuntMixin(object):
 
     return sorted(all_entries, key=lambda x: x.timestamp)[offset:offset + count]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountHuntLogEntries(self, hunt_id):
     """Returns number of hunt log entries of a given hunt."""
     return len(self.ReadHuntLogEntries(hunt_id, 0, sys.maxsize))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntResults(self,
                       hunt_id,
                       offset,
@@ -205,38 +280,58 @@ class InMemoryDBHuntMixin(object):
                       with_substring=None,
                       with_timestamp=None):
     """Reads hunt results of a given hunt using given query options."""
+    all_results = self._FilterHuntResults(
+        hunt_id,
+        with_tag=with_tag,
+        with_type=with_type,
+        with_substring=with_substring,
+        with_timestamp=with_timestamp)
+
+    results = []
+    for flow_obj, snapshot in all_results[offset:offset + count]:
+      entry = self._ThawFlowResultOrError(snapshot)
+      results.append(
+          rdf_flow_objects.FlowResult(
+              hunt_id=hunt_id,
+              client_id=flow_obj.client_id,
+              flow_id=flow_obj.flow_id,
+              timestamp=entry.timestamp,
+              tag=entry.tag,
+              payload=entry.payload))
+
+    return results
+
+  def _FilterHuntResults(self,
+                         hunt_id,
+                         with_tag=None,
+                         with_type=None,
+                         with_substring=None,
+                         with_timestamp=None):
+    """Returns (flow, result snapshot) pairs of matching hunt results."""
     all_results = []
-    for flow_obj in self._GetHuntFlows(hunt_id):
-      for entry in self.ReadFlowResults(
+    for flow in self._GetHuntFlows(hunt_id):
+      flow_obj = flow.view
+      for snapshot in self._FilterFlowResultsOrErrors(
+          self.flow_results,
           flow_obj.client_id,
           flow_obj.flow_id,
-          0,
-          sys.maxsize,
           with_tag=with_tag,
           with_type=with_type,
           with_substring=with_substring):
-        all_results.append(
-            rdf_flow_objects.FlowResult(
-                hunt_id=hunt_id,
-                client_id=flow_obj.client_id,
-                flow_id=flow_obj.flow_id,
-                timestamp=entry.timestamp,
-                tag=entry.tag,
-                payload=entry.payload))
-
-    if with_timestamp:
-      all_results = [r for r in all_results if r.timestamp == with_timestamp]
+        if with_timestamp and snapshot.view.timestamp != with_timestamp:
+          continue
+        all_results.append((flow_obj, snapshot))
 
-    return sorted(all_results, key=lambda x: x.timestamp)[offset:offset + count]
+    return sorted(all_results, key=lambda x: x[1].view.timestamp)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountHuntResults(self, hunt_id, with_tag=None, with_type=None):
     """Counts hunt results of a given hunt using given query options."""
     return len(
-        self.ReadHuntResults(
-            hunt_id, 0, sys.maxsize, with_tag=with_tag, with_type=with_type))
+        self._FilterHuntResults(
+            hunt_id, with_tag=with_tag, with_type=with_type))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountHuntResultsByType(self, hunt_id):
     result = {}
     for hr in self.ReadHuntResults(hunt_id, 0, sys.maxsize):
@@ -245,7 +340,7 @@ class InMemoryDBHuntMixin(object):
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntFlows(self,
                     hunt_id,
                     offset,
@@ -268,14 +363,11 @@ class InMemoryDBHuntMixin(object):
     else:
       raise ValueError("Invalid filter condition: %d" % filter_condition)
 
-    results = [
-        flow_obj for flow_obj in self._GetHuntFlows(hunt_id)
-        if filter_fn(flow_obj)
-    ]
-    results.sort(key=lambda f: f.last_update_time)
-    return results[offset:offset + count]
+    results = [f for f in self._GetHuntFlows(hunt_id) if filter_fn(f.view)]
+    results.sort(key=lambda f: f.view.last_update_time)
+    return [f.Get() for f in results[offset:offset + count]]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountHuntFlows(self,
                      hunt_id,
                      filter_condition=db.HuntFlowsCondition.UNSET):
@@ -285,48 +377,30 @@ class InMemoryDBHuntMixin(object):
         self.ReadHuntFlows(
             hunt_id, 0, sys.maxsize, filter_condition=filter_condition))
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntCounters(self, hunt_id):
     """Reads hunt counters."""
-    num_clients = self.CountHuntFlows(hunt_id)
-    num_successful_clients = self.CountHuntFlows(
-        hunt_id, filter_condition=db.HuntFlowsCondition.SUCCEEDED_FLOWS_ONLY)
-    num_failed_clients = self.CountHuntFlows(
-        hunt_id, filter_condition=db.HuntFlowsCondition.FAILED_FLOWS_ONLY)
-    num_clients_with_results = len(
-        set(r[0].client_id
-            for r in self.flow_results.values()
-            if r and r[0].hunt_id == hunt_id))
-    num_crashed_clients = self.CountHuntFlows(
-        hunt_id, filter_condition=db.HuntFlowsCondition.CRASHED_FLOWS_ONLY)
-    num_running_clients = self.CountHuntFlows(
-        hunt_id, filter_condition=db.HuntFlowsCondition.FLOWS_IN_PROGRESS_ONLY)
-    num_results = self.CountHuntResults(hunt_id)
-
-    total_cpu_seconds = 0
-    total_network_bytes_sent = 0
-    for f in self.ReadHuntFlows(hunt_id, 0, sys.maxsize):
-      total_cpu_seconds += (
-          f.cpu_time_used.user_cpu_time + f.cpu_time_used.system_cpu_time)
-      total_network_bytes_sent += f.network_bytes_sent
+    counters = self.hunt_counters.get(hunt_id, collections.Counter())
+    flow_state = rdf_flow_objects.Flow.FlowState
 
     return db.HuntCounters(
-        num_clients=num_clients,
-        num_successful_clients=num_successful_clients,
-        num_failed_clients=num_failed_clients,
-        num_clients_with_results=num_clients_with_results,
-        num_crashed_clients=num_crashed_clients,
-        num_running_clients=num_running_clients,
-        num_results=num_results,
-        total_cpu_seconds=total_cpu_seconds,
-        total_network_bytes_sent=total_network_bytes_sent)
-
-  @utils.Synchronized
+        num_clients=counters["num_clients"],
+        num_successful_clients=counters[int(flow_state.FINISHED)],
+        num_failed_clients=counters[int(flow_state.ERROR)],
+        num_clients_with_results=counters["num_clients_with_results"],
+        num_crashed_clients=counters[int(flow_state.CRASHED)],
+        num_running_clients=counters[int(flow_state.RUNNING)],
+        num_results=counters["num_results"],
+        total_cpu_seconds=counters["total_cpu_seconds"],
+        total_network_bytes_sent=counters["total_network_bytes_sent"])
+
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntClientResourcesStats(self, hunt_id):
     """Read/calculate hunt client resources stats."""
 
     result = rdf_stats.ClientResourcesStats()
-    for f in self._GetHuntFlows(hunt_id):
+    for flow in self._GetHuntFlows(hunt_id):
+      f = flow.view
       cr = rdf_client_stats.ClientResources(
           session_id="%s/%s" % (f.client_id, f.flow_id),
           client_id=f.client_id,
@@ -339,12 +413,13 @@ class InMemoryDBHuntMixin(object):
     return rdf_stats.ClientResourcesStats.FromSerializedBytes(
         result.SerializeToBytes())
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntFlowsStatesAndTimestamps(self, hunt_id):
     """Reads hunt flows states and timestamps."""
 
     result = []
-    for f in self._GetHuntFlows(hunt_id):
+    for flow in self._GetHuntFlows(hunt_id):
+      f = flow.view
       result.append(
           db.FlowStateAndTimestamps(
               flow_state=f.flow_state,
@@ -353,7 +428,20 @@ class InMemoryDBHuntMixin(object):
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
+  def ReadHuntClientCompletionHistogram(self, hunt_id):
+    """Reads hunt's client completion histogram."""
+    buckets = self.hunt_completion_buckets.get(hunt_id, {})
+    return [
+        db.HuntClientCompletionBucket(
+            timestamp=rdfvalue.RDFDatetime.FromSecondsSinceEpoch(bucket),
+            num_started_clients=num_started,
+            num_completed_clients=num_completed)
+        for bucket, (num_started, num_completed) in sorted(buckets.items())
+        if num_started or num_completed
+    ]
+
+  @mem_utils.Synchronized("flows_lock")
   def ReadHuntOutputPluginLogEntries(self,
                                      hunt_id,
                                      output_plugin_id,
@@ -363,7 +451,8 @@ class InMemoryDBHuntMixin(object):
     """Reads hunt output plugin log entries."""
 
     all_entries = []
-    for flow_obj in self._GetHuntFlows(hunt_id):
+    for flow in self._GetHuntFlows(hunt_id):
+      flow_obj = flow.view
       for entry in self.ReadFlowOutputPluginLogEntries(
           flow_obj.client_id,
           flow_obj.flow_id,
@@ -383,7 +472,7 @@ class InMemoryDBHuntMixin(object):
 
     return sorted(all_entries, key=lambda x: x.timestamp)[offset:offset + count]
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("flows_lock")
   def CountHuntOutputPluginLogEntries(self,
                                       hunt_id,
                                       output_plugin_id,
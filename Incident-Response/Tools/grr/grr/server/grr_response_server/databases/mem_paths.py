@@ -11,9 +11,9 @@ from typing import Sequence
 from typing import Text
 
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
 from grr_response_server.databases import db
+from grr_response_server.databases import mem_utils
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
@@ -187,7 +187,7 @@ class _PathRecord(object):
 class InMemoryDBPathMixin(object):
   """InMemoryDB mixin for path related functions."""
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def ReadPathInfo(self, client_id, path_type, components, timestamp=None):
     """Retrieves a path info record for a given path."""
     try:
@@ -197,7 +197,7 @@ class InMemoryDBPathMixin(object):
       raise db.UnknownPathError(
           client_id=client_id, path_type=path_type, components=components)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def ReadPathInfos(self, client_id, path_type, components_list):
     """Retrieves path info records for given paths."""
     result = {}
@@ -211,7 +211,7 @@ class InMemoryDBPathMixin(object):
 
     return result
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def ListDescendantPathInfos(self,
                               client_id,
                               path_type,
@@ -236,16 +236,17 @@ class InMemoryDBPathMixin(object):
         continue
       if not collection.StartsWith(other_components, components):
         continue
-      if (max_depth is not None and
-          len(other_components) - len(components) > max_depth):
-        continue
-
       result.append(path_info)
 
     if not root_dir_exists and components:
       raise db.UnknownPathError(client_id, path_type, components)
 
+    def WithinMaxDepth(path_info):
+      return (max_depth is None or
+              len(path_info.components) - len(components) <= max_depth)
+
     if timestamp is None:
+      result = filter(WithinMaxDepth, result)
       return sorted(result, key=lambda _: tuple(_.components))
 
     # We need to filter implicit path infos if specific timestamp is given.
@@ -287,7 +288,10 @@ class InMemoryDBPathMixin(object):
 
     explicit_path_infos = []
     trie.Collect(explicit_path_infos)
-    return explicit_path_infos
+
+    # Explicit descendants deeper than `max_depth` still make their ancestors
+    # explicit, so the depth is limited only after collecting.
+    return list(filter(WithinMaxDepth, explicit_path_infos))
 
   def _GetPathRecord(self, client_id, path_info, set_default=True):
     components = tuple(path_info.components)
@@ -313,19 +317,19 @@ class InMemoryDBPathMixin(object):
       parent_path_record = self._GetPathRecord(client_id, parent_path_info)
       parent_path_record.AddChild(path_info)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def MultiWritePathInfos(self, path_infos):
     for client_id, client_path_infos in path_infos.items():
       self.WritePathInfos(client_id, client_path_infos)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def WritePathInfos(self, client_id, path_infos):
     for path_info in path_infos:
       self._WritePathInfo(client_id, path_info)
       for ancestor_path_info in path_info.GetAncestors():
         self._WritePathInfo(client_id, ancestor_path_info)
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def ReadPathInfosHistories(
       self,
       client_id: Text,
@@ -371,7 +375,7 @@ class InMemoryDBPathMixin(object):
 
     return results
 
-  @utils.Synchronized
+  @mem_utils.Synchronized("paths_lock")
   def ReadLatestPathInfosWithHashBlobReferences(self,
                                                 client_paths,
                                                 max_timestamp=None):
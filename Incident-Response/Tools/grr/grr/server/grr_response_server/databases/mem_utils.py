@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Utilities used by the in memory database."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import functools
+
+from typing import Iterable
+from typing import Text
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.util import precondition
+
+
+class Snapshot(object):
+  """An immutable snapshot of an RDF value stored in the database.
+
+  Instead of copying values on every write and read, the database keeps their
+  serialized form, which is shared by all readers. Every reader gets its own
+  instance parsed from it. Parsing is lazy, i.e. nested fields are only parsed
+  when they are accessed, so this is much cheaper than a deep copy.
+
+  Values are serialized when the snapshot is taken, so that later modifications
+  of the written value (including its repeated fields, which `Copy` shares) do
+  not leak into the database. Values updated by the database itself are only
+  serialized again when they are first read.
+
+  The database itself looks at stored values through `view`. The view must
+  never be modified or returned to callers: values are updated by replacing
+  their snapshot (see `Update`).
+  """
+
+  __slots__ = ("_cls", "_serialized", "_unserialized_fields", "_unserialized",
+               "_view")
+
+  def __init__(self,
+               value: rdfvalue.RDFValue,
+               unserialized_fields: Iterable[Text] = (),
+               **updates):
+    """Initializes the snapshot.
+
+    Args:
+      value: The value to take a snapshot of. It's not modified.
+      unserialized_fields: Names of fields that are copied instead of being
+        serialized, e.g. because floats lose precision when serialized.
+      **updates: Fields to set in the snapshot (e.g. timestamps set by the
+        database), the same as if they were set on a copy of `value`.
+    """
+    precondition.AssertType(value, rdfvalue.RDFValue)
+
+    serialized = value.SerializeToBytes()
+    view = value.__class__.FromSerializedBytes(serialized)
+    for name in unserialized_fields:
+      if value.HasField(name):
+        setattr(view, name, getattr(value, name).Copy())
+
+    self._Init(view, unserialized_fields, updates)
+    if not updates:
+      self._serialized = serialized
+
+  def _Init(self, view, unserialized_fields, updates):
+    for name, field_value in updates.items():
+      setattr(view, name, field_value)
+
+    self._cls = view.__class__
+    self._serialized = None
+    self._unserialized_fields = tuple(unserialized_fields)
+    self._unserialized = {
+        name: getattr(view, name).Copy()
+        for name in self._unserialized_fields
+        if view.HasField(name)
+    }
+    self._view = view
+
+  @property
+  def view(self) -> rdfvalue.RDFValue:
+    """A read-only instance of the value, shared by the database."""
+    return self._view
+
+  def Get(self) -> rdfvalue.RDFValue:
+    """Returns a new instance of the value that can be freely modified."""
+    if self._serialized is None:
+      self._serialized = self._view.SerializeToBytes()
+
+    value = self._cls.FromSerializedBytes(self._serialized)
+    for name, field_value in self._unserialized.items():
+      setattr(value, name, field_value.Copy())
+    return value
+
+  def Update(self, **updates) -> "Snapshot":
+    """Returns a snapshot of the value with given fields set."""
+    # Fields of a parsed instance are not parsed until accessed, so this is
+    # cheaper than copying the view.
+    result = Snapshot.__new__(Snapshot)
+    # pylint: disable=protected-access
+    result._Init(self.Get(), self._unserialized_fields, updates)
+    # pylint: enable=protected-access
+    return result
+
+
+def Synchronized(lock_name: Text):
+  """Returns a decorator that holds a lock of the database during calls.
+
+  This is like `utils.Synchronized`, but for tables that have their own lock.
+
+  Args:
+    lock_name: Name of the attribute of the database holding the lock.
+
+  Returns:
+    A decorator for methods of the database.
+  """
+
+  def Decorator(f):
+
+    @functools.wraps(f)
+    def NewFunction(self, *args, **kwargs):
+      with getattr(self, lock_name):
+        return f(self, *args, **kwargs)
+
+    return NewFunction
+
+  return Decorator
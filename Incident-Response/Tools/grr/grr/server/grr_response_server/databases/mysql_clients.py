@@ -620,6 +620,21 @@ class MySQLDBClientMixin(object):
       result[hash_to_kw[kw_hash]].append(db_utils.IntToClientID(cid))
     return result
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadClientKeywordIndex(self, start_time=None, cursor=None):
+    """Reads the whole client keyword index."""
+    query = "SELECT keyword, client_id FROM client_keywords"
+    args = []
+    if start_time:
+      query += " WHERE timestamp >= FROM_UNIXTIME(%s)"
+      args.append(mysql_utils.RDFDatetimeToTimestamp(start_time))
+    cursor.execute(query, args)
+
+    result = {}
+    for kw, cid in cursor.fetchall():
+      result.setdefault(kw, []).append(db_utils.IntToClientID(cid))
+    return result
+
   @mysql_utils.WithTransaction()
   def AddClientLabels(self, client_id, owner, labels, cursor=None):
     """Attaches a list of user labels to a client."""
@@ -942,5 +957,10 @@ class MySQLDBClientMixin(object):
       last_startup_timestamp = NULL
     WHERE client_id = %s""", [db_utils.ClientIDToInt(client_id)])
 
+    # Client's flows are deleted by the cascade, so they have to be subtracted
+    # from hunt counters first.
+    self._UpdateHuntFlowStats(
+        self._ReadHuntFlowStats(client_id, cursor=cursor), [], cursor=cursor)
+
     cursor.execute("DELETE FROM clients WHERE client_id = %s",
                    [db_utils.ClientIDToInt(client_id)])
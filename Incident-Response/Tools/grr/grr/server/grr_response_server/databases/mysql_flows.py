@@ -18,6 +18,7 @@ from grr_response_core.lib import registry
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import compatibility
 from grr_response_core.lib.util import random
@@ -30,6 +31,11 @@ from grr_response_server.rdfvalues import hunt_objects as rdf_hunt_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+def _IsTopLevelHuntFlow(flow_obj):
+  """Checks whether the flow counts towards its hunt's stats."""
+  return bool(flow_obj.parent_hunt_id) and not flow_obj.parent_flow_id
+
+
 class MySQLDBFlowMixin(object):
   """MySQLDB mixin for flow handling."""
 
@@ -276,13 +282,15 @@ class MySQLDBFlowMixin(object):
                        parent_hunt_id, name, creator, flow, flow_state,
                        next_request_to_process, pending_termination, timestamp,
                        network_bytes_sent, user_cpu_time_used_micros,
-                       system_cpu_time_used_micros, num_replies_sent, last_update)
+                       system_cpu_time_used_micros, num_replies_sent,
+                       last_update, args_digest)
     VALUES (%(client_id)s, %(flow_id)s, %(long_flow_id)s, %(parent_flow_id)s,
             %(parent_hunt_id)s, %(name)s, %(creator)s, %(flow)s, %(flow_state)s,
             %(next_request_to_process)s, %(pending_termination)s,
             FROM_UNIXTIME(%(timestamp)s),
             %(network_bytes_sent)s, %(user_cpu_time_used_micros)s,
-            %(system_cpu_time_used_micros)s, %(num_replies_sent)s, NOW(6))"""
+            %(system_cpu_time_used_micros)s, %(num_replies_sent)s, NOW(6),
+            %(args_digest)s)"""
 
     if allow_update:
       query += """
@@ -323,10 +331,14 @@ class MySQLDBFlowMixin(object):
         "system_cpu_time_used_micros": system_cpu_time_used_micros,
     }
 
+    # Digests of arguments are only needed for throttling parent flows. They
+    # never change, so they are not updated on duplicate keys.
     if flow_obj.parent_flow_id:
       args["parent_flow_id"] = db_utils.FlowIDToInt(flow_obj.parent_flow_id)
+      args["args_digest"] = None
     else:
       args["parent_flow_id"] = None
+      args["args_digest"] = rdf_flow_objects.FlowArgsDigest(flow_obj.args)
 
     if flow_obj.parent_hunt_id:
       args["parent_hunt_id"] = db_utils.HuntIDToInt(flow_obj.parent_hunt_id)
@@ -339,6 +351,13 @@ class MySQLDBFlowMixin(object):
     else:
       args["pending_termination"] = None
 
+    is_hunt_flow = _IsTopLevelHuntFlow(flow_obj)
+    if is_hunt_flow and allow_update:
+      old_stats = self._ReadHuntFlowStats(
+          flow_obj.client_id, flow_obj.flow_id, cursor=cursor)
+    else:
+      old_stats = []
+
     try:
       cursor.execute(query, args)
     except MySQLdb.IntegrityError as e:
@@ -347,6 +366,11 @@ class MySQLDBFlowMixin(object):
       else:
         raise db.UnknownClientError(flow_obj.client_id, cause=e)
 
+    if is_hunt_flow:
+      new_stats = self._ReadHuntFlowStats(
+          flow_obj.client_id, flow_obj.flow_id, cursor=cursor)
+      self._UpdateHuntFlowStats(old_stats, new_stats, cursor=cursor)
+
   def _FlowObjectFromRow(self, row):
     """Generates a flow object from a database row."""
     datetime = mysql_utils.TimestampToRDFDatetime
@@ -482,6 +506,62 @@ class MySQLDBFlowMixin(object):
     cursor.execute(query, args)
     return [self._FlowObjectFromRow(row) for row in cursor.fetchall()]
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def CountFlowObjectsByCreator(self,
+                                client_id: Text,
+                                creator: Text,
+                                min_create_time: rdfvalue.RDFDatetime,
+                                cursor=None) -> int:
+    """Counts parent flows started by a user on a client."""
+    # Covered by the flows_by_client_creator_timestamp index.
+    query = """
+      SELECT COUNT(*)
+        FROM flows
+       WHERE client_id = %s
+         AND creator = %s
+         AND timestamp >= FROM_UNIXTIME(%s)
+         AND parent_flow_id IS NULL
+    """
+    cursor.execute(query, [
+        db_utils.ClientIDToInt(client_id),
+        creator,
+        mysql_utils.RDFDatetimeToTimestamp(min_create_time),
+    ])
+    count, = cursor.fetchone()
+    return count
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadLatestFlowObjectWithArgs(
+      self,
+      client_id: Text,
+      flow_class_name: Text,
+      flow_args: Optional[rdf_structs.RDFProtoStruct],
+      min_create_time: rdfvalue.RDFDatetime,
+      cursor=None) -> Optional[rdf_flow_objects.Flow]:
+    """Reads the latest parent flow with the given class and arguments."""
+    query = f"""
+      SELECT {self.FLOW_DB_FIELDS}
+        FROM flows
+       WHERE client_id = %s
+         AND name = %s
+         AND args_digest = %s
+         AND timestamp >= FROM_UNIXTIME(%s)
+         AND parent_flow_id IS NULL
+    ORDER BY timestamp DESC
+       LIMIT 1
+    """
+    cursor.execute(query, [
+        db_utils.ClientIDToInt(client_id),
+        flow_class_name,
+        rdf_flow_objects.FlowArgsDigest(flow_args),
+        mysql_utils.RDFDatetimeToTimestamp(min_create_time),
+    ])
+    row = cursor.fetchone()
+    if row is None:
+      return None
+
+    return self._FlowObjectFromRow(row)
+
   @mysql_utils.WithTransaction(readonly=True)
   def ReadChildFlowObjects(self, client_id, flow_id, cursor=None):
     """Reads flows that were started by a given flow from the database."""
@@ -611,12 +691,20 @@ class MySQLDBFlowMixin(object):
     query += ", ".join(updates)
     query += " WHERE client_id=%s AND flow_id=%s"
 
+    # Every update moves last_update, which decides the completion bucket of
+    # finished hunt flows.
+    old_stats = self._ReadHuntFlowStats(client_id, flow_id, cursor=cursor)
+
     args.append(db_utils.ClientIDToInt(client_id))
     args.append(db_utils.FlowIDToInt(flow_id))
     updated = cursor.execute(query, args)
     if updated == 0:
       raise db.UnknownFlowError(client_id, flow_id)
 
+    if old_stats:
+      new_stats = self._ReadHuntFlowStats(client_id, flow_id, cursor=cursor)
+      self._UpdateHuntFlowStats(old_stats, new_stats, cursor=cursor)
+
   @mysql_utils.WithTransaction()
   def UpdateFlows(self,
                   client_id_flow_id_pairs,
@@ -1211,7 +1299,18 @@ class MySQLDBFlowMixin(object):
         "user_cpu_time_used_micros":
             db_utils.SecondsToMicros(flow_obj.cpu_time_used.user_cpu_time),
     }
+    is_hunt_flow = _IsTopLevelHuntFlow(flow_obj)
+    if is_hunt_flow:
+      old_stats = self._ReadHuntFlowStats(
+          flow_obj.client_id, flow_obj.flow_id, cursor=cursor)
+
     rows_updated = cursor.execute(update_query, args)
+
+    if is_hunt_flow and rows_updated == 1:
+      new_stats = self._ReadHuntFlowStats(
+          flow_obj.client_id, flow_obj.flow_id, cursor=cursor)
+      self._UpdateHuntFlowStats(old_stats, new_stats, cursor=cursor)
+
     return rows_updated == 1
 
   @mysql_utils.WithTransaction()
@@ -4,6 +4,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
+
 import MySQLdb
 
 from grr_response_core.lib import rdfvalue
@@ -41,10 +43,178 @@ _HUNT_OUTPUT_PLUGINS_STATES_COLUMNS = (
     "plugin_state",
 )
 
+# Hunt counters and completion buckets are sharded by client, so that
+# concurrent flow writes of a large hunt don't all wait for the same row lock.
+_HUNT_COUNTERS_SHARDS = 16
+
+_HUNT_COUNTERS_COLUMNS = (
+    "num_clients",
+    "num_successful_clients",
+    "num_failed_clients",
+    "num_crashed_clients",
+    "num_running_clients",
+    "num_clients_with_results",
+    "num_results",
+    "total_cpu_time_used_micros",
+    "total_network_bytes_sent",
+)
+
+_HuntFlowStats = collections.namedtuple("_HuntFlowStats", [
+    "hunt_id",
+    "shard",
+    "flow_state",
+    "create_bucket",
+    "completion_bucket",
+    "cpu_time_used_micros",
+    "network_bytes_sent",
+    "num_results",
+])
+
+
+def _CompletionBucket(timestamp):
+  seconds = int(timestamp)
+  return seconds - seconds % db.HUNT_COMPLETION_BUCKET_SECONDS
+
+
+def _HuntCountersValues(stats):
+  """Returns values of hunt_counters columns a flow contributes."""
+  flow_state = rdf_flow_objects.Flow.FlowState
+  return (
+      1,
+      int(stats.flow_state == flow_state.FINISHED),
+      int(stats.flow_state == flow_state.ERROR),
+      int(stats.flow_state == flow_state.CRASHED),
+      int(stats.flow_state == flow_state.RUNNING),
+      int(stats.num_results > 0),
+      stats.num_results,
+      stats.cpu_time_used_micros,
+      stats.network_bytes_sent,
+  )
+
 
 class MySQLDBHuntMixin(object):
   """MySQLDB mixin for flow handling."""
 
+  def _ReadHuntFlowStats(self, client_id, flow_id=None, cursor=None):
+    """Reads contributions of client's top-level hunt flows to hunt stats.
+
+    Read rows stay locked until the end of the transaction, so that concurrent
+    writers of the same flow compute their updates from the same state.
+
+    Args:
+      client_id: The client to read flows of.
+      flow_id: If set, only this flow is read.
+      cursor: MySQL cursor of the current transaction.
+
+    Returns:
+      A list of _HuntFlowStats (empty for flows that are not top-level hunt
+      flows).
+    """
+    client_id_int = db_utils.ClientIDToInt(client_id)
+
+    query = """
+      SELECT parent_hunt_id, flow_state, UNIX_TIMESTAMP(timestamp),
+             UNIX_TIMESTAMP(last_update),
+             IFNULL(user_cpu_time_used_micros, 0) +
+                 IFNULL(system_cpu_time_used_micros, 0),
+             IFNULL(network_bytes_sent, 0), IFNULL(num_replies_sent, 0)
+      FROM flows
+      WHERE client_id = %s AND
+            parent_hunt_id IS NOT NULL AND parent_flow_id IS NULL
+    """
+    args = [client_id_int]
+    if flow_id is not None:
+      query += " AND flow_id = %s"
+      args.append(db_utils.FlowIDToInt(flow_id))
+    query += " FOR UPDATE"
+    cursor.execute(query, args)
+
+    result = []
+    for (hunt_id, flow_state, create_timestamp, last_update, cpu_micros,
+         network_bytes_sent, num_replies_sent) in cursor.fetchall():
+      if flow_state != rdf_flow_objects.Flow.FlowState.RUNNING:
+        completion_bucket = _CompletionBucket(last_update)
+      else:
+        completion_bucket = None
+
+      result.append(
+          _HuntFlowStats(
+              hunt_id=hunt_id,
+              shard=client_id_int % _HUNT_COUNTERS_SHARDS,
+              flow_state=flow_state,
+              create_bucket=_CompletionBucket(create_timestamp),
+              completion_bucket=completion_bucket,
+              cpu_time_used_micros=int(cpu_micros),
+              network_bytes_sent=int(network_bytes_sent),
+              num_results=int(num_replies_sent)))
+    return result
+
+  def _UpdateHuntFlowStats(self, old_stats, new_stats, cursor=None):
+    """Incrementally updates hunt counters and completion buckets.
+
+    Args:
+      old_stats: A list of _HuntFlowStats of flows before the change.
+      new_stats: A list of _HuntFlowStats of the same flows after the change.
+      cursor: MySQL cursor of the current transaction.
+    """
+    if old_stats == new_stats:
+      return
+
+    num_counters = len(_HUNT_COUNTERS_COLUMNS)
+    counters = collections.defaultdict(lambda: [0] * num_counters)
+    buckets = collections.defaultdict(lambda: [0, 0])
+    for stats_list, sign in [(old_stats, -1), (new_stats, 1)]:
+      for stats in stats_list:
+        row = counters[(stats.hunt_id, stats.shard)]
+        for i, value in enumerate(_HuntCountersValues(stats)):
+          row[i] += sign * value
+
+        buckets[(stats.hunt_id, stats.create_bucket, stats.shard)][0] += sign
+        if stats.completion_bucket is not None:
+          key = (stats.hunt_id, stats.completion_bucket, stats.shard)
+          buckets[key][1] += sign
+
+    # Rows are written in a fixed order to avoid deadlocks between
+    # transactions updating several rows of the same hunt.
+    counters_args = []
+    for key, values in sorted(counters.items()):
+      if any(values):
+        counters_args.extend(key + tuple(values))
+
+    if counters_args:
+      columns = ("hunt_id", "shard") + _HUNT_COUNTERS_COLUMNS
+      query = """
+        INSERT INTO hunt_counters ({columns})
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE {updates}
+      """.format(
+          columns=", ".join(columns),
+          values=mysql_utils.Placeholders(
+              num=len(columns), values=len(counters_args) // len(columns)),
+          updates=", ".join("{0} = {0} + VALUES({0})".format(column)
+                            for column in _HUNT_COUNTERS_COLUMNS))
+      cursor.execute(query, counters_args)
+
+    buckets_args = []
+    for key, values in sorted(buckets.items()):
+      if any(values):
+        buckets_args.extend(key + tuple(values))
+
+    if buckets_args:
+      query = """
+        INSERT INTO hunt_client_completion_buckets
+            (hunt_id, bucket_timestamp, shard, num_started_clients,
+             num_completed_clients)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            num_started_clients =
+                num_started_clients + VALUES(num_started_clients),
+            num_completed_clients =
+                num_completed_clients + VALUES(num_completed_clients)
+      """.format(values=mysql_utils.Placeholders(
+          num=5, values=len(buckets_args) // 5))
+      cursor.execute(query, buckets_args)
+
   @mysql_utils.WithTransaction()
   def WriteHuntObject(self, hunt_obj, cursor=None):
     """Writes a hunt object to the database."""
@@ -149,6 +319,12 @@ class MySQLDBHuntMixin(object):
     query = "DELETE FROM hunt_output_plugins_states WHERE hunt_id = %s"
     cursor.execute(query, [hunt_id_int])
 
+    query = "DELETE FROM hunt_counters WHERE hunt_id = %s"
+    cursor.execute(query, [hunt_id_int])
+
+    query = "DELETE FROM hunt_client_completion_buckets WHERE hunt_id = %s"
+    cursor.execute(query, [hunt_id_int])
+
   def _HuntObjectFromRow(self, row):
     """Generates a flow object from a database row."""
     (
@@ -661,53 +837,44 @@ class MySQLDBHuntMixin(object):
   @mysql_utils.WithTransaction(readonly=True)
   def ReadHuntCounters(self, hunt_id, cursor=None):
     """Reads hunt counters."""
-    hunt_id_int = db_utils.HuntIDToInt(hunt_id)
-
-    query = ("SELECT flow_state, COUNT(*) "
-             "FROM flows "
-             "FORCE INDEX(flows_by_hunt) "
-             "WHERE parent_hunt_id = %s AND parent_flow_id IS NULL "
-             "GROUP BY flow_state")
-
-    cursor.execute(query, [hunt_id_int])
-    counts_by_state = dict(cursor.fetchall())
-
-    num_successful_clients = counts_by_state.get(
-        int(rdf_flow_objects.Flow.FlowState.FINISHED), 0)
-    num_failed_clients = counts_by_state.get(
-        int(rdf_flow_objects.Flow.FlowState.ERROR), 0)
-    num_crashed_clients = counts_by_state.get(
-        int(rdf_flow_objects.Flow.FlowState.CRASHED), 0)
-    num_running_clients = counts_by_state.get(
-        int(rdf_flow_objects.Flow.FlowState.RUNNING), 0)
-    num_clients = sum(counts_by_state.values())
-
+    # Counters are updated together with hunt flows (see _UpdateHuntFlowStats),
+    # so there is no need to scan hunt flows here. They are sharded by client,
+    # so the shards are summed.
     query = """
-    SELECT * FROM
-
-      (
-      SELECT COUNT(client_id)
-      FROM flows
-      FORCE INDEX(flows_by_hunt)
-      WHERE parent_hunt_id = %s AND parent_flow_id IS NULL AND
-            num_replies_sent > 0) counters,
-
-      (
-      SELECT SUM(user_cpu_time_used_micros + system_cpu_time_used_micros),
-             SUM(network_bytes_sent),
-             SUM(num_replies_sent)
-      FROM flows
-      FORCE INDEX(flows_by_hunt)
-      WHERE parent_hunt_id = %s AND parent_flow_id IS NULL) resources
+      SELECT SUM(num_clients), SUM(num_successful_clients),
+             SUM(num_failed_clients), SUM(num_clients_with_results),
+             SUM(num_crashed_clients), SUM(num_running_clients),
+             SUM(num_results), SUM(total_cpu_time_used_micros),
+             SUM(total_network_bytes_sent)
+      FROM hunt_counters
+      WHERE hunt_id = %s
     """
+    cursor.execute(query, [db_utils.HuntIDToInt(hunt_id)])
+    row = cursor.fetchone()
+    # SUM() returns NULL when the hunt has no counters yet.
+    if row is None or row[0] is None:
+      return db.HuntCounters(
+          num_clients=0,
+          num_successful_clients=0,
+          num_failed_clients=0,
+          num_clients_with_results=0,
+          num_crashed_clients=0,
+          num_running_clients=0,
+          num_results=0,
+          total_cpu_seconds=0,
+          total_network_bytes_sent=0)
 
-    cursor.execute(query, [hunt_id_int, hunt_id_int])
     (
+        num_clients,
+        num_successful_clients,
+        num_failed_clients,
         num_clients_with_results,
-        total_cpu_seconds,
-        total_network_bytes_sent,
+        num_crashed_clients,
+        num_running_clients,
         num_results,
-    ) = cursor.fetchone()
+        total_cpu_time_used_micros,
+        total_network_bytes_sent,
+    ) = map(int, row)
 
     return db.HuntCounters(
         num_clients=num_clients,
@@ -716,9 +883,31 @@ class MySQLDBHuntMixin(object):
         num_clients_with_results=num_clients_with_results,
         num_crashed_clients=num_crashed_clients,
         num_running_clients=num_running_clients,
-        num_results=int(num_results or 0),
-        total_cpu_seconds=db_utils.MicrosToSeconds(int(total_cpu_seconds or 0)),
-        total_network_bytes_sent=int(total_network_bytes_sent or 0))
+        num_results=num_results,
+        total_cpu_seconds=db_utils.MicrosToSeconds(total_cpu_time_used_micros),
+        total_network_bytes_sent=total_network_bytes_sent)
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadHuntClientCompletionHistogram(self, hunt_id, cursor=None):
+    """Reads hunt's client completion histogram."""
+    query = """
+      SELECT bucket_timestamp, SUM(num_started_clients),
+             SUM(num_completed_clients)
+      FROM hunt_client_completion_buckets
+      WHERE hunt_id = %s
+      GROUP BY bucket_timestamp
+      HAVING SUM(num_started_clients) > 0 OR SUM(num_completed_clients) > 0
+      ORDER BY bucket_timestamp
+    """
+    cursor.execute(query, [db_utils.HuntIDToInt(hunt_id)])
+
+    return [
+        db.HuntClientCompletionBucket(
+            timestamp=rdfvalue.RDFDatetime.FromSecondsSinceEpoch(ts),
+            num_started_clients=int(num_started),
+            num_completed_clients=int(num_completed))
+        for ts, num_started, num_completed in cursor.fetchall()
+    ]
 
   def _BinsToQuery(self, bins, column_name):
     """Builds an SQL query part to fetch counts corresponding to given bins."""
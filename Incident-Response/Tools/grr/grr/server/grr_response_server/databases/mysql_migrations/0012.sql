@@ -0,0 +1,76 @@
+-- Hunt counters and client completion histograms are updated by the server in
+-- the same transactions that write hunt flows, so that reading them doesn't
+-- require scanning all flows of a hunt.
+--
+-- Every hunt has up to 16 rows of counters (and 16 rows per histogram bucket),
+-- one per shard of its clients, so that concurrent flow writes of a large hunt
+-- don't all wait for the same row lock. Readers sum the shards.
+
+CREATE TABLE hunt_counters(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL,
+    num_clients BIGINT NOT NULL DEFAULT 0,
+    num_successful_clients BIGINT NOT NULL DEFAULT 0,
+    num_failed_clients BIGINT NOT NULL DEFAULT 0,
+    num_crashed_clients BIGINT NOT NULL DEFAULT 0,
+    num_running_clients BIGINT NOT NULL DEFAULT 0,
+    num_clients_with_results BIGINT NOT NULL DEFAULT 0,
+    num_results BIGINT NOT NULL DEFAULT 0,
+    total_cpu_time_used_micros BIGINT NOT NULL DEFAULT 0,
+    total_network_bytes_sent BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hunt_id, shard)
+);
+
+-- Every bucket covers one minute (bucket_timestamp is the start of the minute
+-- in seconds since epoch).
+CREATE TABLE hunt_client_completion_buckets(
+    hunt_id BIGINT UNSIGNED NOT NULL,
+    bucket_timestamp BIGINT NOT NULL,
+    shard TINYINT UNSIGNED NOT NULL,
+    num_started_clients BIGINT NOT NULL DEFAULT 0,
+    num_completed_clients BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hunt_id, bucket_timestamp, shard)
+);
+
+-- Counters of existing hunts are computed once from their flows. Flows
+-- written by servers that don't maintain the counters yet are not counted, so
+-- the migration should be applied before they are upgraded.
+INSERT INTO hunt_counters(
+    hunt_id, shard, num_clients, num_successful_clients, num_failed_clients,
+    num_crashed_clients, num_running_clients, num_clients_with_results,
+    num_results, total_cpu_time_used_micros, total_network_bytes_sent)
+SELECT
+    parent_hunt_id,
+    client_id % 16 AS shard,
+    COUNT(*),
+    SUM(flow_state = 2),
+    SUM(flow_state = 3),
+    SUM(flow_state = 4),
+    SUM(flow_state = 1),
+    SUM(IFNULL(num_replies_sent, 0) > 0),
+    SUM(IFNULL(num_replies_sent, 0)),
+    SUM(IFNULL(user_cpu_time_used_micros, 0) +
+        IFNULL(system_cpu_time_used_micros, 0)),
+    SUM(IFNULL(network_bytes_sent, 0))
+FROM flows
+WHERE parent_hunt_id IS NOT NULL AND parent_flow_id IS NULL
+GROUP BY parent_hunt_id, shard;
+
+INSERT INTO hunt_client_completion_buckets(
+    hunt_id, bucket_timestamp, shard, num_started_clients)
+SELECT parent_hunt_id, FLOOR(UNIX_TIMESTAMP(timestamp) / 60) * 60 AS bucket,
+       client_id % 16 AS shard, COUNT(*)
+FROM flows
+WHERE parent_hunt_id IS NOT NULL AND parent_flow_id IS NULL
+GROUP BY parent_hunt_id, bucket, shard;
+
+INSERT INTO hunt_client_completion_buckets(
+    hunt_id, bucket_timestamp, shard, num_completed_clients)
+SELECT parent_hunt_id, FLOOR(UNIX_TIMESTAMP(last_update) / 60) * 60 AS bucket,
+       client_id % 16 AS shard, COUNT(*)
+FROM flows
+WHERE parent_hunt_id IS NOT NULL AND parent_flow_id IS NULL AND
+      flow_state != 1
+GROUP BY parent_hunt_id, bucket, shard
+ON DUPLICATE KEY UPDATE
+    num_completed_clients = VALUES(num_completed_clients);
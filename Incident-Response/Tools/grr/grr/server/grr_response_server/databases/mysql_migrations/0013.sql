@@ -0,0 +1,46 @@
+-- The earliest time at which a path or any of its descendants had a stat or
+-- hash entry. Listing descendants as of a given timestamp uses it to select
+-- explicit paths without aggregating the whole stat and hash entry history.
+ALTER TABLE client_paths
+    ADD COLUMN first_explicit_timestamp TIMESTAMP(6) NULL DEFAULT NULL;
+
+UPDATE client_paths AS p
+  JOIN (SELECT client_id, path_type, path_id, MIN(timestamp) AS timestamp
+          FROM client_path_stat_entries
+      GROUP BY client_id, path_type, path_id) AS s
+    ON p.client_id = s.client_id
+   AND p.path_type = s.path_type
+   AND p.path_id = s.path_id
+   SET p.first_explicit_timestamp = s.timestamp;
+
+UPDATE client_paths AS p
+  JOIN (SELECT client_id, path_type, path_id, MIN(timestamp) AS timestamp
+          FROM client_path_hash_entries
+      GROUP BY client_id, path_type, path_id) AS h
+    ON p.client_id = h.client_id
+   AND p.path_type = h.path_type
+   AND p.path_id = h.path_id
+   SET p.first_explicit_timestamp =
+       LEAST(IFNULL(p.first_explicit_timestamp, h.timestamp), h.timestamp);
+
+-- Propagates explicit timestamps to ancestors. Descendants are matched by
+-- path prefix, with LIKE wildcards in the ancestor's path escaped.
+UPDATE client_paths AS p
+  JOIN (SELECT a.client_id, a.path_type, a.path_id,
+               MIN(d.first_explicit_timestamp) AS timestamp
+          FROM client_paths AS a
+          JOIN client_paths AS d
+            ON d.client_id = a.client_id
+           AND d.path_type = a.path_type
+           AND d.path LIKE CONCAT(
+                   REPLACE(REPLACE(REPLACE(a.path, '\\', '\\\\'),
+                                   '%', '\\%'),
+                           '_', '\\_'),
+                   '/%')
+         WHERE d.first_explicit_timestamp IS NOT NULL
+      GROUP BY a.client_id, a.path_type, a.path_id) AS c
+    ON p.client_id = c.client_id
+   AND p.path_type = c.path_type
+   AND p.path_id = c.path_id
+   SET p.first_explicit_timestamp =
+       LEAST(IFNULL(p.first_explicit_timestamp, c.timestamp), c.timestamp);
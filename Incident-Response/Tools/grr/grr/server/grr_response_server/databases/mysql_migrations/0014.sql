@@ -0,0 +1,14 @@
+-- Digests of flow arguments and indexes used for throttling flows, so that
+-- enforcing the daily flow limit and finding duplicate flows doesn't require
+-- reading and deserializing all recent flows of a client.
+--
+-- Digests can't be computed from serialized flows in SQL, so parent flows
+-- created before this migration are not detected as duplicates.
+ALTER TABLE flows
+    ADD COLUMN args_digest BINARY(32) DEFAULT NULL;
+
+CREATE INDEX flows_by_client_creator_timestamp
+    ON flows(client_id, creator, timestamp, parent_flow_id);
+
+CREATE INDEX flows_by_client_name_args_digest_timestamp
+    ON flows(client_id, name, args_digest, timestamp);
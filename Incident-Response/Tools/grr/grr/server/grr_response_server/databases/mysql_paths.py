@@ -21,6 +21,20 @@ from grr_response_server.databases import mysql_utils
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+# Ordering key of client paths that orders them by path components. The
+# separator is replaced with the smallest byte, so that every path comes right
+# before its descendants and before siblings that extend its last component
+# (`foo/bar` before `foo.txt`). Binary comparison also keeps the order case
+# sensitive, unlike the collation of the `path` column.
+_PATH_ORDER_KEY = "REPLACE(BINARY path, '/', x'00')"
+
+
+def _PathOrderKey(components):
+  """Returns the `_PATH_ORDER_KEY` value of a path given by its components."""
+  path = mysql_utils.ComponentsToPath(components)
+  return path.replace("/", "\0").encode("utf-8")
+
+
 class MySQLDBPathMixin(object):
   """MySQLDB mixin for path related functions."""
 
@@ -216,6 +230,9 @@ class MySQLDBPathMixin(object):
     hash_entry_keys = []
     hash_entry_values = []
 
+    # Keys of paths that have a stat or hash entry and of all their ancestors.
+    explicit_path_keys = set()
+
     for client_id, client_path_infos in path_infos.items():
       for path_info in client_path_infos:
         path = mysql_utils.ComponentsToPath(path_info.components)
@@ -243,18 +260,29 @@ class MySQLDBPathMixin(object):
                                     path_info.hash_entry.SerializeToBytes(),
                                     path_info.hash_entry.sha256.AsBytes()))
 
+        explicit = (
+            path_info.HasField("stat_entry") or
+            path_info.HasField("hash_entry"))
+        if explicit:
+          explicit_path_keys.add(key)
+
         # TODO(hanuszczak): Implement a trie in order to avoid inserting
         # duplicated records.
         for parent_path_info in path_info.GetAncestors():
           path = mysql_utils.ComponentsToPath(parent_path_info.components)
-          parent_path_info_values.append((
+          parent_key = (
               db_utils.ClientIDToInt(client_id),
               int(parent_path_info.path_type),
               parent_path_info.GetPathID().AsBytes(),
+          )
+          parent_path_info_values.append(parent_key + (
               path,
               len(parent_path_info.components),
           ))
 
+          if explicit:
+            explicit_path_keys.add(parent_key)
+
     if path_info_values:
       query = """
         INSERT INTO client_paths(client_id, path_type, path_id,
@@ -320,95 +348,243 @@ class MySQLDBPathMixin(object):
       params = [mysql_utils.RDFDatetimeToTimestamp(now)] + hash_entry_keys
       cursor.execute(query, params)
 
-  @mysql_utils.WithTransaction(readonly=True)
+    if explicit_path_keys:
+      condition = "(client_id = %s AND path_type = %s AND path_id = %s)"
+
+      query = """
+        UPDATE client_paths
+        FORCE INDEX (PRIMARY)
+        SET first_explicit_timestamp = FROM_UNIXTIME(%s)
+        WHERE first_explicit_timestamp IS NULL
+          AND ({})
+      """.format(" OR ".join([condition] * len(explicit_path_keys)))
+
+      params = [mysql_utils.RDFDatetimeToTimestamp(now)]
+      for key in explicit_path_keys:
+        params.extend(key)
+      cursor.execute(query, params)
+
+  # Number of path info records (with their stat and hash entries) read from
+  # the database per query when iterating over descendants of a path.
+  _DESCENDANT_PATH_INFOS_BATCH_SIZE = 1000
+
   def ListDescendantPathInfos(self,
                               client_id,
                               path_type,
                               components,
                               timestamp=None,
-                              max_depth=None,
-                              cursor=None):
+                              max_depth=None):
     """Lists path info records that correspond to descendants of given path."""
-    path_infos = []
+    return list(
+        self.IterDescendantPathInfos(
+            client_id,
+            path_type,
+            components,
+            timestamp=timestamp,
+            max_depth=max_depth))
+
+  def IterDescendantPathInfos(self,
+                              client_id,
+                              path_type,
+                              components,
+                              timestamp=None,
+                              max_depth=None):
+    """Iterates over path info records of descendants of given path.
+
+    Records are read page by page in the order of path components. Every page
+    is read in its own transaction and starts right after the last path of the
+    previous one, so no connection is held between pages.
+    """
+    # The base directory is checked eagerly, so that errors are raised by the
+    # call itself and not by the first iteration of the returned generator.
+    self._CheckDescendantPathInfosBase(client_id, path_type, components)
+
+    return self._IterDescendantPathInfos(
+        client_id,
+        path_type,
+        components,
+        timestamp=timestamp,
+        max_depth=max_depth)
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def _CheckDescendantPathInfosBase(self,
+                                    client_id,
+                                    path_type,
+                                    components,
+                                    cursor=None):
+    """Checks that the path to list descendants of is a known directory."""
+    query = """
+    SELECT directory
+      FROM client_paths
+     WHERE client_id = %(client_id)s
+       AND path_type = %(path_type)s
+       AND path_id = %(path_id)s
+    """
+    values = {
+        "client_id": db_utils.ClientIDToInt(client_id),
+        "path_type": int(path_type),
+        "path_id": rdf_objects.PathID.FromComponents(components).AsBytes(),
+    }
+    cursor.execute(query, values)
+    row = cursor.fetchone()
+
+    # The root directory always exists, even if it was never collected.
+    if row is None:
+      if components:
+        raise db.UnknownPathError(client_id, path_type, components)
+      return
+
+    (directory,) = row
+    if not directory:
+      raise db.NotDirectoryPathError(client_id, path_type, components)
 
-    query = ""
+  def _IterDescendantPathInfos(self,
+                               client_id,
+                               path_type,
+                               components,
+                               timestamp=None,
+                               max_depth=None):
+    """Yields descendant path infos page by page."""
+    after_components = None
+    while True:
+      path_infos = self._ReadDescendantPathInfosPage(
+          client_id,
+          path_type,
+          components,
+          after_components=after_components,
+          timestamp=timestamp,
+          max_depth=max_depth)
+
+      for path_info in path_infos:
+        yield path_info
+
+      if len(path_infos) < self._DESCENDANT_PATH_INFOS_BATCH_SIZE:
+        return
+
+      after_components = path_infos[-1].components
 
+  @mysql_utils.WithTransaction(readonly=True)
+  def _ReadDescendantPathInfosPage(self,
+                                   client_id,
+                                   path_type,
+                                   components,
+                                   after_components=None,
+                                   timestamp=None,
+                                   max_depth=None,
+                                   cursor=None):
+    """Reads a single page of descendant path info records.
+
+    Args:
+      client_id: An identifier string for a client.
+      path_type: A type of a path to retrieve path information for.
+      components: A tuple of path components of a path to retrieve descendant
+        path information for.
+      after_components: If set, reads only records of paths that come after
+        this one in the order of path components.
+      timestamp: If set, reads only descendants that existed at that timestamp
+        and their stat and hash entries as of that timestamp.
+      max_depth: If set, the maximum number of generations to descend.
+      cursor: A MySQL cursor to use.
+
+    Returns:
+      A list of at most `_DESCENDANT_PATH_INFOS_BATCH_SIZE` instances of
+      `rdf_objects.PathInfo` sorted by path components.
+    """
     path = mysql_utils.ComponentsToPath(components)
     escaped_path = db_utils.EscapeWildcards(db_utils.EscapeBackslashes(path))
     values = {
         "client_id": db_utils.ClientIDToInt(client_id),
         "path_type": int(path_type),
         "escaped_path": escaped_path,
-        "path": path,
+        "limit": self._DESCENDANT_PATH_INFOS_BATCH_SIZE,
     }
 
-    query += """
-    SELECT path, directory, UNIX_TIMESTAMP(p.timestamp),
-           stat_entry, UNIX_TIMESTAMP(last_stat_entry_timestamp),
-           hash_entry, UNIX_TIMESTAMP(last_hash_entry_timestamp)
-      FROM client_paths AS p
-    """
-    if timestamp is None:
-      query += """
-      LEFT JOIN client_path_stat_entries AS s ON
-                (p.client_id = s.client_id AND
-                 p.path_type = s.path_type AND
-                 p.path_id = s.path_id AND
-                 p.last_stat_entry_timestamp = s.timestamp)
-      LEFT JOIN client_path_hash_entries AS h ON
-                (p.client_id = h.client_id AND
-                 p.path_type = h.path_type AND
-                 p.path_id = h.path_id AND
-                 p.last_hash_entry_timestamp = h.timestamp)
-      """
-      only_explicit = False
-    else:
-      query += """
-      LEFT JOIN (SELECT sr.client_id, sr.path_type, sr.path_id, sr.stat_entry
-                   FROM client_path_stat_entries AS sr
-             INNER JOIN (SELECT client_id, path_type, path_id,
-                                MAX(timestamp) AS max_timestamp
-                           FROM client_path_stat_entries
-                          WHERE UNIX_TIMESTAMP(timestamp) <= %(timestamp)s
-                       GROUP BY client_id, path_type, path_id) AS st
-                     ON sr.client_id = st.client_id
-                    AND sr.path_type = st.path_type
-                    AND sr.path_id = st.path_id
-                    AND sr.timestamp = st.max_timestamp) AS s
-             ON (p.client_id = s.client_id AND
-                 p.path_type = s.path_type AND
-                 p.path_id = s.path_id)
-      LEFT JOIN (SELECT hr.client_id, hr.path_type, hr.path_id, hr.hash_entry
-                   FROM client_path_hash_entries AS hr
-             INNER JOIN (SELECT client_id, path_type, path_id,
-                                MAX(timestamp) AS max_timestamp
-                           FROM client_path_hash_entries
-                          WHERE UNIX_TIMESTAMP(timestamp) <= %(timestamp)s
-                       GROUP BY client_id, path_type, path_id) AS ht
-                     ON hr.client_id = ht.client_id
-                    AND hr.path_type = ht.path_type
-                    AND hr.path_id = ht.path_id
-                    AND hr.timestamp = ht.max_timestamp) AS h
-             ON (p.client_id = h.client_id AND
-                 p.path_type = h.path_type AND
-                 p.path_id = h.path_id)
+    # The page is selected in a derived table, so that stat and hash entries
+    # are only looked up for the rows of the page.
+    page_query = """
+    SELECT client_id, path_type, path_id, path, directory, timestamp,
+           last_stat_entry_timestamp, last_hash_entry_timestamp,
+           {order_key} AS order_key
+      FROM client_paths
+     WHERE client_id = %(client_id)s
+       AND path_type = %(path_type)s
+       AND path LIKE CONCAT(%(escaped_path)s, '/%%')
+    """.format(order_key=_PATH_ORDER_KEY)
+
+    if after_components is not None:
+      page_query += """
+       AND {order_key} > %(after)s
+      """.format(order_key=_PATH_ORDER_KEY)
+      values["after"] = _PathOrderKey(after_components)
+
+    # For a specific timestamp only explicit paths (paths that have an
+    # associated stat or hash entry or have an explicit descendant) are listed,
+    # which is what `first_explicit_timestamp` is maintained for.
+    if timestamp is not None:
+      page_query += """
+       AND first_explicit_timestamp <= FROM_UNIXTIME(%(timestamp)s)
       """
       values["timestamp"] = mysql_utils.RDFDatetimeToTimestamp(timestamp)
-      only_explicit = True
-
-    query += """
-    WHERE p.client_id = %(client_id)s
-      AND p.path_type = %(path_type)s
-      AND (path LIKE CONCAT(%(escaped_path)s, '/%%') OR path = %(path)s)
-    """
 
     if max_depth is not None:
-      query += """
-      AND depth <= %(depth)s
+      page_query += """
+       AND depth <= %(depth)s
       """
       values["depth"] = len(components) + max_depth
 
-    cursor.execute(query, values)
+    page_query += """
+  ORDER BY order_key
+     LIMIT %(limit)s
+    """
+
+    if timestamp is None:
+      query = """
+      SELECT path, directory, UNIX_TIMESTAMP(p.timestamp),
+             stat_entry, UNIX_TIMESTAMP(last_stat_entry_timestamp),
+             hash_entry, UNIX_TIMESTAMP(last_hash_entry_timestamp)
+        FROM ({page_query}) AS p
+   LEFT JOIN client_path_stat_entries AS s ON
+             (p.client_id = s.client_id AND
+              p.path_type = s.path_type AND
+              p.path_id = s.path_id AND
+              p.last_stat_entry_timestamp = s.timestamp)
+   LEFT JOIN client_path_hash_entries AS h ON
+             (p.client_id = h.client_id AND
+              p.path_type = h.path_type AND
+              p.path_id = h.path_id AND
+              p.last_hash_entry_timestamp = h.timestamp)
+    ORDER BY order_key
+      """
+    else:
+      # Entries as of the given timestamp are looked up per row using the
+      # (client_id, path_type, path_id, timestamp) indices.
+      query = """
+      SELECT path, directory, UNIX_TIMESTAMP(p.timestamp),
+             (SELECT s.stat_entry
+                FROM client_path_stat_entries AS s
+               WHERE s.client_id = p.client_id
+                 AND s.path_type = p.path_type
+                 AND s.path_id = p.path_id
+                 AND s.timestamp <= FROM_UNIXTIME(%(timestamp)s)
+            ORDER BY s.timestamp DESC
+               LIMIT 1),
+             UNIX_TIMESTAMP(last_stat_entry_timestamp),
+             (SELECT h.hash_entry
+                FROM client_path_hash_entries AS h
+               WHERE h.client_id = p.client_id
+                 AND h.path_type = p.path_type
+                 AND h.path_id = p.path_id
+                 AND h.timestamp <= FROM_UNIXTIME(%(timestamp)s)
+            ORDER BY h.timestamp DESC
+               LIMIT 1),
+             UNIX_TIMESTAMP(last_hash_entry_timestamp)
+        FROM ({page_query}) AS p
+    ORDER BY order_key
+      """
+
+    cursor.execute(query.format(page_query=page_query), values)
+
+    path_infos = []
     for row in cursor.fetchall():
       # pyformat: disable
       (path, directory, timestamp,
@@ -416,8 +592,6 @@ class MySQLDBPathMixin(object):
        hash_entry_bytes, last_hash_entry_timestamp) = row
       # pyformat: enable
 
-      path_components = mysql_utils.PathToComponents(path)
-
       if stat_entry_bytes is not None:
         stat_entry = rdf_client_fs.StatEntry.FromSerializedBytes(
             stat_entry_bytes)
@@ -432,7 +606,7 @@ class MySQLDBPathMixin(object):
       datetime = mysql_utils.TimestampToRDFDatetime
       path_info = rdf_objects.PathInfo(
           path_type=path_type,
-          components=path_components,
+          components=mysql_utils.PathToComponents(path),
           timestamp=datetime(timestamp),
           last_stat_entry_timestamp=datetime(last_stat_entry_timestamp),
           last_hash_entry_timestamp=datetime(last_hash_entry_timestamp),
@@ -442,41 +616,7 @@ class MySQLDBPathMixin(object):
 
       path_infos.append(path_info)
 
-    path_infos.sort(key=lambda _: tuple(_.components))
-
-    # The first entry should be always the base directory itself unless it is a
-    # root directory that was never collected.
-    if not path_infos and components:
-      raise db.UnknownPathError(client_id, path_type, components)
-
-    if path_infos and not path_infos[0].directory:
-      raise db.NotDirectoryPathError(client_id, path_type, components)
-
-    path_infos = path_infos[1:]
-
-    # For specific timestamp, we return information only about explicit paths
-    # (paths that have associated stat or hash entry or have an ancestor that is
-    # explicit).
-    if not only_explicit:
-      return path_infos
-
-    explicit_path_infos = []
-    has_explicit_ancestor = set()
-
-    # This list is sorted according to the keys component, so by traversing it
-    # in the reverse order we make sure that we process deeper paths first.
-    for path_info in reversed(path_infos):
-      path_components = tuple(path_info.components)
-
-      if (path_info.HasField("stat_entry") or
-          path_info.HasField("hash_entry") or
-          path_components in has_explicit_ancestor):
-        explicit_path_infos.append(path_info)
-        has_explicit_ancestor.add(path_components[:-1])
-
-    # Since we collected explicit paths in reverse order, we need to reverse it
-    # again to conform to the interface.
-    return list(reversed(explicit_path_infos))
+    return path_infos
 
   @mysql_utils.WithTransaction(readonly=True)
   def ReadPathInfosHistories(
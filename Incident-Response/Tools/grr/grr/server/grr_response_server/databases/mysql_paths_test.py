@@ -3,18 +3,56 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+from unittest import mock
+
 from absl import app
 from absl.testing import absltest
 
 from grr_response_server.databases import db_paths_test
+from grr_response_server.databases import db_test_utils
+from grr_response_server.databases import mysql_paths
 from grr_response_server.databases import mysql_test
+from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import test_lib
 
 
 class MysqlPathsTest(db_paths_test.DatabaseTestPathsMixin,
                      mysql_test.MysqlTestBase, absltest.TestCase):
-  pass
 
+  @mock.patch.object(mysql_paths.MySQLDBPathMixin,
+                     "_DESCENDANT_PATH_INFOS_BATCH_SIZE", 2)
+  def testIterDescendantPathInfosReadsPagesInPathOrder(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    path_infos = [
+        rdf_objects.PathInfo.OS(components=("foo", "bar%d" % i))
+        for i in range(5)
+    ]
+    self.db.WritePathInfos(client_id, path_infos)
+
+    results = self.db.IterDescendantPathInfos(
+        client_id=client_id,
+        path_type=rdf_objects.PathInfo.PathType.OS,
+        components=("foo",))
+    first_results = [next(results), next(results)]
+
+    # Every page continues after the last path of the previous one, so paths
+    # written between pages are listed only if they come later.
+    self.db.WritePathInfos(client_id, [
+        rdf_objects.PathInfo.OS(components=("foo", "bar")),
+        rdf_objects.PathInfo.OS(components=("foo", "bar3", "baz")),
+    ])
+
+    components = [tuple(result.components) for result in first_results]
+    components.extend(tuple(result.components) for result in results)
+    self.assertEqual(components, [
+        ("foo", "bar0"),
+        ("foo", "bar1"),
+        ("foo", "bar2"),
+        ("foo", "bar3"),
+        ("foo", "bar3", "baz"),
+        ("foo", "bar4"),
+    ])
 
 if __name__ == "__main__":
   app.run(test_lib.main)
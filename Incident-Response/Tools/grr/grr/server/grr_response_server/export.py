@@ -9,8 +9,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import collections
+from concurrent import futures
 import hashlib
 import logging
+import threading
 import time
 from typing import Any
 from typing import Iterator
@@ -325,8 +328,10 @@ class DataAgnosticExportConverter(ExportConverter):
   are preserved.
   """
 
-  # Cache used for generated classes.
+  # Cache used for generated classes. Converters may run in several threads
+  # (see ConvertBatchesInParallel), so the cache is guarded by a lock.
   classes_cache = {}
+  classes_cache_lock = threading.Lock()
 
   def ExportedClassNameForValue(self, value):
     return "AutoExported" + compatibility.GetName(value.__class__)
@@ -388,11 +393,12 @@ class DataAgnosticExportConverter(ExportConverter):
 
   def Convert(self, metadata, value):
     class_name = self.ExportedClassNameForValue(value)
-    try:
-      cls = DataAgnosticExportConverter.classes_cache[class_name]
-    except KeyError:
-      cls = self.MakeFlatRDFClass(value)
-      DataAgnosticExportConverter.classes_cache[class_name] = cls
+    with DataAgnosticExportConverter.classes_cache_lock:
+      try:
+        cls = DataAgnosticExportConverter.classes_cache[class_name]
+      except KeyError:
+        cls = self.MakeFlatRDFClass(value)
+        DataAgnosticExportConverter.classes_cache[class_name] = cls
 
     result_obj = cls()
     result_obj.Flatten(metadata, value)
@@ -1489,6 +1495,65 @@ def ConvertValuesWithMetadata(metadata_value_pairs, options=None):
     raise NoConverterFound(no_converter_found_error)
 
 
+def _ConvertBatch(converter, metadata_value_pairs):
+  return list(converter.BatchConvert(metadata_value_pairs))
+
+
+def ConvertBatchesInParallel(converter,
+                             metadata_value_batches,
+                             num_workers=4,
+                             max_pending_batches=8):
+  """Converts batches of values concurrently, yielding results in order.
+
+  Batches are pulled from metadata_value_batches in the calling thread and
+  handed to a pool of worker threads running converter.BatchConvert. Results
+  are yielded in the same order as the input batches. At most
+  max_pending_batches batches are being converted or waiting to be consumed
+  at any given time, so memory usage stays bounded no matter how many values
+  are converted.
+
+  Worker threads let converters that wait on the data store or the file store
+  overlap with reading the next batches. Pure protobuf conversion is bound by
+  the GIL, so it doesn't get faster with more threads (see
+  export_benchmark_test.py).
+
+  Args:
+    converter: ExportConverter instance. It's shared between worker threads.
+    metadata_value_batches: An iterable of lists of (metadata, value) tuples.
+    num_workers: Number of worker threads. If 0, all conversions are done in
+      the calling thread.
+    max_pending_batches: Maximum number of batches in flight.
+
+  Yields:
+    Converted values.
+  """
+  if num_workers <= 0:
+    for batch in metadata_value_batches:
+      for result in converter.BatchConvert(batch):
+        yield result
+    return
+
+  pending = collections.deque()
+  executor = futures.ThreadPoolExecutor(max_workers=num_workers)
+  try:
+    for batch in metadata_value_batches:
+      pending.append(executor.submit(_ConvertBatch, converter, batch))
+
+      if len(pending) >= max(max_pending_batches, 1):
+        for result in pending.popleft().result():
+          yield result
+
+    while pending:
+      for result in pending.popleft().result():
+        yield result
+  finally:
+    # If the consumer stops early, don't waste time converting batches that
+    # nobody is going to read.
+    for future in pending:
+      future.cancel()
+    executor.shutdown(wait=True)
+
+
 def ConvertValues(default_metadata, values, options=None):
   """Converts a set of RDFValues into a set of export-friendly RDFValues.
 
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Benchmarks for converting hunt results to exported values."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+from absl import app
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import collection
+from grr_response_server import export
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class ConvertBatchesInParallelBenchmark(
+    benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares export conversion in the calling thread and in worker threads."""
+
+  REPEATS = 3
+  units = "s"
+
+  NUM_VALUES = 20000
+  BATCH_SIZE = 5000
+
+  def setUp(self):
+    super().setUp()
+
+    metadata = export.ExportedMetadata(
+        client_urn=rdfvalue.RDFURN("C.0000000000000000"))
+    self.pairs = []
+    for i in range(self.NUM_VALUES):
+      stat_entry = rdf_client_fs.StatEntry(
+          pathspec=rdf_paths.PathSpec.OS(path="/home/foo/bar%d" % i),
+          st_size=i,
+          st_mode=0o644,
+          st_mtime=1577836800 + i)
+      self.pairs.append((metadata, stat_entry))
+
+  def _Convert(self, converter, num_workers):
+    results = export.ConvertBatchesInParallel(
+        converter,
+        collection.Batch(self.pairs, self.BATCH_SIZE),
+        num_workers=num_workers)
+    return sum(1 for _ in results)
+
+  def testStatEntryConversion(self):
+    converter = export.StatEntryToExportedFileConverter()
+    for num_workers in [0, 2, 4]:
+      self.TimeIt(
+          self._Convert,
+          name="StatEntry, %d workers" % num_workers,
+          converter=converter,
+          num_workers=num_workers)
+
+  def testDataAgnosticConversion(self):
+    converter = export.DataAgnosticExportConverter()
+    for num_workers in [0, 2, 4]:
+      self.TimeIt(
+          self._Convert,
+          name="DataAgnostic, %d workers" % num_workers,
+          converter=converter,
+          num_workers=num_workers)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
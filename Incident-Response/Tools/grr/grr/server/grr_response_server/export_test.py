@@ -8,12 +8,14 @@ from __future__ import unicode_literals
 import binascii
 import os
 import socket
+import time
 
 from absl import app
 from absl.testing import absltest
 
 from grr_response_core.lib import queues
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import anomaly as rdf_anomaly
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
@@ -155,6 +157,37 @@ class ExportTest(ExportTestBase):
                     (result[0] == DummyRDFValue2("someB") and
                      result[1] == DummyRDFValue("someA")))
 
+  def testConvertBatchesInParallelPreservesBatchOrder(self):
+    converter = DummyRDFValueConverter()
+    batches = [[(self.metadata, DummyRDFValue("%d-%d" % (i, j)))
+                for j in range(5)]
+               for i in range(20)]
+
+    result = list(
+        export.ConvertBatchesInParallel(
+            converter, batches, num_workers=4, max_pending_batches=3))
+
+    self.assertEqual(result, [
+        rdfvalue.RDFString("%d-%d" % (i, j)) for i in range(20)
+        for j in range(5)
+    ])
+
+  def testConvertBatchesInParallelConsumesInputLazily(self):
+    converter = DummyRDFValueConverter()
+    consumed = []
+
+    def Batches():
+      for i in range(100):
+        consumed.append(i)
+        yield [(self.metadata, DummyRDFValue(str(i)))]
+
+    results = export.ConvertBatchesInParallel(
+        converter, Batches(), num_workers=2, max_pending_batches=2)
+    self.assertEqual(next(results), rdfvalue.RDFString("0"))
+    results.close()
+
+    self.assertLess(len(consumed), 100)
+
   def testStatEntryToExportedFileConverterWithMissingAFF4File(self):
     stat = rdf_client_fs.StatEntry(
         pathspec=rdf_paths.PathSpec(
@@ -1387,6 +1420,35 @@ class DataAgnosticExportConverterTest(ExportTestBase):
     self.assertLen(converted_values, 1)
     return converted_values[0]
 
+  def testGeneratesOneClassWhenConvertingInParallel(self):
+    metadata = export.ExportedMetadata(source_urn=rdfvalue.RDFURN("aff4:/foo"))
+    batches = [[(metadata,
+                 export_test_lib.DataAgnosticConverterTestValue(
+                     string_value="%d" % i))] for i in range(20)]
+
+    make_flat_rdf_class = export.DataAgnosticExportConverter.MakeFlatRDFClass
+
+    def SlowMakeFlatRDFClass(converter, value):
+      time.sleep(0.1)
+      return make_flat_rdf_class(converter, value)
+
+    # A class name that isn't in the cache yet, so that worker threads race to
+    # generate it. Generating it twice would fail with a duplicate name error.
+    with utils.MultiStubber(
+        (export.DataAgnosticExportConverter, "classes_cache", {}),
+        (export.DataAgnosticExportConverter, "ExportedClassNameForValue",
+         lambda self, value: "AutoExportedParallelConversionTestValue"),
+        (export.DataAgnosticExportConverter, "MakeFlatRDFClass",
+         SlowMakeFlatRDFClass)):
+      converted = list(
+          export.ConvertBatchesInParallel(
+              export.DataAgnosticExportConverter(), batches, num_workers=4))
+
+    self.assertLen(converted, 20)
+    self.assertLen(set(type(value) for value in converted), 1)
+    self.assertEqual([value.string_value for value in converted],
+                     ["%d" % i for i in range(20)])
+
   def testAddsMetadataAndIgnoresRepeatedAndMessagesFields(self):
     original_value = export_test_lib.DataAgnosticConverterTestValue()
     converted_value = self.ConvertOriginalValue(original_value)
@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 
 import abc
 import collections
+from concurrent import futures
 import hashlib
 import io
 import os
@@ -460,7 +461,66 @@ class StreamedFileChunk(object):
     self.total_chunks = total_chunks
 
 
-def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
+def GetLatestHashIds(client_paths, max_timestamp=None):
+  """Returns hash ids of the latest collected versions of given files.
+
+  Args:
+    client_paths: db.ClientPath objects describing paths to files.
+    max_timestamp: If specified, the last collected version of every file with
+      a timestamp equal or lower than max_timestamp will be used.
+
+  Returns:
+    A dictionary mapping db.ClientPath to rdf_objects.SHA256HashID. Files that
+    were never collected are omitted.
+  """
+  path_infos_by_cp = (
+      data_store.REL_DB.ReadLatestPathInfosWithHashBlobReferences(
+          client_paths, max_timestamp=max_timestamp))
+
+  hash_ids_by_cp = {}
+  for cp, pi in path_infos_by_cp.items():
+    if pi:
+      hash_ids_by_cp[cp] = rdf_objects.SHA256HashID.FromSerializedBytes(
+          pi.hash_entry.sha256.AsBytes())
+
+  return hash_ids_by_cp
+
+
+def _ReadBlobsInBatches(blob_ids, prefetch=False):
+  """Reads blobs in batches of STREAM_CHUNKS_READ_AHEAD.
+
+  Args:
+    blob_ids: A list of blob ids to read.
+    prefetch: If True, the next batch of blobs is read on a background thread
+      while the current one is being processed by the caller.
+
+  Yields:
+    Dictionaries mapping blob ids to blob data, one per batch.
+  """
+  batches = list(collection.Batch(blob_ids, STREAM_CHUNKS_READ_AHEAD))
+
+  if not prefetch:
+    for batch in batches:
+      yield data_store.BLOBS.ReadBlobs(batch)
+    return
+
+  with futures.ThreadPoolExecutor(max_workers=1) as executor:
+    next_blobs = None
+    for i, batch in enumerate(batches):
+      if next_blobs is None:
+        next_blobs = executor.submit(data_store.BLOBS.ReadBlobs, batch)
+
+      blobs = next_blobs.result()
+      if i + 1 < len(batches):
+        next_blobs = executor.submit(data_store.BLOBS.ReadBlobs, batches[i + 1])
+
+      yield blobs
+
+
+def StreamFilesChunks(client_paths,
+                      max_timestamp=None,
+                      max_size=None,
+                      prefetch_blobs=False):
   """Streams contents of given files.
 
   Args:
@@ -471,6 +531,8 @@ def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
       each file.
     max_size: If specified, only the chunks covering max_size bytes will be
       returned.
+    prefetch_blobs: If True, the next batch of blobs is read from the blob
+      store on a background thread while the current one is being consumed.
 
   Yields:
     StreamedFileChunk objects for every file read. Chunks will be returned
@@ -481,15 +543,7 @@ def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
     BlobNotFoundError: if one of the blobs wasn't found while streaming.
   """
 
-  path_infos_by_cp = (
-      data_store.REL_DB.ReadLatestPathInfosWithHashBlobReferences(
-          client_paths, max_timestamp=max_timestamp))
-
-  hash_ids_by_cp = {}
-  for cp, pi in path_infos_by_cp.items():
-    if pi:
-      hash_ids_by_cp[cp] = rdf_objects.SHA256HashID.FromSerializedBytes(
-          pi.hash_entry.sha256.AsBytes())
+  hash_ids_by_cp = GetLatestHashIds(client_paths, max_timestamp=max_timestamp)
 
   blob_refs_by_hash_id = data_store.REL_DB.ReadHashBlobReferences(
       hash_ids_by_cp.values())
@@ -519,9 +573,11 @@ def StreamFilesChunks(client_paths, max_timestamp=None, max_size=None):
       if max_size is not None and cur_size >= max_size:
         break
 
-  for batch in collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD):
-    blobs = data_store.BLOBS.ReadBlobs(
-        [blob_id for cp, blob_id, i, num_blobs, offset, total_size in batch])
+  chunk_batches = collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD)
+  blob_batches = _ReadBlobsInBatches(
+      [blob_id for cp, blob_id, i, num_blobs, offset, total_size in all_chunks],
+      prefetch=prefetch_blobs)
+  for batch, blobs in zip(chunk_batches, blob_batches):
     for cp, blob_id, i, num_blobs, offset, total_size in batch:
       blob_data = blobs[blob_id]
       if blob_data is None:
@@ -574,6 +574,31 @@ class StreamFilesChunksTest(test_lib.GRRBaseTest):
     self.assertEqual(chunks[0].client_path, client_path_2)
     self.assertEqual(chunks[1].client_path, client_path_1)
 
+  def testPrefetchingBlobsAcrossReadAheadBatchesKeepsOrder(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    blob_data_1, _ = self._WriteFile(client_path_1, (0, 3))
+
+    client_path_2 = db.ClientPath.OS(self.client_id_other, ("foo", "bar"))
+    blob_data_2, _ = self._WriteFile(client_path_2, (3, 6))
+
+    with mock.patch.object(file_store, "STREAM_CHUNKS_READ_AHEAD", 2):
+      chunks = list(
+          file_store.StreamFilesChunks([client_path_1, client_path_2],
+                                       prefetch_blobs=True))
+
+    self.assertEqual([c.client_path for c in chunks], [client_path_1] * 3 +
+                     [client_path_2] * 3)
+    self.assertEqual([c.data for c in chunks], blob_data_1 + blob_data_2)
+
+  def testGetLatestHashIdsOmitsFilesWithoutHashes(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path_1, (0, 1))
+    client_path_2 = db.ClientPath.OS(self.client_id, ("foo", "baz"))
+
+    hash_ids = file_store.GetLatestHashIds([client_path_1, client_path_2])
+    self.assertCountEqual(hash_ids.keys(), [client_path_1])
+    self.assertIsInstance(hash_ids[client_path_1], rdf_objects.SHA256HashID)
+
   def testReadsLatestVersionWhenStreamingWithoutSpecifiedTimestamp(self):
     client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
 
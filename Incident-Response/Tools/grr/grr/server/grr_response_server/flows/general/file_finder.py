@@ -4,6 +4,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import re
 import stat
 
 
@@ -58,7 +59,9 @@ class FileFinder(transfer.MultiGetFileLogic, fingerprint.FingerprintFileLogic,
           type_enum.SIZE: (self.SizeCondition, 0),
           type_enum.CONTENTS_REGEX_MATCH: (self.ContentsRegexMatchCondition, 1),
           type_enum.CONTENTS_LITERAL_MATCH:
-              (self.ContentsLiteralMatchCondition, 1)
+              (self.ContentsLiteralMatchCondition, 1),
+          type_enum.CONTENTS_MULTI_LITERAL_MATCH:
+              (self.ContentsMultiLiteralMatchCondition, 1),
       }
     return self._condition_handlers
 
@@ -215,6 +218,41 @@ class FileFinder(transfer.MultiGetFileLogic, fingerprint.FingerprintFileLogic,
         request_data=dict(
             original_result=response, condition_index=condition_index + 1))
 
+  def ContentsMultiLiteralMatchCondition(self, response, condition_options,
+                                         condition_index):
+    """Applies multi-literal match condition to responses."""
+    if not (self.args.process_non_regular_files or
+            stat.S_ISREG(int(response.stat_entry.st_mode))):
+      return
+
+    options = condition_options.contents_multi_literal_match
+    literals = [literal for literal in options.literals if literal]
+    if not literals:
+      return
+
+    # The Grep client action looks up a single pattern, so the literals are
+    # sent as a regex alternation. Longer literals go first, so that the
+    # longest one is reported when several begin at the same offset. The
+    # client matches regexes case-insensitively, literals must not be.
+    literals.sort(key=len, reverse=True)
+    regex = b"(?-i:%s)" % b"|".join(map(re.escape, literals))
+
+    grep_spec = rdf_client_fs.GrepSpec(
+        target=response.stat_entry.pathspec,
+        regex=regex,
+        mode=options.mode,
+        start_offset=options.start_offset,
+        length=options.length,
+        bytes_before=options.bytes_before,
+        bytes_after=options.bytes_after)
+
+    self.CallClient(
+        server_stubs.Grep,
+        request=grep_spec,
+        next_state=compatibility.GetName(self.ProcessGrep),
+        request_data=dict(
+            original_result=response, condition_index=condition_index + 1))
+
   def ProcessGrep(self, responses):
     for response in responses:
       if "original_result" not in responses.request_data:
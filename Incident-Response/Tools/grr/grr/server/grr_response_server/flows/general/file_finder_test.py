@@ -394,6 +394,36 @@ class TestFileFinderFlow(vfs_test_lib.VfsTestCase,
     self.assertEqual(results[0].matches[0].data,
                      b"MZ\x90\x00\x03\x00\x00\x00\x04\x00\x00\x00\xff")
 
+  def testMultiLiteralMatchConditionWithDifferentActions(self):
+    expected_files = ["auth.log"]
+    non_expected_files = ["dpkg.log", "dpkg_false.log"]
+
+    match = rdf_file_finder.FileFinderContentsMultiLiteralMatchCondition(
+        mode=rdf_file_finder.FileFinderContentsMultiLiteralMatchCondition.Mode
+        .ALL_HITS,
+        bytes_before=10,
+        bytes_after=10,
+        # Literals are case-sensitive, so the second one must not match.
+        literals=[b"session opened for user dearjohn", b"SESSION OPENED"])
+    multi_literal_condition = rdf_file_finder.FileFinderCondition(
+        condition_type=rdf_file_finder.FileFinderCondition.Type
+        .CONTENTS_MULTI_LITERAL_MATCH,
+        contents_multi_literal_match=match)
+
+    for action in self.CONDITION_TESTS_ACTIONS:
+      results = self.RunFlowAndCheckResults(
+          action=action,
+          conditions=[multi_literal_condition],
+          expected_files=expected_files,
+          non_expected_files=non_expected_files)
+
+      # Check that the results' matches fields are correctly filled.
+      self.assertLen(results, 1)
+      self.assertLen(results[0].matches, 1)
+      self.assertEqual(results[0].matches[0].offset, 350)
+      self.assertEqual(results[0].matches[0].data,
+                       b"session): session opened for user dearjohn by (uid=0")
+
   def testRegexMatchConditionWithDifferentActions(self):
     expected_files = ["auth.log"]
     non_expected_files = ["dpkg.log", "dpkg_false.log"]
@@ -6,7 +6,6 @@ from __future__ import unicode_literals
 
 import stat
 from typing import Any, Optional
-import zlib
 
 from grr_response_core.lib import constants
 from grr_response_core.lib import rdfvalue
@@ -15,11 +14,11 @@ from grr_response_core.lib.rdfvalues import client_action as rdf_client_action
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
-from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import compatibility
 from grr_response_core.lib.util import text
 from grr_response_proto import flows_pb2
+from grr_response_server import blob_ingestion
 from grr_response_server import data_store
 from grr_response_server import file_store
 from grr_response_server import flow_base
@@ -38,6 +37,11 @@ class GetFileArgs(rdf_structs.RDFProtoStruct):
   ]
 
 
+class GetFileProgress(rdf_structs.RDFProtoStruct):
+  protobuf = flows_pb2.GetFileProgress
+  rdf_deps = []
+
+
 class GetFile(flow_base.FlowBase):
   """An efficient file transfer mechanism (deprecated, use MultiGetFile).
 
@@ -48,6 +52,14 @@ class GetFile(flow_base.FlowBase):
   GetFile can also retrieve content from device files that report a size of 0 in
   stat when read_length is specified.
 
+  In resumable mode, chunks are requested in windows: the client hashes all
+  chunks of a window, and only chunks missing from the blob store are
+  transferred. This way collecting a large file again after an interrupted
+  collection only transfers the missing chunks. Several windows are in flight at
+  once and windows grow as long as the throughput grows. Chunks that fail to
+  transfer are retried, and if they keep failing, only the chunks before the
+  first failed one are collected.
+
   Returns to parent flow:
     A PathSpec.
   """
@@ -55,11 +67,22 @@ class GetFile(flow_base.FlowBase):
   category = "/Filesystem/"
 
   args_type = GetFileArgs
+  progress_type = GetFileProgress
 
   # We have a maximum of this many chunk reads outstanding (about 10mb)
   WINDOW_SIZE = 200
   CHUNK_SIZE = 512 * 1024
 
+  # In resumable mode, this many windows of chunks are hashed at once. Windows
+  # start at WINDOW_SIZE chunks and are doubled while the throughput increases
+  # by at least WINDOW_GROWTH_MIN_SPEEDUP, up to MAX_WINDOW_SIZE chunks.
+  NUM_WINDOWS_IN_FLIGHT = 2
+  MAX_WINDOW_SIZE = 3200
+  WINDOW_GROWTH_MIN_SPEEDUP = 1.1
+  # In resumable mode, chunks that fail to transfer are requested again up to
+  # this many times.
+  MAX_CHUNK_RETRIES = 3
+
   @classmethod
   def GetDefaultArgs(cls, username=None):
     del username
@@ -80,6 +103,23 @@ class GetFile(flow_base.FlowBase):
     self.state.num_bytes_collected = 0
     self.state.target_pathspec = self.args.pathspec.Copy()
 
+    # Used in resumable mode only. Only chunks before the first missing one
+    # count as collected (or skipped).
+    self.state.num_bytes_skipped = 0
+    # Maps chunk numbers to (blob hash, length, transferred) of chunks that are
+    # stored.
+    self.state.chunk_blobs = {}
+    # Number of consecutive stored chunks from the start of the file.
+    self.state.num_contiguous_chunks = 0
+    # The first chunk that couldn't be transferred, if any.
+    self.state.failed_chunk = None
+    # Maps first chunk numbers of windows being hashed to their chunk hashes.
+    self.state.window_hashes = {}
+    self.state.window_size = self.WINDOW_SIZE
+    self.state.max_throughput = 0
+    self.state.last_window_time = None
+    self.state.last_window_bytes = 0
+
     # TODO(hanuszczak): Support for old clients ends on 2021-01-01.
     # This conditional should be removed after that date.
     if not self.client_version or self.client_version >= 3221:
@@ -145,6 +185,12 @@ class GetFile(flow_base.FlowBase):
 
     self.state.max_chunk_number = (self.state.file_size // self.CHUNK_SIZE) + 1
 
+    if self.args.resumable:
+      self.state.last_window_time = rdfvalue.RDFDatetime.Now()
+      for _ in range(self.NUM_WINDOWS_IN_FLIGHT):
+        self._HashWindow()
+      return
+
     self.FetchWindow(
         min(self.WINDOW_SIZE,
             self.state.max_chunk_number - self.state["current_chunk_number"]))
@@ -168,13 +214,150 @@ class GetFile(flow_base.FlowBase):
           next_state=compatibility.GetName(self.ReadBuffer))
       self.state.current_chunk_number += 1
 
+  def _ChunkRequest(self, chunk_number):
+    offset = chunk_number * self.CHUNK_SIZE
+    return rdf_client.BufferReference(
+        pathspec=self.state.target_pathspec,
+        offset=offset,
+        length=min(self.state.file_size - offset, self.CHUNK_SIZE))
+
+  def _HashWindow(self):
+    """Asks the client to hash the next window of chunks (resumable mode)."""
+    start = self.state.current_chunk_number
+    end = min(start + self.state.window_size,
+              -(-self.state.file_size // self.CHUNK_SIZE))
+    # Chunks after a failed one wouldn't be collected anyway.
+    if start >= end or self.state.failed_chunk is not None:
+      return
+
+    self.state.window_hashes[start] = {}
+    for chunk_number in range(start, end):
+      self.CallClient(
+          server_stubs.HashBuffer,
+          self._ChunkRequest(chunk_number),
+          next_state=compatibility.GetName(self.CheckChunkHash),
+          request_data=dict(
+              window=start, chunk=chunk_number, last=chunk_number == end - 1))
+    self.state.current_chunk_number = end
+
+  def CheckChunkHash(self, responses):
+    """Collects chunk hashes and checks complete windows with the blob store."""
+    window = responses.request_data["window"]
+    response = responses.First()
+    if responses.success and response:
+      chunk_hash = (response.data, response.length)
+    else:
+      # The chunk is transferred without checking the blob store.
+      chunk_hash = None
+    self.state.window_hashes[window][responses.request_data["chunk"]] = (
+        chunk_hash)
+
+    # Responses are processed in order, so all hashes of the window are here.
+    if responses.request_data["last"]:
+      self._CheckWindow(window)
+
+  def _CheckWindow(self, window):
+    """Transfers the chunks of a window that are not stored yet."""
+    hashes = self.state.window_hashes.pop(window)
+    blob_ids = {
+        chunk_number: rdf_objects.BlobID.FromSerializedBytes(chunk_hash[0])
+        for chunk_number, chunk_hash in hashes.items()
+        if chunk_hash is not None
+    }
+    existing_blobs = data_store.BLOBS.CheckBlobsExist(list(blob_ids.values()))
+
+    for chunk_number in sorted(hashes):
+      blob_id = blob_ids.get(chunk_number)
+      if blob_id is not None and existing_blobs[blob_id]:
+        digest, length = hashes[chunk_number]
+        self._AddChunkBlob(chunk_number, digest, length, transferred=False)
+      else:
+        self._TransferChunk(chunk_number, retries=0)
+
+    self._UpdateWindowSize()
+    self._HashWindow()
+
+  def _TransferChunk(self, chunk_number, retries):
+    self.CallClient(
+        server_stubs.TransferBuffer,
+        self._ChunkRequest(chunk_number),
+        next_state=compatibility.GetName(self.ReadChunk),
+        request_data=dict(chunk=chunk_number, retries=retries))
+
+  def _AddChunkBlob(self, chunk_number, digest, length, transferred):
+    """Stores a chunk's blob and extends the contiguous collected prefix."""
+    self.state.chunk_blobs[chunk_number] = (digest, length, transferred)
+
+    chunk_blobs = self.state.chunk_blobs
+    while self.state.num_contiguous_chunks in chunk_blobs:
+      _, num_bytes, was_transferred = chunk_blobs[
+          self.state.num_contiguous_chunks]
+      self.state.num_bytes_collected += num_bytes
+      if not was_transferred:
+        self.state.num_bytes_skipped += num_bytes
+      self.state.num_contiguous_chunks += 1
+
+  def _UpdateWindowSize(self):
+    """Grows the window if the throughput grew since the last window."""
+    now = rdfvalue.RDFDatetime.Now()
+    elapsed = (now - self.state.last_window_time).ToFractional(
+        rdfvalue.SECONDS)
+    # Only transferred chunks count, skipped ones cost (almost) nothing.
+    num_bytes_transferred = (
+        self.state.num_bytes_collected - self.state.num_bytes_skipped)
+    num_bytes = num_bytes_transferred - self.state.last_window_bytes
+    self.state.last_window_time = now
+    self.state.last_window_bytes = num_bytes_transferred
+    if elapsed <= 0:
+      return
+
+    throughput = num_bytes / elapsed
+    if throughput >= self.state.max_throughput * self.WINDOW_GROWTH_MIN_SPEEDUP:
+      self.state.max_throughput = throughput
+      self.state.window_size = min(self.state.window_size * 2,
+                                   self.MAX_WINDOW_SIZE)
+
+  def ReadChunk(self, responses):
+    """Stores the hash of a transferred chunk (resumable mode)."""
+    chunk_number = responses.request_data["chunk"]
+    if not responses.success:
+      retries = responses.request_data["retries"]
+      if retries < self.MAX_CHUNK_RETRIES:
+        self._TransferChunk(chunk_number, retries=retries + 1)
+        return
+
+      self.Log("Failed to transfer chunk %d: %s", chunk_number,
+               responses.status)
+      if (self.state.failed_chunk is None or
+          chunk_number < self.state.failed_chunk):
+        self.state.failed_chunk = chunk_number
+      return
+
+    response = responses.First()
+    if not response:
+      raise IOError("Missing hash for chunk %d" % chunk_number)
+
+    self._AddChunkBlob(
+        chunk_number, response.data, response.length, transferred=True)
+
+  def _CollectedBlobs(self):
+    """Returns (blob hash, length) of consecutive chunks from the start."""
+    if not self.args.resumable:
+      return self.state.blobs
+
+    chunk_blobs = self.state.chunk_blobs
+    return [
+        chunk_blobs[chunk_number][:2]
+        for chunk_number in range(self.state.num_contiguous_chunks)
+    ]
+
   def _AddFileToFileStore(self):
     stat_entry = self.state.stat_entry
     path_info = rdf_objects.PathInfo.FromStatEntry(stat_entry)
 
     blob_refs = []
     offset = 0
-    for data, size in self.state.blobs:
+    for data, size in self._CollectedBlobs():
       blob_refs.append(
           rdf_objects.BlobReference(
               offset=offset,
@@ -192,6 +375,14 @@ class GetFile(flow_base.FlowBase):
 
     # Save some space.
     del self.state["blobs"]
+    self.state.chunk_blobs = {}
+
+  def GetProgress(self) -> GetFileProgress:
+    return GetFileProgress(
+        file_size=self.state.file_size,
+        num_bytes_collected=self.state.num_bytes_collected,
+        num_bytes_skipped=self.state.get("num_bytes_skipped", 0),
+        window_size=self.state.get("window_size", self.WINDOW_SIZE))
 
   def ReadBuffer(self, responses):
     """Read the buffer and write to the file."""
@@ -956,24 +1147,8 @@ class BlobHandler(message_handlers.MessageHandler):
   handler_name = "BlobHandler"
 
   def ProcessMessages(self, msgs):
-    blobs = []
-    for msg in msgs:
-      blob = msg.request.payload
-      data = blob.data
-      if not data:
-        continue
-
-      ct = rdf_protodict.DataBlob.CompressionType
-      if blob.compression == ct.ZCOMPRESSION:
-        data = zlib.decompress(data)
-      elif blob.compression == ct.UNCOMPRESSED:
-        pass
-      else:
-        raise ValueError("Unsupported compression")
-
-      blobs.append(data)
-
-    data_store.BLOBS.WriteBlobsWithUnknownHashes(blobs)
+    blobs = [msg.request.payload for msg in msgs]
+    blob_ingestion.GetPipeline().Ingest(data_store.BLOBS, blobs)
 
 
 class SendFile(flow_base.FlowBase):
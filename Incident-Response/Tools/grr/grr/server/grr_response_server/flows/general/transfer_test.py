@@ -18,6 +18,7 @@ from absl import app
 from grr_response_core.lib import constants
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import client as rdf_client
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.util import compatibility
 from grr_response_core.lib.util import temp
@@ -26,6 +27,7 @@ from grr_response_server import file_store
 from grr_response_server.databases import db
 from grr_response_server.flows.general import transfer
 from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import acl_test_lib
 from grr.test_lib import action_mocks
 from grr.test_lib import flow_test_lib
 from grr.test_lib import test_lib
@@ -50,6 +52,27 @@ class ClientMock(action_mocks.ActionMock):
     ]
 
 
+class FailingTransferBufferClientMock(action_mocks.GetFileClientMock):
+  """A GetFile client mock that fails to transfer a chunk a number of times."""
+
+  def __init__(self, failing_offset, num_failures):
+    super().__init__()
+    self.failing_offset = failing_offset
+    self.num_failures = num_failures
+
+  def HandleMessage(self, message):
+    if (message.name == "TransferBuffer" and
+        message.payload.offset == self.failing_offset and
+        self.num_failures > 0):
+      self.num_failures -= 1
+      return [
+          self.GenerateStatusMessage(
+              message, status=rdf_flows.GrrStatus.ReturnedStatus.IOERROR)
+      ]
+
+    return super().HandleMessage(message)
+
+
 class GetMBRFlowTest(flow_test_lib.FlowTestsBaseclass):
   """Test the transfer mechanism."""
 
@@ -162,6 +185,160 @@ class GetFileFlowTest(CompareFDsMixin, flow_test_lib.FlowTestsBaseclass):
     self.assertIsNone(history[-1].hash_entry.sha1)
     self.assertIsNone(history[-1].hash_entry.md5)
 
+  def testGetFileResumable(self):
+    client_mock = action_mocks.GetFileClientMock()
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS,
+        path=os.path.join(self.base_path, "test_img.dd"))
+
+    flow_id = flow_test_lib.TestFlowHelper(
+        transfer.GetFile.__name__,
+        client_mock,
+        creator=self.test_username,
+        client_id=self.client_id,
+        pathspec=pathspec,
+        resumable=True)
+
+    # Fix path for Windows testing.
+    pathspec.path = pathspec.path.replace("\\", "/")
+    with open(pathspec.path, "rb") as fd2:
+      cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+      fd_rel_db = file_store.OpenFile(cp)
+      self.CompareFDs(fd2, fd_rel_db)
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.GetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_bytes_collected, os.path.getsize(pathspec.path))
+    self.assertEqual(p.num_bytes_collected, p.file_size)
+    self.assertEqual(p.num_bytes_skipped, 0)
+
+  def testGetFileResumableSkipsStoredChunks(self):
+    client_mock = action_mocks.GetFileClientMock()
+
+    # The second time, only the middle chunk has changed and is transferred,
+    # like when collecting a file again after an interrupted collection.
+    chunk_size = transfer.GetFile.CHUNK_SIZE
+    for data in [
+        b"A" * chunk_size + b"B" * chunk_size + b"C" * 100,
+        b"A" * chunk_size + b"X" * chunk_size + b"C" * 100
+    ]:
+      path = os.path.join(self.temp_dir, "test.txt")
+      with io.open(path, "wb") as fd:
+        fd.write(data)
+
+      pathspec = rdf_paths.PathSpec(
+          pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+      flow_id = flow_test_lib.TestFlowHelper(
+          transfer.GetFile.__name__,
+          client_mock,
+          creator=self.test_username,
+          client_id=self.client_id,
+          pathspec=pathspec,
+          resumable=True)
+
+      cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+      fd_rel_db = file_store.OpenFile(cp)
+      self.assertEqual(fd_rel_db.read(), data)
+
+    self.assertEqual(client_mock.action_counts["TransferBuffer"], 4)
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.GetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_bytes_collected, len(data))
+    self.assertEqual(p.num_bytes_skipped, chunk_size + 100)
+
+  def testGetFileResumableGrowsWindow(self):
+    client_mock = action_mocks.GetFileClientMock()
+
+    path = os.path.join(self.temp_dir, "test.txt")
+    data = os.urandom(transfer.GetFile.CHUNK_SIZE * 7 + 100)
+    with io.open(path, "wb") as fd:
+      fd.write(data)
+
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+    with mock.patch.object(transfer.GetFile, "WINDOW_SIZE", 1):
+      flow_id = flow_test_lib.TestFlowHelper(
+          transfer.GetFile.__name__,
+          client_mock,
+          creator=self.test_username,
+          client_id=self.client_id,
+          pathspec=pathspec,
+          resumable=True)
+
+    cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+    self.assertEqual(file_store.OpenFile(cp).read(), data)
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.GetFile(f_obj).GetProgress()
+    self.assertGreater(p.window_size, 1)
+
+  def testGetFileResumableRetriesFailedChunks(self):
+    chunk_size = transfer.GetFile.CHUNK_SIZE
+    client_mock = FailingTransferBufferClientMock(
+        failing_offset=chunk_size,
+        num_failures=transfer.GetFile.MAX_CHUNK_RETRIES)
+
+    path = os.path.join(self.temp_dir, "test.txt")
+    data = os.urandom(chunk_size * 3 + 100)
+    with io.open(path, "wb") as fd:
+      fd.write(data)
+
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+    flow_id = flow_test_lib.TestFlowHelper(
+        transfer.GetFile.__name__,
+        client_mock,
+        creator=self.test_username,
+        client_id=self.client_id,
+        pathspec=pathspec,
+        resumable=True)
+
+    cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+    self.assertEqual(file_store.OpenFile(cp).read(), data)
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.GetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_bytes_collected, len(data))
+
+  def testGetFileResumableCollectsChunksBeforeFailedChunk(self):
+    chunk_size = transfer.GetFile.CHUNK_SIZE
+    client_mock = FailingTransferBufferClientMock(
+        failing_offset=chunk_size,
+        num_failures=transfer.GetFile.MAX_CHUNK_RETRIES + 1)
+
+    path = os.path.join(self.temp_dir, "test.txt")
+    data = os.urandom(chunk_size * 3 + 100)
+    with io.open(path, "wb") as fd:
+      fd.write(data)
+
+    # Change the username so notifications get written.
+    username = "notification_test"
+    acl_test_lib.CreateUser(username)
+
+    pathspec = rdf_paths.PathSpec(
+        pathtype=rdf_paths.PathSpec.PathType.OS, path=path)
+    flow_id = flow_test_lib.TestFlowHelper(
+        transfer.GetFile.__name__,
+        client_mock,
+        creator=username,
+        client_id=self.client_id,
+        pathspec=pathspec,
+        resumable=True)
+
+    # Chunks after the failed one were transferred, but there is a gap before
+    # them, so only the first chunk is collected.
+    cp = db.ClientPath.FromPathSpec(self.client_id, pathspec)
+    self.assertEqual(file_store.OpenFile(cp).read(), data[:chunk_size])
+
+    f_obj = flow_test_lib.GetFlowObj(self.client_id, flow_id)
+    p = transfer.GetFile(f_obj).GetProgress()
+    self.assertEqual(p.num_bytes_collected, chunk_size)
+
+    notifications = data_store.REL_DB.ReadUserNotifications(username)
+    messages = [n.message for n in notifications]
+    self.assertTrue(any("transferred partially" in m for m in messages))
+
   def testGetFilePathCorrection(self):
     """Tests that the pathspec returned is used for the aff4path."""
     client_mock = action_mocks.GetFileClientMock()
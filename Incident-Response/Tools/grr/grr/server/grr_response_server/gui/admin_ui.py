@@ -13,6 +13,7 @@ from absl import flags
 from grr_response_core import config
 from grr_response_core.config import contexts
 from grr_response_core.config import server as config_server
+from grr_response_server import client_index
 from grr_response_server import fleetspeak_connector
 
 # pylint: disable=unused-import,g-bad-import-order
@@ -43,6 +44,7 @@ def main(_):
   server_startup.Init()
 
   fleetspeak_connector.Init()
+  client_index.InitIndexCache()
 
   if not config.CONFIG["AdminUI.headless"] and (not os.path.exists(
       os.path.join(config.CONFIG["AdminUI.document_root"],
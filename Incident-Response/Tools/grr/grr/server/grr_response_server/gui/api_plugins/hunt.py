@@ -881,23 +881,10 @@ class ApiGetHuntClientCompletionStatsHandler(
     if target_size <= 0:
       target_size = 1000
 
-    states_and_timestamps = data_store.REL_DB.ReadHuntFlowsStatesAndTimestamps(
+    buckets = data_store.REL_DB.ReadHuntClientCompletionHistogram(
         str(args.hunt_id))
 
-    started_clients = []
-    completed_clients = []
-
-    # TODO(user): keeping using RDFURNs only to share _SampleClients and
-    # _Resample code between legacy and relational implementations.
-    # Get rid of RDFURNs as soon as AFF4 is gone.
-    for i, sat in enumerate(states_and_timestamps):
-      started_clients.append((rdfvalue.RDFURN(str(i)), sat.create_time))
-      if sat.flow_state != rdf_flow_objects.Flow.FlowState.RUNNING:
-        completed_clients.append(
-            (rdfvalue.RDFURN(str(i)), sat.last_update_time))
-
-    (start_stats, complete_stats) = self._SampleClients(started_clients,
-                                                        completed_clients)
+    (start_stats, complete_stats) = self._CumulativeStats(buckets)
 
     if len(start_stats) > target_size:
       # start_stats and complete_stats are equally big, so resample both
@@ -907,47 +894,41 @@ class ApiGetHuntClientCompletionStatsHandler(
     return ApiGetHuntClientCompletionStatsResult().InitFromDataPoints(
         start_stats, complete_stats)
 
-  def _SampleClients(self, started_clients, completed_clients):
-    # immediately return on empty client data
-    if not started_clients and not completed_clients:
-      return ([], [])
+  def _CumulativeStats(self, buckets):
+    """Turns histogram buckets into cumulative data points.
 
-    cdict = {}
-    for client, timestamp in started_clients:
-      cdict.setdefault(client, []).append(timestamp)
+    Every bucket is turned into a data point at its end, counting all clients
+    started or completed by then.
 
-    fdict = {}
-    for client, timestamp in completed_clients:
-      fdict.setdefault(client, []).append(timestamp)
-
-    cl_age = [min(x).AsSecondsSinceEpoch() for x in cdict.values()]
-    fi_age = [min(x).AsSecondsSinceEpoch() for x in fdict.values()]
-
-    cl_hist = {}
-    fi_hist = {}
+    Args:
+      buckets: A list of db.HuntClientCompletionBucket sorted by timestamp.
 
-    for age in cl_age:
-      cl_hist.setdefault(age, 0)
-      cl_hist[age] += 1
+    Returns:
+      A tuple of lists of (timestamp, count) pairs for started and completed
+      clients.
+    """
+    # immediately return on empty client data
+    if not buckets:
+      return ([], [])
 
-    for age in fi_age:
-      fi_hist.setdefault(age, 0)
-      fi_hist[age] += 1
+    first_started = [b for b in buckets if b.num_started_clients]
+    if first_started:
+      t0 = first_started[0].timestamp.AsSecondsSinceEpoch()
+    else:
+      t0 = buckets[0].timestamp.AsSecondsSinceEpoch()
 
-    t0 = min(cl_age) - 1
     times = [t0]
     cl = [0]
     fi = [0]
 
-    all_times = set(cl_age) | set(fi_age)
     cl_count = 0
     fi_count = 0
+    for bucket in buckets:
+      cl_count += bucket.num_started_clients
+      fi_count += bucket.num_completed_clients
 
-    for time in sorted(all_times):
-      cl_count += cl_hist.get(time, 0)
-      fi_count += fi_hist.get(time, 0)
-
-      times.append(time)
+      times.append(bucket.timestamp.AsSecondsSinceEpoch() +
+                   db.HUNT_COMPLETION_BUCKET_SECONDS)
       cl.append(cl_count)
       fi.append(fi_count)
 
@@ -1041,7 +1022,8 @@ class ApiGetHuntFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
     generator = archive_generator.CollectionArchiveGenerator(
         prefix=target_file_prefix,
         description=description,
-        archive_format=archive_format)
+        archive_format=archive_format,
+        deduplicate_files=args.deduplicate_files)
     content_generator = self._WrapContentGenerator(
         generator, collection, args, context=context)
     return api_call_handler_base.ApiBinaryStream(
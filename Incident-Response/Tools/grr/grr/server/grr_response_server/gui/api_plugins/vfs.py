@@ -17,6 +17,7 @@ from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.util import collection
 from grr_response_core.lib.util import compatibility
 from grr_response_core.lib.util import context as context_lib
 from grr_response_core.lib.util.compat import csv
@@ -37,6 +38,9 @@ from grr_response_server.rdfvalues import objects as rdf_objects
 # Files can only be accessed if their first path component is from this list.
 _ROOT_FILES_ALLOWLIST = ["fs", "registry", "temp"]
 
+# Number of descendant path infos processed at once by the streaming handlers.
+_PATH_INFOS_BATCH_SIZE = 1000
+
 
 def ValidateVfsPath(path):
   """Validates a VFS path."""
@@ -846,27 +850,25 @@ def _GetTimelineStatEntries(api_client_id, file_path, with_history=True):
   except db.UnknownPathError:
     return
 
-  path_infos = []
-  for path_info in itertools.chain(
+  path_infos = itertools.chain(
       [root_path_info],
-      data_store.REL_DB.ListDescendantPathInfos(client_id, path_type,
+      data_store.REL_DB.IterDescendantPathInfos(client_id, path_type,
                                                 components),
-  ):
-    # TODO(user): this is to keep the compatibility with current
-    # AFF4 implementation. Check if this check is needed.
-    if path_info.directory:
-      continue
+  )
+  # TODO(user): this is to keep the compatibility with current
+  # AFF4 implementation. Check if this check is needed.
+  file_path_infos = (pi for pi in path_infos if not pi.directory)
 
-    categorized_path = rdf_objects.ToCategorizedPath(path_info.path_type,
-                                                     path_info.components)
-    if with_history:
-      path_infos.append(path_info)
-    else:
+  if not with_history:
+    for path_info in file_path_infos:
+      categorized_path = rdf_objects.ToCategorizedPath(path_info.path_type,
+                                                       path_info.components)
       yield categorized_path, path_info.stat_entry, path_info.hash_entry
+    return
 
-  if with_history:
+  for batch in collection.Batch(file_path_infos, _PATH_INFOS_BATCH_SIZE):
     hist_path_infos = data_store.REL_DB.ReadPathInfosHistories(
-        client_id, path_type, [tuple(pi.components) for pi in path_infos])
+        client_id, path_type, [tuple(pi.components) for pi in batch])
     for path_info in itertools.chain.from_iterable(hist_path_infos.values()):
       categorized_path = rdf_objects.ToCategorizedPath(path_info.path_type,
                                                        path_info.components)
@@ -1132,31 +1134,36 @@ class ApiGetVfsFilesArchiveHandler(api_call_handler_base.ApiCallHandler):
 
   args_type = ApiGetVfsFilesArchiveArgs
 
-  def _GenerateContent(self, client_id, start_paths, timestamp, path_prefix):
-    client_paths = []
+  def _IterClientPaths(self, client_id, start_paths):
     for start_path in start_paths:
       path_type, components = rdf_objects.ParseCategorizedPath(start_path)
-      for pi in data_store.REL_DB.ListDescendantPathInfos(
+      for pi in data_store.REL_DB.IterDescendantPathInfos(
           client_id, path_type, components):
         if pi.directory:
           continue
 
-        client_paths.append(db.ClientPath.FromPathInfo(client_id, pi))
+        yield db.ClientPath.FromPathInfo(client_id, pi)
+
+  def _GenerateContent(self, client_id, start_paths, timestamp, path_prefix):
+    client_paths = self._IterClientPaths(client_id, start_paths)
 
     archive_generator = utils.StreamingZipGenerator(
         compression=zipfile.ZIP_DEFLATED)
-    for chunk in file_store.StreamFilesChunks(
-        client_paths, max_timestamp=timestamp):
-      if chunk.chunk_index == 0:
-        content_path = os.path.join(path_prefix, chunk.client_path.vfs_path)
-        # TODO(user): Export meaningful file metadata.
-        st = os.stat_result((0o644, 0, 0, 0, 0, 0, chunk.total_size, 0, 0, 0))
-        yield archive_generator.WriteFileHeader(content_path, st=st)
-
-      yield archive_generator.WriteFileChunk(chunk.data)
-
-      if chunk.chunk_index == chunk.total_chunks - 1:
-        yield archive_generator.WriteFileFooter()
+    # Files are streamed in batches, so that the whole listing never has to be
+    # kept in memory.
+    for batch in collection.Batch(client_paths, _PATH_INFOS_BATCH_SIZE):
+      for chunk in file_store.StreamFilesChunks(batch, max_timestamp=timestamp):
+        if chunk.chunk_index == 0:
+          content_path = os.path.join(path_prefix, chunk.client_path.vfs_path)
+          # TODO(user): Export meaningful file metadata.
+          st = os.stat_result(
+              (0o644, 0, 0, 0, 0, 0, chunk.total_size, 0, 0, 0))
+          yield archive_generator.WriteFileHeader(content_path, st=st)
+
+        yield archive_generator.WriteFileChunk(chunk.data)
+
+        if chunk.chunk_index == chunk.total_chunks - 1:
+          yield archive_generator.WriteFileFooter()
 
     yield archive_generator.Close()
 
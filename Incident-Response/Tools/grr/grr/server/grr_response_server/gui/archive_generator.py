@@ -54,7 +54,8 @@ class CollectionArchiveGenerator(object):
                prefix=None,
                description=None,
                predicate=None,
-               client_id=None):
+               client_id=None,
+               deduplicate_files=False):
     """CollectionArchiveGenerator constructor.
 
     Args:
@@ -69,6 +70,10 @@ class CollectionArchiveGenerator(object):
         archived, all others will be skipped. The predicate receives a
         db.ClientPath as input.
       client_id: The client_id to use when exporting a flow results collection.
+      deduplicate_files: If True, contents of every unique file (as identified
+        by its hash) are written only once. Other files with the same contents
+        are written as hard links in TAR archives and are listed in the
+        MANIFEST file in ZIP archives.
 
     Raises:
       ValueError: if prefix is None.
@@ -82,6 +87,7 @@ class CollectionArchiveGenerator(object):
       self.archive_generator = utils.StreamingTarGenerator()
     else:
       raise ValueError("Unknown archive format: %s" % archive_format)
+    self.archive_format = archive_format
 
     if not prefix:
       raise ValueError("Prefix can't be None.")
@@ -97,6 +103,13 @@ class CollectionArchiveGenerator(object):
     self.predicate = predicate or (lambda _: True)
     self.client_id = client_id
 
+    self.deduplicate_files = deduplicate_files
+    # Archive paths of files whose contents were written, keyed by hash id.
+    self._archive_paths_by_hash_id = {}
+    # Archive paths of deduplicated files mapped to archive paths of files
+    # holding their contents.
+    self.deduplicated_files = {}
+
   @property
   def output_size(self):
     return self.archive_generator.output_size
@@ -123,6 +136,12 @@ class CollectionArchiveGenerator(object):
       manifest["failed_files_list"] = [
           _ClientPathToString(cp, prefix="aff4:") for cp in self.failed_files
       ]
+    if self.deduplicate_files:
+      manifest["deduplicated_files"] = len(self.deduplicated_files)
+      # TAR archives reference duplicates with hard links, ZIP archives have
+      # no such concept, so the references are listed here instead.
+      if self.archive_format == self.ZIP and self.deduplicated_files:
+        manifest["deduplicated_files_list"] = dict(self.deduplicated_files)
 
     manifest_fd = io.BytesIO()
     if self.total_files != len(self.archived_files):
@@ -180,10 +199,14 @@ class CollectionArchiveGenerator(object):
         client_ids.add(client_path.client_id)
         client_paths.add(client_path)
 
-      for chunk in file_store.StreamFilesChunks(client_paths):
-        self.processed_files.add(chunk.client_path)
-        for output in self._WriteFileChunk(chunk=chunk):
+      if self.deduplicate_files:
+        for output in self._WriteDeduplicatedFiles(client_paths):
           yield output
+      else:
+        for chunk in file_store.StreamFilesChunks(client_paths):
+          self.processed_files.add(chunk.client_path)
+          for output in self._WriteFileChunk(chunk=chunk):
+            yield output
 
       self.processed_files |= client_paths - (
           self.ignored_files | self.archived_files)
@@ -200,6 +223,63 @@ class CollectionArchiveGenerator(object):
 
     yield self.archive_generator.Close()
 
+  def _WriteDeduplicatedFiles(self, client_paths):
+    """Yields binary chunks writing every unique file contents only once.
+
+    Files with contents that were already written to the archive (in this or
+    one of the previous batches) are not read from the blob store. They are
+    written as hard links (TAR) or recorded in the MANIFEST (ZIP) instead.
+
+    Args:
+      client_paths: A set of db.ClientPath objects to write.
+    """
+    hash_ids_by_cp = file_store.GetLatestHashIds(client_paths)
+
+    unique_paths = []
+    duplicate_paths = []
+    hash_ids_in_batch = set()
+    for client_path in sorted(client_paths, key=_ClientPathToString):
+      hash_id = hash_ids_by_cp.get(client_path)
+      if hash_id is None:
+        continue
+
+      if (hash_id in self._archive_paths_by_hash_id or
+          hash_id in hash_ids_in_batch):
+        duplicate_paths.append(client_path)
+      else:
+        hash_ids_in_batch.add(hash_id)
+        unique_paths.append(client_path)
+
+    for chunk in file_store.StreamFilesChunks(
+        unique_paths, prefetch_blobs=True):
+      self.processed_files.add(chunk.client_path)
+      for output in self._WriteFileChunk(chunk=chunk):
+        yield output
+
+      if chunk.chunk_index == chunk.total_chunks - 1:
+        hash_id = hash_ids_by_cp[chunk.client_path]
+        self._archive_paths_by_hash_id[hash_id] = _ClientPathToString(
+            chunk.client_path, prefix=self.prefix)
+
+    for client_path in duplicate_paths:
+      try:
+        target_path = self._archive_paths_by_hash_id[
+            hash_ids_by_cp[client_path]]
+      except KeyError:
+        # Contents of the original file couldn't be archived, so there is
+        # nothing to reference.
+        continue
+
+      archive_path = _ClientPathToString(client_path, prefix=self.prefix)
+      if self.archive_format == self.TAR_GZ:
+        st = os.stat_result((0o644, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+        yield self.archive_generator.WriteHardLink(
+            archive_path, target_path, st=st)
+
+      self.deduplicated_files[archive_path] = target_path
+      self.processed_files.add(client_path)
+      self.archived_files.add(client_path)
+
   def _WriteFileChunk(self, chunk):
     """Yields binary chunks, respecting archive file headers and footers.
 
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Benchmarks for archive_generator on hunts with duplicated files."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import hashlib
+
+from absl import app
+
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_server import data_store
+from grr_response_server import file_store
+from grr_response_server.databases import db
+from grr_response_server.gui import archive_generator
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class CollectionArchiveGeneratorBenchmark(
+    benchmark_test_lib.AverageMicroBenchmarks):
+  """Compares regular and deduplicated hunt files archives."""
+
+  REPEATS = 3
+  units = "s"
+
+  NUM_CLIENTS = 200
+  NUM_BLOBS = 16
+  BLOB_SIZE = 64 * 1024
+
+  def _WriteDuplicatedFile(self, client_ids):
+    blob_refs = []
+    blobs = {}
+    for i in range(self.NUM_BLOBS):
+      data = hashlib.sha256(b"%d" % i).digest() * (self.BLOB_SIZE // 32)
+      blob_id = rdf_objects.BlobID.FromBlobData(data)
+      blobs[blob_id] = data
+      blob_refs.append(
+          rdf_objects.BlobReference(
+              offset=i * self.BLOB_SIZE, size=len(data), blob_id=blob_id))
+    data_store.BLOBS.WriteBlobs(blobs)
+
+    for client_id in client_ids:
+      path_info = rdf_objects.PathInfo.OS(components=("windows", "evil.dll"))
+      hash_id = file_store.AddFileWithUnknownHash(
+          db.ClientPath.FromPathInfo(client_id, path_info), blob_refs)
+      path_info.hash_entry.sha256 = hash_id.AsBytes()
+      data_store.REL_DB.WritePathInfos(client_id, [path_info])
+
+  def setUp(self):
+    super().setUp()
+
+    client_ids = self.SetupClients(self.NUM_CLIENTS)
+    self._WriteDuplicatedFile(client_ids)
+
+    self.collection = []
+    for client_id in client_ids:
+      self.collection.append(
+          rdf_flow_objects.FlowResult(
+              client_id=client_id,
+              payload=rdf_client_fs.StatEntry(
+                  pathspec=rdf_paths.PathSpec.OS(path="/windows/evil.dll"))))
+
+  def _GenerateArchive(self, archive_format, deduplicate_files):
+    generator = archive_generator.CollectionArchiveGenerator(
+        archive_format=archive_format,
+        prefix="hunt_benchmark",
+        deduplicate_files=deduplicate_files)
+    for _ in generator.Generate(self.collection):
+      pass
+
+    return generator.output_size
+
+  def testGenerateZipArchive(self):
+    for deduplicate_files in [False, True]:
+      self.TimeIt(
+          self._GenerateArchive,
+          name="ZIP (deduplicate_files=%s)" % deduplicate_files,
+          archive_format=archive_generator.CollectionArchiveGenerator.ZIP,
+          deduplicate_files=deduplicate_files)
+
+  def testGenerateTarArchive(self):
+    for deduplicate_files in [False, True]:
+      self.TimeIt(
+          self._GenerateArchive,
+          name="TAR_GZ (deduplicate_files=%s)" % deduplicate_files,
+          archive_format=archive_generator.CollectionArchiveGenerator.TAR_GZ,
+          deduplicate_files=deduplicate_files)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -23,6 +23,7 @@ from grr_response_server import file_store
 from grr_response_server import flow_base
 from grr_response_server.databases import db
 from grr_response_server.gui import archive_generator
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr.test_lib import flow_test_lib
 from grr.test_lib import test_lib
@@ -254,6 +255,89 @@ class CollectionArchiveGeneratorTest(test_lib.GRRBaseTest):
                 ["aff4:/%s/fs/os/foo/bar/中国新闻网新闻中.txt" % self.client_id]
         })
 
+  def _InitializeDuplicatedFiles(self):
+    self.other_client_id = self.SetupClient(1)
+    for client_id in [self.client_id, self.other_client_id]:
+      self._CreateFile(
+          client_id=client_id,
+          vfs_path="fs/os/foo/bar/same.dll",
+          content=b"same")
+      self._CreateFile(
+          client_id=client_id,
+          vfs_path="fs/os/foo/bar/%s.txt" % client_id,
+          content=client_id.encode("utf-8"))
+
+    self.collection = []
+    for client_id in [self.client_id, self.other_client_id]:
+      for name in ["same.dll", "%s.txt" % client_id]:
+        self.collection.append(
+            rdf_flow_objects.FlowResult(
+                client_id=client_id,
+                payload=rdf_client_fs.StatEntry(
+                    pathspec=rdf_paths.PathSpec(
+                        path="foo/bar/" + name,
+                        pathtype=rdf_paths.PathSpec.PathType.OS))))
+
+  def _GenerateDeduplicatedArchive(self, archive_format):
+    fd_path = os.path.join(self.temp_dir, "archive")
+    generator = archive_generator.CollectionArchiveGenerator(
+        archive_format=archive_format,
+        prefix="test_prefix",
+        description="Test description",
+        deduplicate_files=True)
+    with open(fd_path, "wb") as out_fd:
+      for chunk in generator.Generate(self.collection):
+        out_fd.write(chunk)
+
+    return fd_path
+
+  def testDeduplicatedZipListsDuplicatesInManifest(self):
+    self._InitializeDuplicatedFiles()
+
+    fd_path = self._GenerateDeduplicatedArchive(
+        archive_generator.CollectionArchiveGenerator.ZIP)
+
+    zip_fd = zipfile.ZipFile(fd_path)
+    names = zip_fd.namelist()
+    original = "test_prefix/%s/fs/os/foo/bar/same.dll" % self.client_id
+    duplicate = "test_prefix/%s/fs/os/foo/bar/same.dll" % self.other_client_id
+    self.assertIn(original, names)
+    self.assertNotIn(duplicate, names)
+    self.assertEqual(zip_fd.read(original), b"same")
+
+    manifest = yaml.safe_load(zip_fd.read("test_prefix/MANIFEST"))
+    self.assertEqual(manifest["processed_files"], 4)
+    self.assertEqual(manifest["archived_files"], 4)
+    self.assertEqual(manifest["deduplicated_files"], 1)
+    self.assertEqual(manifest["deduplicated_files_list"],
+                     {duplicate: original})
+
+  def testDeduplicatedTarUsesHardLinks(self):
+    self._InitializeDuplicatedFiles()
+
+    fd_path = self._GenerateDeduplicatedArchive(
+        archive_generator.CollectionArchiveGenerator.TAR_GZ)
+
+    original = "test_prefix/%s/fs/os/foo/bar/same.dll" % self.client_id
+    duplicate = "test_prefix/%s/fs/os/foo/bar/same.dll" % self.other_client_id
+    with tarfile.open(fd_path, encoding="utf-8") as tar_fd:
+      self.assertTrue(tar_fd.getmember(original).isfile())
+      self.assertTrue(tar_fd.getmember(duplicate).islnk())
+      self.assertEqual(tar_fd.getmember(duplicate).linkname, original)
+      self.assertEqual(tar_fd.extractfile(duplicate).read(), b"same")
+
+      other_file = "test_prefix/%s/fs/os/foo/bar/%s.txt" % (
+          self.other_client_id, self.other_client_id)
+      self.assertEqual(
+          tar_fd.extractfile(other_file).read(),
+          self.other_client_id.encode("utf-8"))
+
+      manifest = yaml.safe_load(
+          tar_fd.extractfile("test_prefix/MANIFEST").read())
+      self.assertEqual(manifest["archived_files"], 4)
+      self.assertEqual(manifest["deduplicated_files"], 1)
+      self.assertNotIn("deduplicated_files_list", manifest)
+
 
 class FlowArchiveGeneratorTest(test_lib.GRRBaseTest):
   """Test for CollectionArchiveGenerator."""
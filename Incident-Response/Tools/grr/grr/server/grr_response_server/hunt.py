@@ -113,6 +113,13 @@ def StopHuntIfCPUOrNetworkLimitsExceeded(hunt_id):
   if hunt_obj.hunt_state == rdf_hunt_objects.Hunt.HuntState.STOPPED:
     return hunt_obj
 
+  # Do nothing if the hunt has no limits to check.
+  if not (hunt_obj.total_network_bytes_limit or
+          hunt_obj.avg_results_per_client_limit or
+          hunt_obj.avg_cpu_seconds_per_client_limit or
+          hunt_obj.avg_network_bytes_per_client_limit):
+    return hunt_obj
+
   hunt_counters = data_store.REL_DB.ReadHuntCounters(hunt_id)
 
   # Check global hunt network bytes limit first.
@@ -96,6 +96,11 @@ class InstantOutputPluginWithExportConversion(InstantOutputPlugin):
   __abstract = True  # pylint: disable=g-bad-name
 
   BATCH_SIZE = 5000
+  # Number of threads running export converters. If 0, values are converted
+  # in the thread that consumes the plugin output.
+  CONVERSION_THREADS = 4
+  # Maximum number of batches being converted or waiting to be written.
+  MAX_PENDING_BATCHES = 8
 
   def __init__(self, *args, **kwargs):
     super().__init__(*args, **kwargs)
@@ -212,7 +217,9 @@ class InstantOutputPluginWithExportConversion(InstantOutputPlugin):
     """Generates converted values using given converter from given messages.
 
     Groups values in batches of BATCH_SIZE size and applies the converter
-    to each batch.
+    to each batch. Batches are converted by CONVERSION_THREADS worker threads
+    while the next batches are being read, with at most MAX_PENDING_BATCHES
+    batches in flight. Converted values are yielded in the original order.
 
     Args:
       converter: ExportConverter instance.
@@ -224,12 +231,19 @@ class InstantOutputPluginWithExportConversion(InstantOutputPlugin):
     Raises:
       ValueError: if any of the GrrMessage objects doesn't have "source" set.
     """
-    for batch in collection.Batch(grr_messages, self.BATCH_SIZE):
-      metadata_items = self._GetMetadataForClients([gm.source for gm in batch])
-      batch_with_metadata = zip(metadata_items, [gm.payload for gm in batch])
 
-      for result in converter.BatchConvert(batch_with_metadata):
-        yield result
+    def MetadataValueBatches():
+      for batch in collection.Batch(grr_messages, self.BATCH_SIZE):
+        metadata_items = self._GetMetadataForClients(
+            [gm.source for gm in batch])
+        yield list(zip(metadata_items, [gm.payload for gm in batch]))
+
+    for result in export.ConvertBatchesInParallel(
+        converter,
+        MetadataValueBatches(),
+        num_workers=self.CONVERSION_THREADS,
+        max_pending_batches=self.MAX_PENDING_BATCHES):
+      yield result
 
   def ProcessValues(self, value_type, values_generator_fn):
     converter_classes = export.ExportConverter.GetConvertersByClass(value_type)
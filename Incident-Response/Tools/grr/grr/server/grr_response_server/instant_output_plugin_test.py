@@ -10,6 +10,7 @@ import io
 from absl import app
 
 from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
 from grr_response_server import export
 from grr_response_server.output_plugins import test_plugins
 from grr.test_lib import test_lib
@@ -111,6 +112,29 @@ class InstantOutputPluginWithExportConversionTest(
         "Finish"
     ])  # pyformat: disable
 
+  def testPreservesOrderWhenConvertingManyBatchesInParallel(self):
+    values = [DummySrcValue1("v%d" % i) for i in range(100)]
+    with utils.MultiStubber((self.plugin, "BATCH_SIZE", 7),
+                            (self.plugin, "CONVERSION_THREADS", 3),
+                            (self.plugin, "MAX_PENDING_BATCHES", 2)):
+      lines = self.ProcessValuesToLines({DummySrcValue1: values})
+
+    self.assertListEqual(
+        lines, ["Start", "Original: DummySrcValue1"] +
+        ["Exported value: exp-v%d" % i for i in range(100)] + ["Finish"])
+
+  def testWorksCorrectlyWithoutConversionThreads(self):
+    values = [DummySrcValue2("v%d" % i) for i in range(10)]
+    with utils.MultiStubber((self.plugin, "BATCH_SIZE", 3),
+                            (self.plugin, "CONVERSION_THREADS", 0)):
+      lines = self.ProcessValuesToLines({DummySrcValue2: values})
+
+    self.assertListEqual(
+        lines, ["Start", "Original: DummySrcValue2"] +
+        ["Exported value: exp1-v%d" % i for i in range(10)] +
+        ["Original: DummySrcValue2"] +
+        ["Exported value: exp2-v%d" % i for i in range(10)] + ["Finish"])
+
 
 def main(argv):
   test_lib.main(argv)
@@ -5,6 +5,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
+import hashlib
 import re
 
 from grr_response_core.lib import rdfvalue
@@ -181,6 +182,51 @@ class Flow(rdf_structs.RDFProtoStruct):
       self.runtime_us = rdfvalue.Duration(0)
 
 
+def _ClearDefaultFields(proto):
+  """Clears fields of a proto (recursively) that are set to default values."""
+  for field, value in proto.ListFields():
+    if field.label == field.LABEL_REPEATED:
+      is_map = (
+          field.message_type is not None and
+          field.message_type.GetOptions().map_entry)
+      if field.cpp_type == field.CPPTYPE_MESSAGE and not is_map:
+        for item in value:
+          _ClearDefaultFields(item)
+    elif field.cpp_type == field.CPPTYPE_MESSAGE:
+      _ClearDefaultFields(value)
+      if not value.ListFields():
+        proto.ClearField(field.name)
+    elif value == field.default_value:
+      proto.ClearField(field.name)
+
+
+def FlowArgsDigest(flow_args):
+  """Returns a digest identifying flow arguments.
+
+  Digests of arguments of flows are stored by the database, so that identical
+  flows can be found without reading and comparing the arguments of all flows.
+  Fields explicitly set to their default values are treated as not set, so
+  arguments that compare equal have the same digest.
+
+  Args:
+    flow_args: Flow arguments rdfvalue or None (equivalent to EmptyFlowArgs).
+
+  Returns:
+    A SHA-256 digest (32 bytes) of the arguments' type and serialized value.
+  """
+  if flow_args is None:
+    flow_args = rdf_flows.EmptyFlowArgs()
+
+  proto = flow_args.AsPrimitiveProto()
+  _ClearDefaultFields(proto)
+
+  hasher = hashlib.sha256()
+  hasher.update(compatibility.GetName(type(flow_args)).encode("utf-8"))
+  hasher.update(b"\0")
+  hasher.update(proto.SerializeToString(deterministic=True))
+  return hasher.digest()
+
+
 def _ClientIDFromSessionID(session_id):
   """Extracts the client id from a session id."""
 
@@ -6,7 +6,6 @@ from __future__ import division
 from __future__ import unicode_literals
 
 from grr_response_core.lib import rdfvalue
-from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_server import data_store
 
 
@@ -43,21 +42,6 @@ class FlowThrottler(object):
     self.daily_req_limit = daily_req_limit
     self.dup_interval = dup_interval
 
-  def _LoadFlows(self, client_id, min_create_time):
-    """Yields all flows for the given client_id and time range.
-
-    Args:
-      client_id: Client id string.
-      min_create_time: minimum creation time (inclusive)
-    Yields: flow_objects.Flow objects
-    """
-    flow_list = data_store.REL_DB.ReadAllFlowObjects(
-        client_id=client_id,
-        min_create_time=min_create_time,
-        include_child_flows=False)
-    for flow_obj in flow_list:
-      yield flow_obj
-
   def EnforceLimits(self, client_id, user, flow_name, flow_args=None):
     """Enforce DailyFlowRequestLimit and FlowDuplicateInterval.
 
@@ -81,30 +65,25 @@ class FlowThrottler(object):
       return
 
     now = rdfvalue.RDFDatetime.Now()
-    yesterday = now - rdfvalue.Duration.From(1, rdfvalue.DAYS)
-    dup_boundary = now - self.dup_interval
-    min_create_time = min(yesterday, dup_boundary)
 
-    flow_count = 0
-    flow_objs = self._LoadFlows(client_id, min_create_time)
-
-    if flow_args is None:
-      flow_args = rdf_flows.EmptyFlowArgs()
-
-    for flow_obj in flow_objs:
-      if (flow_obj.create_time > dup_boundary and
-          flow_obj.flow_class_name == flow_name and flow_obj.args == flow_args):
+    # Both checks are answered by the database's throttling indexes, so there
+    # is no need to read and compare all recent flows of the client.
+    if self.dup_interval:
+      dup_boundary = now - self.dup_interval
+      flow_obj = data_store.REL_DB.ReadLatestFlowObjectWithArgs(
+          client_id, flow_name, flow_args, dup_boundary)
+      if flow_obj is not None:
         raise DuplicateFlowError(
             "Identical %s already run on %s at %s" %
             (flow_name, client_id, flow_obj.create_time),
             flow_id=flow_obj.flow_id)
 
-      # Filter for flows started by user within the 1 day window.
-      if flow_obj.creator == user and flow_obj.create_time > yesterday:
-        flow_count += 1
-
     # If limit is set, enforce it.
-    if self.daily_req_limit and flow_count >= self.daily_req_limit:
-      raise DailyFlowRequestLimitExceededError(
-          "%s flows run since %s, limit: %s" %
-          (flow_count, yesterday, self.daily_req_limit))
+    if self.daily_req_limit:
+      yesterday = now - rdfvalue.Duration.From(1, rdfvalue.DAYS)
+      flow_count = data_store.REL_DB.CountFlowObjectsByCreator(
+          client_id, user, yesterday)
+      if flow_count >= self.daily_req_limit:
+        raise DailyFlowRequestLimitExceededError(
+            "%s flows run since %s, limit: %s" %
+            (flow_count, yesterday, self.daily_req_limit))
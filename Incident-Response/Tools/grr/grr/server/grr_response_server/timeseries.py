@@ -1,13 +1,20 @@
 #!/usr/bin/env python
 # Lint as: python3
 """Operations on a series of points, indexed by time.
+
+Points are stored in two NumPy arrays (values and timestamps), so that
+operations on long series (e.g. a year of per-minute client statistics) are
+vectorized. Missing values (None) are stored as NaN.
+
+Operations never modify the arrays in place, they replace them with new arrays
+or views instead. This allows copies of a series and filtered series to share
+their data.
 """
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import unicode_literals
 
-import copy
-
+import numpy as np
 
 from grr_response_core.lib import rdfvalue
 
@@ -15,6 +22,14 @@ NORMALIZE_MODE_GAUGE = 1
 NORMALIZE_MODE_COUNTER = 2
 
 
+def _ValuesArray(values):
+  """Converts a sequence of values (possibly None) to an array."""
+  if any(v is None for v in values):
+    return np.array([np.nan if v is None else v for v in values],
+                    dtype=np.float64)
+  return np.asarray(values)
+
+
 class Timeseries(object):
   """Timeseries contains a sequence of points, each with a timestamp."""
 
@@ -27,14 +42,71 @@ class Timeseries(object):
     Raises:
       RuntimeError: If initializer is not understood.
     """
+    # Points appended one by one are buffered, as growing arrays is expensive.
+    self._pending_values = []
+    self._pending_timestamps = []
+
     if initializer is None:
-      self.data = []
+      self._values = np.empty(0, dtype=np.int64)
+      self._timestamps = np.empty(0, dtype=np.int64)
       return
     if isinstance(initializer, Timeseries):
-      self.data = copy.deepcopy(initializer.data)
+      # pylint: disable=protected-access
+      initializer._Consolidate()
+      # Arrays are never modified in place, so they can be shared.
+      self._values = initializer._values
+      self._timestamps = initializer._timestamps
+      # pylint: enable=protected-access
       return
     raise RuntimeError("Unrecognized initializer.")
 
+  def _Consolidate(self):
+    """Moves buffered points to the arrays."""
+    if not self._pending_timestamps:
+      return
+
+    values = _ValuesArray(self._pending_values)
+    timestamps = np.asarray(self._pending_timestamps, dtype=np.int64)
+    self._pending_values = []
+    self._pending_timestamps = []
+
+    if self._timestamps.size:
+      values = np.concatenate([self._values, values])
+      timestamps = np.concatenate([self._timestamps, timestamps])
+    self._values = values
+    self._timestamps = timestamps
+
+  @property
+  def values(self):
+    """Values of the series as an array (missing values are NaN)."""
+    self._Consolidate()
+    return self._values
+
+  @property
+  def timestamps(self):
+    """Timestamps of the series as an array of microseconds since epoch."""
+    self._Consolidate()
+    return self._timestamps
+
+  @property
+  def data(self):
+    """Points of the series as a list of [value, timestamp] lists."""
+    self._Consolidate()
+    values = self._values.tolist()
+    if self._values.dtype.kind == "f":
+      values = [None if v != v else v for v in values]  # NaN != NaN.
+    return [list(p) for p in zip(values, self._timestamps.tolist())]
+
+  @data.setter
+  def data(self, points):
+    self._pending_values = []
+    self._pending_timestamps = []
+    self._values = _ValuesArray([v for v, _ in points])
+    self._timestamps = np.asarray([t for _, t in points], dtype=np.int64)
+
+  def __len__(self):
+    return self._timestamps.size + len(self._pending_timestamps)
+
   def _NormalizeTime(self, time):
     """Normalize a time to be an int measured in microseconds."""
     if isinstance(time, rdfvalue.RDFDatetime):
@@ -43,6 +115,13 @@ class Timeseries(object):
       return time.microseconds
     return int(time)
 
+  def _LastTimestamp(self):
+    if self._pending_timestamps:
+      return self._pending_timestamps[-1]
+    if self._timestamps.size:
+      return self._timestamps[-1]
+    return None
+
   def Append(self, value, timestamp):
     """Adds value at timestamp.
 
@@ -57,18 +136,37 @@ class Timeseries(object):
     """
 
     timestamp = self._NormalizeTime(timestamp)
-    if self.data and timestamp < self.data[-1][1]:
+    last_timestamp = self._LastTimestamp()
+    if last_timestamp is not None and timestamp < last_timestamp:
       raise RuntimeError("Next timestamp must be larger.")
-    self.data.append([value, timestamp])
+    self._pending_values.append(value)
+    self._pending_timestamps.append(timestamp)
 
   def MultiAppend(self, value_timestamp_pairs):
     """Adds multiple value<->timestamp pairs.
 
     Args:
       value_timestamp_pairs: Tuples of (value, timestamp).
+
+    Raises:
+      RuntimeError: If timestamps are not increasing.
     """
+    values = []
+    timestamps = []
     for value, timestamp in value_timestamp_pairs:
-      self.Append(value, timestamp)
+      values.append(value)
+      timestamps.append(self._NormalizeTime(timestamp))
+    if not timestamps:
+      return
+
+    last_timestamp = self._LastTimestamp()
+    if last_timestamp is not None and timestamps[0] < last_timestamp:
+      raise RuntimeError("Next timestamp must be larger.")
+    if np.any(np.diff(np.asarray(timestamps, dtype=np.int64)) < 0):
+      raise RuntimeError("Next timestamp must be larger.")
+
+    self._pending_values.extend(values)
+    self._pending_timestamps.extend(timestamps)
 
   def FilterRange(self, start_time=None, stop_time=None):
     """Filter the series to lie between start_time and stop_time.
@@ -79,14 +177,20 @@ class Timeseries(object):
       start_time: If set, timestamps before start_time will be dropped.
       stop_time: If set, timestamps at or past stop_time will be dropped.
     """
+    self._Consolidate()
 
-    start_time = self._NormalizeTime(start_time)
-    stop_time = self._NormalizeTime(stop_time)
-    self.data = [
-        p for p in self.data
-        if (start_time is None or p[1] >= start_time) and
-        (stop_time is None or p[1] < stop_time)
-    ]
+    start = 0
+    stop = self._timestamps.size
+    if start_time is not None:
+      start = np.searchsorted(
+          self._timestamps, self._NormalizeTime(start_time), side="left")
+    if stop_time is not None:
+      stop = np.searchsorted(
+          self._timestamps, self._NormalizeTime(stop_time), side="left")
+
+    # Slicing creates views, the data is not copied.
+    self._values = self._values[start:stop]
+    self._timestamps = self._timestamps[start:stop]
 
   def Normalize(self, period, start_time, stop_time, mode=NORMALIZE_MODE_GAUGE):
     """Normalize the series to have a fixed period over a fixed time range.
@@ -124,33 +228,39 @@ class Timeseries(object):
     period = self._NormalizeTime(period)
     start_time = self._NormalizeTime(start_time)
     stop_time = self._NormalizeTime(stop_time)
-    if not self.data:
+    if not len(self):  # pylint: disable=g-explicit-length-test
       return
 
     self.FilterRange(start_time, stop_time)
 
-    grouped = {}
-    for value, timestamp in self.data:
-      offset = timestamp - start_time
-      shifted_offset = offset - (offset % period)
-      grouped.setdefault(shifted_offset, []).append(value)
-
-    self.data = []
-    last_value = None
-    for offset in range(0, stop_time - start_time, period):
-      g = grouped.get(offset)
-      if mode == NORMALIZE_MODE_GAUGE:
-        v = None
-        if g:
-          v = sum(g) / len(g)
-        self.data.append([v, offset + start_time])
+    values = self._values
+    # Index of the output interval of every point.
+    buckets = (self._timestamps - start_time) // period
+    num_buckets = max(0, -(-(stop_time - start_time) // period))
+    timestamps = start_time + np.arange(num_buckets, dtype=np.int64) * period
+
+    if mode == NORMALIZE_MODE_GAUGE:
+      counts = np.bincount(buckets, minlength=num_buckets)
+      sums = np.bincount(
+          buckets, weights=values.astype(np.float64), minlength=num_buckets)
+      with np.errstate(invalid="ignore", divide="ignore"):
+        self._values = np.where(counts > 0, sums / np.maximum(counts, 1),
+                                np.nan)
+    else:
+      if np.any(np.diff(values) < 0):
+        raise RuntimeError("Next value must not be smaller.")
+
+      # Index of the last point in or before every output interval (-1 if
+      # there is no such point).
+      last = np.searchsorted(buckets, np.arange(num_buckets), side="right") - 1
+      if not values.size:
+        self._values = np.full(num_buckets, np.nan)
+      elif np.any(last < 0):
+        self._values = np.where(last >= 0, values[np.maximum(last, 0)], np.nan)
       else:
-        if g:
-          for v in g:
-            if last_value is not None and v < last_value:
-              raise RuntimeError("Next value must not be smaller.")
-            last_value = v
-        self.data.append([last_value, offset + start_time])
+        self._values = values[last]
+
+    self._timestamps = timestamps
 
   def MakeIncreasing(self):
     """Makes the time series increasing.
@@ -164,15 +274,16 @@ class Timeseries(object):
     larger than the previous level.
 
     """
-    offset = 0
-    last_value = None
-    for p in self.data:
-      if last_value and last_value > p[0]:
-        # Assume that it was only reset once.
-        offset += last_value
-      last_value = p[0]
-      if offset:
-        p[0] += offset
+    self._Consolidate()
+    if self._values.size < 2:
+      return
+
+    previous = self._values[:-1]
+    # Assume that the counter was only reset once between two points, so the
+    # value before the reset is what was counted until then.
+    resets = np.where(previous > self._values[1:], previous, 0)
+    offsets = np.concatenate([[0], np.cumsum(resets)])
+    self._values = self._values + offsets.astype(self._values.dtype)
 
   def ToDeltas(self):
     """Convert the sequence to the sequence of differences between points.
@@ -180,15 +291,15 @@ class Timeseries(object):
     The value of each point v[i] is replaced by v[i+1] - v[i], except for the
     last point which is dropped.
     """
-    if len(self.data) < 2:
-      self.data = []
+    self._Consolidate()
+    if self._values.size < 2:
+      self._values = self._values[:0]
+      self._timestamps = self._timestamps[:0]
       return
-    for i in range(0, len(self.data) - 1):
-      if self.data[i][0] is None or self.data[i + 1][0] is None:
-        self.data[i][0] = None
-      else:
-        self.data[i][0] = self.data[i + 1][0] - self.data[i][0]
-    del self.data[-1]
+
+    # Differences with missing values (NaN) are missing as well.
+    self._values = np.diff(self._values)
+    self._timestamps = self._timestamps[:-1]
 
   def Add(self, other):
     """Add other to self pointwise.
@@ -203,27 +314,35 @@ class Timeseries(object):
     Raises:
       RuntimeError: other does not contain the same timestamps as self.
     """
-    if len(self.data) != len(other.data):
+    if len(self) != len(other):
       raise RuntimeError("Can only add series of identical lengths.")
-    for i in range(len(self.data)):
-      if self.data[i][1] != other.data[i][1]:
-        raise RuntimeError("Timestamp mismatch.")
-      if self.data[i][0] is None and other.data[i][0] is None:
-        continue
-      self.data[i][0] = (self.data[i][0] or 0) + (other.data[i][0] or 0)
+    if not np.array_equal(self.timestamps, other.timestamps):
+      raise RuntimeError("Timestamp mismatch.")
+
+    values = self._values
+    other_values = other.values
+    if values.dtype.kind != "f" and other_values.dtype.kind != "f":
+      self._values = values + other_values
+      return
+
+    # A point is missing only if it is missing in both series.
+    missing = np.isnan(values) & np.isnan(other_values)
+    total = np.nan_to_num(values) + np.nan_to_num(other_values)
+    self._values = np.where(missing, np.nan, total)
 
   def Rescale(self, multiplier):
     """Multiply pointwise by multiplier."""
-    for p in self.data:
-      if p[0] is not None:
-        p[0] *= multiplier
+    self._Consolidate()
+    self._values = self._values * multiplier
 
   def Mean(self):
     """Return the arithmetic mean of all values."""
-    values = [v for v, _ in self.data if v is not None]
-    if not values:
+    values = self.values
+    if values.dtype.kind == "f":
+      values = values[~np.isnan(values)]
+    if not values.size:
       return None
 
     # TODO(hanuszczak): Why do we return a floored division result instead of
     # the exact value?
-    return sum(values) // len(values)
+    return values.sum().item() // values.size
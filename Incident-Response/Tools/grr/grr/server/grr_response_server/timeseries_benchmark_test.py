@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Benchmarks for timeseries over a year of per-minute samples."""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import random
+
+from absl import app
+
+from grr_response_server import timeseries
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class TimeseriesBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
+  """Times operations used for rendering client load stats graphs."""
+
+  REPEATS = 3
+  units = "s"
+
+  MINUTE = 60 * 1000 * 1000
+  NUM_SAMPLES = 365 * 24 * 60
+  # Number of points in a rendered graph, see ApiGetClientLoadStatsHandler.
+  NUM_BUCKETS = 1000
+
+  START_TIME = 1577836800 * 1000 * 1000
+
+  def setUp(self):
+    super().setUp()
+
+    rand = random.Random(0)
+    self.gauge_points = []
+    self.counter_points = []
+    counter = 0
+    for i in range(self.NUM_SAMPLES):
+      timestamp = self.START_TIME + i * self.MINUTE
+      self.gauge_points.append((rand.uniform(0, 100), timestamp))
+
+      # Counters are occasionally reset, e.g. when the client restarts.
+      if rand.random() < 0.001:
+        counter = 0
+      counter += rand.randint(0, 1024)
+      self.counter_points.append((counter, timestamp))
+
+    self.stop_time = self.START_TIME + self.NUM_SAMPLES * self.MINUTE
+    self.period = (self.stop_time - self.START_TIME) // self.NUM_BUCKETS
+
+  def _MakeSeries(self, points):
+    ts = timeseries.Timeseries()
+    ts.MultiAppend(points)
+    return ts
+
+  def _Gauge(self):
+    ts = self._MakeSeries(self.gauge_points)
+    ts.Normalize(self.period, self.START_TIME, self.stop_time)
+    return len(ts.data)
+
+  def _Counter(self):
+    ts = self._MakeSeries(self.counter_points)
+    ts.MakeIncreasing()
+    ts.Normalize(
+        self.period,
+        self.START_TIME,
+        self.stop_time,
+        mode=timeseries.NORMALIZE_MODE_COUNTER)
+    ts.ToDeltas()
+    return len(ts.data)
+
+  def _FilterRange(self, series):
+    ts = timeseries.Timeseries(series)
+    ts.FilterRange(self.START_TIME + self.NUM_SAMPLES // 4 * self.MINUTE,
+                   self.START_TIME + self.NUM_SAMPLES // 2 * self.MINUTE)
+    return len(ts)
+
+  def testAppend(self):
+    self.TimeIt(
+        self._MakeSeries, name="MultiAppend", points=self.gauge_points)
+
+  def testNormalizeGauge(self):
+    self.TimeIt(self._Gauge, name="Normalize (gauge)")
+
+  def testNormalizeCounter(self):
+    self.TimeIt(self._Counter, name="MakeIncreasing + Normalize (counter)")
+
+  def testFilterRange(self):
+    series = self._MakeSeries(self.gauge_points)
+    self.TimeIt(self._FilterRange, name="FilterRange", series=series)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)